@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the signaling capture log
+Generates the inbound traffic of a meeting (joins, offers, answers, ICE
+candidates, media updates, chat, leaves) and reports the per-event cost and
+log bytes of capturing it with payloads, sizes only and 10% sampling. With
+--keep the full log is left in that directory as input for tools.replay_capture
+
+Usage: python -m benchmarks.bench_capture [--participants 20] [--keep DIR]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from capture import CaptureLog
+
+SDP = "v=0\r\no=- 4611731400430051336 2 IN IP4 127.0.0.1\r\n" + "a=candidate:x\r\n" * 40
+
+
+def meeting_events(participants, room="000000000000000000000001"):
+    """(sid, event, args) for one meeting, in order, with a pause after each"""
+    sids = [f"sid-{i:04d}" for i in range(participants)]
+    events = []
+    for i, sid in enumerate(sids):
+        events.append((sid, "connect", ()))
+        events.append((sid, "join", ({"room": room, "userId": f"user-{i}"},)))
+        # The newcomer offers to everyone already there, who answer
+        for peer in sids[:i]:
+            offer = {"type": "offer", "sdp": SDP}
+            msg = {"targetSocket": peer, "offer": offer, "fromUserId": f"user-{i}", "msgId": sid}
+            events.append((sid, "offer", (msg,)))
+            answer = {"targetSocket": sid, "answer": {"type": "answer", "sdp": SDP}, "msgId": sid}
+            events.append((peer, "answer", (answer,)))
+            for n in range(4):
+                candidate = {"candidate": f"candidate:{n} 1 udp 2122260223 10.0.0.{n} 5{n}000"}
+                events.append((sid, "ice-candidate", ({"targetSocket": peer, **candidate},)))
+                events.append((peer, "ice-candidate", ({"targetSocket": sid, **candidate},)))
+    for _ in range(participants * 5):
+        sid = random.choice(sids)
+        events.append((sid, "media-status-update", ({"room": room, "isMuted": True},)))
+        message = {"room": room, "id": str(random.random()), "message": "hello everyone"}
+        events.append((sid, "send-chat-message", (message,)))
+    for i, sid in enumerate(sids):
+        events.append((sid, "leave", ({"room": room, "userId": f"user-{i}"},)))
+        events.append((sid, "disconnect", ()))
+    return events
+
+
+class StepClock:
+    """Spreads the events out in time as if they arrived over a few seconds"""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def measure(events, directory, **options):
+    log = CaptureLog(directory, clock=StepClock(0.002), **options)
+    start = time.perf_counter()
+    for sid, event, args in events:
+        log.record(sid, event, args)
+    elapsed = time.perf_counter() - start
+    log.close()
+    size = os.path.getsize(log.path) if log.path else 0
+    return elapsed / len(events), size, log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--keep", help="directory to leave the full capture log in")
+    args = parser.parse_args()
+
+    events = meeting_events(args.participants)
+    print(f"{len(events)} inbound events for a {args.participants}-person meeting")
+    print(f"{'mode':<16} {'us/event':>9} {'log bytes':>10} {'B/event':>8} {'captured':>9}")
+    modes = (
+        ("payloads", {}),
+        ("sizes only", {"payloads": False}),
+        ("10% sampled", {"sample": 0.1}),
+    )
+    with tempfile.TemporaryDirectory() as scratch:
+        for label, options in modes:
+            directory = args.keep if args.keep and label == "payloads" else scratch
+            cost, size, log = measure(events, directory, **options)
+            print(
+                f"{label:<16} {cost * 1e6:>9.2f} {size:>10} {size / len(events):>8.1f} "
+                f"{log.records:>9}"
+            )
+            if directory == args.keep:
+                kept = log.path
+    if args.keep:
+        print(f"capture log kept at {kept}")
+
+
+if __name__ == "__main__":
+    main()
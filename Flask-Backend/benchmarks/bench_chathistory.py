@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark for chat history search
+Indexes N chat messages of one meeting (words drawn from a Zipf-like
+vocabulary) in flush-sized batches, then reports the latency of a page of
+results for rare, common and combined terms and for a deep page, next to a
+scan of every message (the cost of searching without an index)
+
+Usage: python -m benchmarks.bench_chathistory [--messages 100000] [--page 20]
+"""
+
+import argparse
+import itertools
+import random
+import time
+
+from chathistory import PostingIndex, tokenize
+
+
+def vocabulary(size):
+    return [f"w{i}" for i in range(size)]
+
+
+def messages(count, words, seed=7):
+    rng = random.Random(seed)
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    return [
+        " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(3, 15)))
+        for _ in range(count)
+    ]
+
+
+def scan(texts, terms, limit):
+    found = []
+    for number in range(len(texts) - 1, -1, -1):
+        words = set(tokenize(texts[number]))
+        if all(term in words for term in terms):
+            found.append(number)
+            if len(found) == limit:
+                break
+    return found
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--page", type=int, default=20)
+    args = parser.parse_args()
+
+    words = vocabulary(args.vocabulary)
+    texts = messages(args.messages, words)
+
+    index = PostingIndex()
+    start = time.perf_counter()
+    slowest = 0.0
+    for first in range(0, len(texts), args.batch):
+        batch_start = time.perf_counter()
+        for number in range(first, min(first + args.batch, len(texts))):
+            index.add(number, texts[number])
+        slowest = max(slowest, time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+    print(
+        f"indexed {len(texts)} messages in {elapsed:.2f}s "
+        f"({len(texts) / elapsed:,.0f} msg/s, slowest {args.batch}-message batch "
+        f"{slowest * 1000:.2f} ms), {len(index.postings)} terms"
+    )
+
+    rare = words[args.vocabulary // 2]
+    queries = [
+        ("rare term", [rare]),
+        ("common term", [words[0]]),
+        ("two common terms", [words[0], words[1]]),
+        ("rare + common", [rare, words[0]]),
+        ("no match", [words[0], "absent"]),
+    ]
+    print(f"{'query':<18} {'hits':>7} {'index ms':>9} {'scan ms':>9}")
+    for label, terms in queries:
+        hits = sum(1 for _ in index.search(terms, len(texts)))
+        cost, page = timed(lambda: index.search(terms, args.page), 50)
+        scan_cost, scanned = timed(lambda: scan(texts, terms, args.page), 1)
+        assert page == scanned
+        print(f"{label:<18} {hits:>7} {cost * 1000:>9.3f} {scan_cost * 1000:>9.1f}")
+
+    # Follow the cursor 50 pages down for the common term
+    before = None
+    start = time.perf_counter()
+    for _ in range(50):
+        page = index.search([words[0]], args.page, before)
+        before = page[-1]
+    cost = (time.perf_counter() - start) / 50
+    print(f"{'page 1-50 common':<18} {'':>7} {cost * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
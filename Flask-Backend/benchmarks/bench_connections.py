@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for active connection records
+Builds active_connections for N simulated sockets (ids decoded per join, as
+they arrive off the wire) and reports the traced bytes per connection for the
+previous per-socket dicts versus interned __slots__ records
+
+Usage: python -m benchmarks.bench_connections [--sizes 10000 50000 100000] [--room-size N]
+"""
+
+import argparse
+import gc
+import json
+import secrets
+import tracemalloc
+
+from connections import ConnectionRecord
+
+
+def join_payloads(count, room_size):
+    """Encoded join packets; decoding each one yields fresh id strings"""
+    rooms = [secrets.token_hex(12) for _ in range(max(1, count // room_size))]
+    return [
+        (
+            secrets.token_urlsafe(15),
+            json.dumps({"room": rooms[i % len(rooms)], "userId": secrets.token_hex(12)}),
+        )
+        for i in range(count)
+    ]
+
+
+def build_dicts(payloads):
+    connections = {}
+    for sid, raw in payloads:
+        data = json.loads(raw)
+        connections[sid] = {
+            "room": data["room"],
+            "userId": data["userId"],
+            "socketId": sid,
+            "role": "presenter",
+        }
+    return connections
+
+
+def build_records(payloads):
+    connections = {}
+    for sid, raw in payloads:
+        data = json.loads(raw)
+        connections[sid] = ConnectionRecord(data["room"], data["userId"], sid, "presenter")
+    return connections
+
+
+def measure(build, payloads):
+    gc.collect()
+    tracemalloc.start()
+    connections = build(payloads)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del connections
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--room-size", type=int, default=50, help="sockets per room")
+    args = parser.parse_args()
+
+    print(f"{'sockets':>8} {'dict B/conn':>12} {'record B/conn':>14} {'saved':>7}")
+    for count in args.sizes:
+        payloads = join_payloads(count, args.room_size)
+        before = measure(build_dicts, payloads) / count
+        after = measure(build_records, payloads) / count
+        print(f"{count:>8} {before:>12.0f} {after:>14.0f} {1 - after / before:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
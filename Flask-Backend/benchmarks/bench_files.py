@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark for chunked file sharing
+Uploads a generated file (1 GB by default) through the Flask app in
+FILE_CHUNK_SIZE chunks, then downloads it whole and by ranges, reporting the
+throughput and the peak Python memory of each phase for two file sizes; the
+peak stays flat as the file grows because every chunk is streamed through one
+fixed-size buffer
+
+Usage: python -m benchmarks.bench_files [--size-mb 1024] [--chunk-mb 8]
+"""
+
+import argparse
+import io
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import mongomock
+
+from files import FileStore
+from server import create_app
+
+MB = 1 << 20
+
+
+class GeneratedStream(io.RawIOBase):
+    """A seekable request body of `length` bytes that is never held in memory"""
+
+    def __init__(self, length):
+        self.length = length
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.length}[whence]
+        self.position = base + offset
+        return self.position
+
+    def readinto(self, buffer):
+        size = max(0, min(len(buffer), self.length - self.position))
+        buffer[:size] = b"\xab" * size
+        self.position += size
+        return size
+
+
+def measured(fn):
+    """(seconds, peak traced bytes, result) of fn()"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def upload(client, meeting_id, size, chunk):
+    response = client.post(
+        f"/api/meetings/{meeting_id}/files",
+        json={"userId": "bench", "name": "big.bin", "size": size},
+    )
+    assert response.status_code == 201, response.json
+    file_id = response.json["fileId"]
+    for offset in range(0, size, chunk):
+        length = min(chunk, size - offset)
+        response = client.put(
+            f"/api/meetings/{meeting_id}/files/{file_id}/upload?offset={offset}&userId=bench",
+            input_stream=GeneratedStream(length),
+            content_length=length,
+            content_type="application/octet-stream",
+        )
+        assert response.status_code == 200, response.json
+    assert response.json["complete"]
+    return file_id
+
+
+def download(client, meeting_id, file_id, headers=None):
+    response = client.get(
+        f"/api/meetings/{meeting_id}/files/{file_id}?userId=bench", headers=headers or {}
+    )
+    assert response.status_code in (200, 206), response.status_code
+    received = sum(len(block) for block in response.response)
+    response.close()
+    return received
+
+
+def run(client, meeting_id, size, chunk):
+    rows = []
+    elapsed, peak, file_id = measured(lambda: upload(client, meeting_id, size, chunk))
+    rows.append(("upload", elapsed, peak, size))
+    elapsed, peak, received = measured(lambda: download(client, meeting_id, file_id))
+    assert received == size
+    rows.append(("download", elapsed, peak, size))
+
+    def ranges():
+        total = 0
+        for start in range(0, size, size // 16 or 1):
+            end = min(start + MB, size) - 1
+            total += download(client, meeting_id, file_id, {"Range": f"bytes={start}-{end}"})
+        return total
+
+    elapsed, peak, received = measured(ranges)
+    rows.append(("16 x 1 MB ranges", elapsed, peak, received))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--chunk-mb", type=int, default=8)
+    args = parser.parse_args()
+
+    app = create_app({"TESTING": True, "SOCKETIO_LOGGER": False})
+    # Uploads need an active meeting the uploader has joined
+    db = mongomock.MongoClient().bench
+    meeting_id = str(db.meetings.insert_one({"hostId": "bench", "active": True}).inserted_id)
+    db.participants.insert_one({"meetingId": meeting_id, "userId": "bench"})
+
+    chunk = args.chunk_mb * MB
+    print(f"{'file':>8} {'phase':<18} {'MB/s':>8} {'peak KiB':>9}")
+    with tempfile.TemporaryDirectory() as directory, patch("server.socketio.emit"), patch(
+        "server.meetings_collection", db.meetings
+    ), patch("server.participants_collection", db.participants):
+        for size_mb in (args.size_mb // 16 or 1, args.size_mb):
+            store = FileStore(directory, max_size=size_mb * MB, chunk_size=chunk)
+            with patch("server.file_store", store), app.test_client() as client:
+                for phase, elapsed, peak, moved in run(client, meeting_id, size_mb * MB, chunk):
+                    print(
+                        f"{size_mb:>6}MB {phase:<18} {moved / MB / elapsed:>8.0f} "
+                        f"{peak / 1024:>9.0f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the idle meeting collector
+Tracks N idle rooms with staggered idle times and reports the cost of one
+collection pass for a growing number of expired rooms, next to a pass that
+scans every tracked room (the cost a heap-less collector would pay)
+
+Usage: python -m benchmarks.bench_idle [--rooms 100000] [--expired 0 10 1000]
+"""
+
+import argparse
+import time
+
+from idle import IdleRooms
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def build(count):
+    clock = Clock()
+    rooms = IdleRooms(1000.0, clock=clock)
+    for i in range(count):
+        # One room goes idle per millisecond
+        clock.now = i / 1000
+        rooms.idle(f"room-{i}")
+    return rooms, clock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rooms", type=int, default=100000)
+    parser.add_argument("--expired", type=int, nargs="+", default=[0, 10, 1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{args.rooms} idle rooms")
+    print(f"{'expired':>8} {'heap pass ms':>13} {'full scan ms':>13}")
+    for expired in args.expired:
+        rooms, clock = build(args.rooms)
+        # Rooms with index < expired are past the 1000 s TTL
+        clock.now = 1000.0 + (expired - 0.5) / 1000
+
+        start = time.perf_counter()
+        found = rooms.expired()
+        heap = time.perf_counter() - start
+        assert len(found) == expired
+
+        rooms, clock = build(args.rooms)
+        clock.now = 1000.0 + (expired - 0.5) / 1000
+        start = time.perf_counter()
+        deadline = clock.now - rooms.ttl
+        scanned = [room for room, since in rooms._since.items() if since <= deadline]
+        scan = time.perf_counter() - start
+        assert len(scanned) == expired
+
+        print(f"{expired:>8} {heap * 1000:>13.3f} {scan * 1000:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark for reactions, raised hands and polls
+Simulates rooms whose participants react and vote for a few seconds and
+reports the cost per click and the packets delivered with tick aggregation
+next to one broadcast per click, then times the hand queue against a plain
+list for a large webinar
+
+Usage: python -m benchmarks.bench_interactions [--rooms 100] [--participants 50]
+"""
+
+import argparse
+import random
+import time
+
+from interactions import REACTIONS, HandQueue, Interactions
+
+
+def simulate(rooms, participants, clicks, seconds):
+    packets = []
+    due = set()
+    tallies = Interactions(
+        lambda room, payload: packets.append(room), lambda delay, callback, room: due.add(room)
+    )
+    polls = {
+        f"room-{r}": tallies.start_poll(f"room-{r}", "Ready?", ["Yes", "No", "Later"])["pollId"]
+        for r in range(rooms)
+    }
+    rng = random.Random(5)
+
+    total = 0
+    start = time.perf_counter()
+    for _ in range(seconds):
+        for _ in range(rooms * participants * clicks):
+            room = f"room-{rng.randrange(rooms)}"
+            if rng.random() < 0.8:
+                tallies.react(room, rng.choice(REACTIONS))
+            else:
+                tallies.vote(
+                    room, polls[room], f"user-{rng.randrange(participants)}", rng.randrange(3)
+                )
+            total += 1
+        # One tick per second
+        for room in list(due):
+            due.discard(room)
+            tallies.flush(room)
+    elapsed = time.perf_counter() - start
+    return total, len(packets), elapsed
+
+
+def time_hands(count):
+    order = list(range(count))
+    random.Random(9).shuffle(order)
+    lowered = order[: count // 2]
+
+    hands = HandQueue()
+    start = time.perf_counter()
+    for user in range(count):
+        hands.raise_hand(user)
+    for user in lowered:
+        hands.lower(user)
+    while hands.next() is not None:
+        pass
+    heap = time.perf_counter() - start
+
+    queue = []
+    start = time.perf_counter()
+    for user in range(count):
+        queue.append(user)
+    for user in lowered:
+        queue.remove(user)
+    while queue:
+        queue.pop(0)
+    plain = time.perf_counter() - start
+    return heap, plain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--participants", type=int, default=50)
+    parser.add_argument("--clicks", type=int, default=2, help="clicks per participant per second")
+    parser.add_argument("--seconds", type=int, default=5)
+    parser.add_argument("--hands", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    clicks, packets, elapsed = simulate(args.rooms, args.participants, args.clicks, args.seconds)
+    print(
+        f"{args.rooms} rooms x {args.participants} participants, {args.clicks} clicks/s each, "
+        f"{args.seconds}s: {clicks} clicks at {elapsed / clicks * 1e6:.2f} us each"
+    )
+    print(f"{'':<22} {'packets':>9} {'deliveries':>12}")
+    print(f"{'broadcast per click':<22} {clicks:>9} {clicks * args.participants:>12}")
+    print(f"{'tick aggregated':<22} {packets:>9} {packets * args.participants:>12}")
+
+    print(f"\n{'hands':>7} {'heap ms':>9} {'list ms':>9}  (raise all, lower half, call the rest)")
+    for count in args.hands:
+        heap, plain = time_hands(count)
+        print(f"{count:>7} {heap * 1000:>9.1f} {plain * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Join-storm benchmark for membership notifications
+Replays a burst of joins into one room on a virtual clock and reports the
+packets delivered and the CPU spent fanning out, with per-event notifications
+versus the adaptive participants-changed batching
+
+Usage: python -m benchmarks.bench_join_storm [--joins N] [--duration SECONDS]
+"""
+
+import argparse
+import heapq
+import json
+import time
+
+from notifications import MembershipNotifier
+
+
+class VirtualRoom:
+    """Fan-out stand-in: encodes each emit once and 'sends' it to every member"""
+
+    def __init__(self):
+        self.members = []
+        self.packets = 0
+        self.bytes = 0
+        self.outbox = []
+
+    def emit(self, event, payload, room, skip_sid):
+        encoded = json.dumps([event, payload])
+        for sid in self.members:
+            if sid != skip_sid:
+                self.outbox.append(encoded)
+                self.packets += 1
+                self.bytes += len(encoded)
+        self.outbox.clear()
+
+
+class VirtualClock:
+    """Heap-based scheduler that runs callbacks in simulated time"""
+
+    def __init__(self):
+        self.now = 0.0
+        self._queue = []
+        self._seq = 0
+
+    def schedule(self, delay, callback, *args):
+        self._seq += 1
+        heapq.heappush(self._queue, (self.now + delay, self._seq, callback, args))
+
+    def advance(self, until):
+        while self._queue and self._queue[0][0] <= until:
+            when, _, callback, args = heapq.heappop(self._queue)
+            self.now = when
+            callback(*args)
+        self.now = until
+
+
+def run(joins, duration, small_room):
+    room = VirtualRoom()
+    clock = VirtualClock()
+    notifier = MembershipNotifier(room.emit, clock.schedule, small_room=small_room)
+
+    start = time.process_time()
+    for i in range(joins):
+        clock.advance(duration * i / joins)
+        sid = f"sid{i:06d}"
+        room.members.append(sid)
+        notifier.joined("all-hands", len(room.members), f"user{i}", sid)
+    clock.advance(duration + notifier.max_window)
+    cpu = time.process_time() - start
+
+    return room.packets, room.bytes, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join-storm notification benchmark")
+    parser.add_argument("--joins", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10.0, help="burst length in seconds")
+    args = parser.parse_args()
+
+    print(f"{args.joins} joins over {args.duration:.0f}s into one room")
+    print(f"{'mode':<12}{'packets':>12}{'MB':>10}{'CPU (ms)':>12}")
+    print("-" * 46)
+    for mode, small_room in (("per-event", args.joins + 1), ("batched", 8)):
+        packets, sent, cpu = run(args.joins, args.duration, small_room)
+        print(f"{mode:<12}{packets:>12,}{sent / 1e6:>10.2f}{cpu * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the waiting room
+Simulates a join storm of N arrivals spread over a few seconds into a meeting
+with a waiting room, then one admit-all by the host, and reports the lobby
+cost per arrival and the database writes and packets delivered next to every
+arrival joining straight away
+
+Usage: python -m benchmarks.bench_lobby [--arrivals 1000] [--seconds 5] [--present 20]
+"""
+
+import argparse
+import random
+import time
+
+from lobby import Lobby
+from notifications import MembershipNotifier
+
+
+def storm(arrivals, seconds, interval):
+    """Arrivals spread over `seconds`, with the host's lobby tick every `interval`"""
+    lists = []
+    due = set()
+    lobby = Lobby(lambda room, payload: lists.append(payload), lambda d, cb, room: due.add(room))
+    rng = random.Random(11)
+    times = sorted(rng.uniform(0, seconds) for _ in range(arrivals))
+
+    wait_time = 0.0
+    tick = interval
+    for i, at in enumerate(times):
+        while at >= tick:
+            for room in list(due):
+                due.discard(room)
+                lobby.flush(room)
+            tick += interval
+        start = time.perf_counter()
+        lobby.wait("room", f"sid-{i}", f"user-{i}")
+        wait_time += time.perf_counter() - start
+    for room in list(due):
+        due.discard(room)
+        lobby.flush(room)
+
+    start = time.perf_counter()
+    entries = lobby.admit("room")
+    admit_time = time.perf_counter() - start
+    return entries, lists, wait_time, admit_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--arrivals", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--present", type=int, default=20, help="participants already in")
+    parser.add_argument("--interval", type=float, default=0.5, help="lobby tick seconds")
+    args = parser.parse_args()
+
+    entries, lists, wait_time, admit_time = storm(args.arrivals, args.seconds, args.interval)
+    packets = []
+    notifier = MembershipNotifier(
+        lambda event, payload, room, skip: packets.append(payload), lambda *a: None
+    )
+    start = time.perf_counter()
+    notifier.joined_many(
+        "room",
+        args.present + len(entries),
+        [{"userId": e["userId"], "socketId": e["socketId"]} for e in entries],
+    )
+    announce_time = time.perf_counter() - start
+
+    n, present = args.arrivals, args.present
+    # Straight joins: one upsert each, and each join goes to everyone already in
+    direct_writes = n
+    direct_deliveries = sum(present + i for i in range(n))
+    # Waiting room: lobby ticks to the host, then after admit-all one packet to the
+    # room and one to each admitted socket about those admitted after it
+    lobby_deliveries = len(lists) + present + (n - 1)
+
+    print(
+        f"{n} arrivals over {args.seconds:g}s into a room of {present}: "
+        f"{wait_time / n * 1e6:.2f} us per arrival, admit-all {admit_time * 1000:.2f} ms, "
+        f"announce {announce_time * 1000:.2f} ms"
+    )
+    print(f"{'':<22} {'DB writes':>10} {'packets':>9} {'deliveries':>12}")
+    print(f"{'join straight away':<22} {direct_writes:>10} {n:>9} {direct_deliveries:>12}")
+    print(
+        f"{'waiting room':<22} {1:>10} {len(lists) + len(packets):>9} {lobby_deliveries:>12}"
+        f"  ({len(lists)} lobby-changed to the host)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Relay throughput benchmark: JSON events vs the binary signal-relay fast path
+Each iteration does the server-side work for one relayed message on one core:
+decode the inbound Socket.IO packet, build the outbound payload, encode it
+
+Usage: python -m benchmarks.bench_relay [--iterations N]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from socketio import packet
+
+from relay import RELAY_ICE_CANDIDATE, RELAY_OFFER, pack_envelope, readdress_envelope
+
+SAMPLES_DIR = Path(__file__).parent / "sdp_samples"
+TARGET = "Alu-s0KrHUwjg7KhAAAD"
+SENDER = "Bq7mX2pLk9RtWv4nAAAF"
+CANDIDATE = {
+    "candidate": "candidate:842163049 1 udp 1677729535 203.0.113.7 54321 typ srflx "
+    "raddr 192.168.1.20 rport 54321 generation 0 ufrag Xk3d network-cost 999",
+    "sdpMLineIndex": 0,
+    "sdpMid": "0",
+}
+
+
+def json_inbound(event, field, body):
+    """Encoded packet a client sends for the JSON events"""
+    data = {field: body, "targetSocket": TARGET, "fromUserId": "user123", "msgId": "m1"}
+    return packet.Packet(packet.EVENT, data=[event, data]).encode()
+
+
+def binary_inbound(kind, body):
+    """Encoded packet + attachment a client sends for signal-relay"""
+    envelope = pack_envelope(kind, TARGET, json.dumps(body).encode())
+    return packet.Packet(packet.EVENT, data=["signal-relay", envelope]).encode()
+
+
+def relay_json(encoded, event, field):
+    pkt = packet.Packet(encoded_packet=encoded)
+    data = pkt.data[1]
+    outbound = {
+        field: data[field],
+        "fromSocket": SENDER,
+        "fromUserId": data.get("fromUserId"),
+        "msgId": data.get("msgId"),
+    }
+    return data["targetSocket"], packet.Packet(packet.EVENT, data=[event, outbound]).encode()
+
+
+def relay_binary(encoded):
+    pkt = packet.Packet(encoded_packet=encoded[0])
+    pkt.add_attachment(encoded[1])
+    target, outbound = readdress_envelope(pkt.data[1], SENDER)
+    return target, packet.Packet(packet.EVENT, data=["signal-relay", outbound]).encode()
+
+
+def measure(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signaling relay throughput benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    offer = {"type": "offer", "sdp": (SAMPLES_DIR / "chrome_offer.sdp").read_bytes().decode()}
+    cases = [
+        ("offer", "offer", offer, RELAY_OFFER),
+        ("ice-candidate", "candidate", CANDIDATE, RELAY_ICE_CANDIDATE),
+    ]
+
+    print(f"{'message':<16}{'json (msg/s)':>16}{'binary (msg/s)':>18}{'speedup':>10}")
+    print("-" * 60)
+    for event, field, body, kind in cases:
+        encoded_json = json_inbound(event, field, body)
+        encoded_binary = binary_inbound(kind, body)
+        json_rate = measure(lambda: relay_json(encoded_json, event, field), args.iterations)
+        binary_rate = measure(lambda: relay_binary(encoded_binary), args.iterations)
+        print(
+            f"{event:<16}{json_rate:>16,.0f}{binary_rate:>18,.0f}{binary_rate / json_rate:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for reliable signaling delivery
+Measures the per-message cost of the ack window (send + ack), then models call
+setup when some targets are reconnecting while their offer is relayed: without
+the window the offer is lost and the caller's connection timeout recreates the
+peer connection; with it the offer is sent again as soon as the target resumes.
+The client timings default to CONNECTION_CONFIG in the frontend
+
+Usage: python -m benchmarks.bench_reliable [--calls 100000] [--reconnecting 0.05]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from reliable import ReliableRelay
+
+# webrtc-app/src/constants/webrtc.ts CONNECTION_CONFIG, in seconds
+TIMEOUT_DURATION = 5.0
+RECREATE_DELAY = 1.0
+
+
+def relay_cost(messages):
+    relay = ReliableRelay(lambda event, payload, target: None)
+    targets = [f"sid-{i}" for i in range(100)]
+    for target in targets:
+        relay.enable(target)
+
+    payloads = [
+        (targets[i % 100], {"offer": {}, "fromSocket": f"from-{i % 37}", "msgId": str(i)})
+        for i in range(messages)
+    ]
+    start = time.perf_counter()
+    for target, payload in payloads:
+        relay.send("offer", payload, target)
+        relay.ack(target, payload["fromSocket"], payload["msgId"])
+    return (time.perf_counter() - start) / messages
+
+
+def setup_times(calls, reconnecting, rtt, reliable):
+    times = []
+    for _ in range(calls):
+        if random.random() >= reconnecting:
+            times.append(2 * rtt)
+            continue
+        outage = random.uniform(0.2, 3.0)
+        if reliable:
+            # Resent right after the resume, then the answer comes back
+            times.append(outage + 2 * rtt)
+        else:
+            # The caller's timeout fires, recreates the connection and offers again
+            times.append(max(outage, TIMEOUT_DURATION + RECREATE_DELAY) + 2 * rtt)
+    return sorted(times)
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--reconnecting", type=float, default=0.05, help="share of targets")
+    parser.add_argument("--rtt", type=float, default=0.08, help="client-server RTT, seconds")
+    args = parser.parse_args()
+
+    print(f"send + ack        {relay_cost(args.calls) * 1e6:>8.2f} us/message")
+    print(f"{args.calls} call setups, {args.reconnecting:.0%} of targets reconnecting")
+    print(f"{'':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for label, reliable in (("timers", False), ("ack window", True)):
+        times = setup_times(args.calls, args.reconnecting, args.rtt, reliable)
+        row = [percentile(times, q) * 1000 for q in (0.5, 0.95, 0.99)]
+        row.append(statistics.mean(times) * 1000)
+        print(f"{label:<12} " + " ".join(f"{value:>8.0f}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Room state snapshot / restore benchmark
+Snapshots N simulated memberships plus a journal of deltas, then measures the
+restore at startup (read vs mmap), resume-token lookups against the restored
+state, and a full decode of every record for comparison
+
+Usage: python -m benchmarks.bench_roomstate [--memberships N] [--journal N] [--room-size N]
+"""
+
+import argparse
+import os
+import random
+import secrets
+import statistics
+import tempfile
+import time
+
+from roomstate import SNAPSHOT_NAME, RoomStateStore, decode_snapshot
+
+
+def memberships(count, room_size):
+    rooms = [secrets.token_hex(12) for _ in range(max(1, count // room_size))]
+    return [
+        (
+            secrets.token_urlsafe(15),
+            rooms[i % len(rooms)],
+            secrets.token_hex(12),
+            "presenter",
+            secrets.token_urlsafe(16),
+        )
+        for i in range(count)
+    ]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--memberships", type=int, default=100000)
+    parser.add_argument("--journal", type=int, default=10000, help="deltas after the snapshot")
+    parser.add_argument("--room-size", type=int, default=50)
+    args = parser.parse_args()
+
+    records = memberships(args.memberships, args.room_size)
+    directory = tempfile.mkdtemp(prefix="roomstate-")
+    store = RoomStateStore(directory)
+
+    size, write_ms = timed(store.snapshot, lambda: records)
+    extra = memberships(args.journal, args.room_size)
+    start = time.perf_counter()
+    for fields in extra:
+        store.put(fields)
+    journal_us = (time.perf_counter() - start) * 1e6 / max(1, len(extra))
+    store.close()
+
+    print(f"{args.memberships} memberships, {args.journal} journal deltas")
+    print(f"  snapshot write           {write_ms:>9.1f} ms  ({size / 1e6:.1f} MB)")
+    print(f"  journal append           {journal_us:>9.1f} us/delta")
+
+    tokens = [fields[4] for fields in random.sample(records + extra, 1000)]
+    for use_mmap in (False, True):
+        restored, load_ms = timed(RoomStateStore(directory, use_mmap=use_mmap).load)
+        lookups = []
+        for token in tokens:
+            _, ms = timed(restored.take, token)
+            lookups.append(ms * 1000)
+        restored.close()
+        label = "mmap" if use_mmap else "read"
+        print(f"  restore ({label})           {load_ms:>9.1f} ms")
+        print(f"  resume lookup ({label})     {statistics.median(lookups):>9.1f} us median")
+
+    with open(os.path.join(directory, SNAPSHOT_NAME), "rb") as f:
+        data = f.read()
+    _, decode_ms = timed(decode_snapshot, data)
+    print(f"  full decode of all records {decode_ms:>7.1f} ms (not needed at startup)")
+
+
+if __name__ == "__main__":
+    main()
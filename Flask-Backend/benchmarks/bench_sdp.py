@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the SDP processing stage
+Measures per-offer cost of parsing + rewriting (cache miss) and of a repeated
+renegotiation (cache hit) using captured browser offers
+
+Usage: python -m benchmarks.bench_sdp [--iterations N]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from sdp import SdpPolicy, SdpProcessor
+
+SAMPLES_DIR = Path(__file__).parent / "sdp_samples"
+
+THUMBNAIL_POLICY = SdpPolicy(
+    codecs={"video": ["VP8", "H264"], "audio": ["opus"]}, bitrates={"video": 300}
+)
+
+
+def load_samples():
+    """Read every captured SDP in the samples directory"""
+    return {path.stem: path.read_bytes().decode() for path in sorted(SAMPLES_DIR.glob("*.sdp"))}
+
+
+def bench_cold(sdp, iterations):
+    """Average microseconds per offer when every offer misses the cache"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        SdpProcessor().process(sdp, THUMBNAIL_POLICY)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench_warm(sdp, iterations):
+    """Average microseconds per offer for a repeated renegotiation"""
+    processor = SdpProcessor()
+    processor.process(sdp, THUMBNAIL_POLICY)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        processor.process(sdp, THUMBNAIL_POLICY)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SDP processing microbenchmark")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'sample':<20}{'bytes':>8}{'miss (us)':>12}{'hit (us)':>12}")
+    print("-" * 52)
+    for name, sdp in load_samples().items():
+        cold = bench_cold(sdp, args.iterations)
+        warm = bench_warm(sdp, args.iterations)
+        print(f"{name:<20}{len(sdp):>8}{cold:>12.1f}{warm:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
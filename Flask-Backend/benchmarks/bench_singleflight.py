@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Request-coalescing benchmark for read endpoints
+Fires bursts of identical GET participants / is-host requests at the Flask app
+against an in-memory database with simulated query latency, and reports the
+database calls per burst with and without single-flight coalescing
+
+Usage: python -m benchmarks.bench_singleflight [--burst N] [--latency MS] [--rounds R]
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import patch
+
+import mongomock
+
+import server
+from singleflight import SingleFlight
+
+
+class CountingCollection:
+    """Collection proxy adding a fixed latency to, and counting, every read"""
+
+    def __init__(self, inner, latency):
+        self.inner = inner
+        self.latency = latency
+        self.reads = 0
+        self._lock = threading.Lock()
+
+    def _read(self, method, *args, **kwargs):
+        with self._lock:
+            self.reads += 1
+        time.sleep(self.latency)
+        return getattr(self.inner, method)(*args, **kwargs)
+
+    def find_one(self, *args, **kwargs):
+        return self._read("find_one", *args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return list(self._read("find", *args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+class PassThrough:
+    """SingleFlight stand-in that never coalesces, i.e. the previous behaviour"""
+
+    def do(self, key, fn, *args):
+        return fn(*args)
+
+
+def seed(db, participants):
+    host_id = db.users.insert_one({"username": "host"}).inserted_id
+    meeting_id = db.meetings.insert_one(
+        {"hostId": str(host_id), "active": True, "name": "Bench"}
+    ).inserted_id
+    for i in range(participants):
+        user_id = host_id if i == 0 else db.users.insert_one({"username": f"u{i}"}).inserted_id
+        db.participants.insert_one(
+            {
+                "meetingId": str(meeting_id),
+                "userId": str(user_id),
+                "isHost": i == 0,
+                "joinedAt": datetime.now(),
+            }
+        )
+    return str(meeting_id), str(host_id)
+
+
+def run(app, burst, latency, rounds, coalesce):
+    db = mongomock.MongoClient().bench
+    meeting_id, host_id = seed(db, 50)
+    collections = {
+        name: CountingCollection(db[name], latency)
+        for name in ("users", "meetings", "participants")
+    }
+    paths = [
+        f"/api/meetings/{meeting_id}/participants",
+        f"/api/meetings/{meeting_id}/is-host/{host_id}",
+    ]
+
+    with patch("server.users_collection", collections["users"]), patch(
+        "server.meetings_collection", collections["meetings"]
+    ), patch("server.participants_collection", collections["participants"]), patch(
+        "server.read_flight", SingleFlight() if coalesce else PassThrough()
+    ), ThreadPoolExecutor(
+        max_workers=burst
+    ) as pool:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for path in paths:
+                barrier = threading.Barrier(burst)
+
+                def request(_):
+                    barrier.wait()
+                    return app.test_client().get(path).status_code
+
+                assert set(pool.map(request, range(burst))) == {200}
+        elapsed = time.perf_counter() - start
+
+    reads = sum(c.reads for c in collections.values())
+    return reads, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst", type=int, default=50, help="concurrent identical requests")
+    parser.add_argument("--latency", type=float, default=5.0, help="simulated query latency (ms)")
+    parser.add_argument("--rounds", type=int, default=10, help="bursts per endpoint")
+    args = parser.parse_args()
+
+    # create_app binds the collections (and the rest of server's state) that run() patches
+    app = server.create_app({"TESTING": True, "SOCKETIO_LOGGER": False})
+    bursts = args.rounds * 2
+    print(f"{args.burst} concurrent requests per burst, {bursts} bursts, {args.latency} ms/query")
+    print(f"{'mode':<12} {'db reads':>10} {'reads/burst':>12} {'wall (s)':>10}")
+    for label, coalesce in (("direct", False), ("coalesced", True)):
+        reads, elapsed = run(app, args.burst, args.latency / 1000, args.rounds, coalesce)
+        print(f"{label:<12} {reads:>10} {reads / bursts:>12.1f} {elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
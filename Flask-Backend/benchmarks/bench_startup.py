@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the backend
+Measures, in fresh interpreters, the cold start (import + app creation) and the
+latency of the first HTTP request and first Socket.IO connect, plus the boot
+time of a worker forked from a preloaded master
+
+Usage: python -m benchmarks.bench_startup [--runs N] [--backend DIR]
+    --backend points at another checkout of Flask-Backend to compare against
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs in the child interpreter; older trees build the app at import time
+_PROBE = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+import server
+app = server.create_app({"SOCKETIO_LOGGER": False}) if hasattr(server, "create_app") else server.app
+t1 = time.perf_counter()
+app.test_client().get("/")
+t2 = time.perf_counter()
+server.socketio.test_client(app).disconnect()
+t3 = time.perf_counter()
+
+fork = None
+if hasattr(server, "reinit_after_fork") and hasattr(os, "fork"):
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        server.reinit_after_fork()
+        app.test_client().get("/")
+        os.write(write_fd, str(time.perf_counter() - start).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    fork = float(os.read(read_fd, 64))
+
+print(json.dumps({"cold": t1 - t0, "http": t2 - t1, "socket": t3 - t2, "fork": fork}))
+"""
+
+
+def probe(backend):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=backend,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters to start")
+    parser.add_argument(
+        "--backend",
+        default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        help="Flask-Backend directory to measure",
+    )
+    args = parser.parse_args()
+
+    results = [probe(args.backend) for _ in range(args.runs)]
+    print(f"{args.runs} runs of {args.backend} (median)")
+    labels = (
+        ("cold", "import + create app"),
+        ("http", "first HTTP request"),
+        ("socket", "first Socket.IO connect"),
+        ("fork", "preloaded worker boot"),
+    )
+    for key, label in labels:
+        values = [r[key] for r in results if r[key] is not None]
+        if values:
+            print(f"  {label:<26} {statistics.median(values) * 1000:>8.1f} ms")
+        else:
+            print(f"  {label:<26} {'n/a':>8}")
+
+
+if __name__ == "__main__":
+    main()
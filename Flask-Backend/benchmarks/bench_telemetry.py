@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark for webrtc-stats telemetry
+Reports the per-sample cost of ingest for several ring buffer capacities (it
+should stay flat) and the time one tick takes to compute the percentiles of
+every link of a full room, where each participant reports on every other one
+
+Usage: python -m benchmarks.bench_telemetry [--participants 50] [--reports 200]
+"""
+
+import argparse
+import random
+import time
+
+from telemetry import NetworkQuality
+
+
+def report_batches(sids, reports):
+    batches = []
+    for _ in range(reports):
+        reporter = random.choice(sids)
+        samples = [
+            [
+                sender,
+                random.uniform(20, 600),
+                random.uniform(0, 0.1),
+                random.uniform(1, 80),
+                random.uniform(100, 2500),
+            ]
+            for sender in sids
+            if sender != reporter
+        ]
+        batches.append((reporter, samples))
+    return batches
+
+
+def engine(capacity, links, advice):
+    return NetworkQuality(
+        lambda sid, payload: advice.append(sid),
+        lambda delay, callback: None,
+        capacity=capacity,
+        max_samples=1000,
+        max_links=links,
+        window=3600,
+        min_samples=1,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--participants", type=int, default=50)
+    parser.add_argument("--reports", type=int, default=200, help="webrtc-stats messages")
+    parser.add_argument(
+        "--capacities", type=int, nargs="+", default=[1024, 16384, 262144], help="ring sizes"
+    )
+    args = parser.parse_args()
+
+    sids = [f"sid-{i}" for i in range(args.participants)]
+    members = set(sids)
+    batches = report_batches(sids, args.reports)
+    total = sum(len(samples) for _, samples in batches)
+    links = args.participants * (args.participants - 1)
+    print(f"{args.participants} participants, {links} links, {total} samples")
+    print(f"{'capacity':>9} {'ingest us/sample':>17} {'tick ms':>9} {'advice':>7}")
+
+    for capacity in args.capacities:
+        advice = []
+        quality = engine(capacity, links, advice)
+        start = time.perf_counter()
+        accepted = sum(
+            quality.ingest("room1", reporter, samples, members) for reporter, samples in batches
+        )
+        ingest = (time.perf_counter() - start) / total
+        assert accepted == total, f"only {accepted} of {total} samples accepted"
+
+        start = time.perf_counter()
+        quality.tick()
+        tick = time.perf_counter() - start
+        print(f"{capacity:>9} {ingest * 1e6:>17.2f} {tick * 1000:>9.2f} {len(advice):>7}")
+        # Senders are spread up to 600 ms RTT and 10% loss, so many links degrade
+        assert advice, "no advice: the samples were not evaluated"
+
+
+if __name__ == "__main__":
+    main()
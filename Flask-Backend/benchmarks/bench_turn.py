@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark for TURN server allocation
+Reports the cost of handing out ICE servers for a new user (server choice plus
+HMAC credentials) versus a returning user served from the credential cache,
+and how evenly a join burst is spread over a pool with uneven reported load
+
+Usage: python -m benchmarks.bench_turn [--users 100000] [--servers 8]
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+
+from turn import TurnPool, turn_urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--servers", type=int, default=8, help="TURN servers in the pool")
+    args = parser.parse_args()
+
+    hosts = [f"turn{i}.example.com" for i in range(args.servers)]
+    pool = TurnPool({host: turn_urls(host) for host in hosts}, "secret", stun_urls=["stun:s"])
+    for host in hosts:
+        pool.report(host, random.uniform(0, args.users / args.servers))
+    reported = {host: pool.servers[host].load for host in hosts}
+
+    users = [f"user-{i}" for i in range(args.users)]
+    start = time.perf_counter()
+    assigned = Counter(pool.ice_servers(user)[0][-1]["urls"][0] for user in users)
+    new = (time.perf_counter() - start) / args.users
+
+    start = time.perf_counter()
+    for user in users:
+        pool.ice_servers(user)
+    cached = (time.perf_counter() - start) / args.users
+
+    print(f"{args.users} users, {args.servers} servers")
+    print(f"  new user       {new * 1e6:>8.2f} us")
+    print(f"  cached user    {cached * 1e6:>8.2f} us")
+    print(f"  {'server':<22} {'reported':>9} {'assigned':>9} {'total':>9}")
+    for host in hosts:
+        count = assigned[turn_urls(host)[0]]
+        load = reported[host]
+        print(f"  {host:<22} {load:>9.0f} {count:>9} {load + count:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the username filter and user cache
+Builds the Bloom filter over N generated usernames, then replays a mix of
+get_user reads of popular users (Zipf-distributed) and bot probes of names that
+do not exist, and reports the filter's size, build time and cost per check,
+its expected and observed false positive rates, and the database lookups left
+next to querying for every request
+
+Usage: python -m benchmarks.bench_usercache [--users 1000000] [--requests 200000]
+"""
+
+import argparse
+import itertools
+import random
+import time
+
+from usercache import UserLookup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--probes", type=float, default=0.5, help="share of bot probes")
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    usernames = [f"user{i:07d}" for i in range(args.users)]
+    existing = set(usernames)
+    lookup = UserLookup(capacity=args.users, error_rate=args.error_rate, cache_size=args.cache_size)
+    start = time.perf_counter()
+    lookup.build(lambda: iter(usernames), len(usernames))
+    build_time = time.perf_counter() - start
+    stats = lookup.stats()
+    print(
+        f"{args.users} usernames: filter of {stats['bits'] / 8 / 2**20:.1f} MiB, "
+        f"{stats['hashes']} hashes, built in {build_time:.2f}s"
+    )
+
+    rng = random.Random(4)
+    # Popular users are read far more often than the rest
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, args.users + 1)))
+    queries = 0
+    start = time.perf_counter()
+    for i in range(args.requests):
+        if rng.random() < args.probes:
+            username = f"probe-{i}"
+        else:
+            username = rng.choices(usernames, cum_weights=weights)[0]
+
+        if lookup.get(username) is not None:
+            continue
+        if not lookup.may_exist(username):
+            continue
+        queries += 1
+        if username in existing:
+            lookup.put(username, {"username": username})
+        else:
+            lookup.missed()
+    elapsed = time.perf_counter() - start
+
+    stats = lookup.stats()
+    per_read = elapsed / args.requests * 1e6
+    print(f"{args.requests} reads ({args.probes:.0%} probes): {per_read:.1f} us each")
+    print(
+        f"false positive rate: expected {stats['expectedFalsePositiveRate']:.4f}, "
+        f"observed {stats['observedFalsePositiveRate']:.4f}"
+    )
+    print(
+        f"cache hit rate {stats['cacheHits'] / args.requests:.1%}; database lookups "
+        f"{args.requests} -> {queries} ({queries / args.requests:.1%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
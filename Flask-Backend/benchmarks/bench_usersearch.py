@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for user search
+Builds the prefix index over N generated users (username + display name) and
+reports the build time and memory, the latency of top-k prefix searches of
+1 to 4 characters, and the cost of indexing a new user, next to a linear scan
+of every name (what an unindexed query has to do)
+
+Usage: python -m benchmarks.bench_usersearch [--users 1000000] [--limit 10]
+"""
+
+import argparse
+import random
+import string
+import time
+import tracemalloc
+
+from usersearch import UserIndex, fold
+
+FIRST = ["alex", "sam", "jo", "kim", "lee", "max", "ana", "eva", "noah", "mia", "li", "omar"]
+LAST = ["smith", "chen", "garcia", "kumar", "okafor", "novak", "silva", "berg", "tanaka"]
+
+
+def generate(count, seed=1):
+    rng = random.Random(seed)
+    users = []
+    for i in range(count):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        tail = "".join(rng.choices(string.ascii_lowercase + string.digits, k=4))
+        users.append((f"{first}{tail}{i}", f"{first.title()} {last.title()}"))
+    return users
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    users = generate(args.users)
+    rng = random.Random(2)
+
+    tracemalloc.start()
+    UserIndex(max_users=args.users).build(lambda: iter(users))
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    index = UserIndex(max_users=args.users + args.queries)
+    start = time.perf_counter()
+    index.build(lambda: iter(users))
+    build_time = time.perf_counter() - start
+    print(
+        f"{args.users} users: built in {build_time:.2f}s, "
+        f"{memory / 2**20:.0f} MiB peak ({memory / args.users:.0f} B/user)"
+    )
+
+    print(f"{'prefix':>7} {'p50 us':>9} {'p99 us':>9} {'scan ms':>9}  (top {args.limit})")
+    for length in (1, 2, 3, 4):
+        prefixes = [fold(rng.choice(users)[rng.randrange(2)][:length]) for _ in range(args.queries)]
+        samples = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.search(prefix, args.limit)
+            samples.append(time.perf_counter() - start)
+
+        # An unindexed query reads every user until it has `limit` matches and
+        # reads them all when there are fewer
+        prefix = prefixes[0] + "~"
+        start = time.perf_counter()
+        found = []
+        for username, display_name in users:
+            if fold(username).startswith(prefix) or fold(display_name).startswith(prefix):
+                found.append(username)
+                if len(found) == args.limit:
+                    break
+        scan = time.perf_counter() - start
+        print(
+            f"{length:>7} {percentile(samples, 0.5) * 1e6:>9.1f} "
+            f"{percentile(samples, 0.99) * 1e6:>9.1f} {scan * 1000:>9.0f}"
+        )
+
+    new = generate(args.queries, seed=3)
+    start = time.perf_counter()
+    for username, display_name in new:
+        index.add("new-" + username, display_name)
+    add_time = time.perf_counter() - start
+    print(f"new user indexed in {add_time / len(new) * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the collaborative whiteboard
+Simulates N people drawing at once in one room (each sends a 2-point extend
+op at 60 Hz, starting a new stroke every second and erasing now and then) and
+reports the server cost per op, the packets and bytes each participant
+receives with tick batching next to one packet per op, and what a late joiner
+is sent (snapshot + tail) next to a replay of every op
+
+Usage: python -m benchmarks.bench_whiteboard [--drawers 50] [--seconds 10]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from whiteboard import Whiteboards
+
+
+def packet_bytes(payload):
+    # Socket.IO text frame: 42["event",payload]
+    return len(json.dumps(["whiteboard-ops", payload], separators=(",", ":"))) + 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--drawers", type=int, default=50)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--rate", type=int, default=60, help="ops per drawer per second")
+    parser.add_argument("--tick-ms", type=float, default=50)
+    parser.add_argument("--snapshot-ops", type=int, default=500)
+    args = parser.parse_args()
+
+    sent = []
+    due = set()
+    boards = Whiteboards(
+        lambda room, payload: sent.append(payload),
+        lambda delay, callback, room: due.add(room),
+        interval=args.tick_ms / 1000,
+        snapshot_ops=args.snapshot_ops,
+        max_strokes=100000,
+    )
+    rng = random.Random(3)
+    strokes = {d: None for d in range(args.drawers)}
+    history = []
+
+    steps = args.seconds * args.rate
+    ops_per_tick = max(1, round(args.rate * args.tick_ms / 1000))
+    submit_time = flush_time = 0.0
+    submitted = 0
+    for step in range(steps):
+        for drawer in range(args.drawers):
+            sid = f"sid-{drawer}"
+            if step % args.rate == 0 or strokes[drawer] is None:
+                if strokes[drawer] and rng.random() < 0.2:
+                    ops = [{"type": "remove", "id": strokes[drawer]}]
+                else:
+                    ops = []
+                strokes[drawer] = f"{drawer}-{step}"
+                ops.append(
+                    {
+                        "type": "add",
+                        "id": strokes[drawer],
+                        "points": [rng.randint(0, 1920), rng.randint(0, 1080)],
+                        "color": "#1e90ff",
+                        "width": 3,
+                    }
+                )
+            else:
+                ops = [
+                    {
+                        "type": "extend",
+                        "id": strokes[drawer],
+                        "points": [rng.randint(0, 1920), rng.randint(0, 1080)],
+                    }
+                ]
+            start = time.perf_counter()
+            boards.submit("room", sid, ops)
+            submit_time += time.perf_counter() - start
+            submitted += len(ops)
+            history.extend(ops)
+
+        if (step + 1) % ops_per_tick == 0:
+            start = time.perf_counter()
+            for room in list(due):
+                due.discard(room)
+                boards.flush(room)
+            flush_time += time.perf_counter() - start
+    for room in list(due):
+        boards.flush(room)
+
+    batched_bytes = sum(packet_bytes(payload) for payload in sent)
+    unbatched_bytes = sum(packet_bytes({"seq": 0, "ops": [[0, "sid-00", op]]}) for op in history)
+    print(
+        f"{args.drawers} drawers x {args.rate} ops/s for {args.seconds}s: {submitted} ops, "
+        f"{submit_time / submitted * 1e6:.2f} us/op to apply, "
+        f"{flush_time / max(1, len(sent)) * 1e6:.1f} us per tick flush"
+    )
+    print(f"{'per participant':<22} {'packets/s':>10} {'KB/s':>8}")
+    print(
+        f"{'one packet per op':<22} {submitted / args.seconds:>10.0f} "
+        f"{unbatched_bytes / args.seconds / 1024:>8.1f}"
+    )
+    print(
+        f"{'tick batched':<22} {len(sent) / args.seconds:>10.0f} "
+        f"{batched_bytes / args.seconds / 1024:>8.1f}"
+    )
+    fanout = args.drawers
+    print(
+        f"room fan-out: {submitted * fanout / args.seconds:,.0f} -> "
+        f"{len(sent) * fanout / args.seconds:,.0f} packets/s"
+    )
+
+    start = time.perf_counter()
+    state = boards.state("room")
+    state_time = time.perf_counter() - start
+    state_bytes = len(json.dumps(state, separators=(",", ":")))
+    replay_bytes = len(json.dumps(history, separators=(",", ":")))
+    print(
+        f"late join: snapshot of {len(state['snapshot']['strokes'])} strokes + "
+        f"{len(state['ops'])} ops = {state_bytes / 1024:.0f} KB in {state_time * 1e6:.0f} us, "
+        f"full replay {len(history)} ops = {replay_bytes / 1024:.0f} KB"
+    )
+
+
+if __name__ == "__main__":
+    main()
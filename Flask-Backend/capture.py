@@ -0,0 +1,182 @@
+"""
+Capture log of inbound Socket.IO events
+Every inbound event can be appended to a compact binary log so that real
+meeting traffic can be replayed against another build (tools/replay_capture.py).
+Sampling is decided per socket, so a sampled session is captured whole
+
+Log layout (little-endian):
+    header   magic "RTCL", version u16, flags u16 (1 = payloads included),
+             capture start as Unix time f64
+    records  u32 length of the rest of the record, then
+             offset since start f64, payload size u32, payload kind u8
+             (0 = not stored, 1 = JSON list of the event arguments,
+             2 = single binary argument), sid length u8, event length u8,
+             sid, event, payload
+"""
+
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"RTCL"
+VERSION = 1
+FLAG_PAYLOADS = 1
+
+KIND_NONE = 0
+KIND_JSON = 1
+KIND_BINARY = 2
+
+_HEADER = struct.Struct("<4sHHd")
+_LENGTH = struct.Struct("<I")
+_RECORD = struct.Struct("<dIBBB")
+
+# Tells apart logs opened by one process within the same second
+_sequence = itertools.count()
+
+
+class CaptureError(ValueError):
+    """Raised when a file is not a capture log"""
+
+
+def sampled(sid, rate):
+    """Deterministic per-socket sampling decision"""
+    if rate >= 1:
+        return True
+    return zlib.crc32(sid.encode()) % 10000 < rate * 10000
+
+
+def encode_payload(args):
+    """(kind, bytes) for the arguments of an event"""
+    if len(args) == 1 and isinstance(args[0], (bytes, bytearray)):
+        return KIND_BINARY, bytes(args[0])
+    return KIND_JSON, json.dumps(list(args), separators=(",", ":"), default=str).encode()
+
+
+def encode_record(offset, sid, event, kind, size, payload=b""):
+    sid_bytes = sid.encode()[:255]
+    event_bytes = event.encode()[:255]
+    body = (
+        _RECORD.pack(offset, size, kind, len(sid_bytes), len(event_bytes))
+        + sid_bytes
+        + event_bytes
+        + payload
+    )
+    return _LENGTH.pack(len(body)) + body
+
+
+class CaptureRecord:
+    """One captured event"""
+
+    __slots__ = ("offset", "sid", "event", "kind", "size", "payload")
+
+    def __init__(self, offset, sid, event, kind, size, payload):
+        self.offset = offset
+        self.sid = sid
+        self.event = event
+        self.kind = kind
+        self.size = size
+        self.payload = payload
+
+    def args(self):
+        """Event arguments, or None if the payload was not stored"""
+        if self.kind == KIND_JSON:
+            return json.loads(self.payload)
+        if self.kind == KIND_BINARY:
+            return [self.payload]
+        return None
+
+
+def read_capture(data):
+    """Return (start time, flags, records) from capture log bytes; a torn tail is ignored"""
+    if len(data) < _HEADER.size:
+        raise CaptureError("Capture log too short")
+    magic, version, flags, started = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise CaptureError("Not a signaling capture log")
+
+    records = []
+    view = memoryview(data)
+    offset = _HEADER.size
+    while offset + _LENGTH.size <= len(view):
+        (length,) = _LENGTH.unpack_from(view, offset)
+        start = offset + _LENGTH.size
+        if length < _RECORD.size or start + length > len(view):
+            break
+        at, size, kind, sid_length, event_length = _RECORD.unpack_from(view, start)
+        position = start + _RECORD.size
+        sid = str(view[position : position + sid_length], "utf-8")
+        position += sid_length
+        event = str(view[position : position + event_length], "utf-8")
+        position += event_length
+        payload = bytes(view[position : start + length])
+        records.append(CaptureRecord(at, sid, event, kind, size, payload))
+        offset = start + length
+    return started, flags, records
+
+
+class CaptureLog:
+    """Appends inbound events to a per-process capture file.
+
+    The file is opened on the first captured event, so a gunicorn master that
+    never handles events creates none, and each forked worker writes its own.
+    """
+
+    def __init__(
+        self, directory, sample=1.0, payloads=True, flush_interval=1.0, clock=time.monotonic
+    ):
+        self.directory = directory
+        self.sample = sample
+        self.payloads = payloads
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.path = None
+        self.records = 0
+        self._file = None
+        self._pid = None
+        self._started = None
+        self._flushed = 0.0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        started = time.time()
+        self.path = os.path.join(
+            self.directory,
+            f"signaling-{time.strftime('%Y%m%d-%H%M%S')}-{self._pid}-{next(_sequence)}.rtcl",
+        )
+        self._file = open(self.path, "xb", buffering=1 << 16)
+        self._file.write(
+            _HEADER.pack(MAGIC, VERSION, FLAG_PAYLOADS if self.payloads else 0, started)
+        )
+        self._started = self.clock()
+        self._flushed = self._started
+
+    def record(self, sid, event, args=()):
+        if not sampled(sid, self.sample):
+            return
+
+        kind, payload = encode_payload(args)
+        size = len(payload)
+        if not self.payloads:
+            kind, payload = KIND_NONE, b""
+
+        with self._lock:
+            if self._file is None or self._pid != os.getpid():
+                self._open()
+            now = self.clock()
+            self._file.write(encode_record(now - self._started, sid, event, kind, size, payload))
+            self.records += 1
+            if now - self._flushed >= self.flush_interval:
+                self._file.flush()
+                self._flushed = now
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
@@ -0,0 +1,47 @@
+"""
+Idempotent chat delivery
+Clients retry chat messages after a reconnect with the same id. Each room keeps
+the ids of its most recent messages in a bounded LRU, so a retry is recognised
+in O(1) and answered to its sender only instead of being fanned out again
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class MessageDeduper:
+    """Recently seen chat message ids, per room"""
+
+    def __init__(self, per_room=1024):
+        self.per_room = per_room
+        self._rooms = {}
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+    def first_delivery(self, room, message_id):
+        """Record a message id; False if the room has already seen it"""
+        if message_id is None:
+            return True
+        with self._lock:
+            seen = self._rooms.get(room)
+            if seen is None:
+                seen = self._rooms[room] = OrderedDict()
+            elif message_id in seen:
+                seen.move_to_end(message_id)
+                self.duplicates += 1
+                return False
+            seen[message_id] = None
+            if len(seen) > self.per_room:
+                seen.popitem(last=False)
+            return True
+
+    def forget(self, room, message_id):
+        """Let a message that was not delivered be sent again under the same id"""
+        with self._lock:
+            seen = self._rooms.get(room)
+            if seen is not None:
+                seen.pop(message_id, None)
+
+    def discard(self, room):
+        with self._lock:
+            self._rooms.pop(room, None)
@@ -0,0 +1,253 @@
+"""
+Meeting chat history and search
+Chat messages are queued as they are broadcast and written to MongoDB in
+batches by a background flush, so storing them never delays delivery. Search
+runs on either an in-process inverted index (per-room posting lists, built from
+the stored history the first time a room is searched and extended by every
+flush) or a MongoDB text index, chosen by configuration
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+MEMORY = "memory"
+MONGO = "mongo"
+SEARCH_BACKENDS = (MEMORY, MONGO)
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Distinct lower-case words of a text, in order of first appearance"""
+    return list(dict.fromkeys(_WORD.findall(text.lower())))
+
+
+def _contains(posting, number):
+    position = bisect_left(posting, number)
+    return position < len(posting) and posting[position] == number
+
+
+class PostingIndex:
+    """Inverted index over the messages of one room.
+
+    Messages are numbered in the order they are added, so every posting list is
+    an ascending array. A query walks the rarest term's list from the newest
+    message down and checks the other terms with a binary search.
+    """
+
+    def __init__(self):
+        # term -> ascending message numbers
+        self.postings = {}
+        # message number -> stored document id
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, doc_id, text):
+        number = len(self.ids)
+        self.ids.append(doc_id)
+        for term in tokenize(text):
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = array("l")
+            posting.append(number)
+
+    def search(self, terms, limit, before=None):
+        """Numbers of up to `limit` messages holding every term, newest first, below `before`"""
+        lists = []
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                return []
+            lists.append(posting)
+        if not lists:
+            return []
+
+        lists.sort(key=len)
+        rarest, others = lists[0], lists[1:]
+        end = len(rarest) if before is None else bisect_left(rarest, before)
+        matches = []
+        for position in range(end - 1, -1, -1):
+            number = rarest[position]
+            if all(_contains(posting, number) for posting in others):
+                matches.append(number)
+                if len(matches) == limit:
+                    break
+        return matches
+
+
+def _public(doc):
+    """A stored message in the shape of a chat-message event"""
+    return {
+        "id": doc.get("messageId"),
+        "userId": doc.get("userId"),
+        "username": doc.get("username"),
+        "message": doc["message"],
+        "timestamp": doc.get("timestamp"),
+    }
+
+
+class ChatHistory:
+    """Batched chat persistence with per-meeting search"""
+
+    def __init__(self, collection, schedule, backend=MEMORY, flush_interval=0.5, max_pending=10000):
+        if backend not in SEARCH_BACKENDS:
+            raise ValueError(f"Unknown chat search backend: {backend}")
+        self.collection = collection
+        # schedule(delay, callback, *args) runs callback later
+        self.schedule = schedule
+        self.backend = backend
+        self.flush_interval = flush_interval
+        # Messages kept for retry while writes fail; the oldest are dropped past it
+        self.max_pending = max_pending
+        self.stored = 0
+        self.dropped = 0
+        self._pending = []
+        self._scheduled = False
+        self._lock = threading.Lock()
+        # room -> PostingIndex, for the rooms searched since they were last released
+        self._indexes = {}
+        # Serialises flushes with loading a room's index, so no message is missed
+        self._index_lock = threading.Lock()
+
+    def append(self, room, message):
+        """Queue a delivered message for the next flush; only text messages are kept"""
+        if not isinstance(message.get("message"), str):
+            return
+        doc = {
+            "_id": ObjectId(),
+            "meetingId": room,
+            "messageId": message.get("id"),
+            "userId": message.get("userId"),
+            "username": message.get("username"),
+            "message": message["message"],
+            "timestamp": message.get("timestamp"),
+            "createdAt": datetime.now(),
+        }
+        with self._lock:
+            self._pending.append(doc)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.schedule(self.flush_interval, self.flush)
+
+    def flush(self):
+        """Store the queued messages with one write and add them to the loaded indexes"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._scheduled = False
+        if not batch:
+            return
+
+        failed = []
+        with self._index_lock:
+            try:
+                self.collection.insert_many(batch, ordered=False)
+                stored = batch
+            except BulkWriteError as exc:
+                # A duplicate _id was stored by an earlier, interrupted attempt
+                errors = {
+                    error["index"]
+                    for error in exc.details.get("writeErrors", ())
+                    if error.get("code") != 11000
+                }
+                stored = [doc for i, doc in enumerate(batch) if i not in errors]
+                failed = [batch[i] for i in sorted(errors)]
+            except PyMongoError as exc:
+                print(f"Chat history write failed: {exc}")
+                stored, failed = [], batch
+
+            self.stored += len(stored)
+            if self.backend == MEMORY:
+                for doc in stored:
+                    index = self._indexes.get(doc["meetingId"])
+                    if index is not None:
+                        index.add(doc["_id"], doc["message"])
+
+        if failed:
+            self._requeue(failed)
+
+    def _requeue(self, docs):
+        """Put the messages of a failed write back in front of the queue"""
+        with self._lock:
+            self._pending[:0] = docs
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+                self.dropped += overflow
+                print(f"Chat history queue full, dropped {overflow} messages")
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.schedule(self.flush_interval, self.flush)
+
+    def search(self, room, query, limit=20, before=None):
+        """Return (messages newest first, cursor for the next page or None).
+
+        Raises ValueError for a cursor this backend did not hand out.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return [], None
+        if self.backend == MONGO:
+            return self._search_text_index(room, terms, limit, before)
+
+        if before is not None:
+            if not str(before).isdigit():
+                raise ValueError("Invalid cursor")
+            before = int(before)
+        index = self._room_index(room)
+        numbers = index.search(terms, limit + 1, before)
+        ids = [index.ids[number] for number in numbers[:limit]]
+        docs = {doc["_id"]: doc for doc in self.collection.find({"_id": {"$in": ids}})}
+        messages = [_public(docs[doc_id]) for doc_id in ids if doc_id in docs]
+        cursor = str(numbers[limit - 1]) if len(numbers) > limit else None
+        return messages, cursor
+
+    def _search_text_index(self, room, terms, limit, before):
+        # Quoted terms must all be present, like the in-process index
+        query = {
+            "meetingId": room,
+            "$text": {"$search": " ".join(f'"{term}"' for term in terms)},
+        }
+        if before is not None:
+            if not ObjectId.is_valid(before):
+                raise ValueError("Invalid cursor")
+            query["_id"] = {"$lt": ObjectId(before)}
+        docs = list(self.collection.find(query).sort("_id", -1).limit(limit + 1))
+        cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+        return [_public(doc) for doc in docs[:limit]], cursor
+
+    def _room_index(self, room):
+        index = self._indexes.get(room)
+        if index is not None:
+            return index
+        with self._index_lock:
+            index = self._indexes.get(room)
+            if index is None:
+                index = PostingIndex()
+                stored = self.collection.find({"meetingId": room}, {"message": 1})
+                for doc in stored.sort("_id", 1):
+                    # Messages stored before only text was accepted cannot be indexed
+                    if isinstance(doc.get("message"), str):
+                        index.add(doc["_id"], doc["message"])
+                self._indexes[room] = index
+        return index
+
+    def ensure_indexes(self):
+        """Create the indexes the history loads and the text search need"""
+        self.collection.create_index([("meetingId", 1), ("_id", 1)])
+        if self.backend == MONGO:
+            self.collection.create_index([("meetingId", 1), ("message", "text")])
+
+    def discard(self, room):
+        """Drop a room's in-process index; its history stays stored"""
+        with self._index_lock:
+            self._indexes.pop(room, None)
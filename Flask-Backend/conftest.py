@@ -1,7 +1,11 @@
 import pytest
 import mongomock
 from unittest.mock import patch, MagicMock
-from server import app, socketio, users_collection, meetings_collection, participants_collection
+from chathistory import ChatHistory
+from server import create_app, socketio
+from usercache import UserLookup
+
+app = create_app({'TESTING': True, 'SOCKETIO_LOGGER': False})
 
 
 @pytest.fixture
@@ -60,3 +64,39 @@ def sample_meeting():
 def socket_client():
     """Create a test client for Socket.IO."""
     return socketio.test_client(app)
+
+
+class FakeScheduler:
+    """Collects scheduled callbacks so tests can fire them explicitly"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, delay, callback, *args):
+        self.calls.append((delay, callback, args))
+
+    def run_all(self):
+        calls, self.calls = self.calls, []
+        for _, callback, args in calls:
+            callback(*args)
+
+
+@pytest.fixture
+def scheduler():
+    """Stand-in for server._schedule that runs callbacks on demand."""
+    return FakeScheduler()
+
+
+@pytest.fixture(autouse=True)
+def chat_history():
+    """Keep chat history flushes away from a real MongoDB."""
+    collection = mongomock.MongoClient()['test_meeting_app']['chat_messages']
+    with patch('server.chat_history', ChatHistory(collection, FakeScheduler())) as history:
+        yield history
+
+
+@pytest.fixture(autouse=True)
+def user_lookup():
+    """Give each test its own username filter and user cache."""
+    with patch('server.user_lookup', UserLookup(capacity=1000)) as lookup:
+        yield lookup
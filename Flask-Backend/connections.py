@@ -0,0 +1,113 @@
+"""
+Compact records for active socket connections
+One __slots__ record per socket instead of a dict, with room and user ids
+interned so every connection in a room shares a single copy of each string.
+Records also read and write like the old dicts ("room", "userId", ...), which
+is the view the socket handlers use. The table of records keeps a per-room
+index of its sockets, so room lookups do not scan every connection
+"""
+
+import sys
+
+# Dict-style key -> slot name
+_FIELDS = {
+    "room": "room",
+    "userId": "user_id",
+    "socketId": "socket_id",
+    "role": "role",
+    "resumeToken": "resume_token",
+    "suspendedAt": "suspended_at",
+}
+
+# Shared by every lookup of a room with no sockets
+_EMPTY = {}
+
+
+def intern_id(value):
+    """Intern a string id so equal ids share one object; other values pass through"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class ConnectionRecord:
+    """State of one socket in a meeting room"""
+
+    __slots__ = tuple(_FIELDS.values())
+
+    def __init__(self, room, user_id, socket_id, role=None):
+        self.room = intern_id(room)
+        self.user_id = intern_id(user_id)
+        self.socket_id = socket_id
+        self.role = role
+        self.resume_token = None
+        self.suspended_at = None
+
+    def __getitem__(self, key):
+        return getattr(self, _FIELDS[key])
+
+    def __setitem__(self, key, value):
+        setattr(self, _FIELDS[key], value)
+
+    def get(self, key, default=None):
+        field = _FIELDS.get(key)
+        return default if field is None else getattr(self, field)
+
+    def __repr__(self):
+        return (
+            f"ConnectionRecord(room={self.room!r}, user_id={self.user_id!r}, "
+            f"socket_id={self.socket_id!r}, role={self.role!r})"
+        )
+
+
+class ConnectionTable(dict):
+    """sid -> connection record, plus a room -> {sid: record} index kept in step.
+
+    Only item assignment, del, pop and clear are used on it; they all update the
+    index. A record's room does not change while it is in the table.
+    """
+
+    def __init__(self, records=None):
+        super().__init__()
+        self._rooms = {}
+        for sid, record in (records or {}).items():
+            self[sid] = record
+
+    def __setitem__(self, sid, record):
+        previous = dict.get(self, sid)
+        if previous is not None:
+            self._unindex(sid, previous)
+        super().__setitem__(sid, record)
+        self._rooms.setdefault(record["room"], {})[sid] = record
+
+    def __delitem__(self, sid):
+        record = self[sid]
+        super().__delitem__(sid)
+        self._unindex(sid, record)
+
+    def pop(self, sid, *default):
+        if sid not in self:
+            return dict.pop(self, sid, *default)
+        record = super().pop(sid)
+        self._unindex(sid, record)
+        return record
+
+    def clear(self):
+        super().clear()
+        self._rooms.clear()
+
+    def _unindex(self, sid, record):
+        members = self._rooms.get(record["room"])
+        if members is not None:
+            members.pop(sid, None)
+            if not members:
+                del self._rooms[record["room"]]
+
+    def in_room(self, room):
+        """The sockets in a room as {sid: record}; callers must not modify it"""
+        return self._rooms.get(room, _EMPTY)
+
+    def rooms(self):
+        """Rooms with at least one socket"""
+        return list(self._rooms)
+
+    def room_size(self, room):
+        return len(self._rooms.get(room, _EMPTY))
@@ -0,0 +1,236 @@
+"""
+Chunked, resumable file uploads for meeting chat
+An upload is a `.part` file on disk plus a small JSON sidecar with its
+metadata; the size of the `.part` file is how far the upload has got, so a
+client that lost its connection asks for the offset and carries on from there,
+even after a restart. Chunks are copied from the request stream to the file
+through one fixed-size buffer, so memory use does not depend on the file size.
+Uploads count against per-meeting and per-user quotas, a meeting's files are
+deleted when it ends, and uploads abandoned halfway are swept after a while
+"""
+
+import json
+import os
+import re
+import secrets
+import shutil
+import threading
+import time
+
+_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class UploadError(Exception):
+    """Raised for a request the upload cannot accept"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class FileStore:
+    """Uploads and shared files, one directory per meeting"""
+
+    def __init__(
+        self,
+        directory,
+        max_size=1 << 30,
+        chunk_size=8 << 20,
+        buffer_size=64 << 10,
+        meeting_quota=None,
+        user_quota=None,
+    ):
+        self.directory = directory
+        self.max_size = max_size
+        # Declared bytes a meeting, and one user in it, may have uploaded or uploading
+        self.meeting_quota = meeting_quota
+        self.user_quota = user_quota
+        # Largest chunk one request may carry
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self._writing = set()
+        self._lock = threading.Lock()
+
+    def _path(self, meeting_id, file_id, suffix=""):
+        if not _ID.match(meeting_id) or not _ID.match(file_id):
+            raise UploadError("Upload not found", 404)
+        return os.path.join(self.directory, meeting_id, file_id + suffix)
+
+    def start(self, meeting_id, user_id, name, size, content_type=None, username=None):
+        """Register an upload and return its metadata"""
+        if not _ID.match(meeting_id):
+            raise UploadError("Invalid meeting ID format")
+        name = os.path.basename(str(name or "")).strip()
+        if not name:
+            raise UploadError("File name is required")
+        if isinstance(size, bool) or not isinstance(size, int) or size < 0:
+            raise UploadError("File size must be a non-negative integer")
+        if size > self.max_size:
+            raise UploadError(f"Files are limited to {self.max_size} bytes", 413)
+
+        with self._lock:
+            self._check_quota(meeting_id, user_id, size)
+            meta = self._create(meeting_id, user_id, name, size, content_type, username)
+        if size == 0:
+            return self._complete(meta)
+        return meta
+
+    def _check_quota(self, meeting_id, user_id, size):
+        meeting_bytes = user_bytes = 0
+        for meta in self._uploads(meeting_id):
+            meeting_bytes += meta["size"]
+            if meta["userId"] == user_id:
+                user_bytes += meta["size"]
+        if self.meeting_quota is not None and meeting_bytes + size > self.meeting_quota:
+            raise UploadError("The meeting's file quota is used up", 413)
+        if self.user_quota is not None and user_bytes + size > self.user_quota:
+            raise UploadError("Your file quota for this meeting is used up", 413)
+
+    def _uploads(self, meeting_id):
+        """Metadata of every upload of a meeting, complete or not"""
+        try:
+            entries = list(os.scandir(os.path.join(self.directory, meeting_id)))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.endswith(".json"):
+                try:
+                    yield self.metadata(meeting_id, entry.name[: -len(".json")])
+                except UploadError:
+                    continue
+
+    def _create(self, meeting_id, user_id, name, size, content_type, username):
+        meta = {
+            "fileId": secrets.token_urlsafe(16),
+            "meetingId": meeting_id,
+            "userId": user_id,
+            "username": username,
+            "name": name,
+            "size": size,
+            "contentType": content_type or "application/octet-stream",
+            "createdAt": time.time(),
+            "complete": False,
+        }
+        os.makedirs(os.path.join(self.directory, meeting_id), exist_ok=True)
+        open(self._path(meeting_id, meta["fileId"], ".part"), "xb").close()
+        self._save(meta)
+        return meta
+
+    def _save(self, meta):
+        path = self._path(meta["meetingId"], meta["fileId"], ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def metadata(self, meeting_id, file_id):
+        try:
+            with open(self._path(meeting_id, file_id, ".json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise UploadError("Upload not found", 404)
+
+    def offset(self, meeting_id, file_id):
+        """Bytes received so far"""
+        meta = self.metadata(meeting_id, file_id)
+        if meta["complete"]:
+            return meta["size"]
+        return os.path.getsize(self._path(meeting_id, file_id, ".part"))
+
+    def write_chunk(self, meeting_id, file_id, offset, stream, length):
+        """Append `length` bytes read from `stream` at `offset`; return (offset, metadata).
+
+        `offset` must be where the upload stands. If the stream ends early the
+        bytes received are kept and the client resumes from the new offset.
+        """
+        meta = self.metadata(meeting_id, file_id)
+        if meta["complete"]:
+            raise UploadError("Upload already complete", 409, meta["size"])
+        if length is None or length <= 0:
+            raise UploadError("Chunk is empty", 411)
+        if length > self.chunk_size:
+            raise UploadError(f"Chunks are limited to {self.chunk_size} bytes", 413)
+
+        key = (meeting_id, file_id)
+        with self._lock:
+            if key in self._writing:
+                raise UploadError("Another chunk is being written", 409)
+            self._writing.add(key)
+        try:
+            try:
+                f = open(self._path(meeting_id, file_id, ".part"), "r+b")
+            except FileNotFoundError:
+                # Completed by a request that was still writing when this one started
+                raise UploadError("Upload already complete", 409, meta["size"])
+            with f:
+                current = f.seek(0, os.SEEK_END)
+                if offset != current:
+                    raise UploadError("Offset does not match the upload", 409, current)
+                if current + length > meta["size"]:
+                    raise UploadError("Chunk goes past the declared file size", 400, current)
+
+                buffer = bytearray(self.buffer_size)
+                view = memoryview(buffer)
+                remaining = length
+                while remaining:
+                    read = stream.readinto(view[: min(remaining, self.buffer_size)])
+                    if not read:
+                        break
+                    f.write(view[:read])
+                    remaining -= read
+                received = f.tell()
+            if received == meta["size"]:
+                self._complete(meta)
+        finally:
+            with self._lock:
+                self._writing.discard(key)
+        return received, meta
+
+    def _complete(self, meta):
+        meta["complete"] = True
+        os.replace(
+            self._path(meta["meetingId"], meta["fileId"], ".part"),
+            self._path(meta["meetingId"], meta["fileId"]),
+        )
+        self._save(meta)
+        return meta
+
+    def file_path(self, meeting_id, file_id):
+        """(path, metadata) of a completed file"""
+        meta = self.metadata(meeting_id, file_id)
+        if not meta["complete"]:
+            raise UploadError("Upload not complete", 409)
+        return self._path(meeting_id, file_id), meta
+
+    def discard(self, meeting_id):
+        """Delete every file and upload of a meeting that has ended"""
+        if _ID.match(meeting_id):
+            shutil.rmtree(os.path.join(self.directory, meeting_id), ignore_errors=True)
+
+    def expire_stale(self, max_age):
+        """Delete uploads that have received nothing for `max_age` seconds; returns how many"""
+        deadline = time.time() - max_age
+        expired = 0
+        try:
+            meetings = [entry.path for entry in os.scandir(self.directory) if entry.is_dir()]
+        except FileNotFoundError:
+            return 0
+        for meeting_dir in meetings:
+            for entry in os.scandir(meeting_dir):
+                if not entry.name.endswith(".part"):
+                    continue
+                try:
+                    if entry.stat().st_mtime > deadline:
+                        continue
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    # Completed or removed in the meantime
+                    continue
+                base = entry.path[: -len(".part")]
+                for suffix in (".json", ".json.tmp"):
+                    try:
+                        os.remove(base + suffix)
+                    except FileNotFoundError:
+                        pass
+                expired += 1
+        return expired
@@ -0,0 +1,21 @@
+"""
+Gunicorn settings, picked up from the working directory
+The app is imported once in the master (preload_app) and forked into the
+workers, which then rebuild their database client and in-process state. The
+master never talks to MongoDB; the first worker it forks builds the indexes
+"""
+preload_app = True
+
+
+def post_worker_init(worker):
+    # Runs in the forked worker after the worker class has set itself up, i.e.
+    # after eventlet's monkey patching, so re-created locks are green ones
+    from server import ensure_indexes, reinit_after_fork, socketio
+
+    reinit_after_fork()
+
+    # Worker ages count up from 1 for the life of the master, so this runs once
+    # per deploy and not again when a worker is replaced. It runs in the
+    # background so building an index cannot hold up the worker's boot.
+    if worker.age == 1:
+        socketio.start_background_task(ensure_indexes)
@@ -0,0 +1,65 @@
+"""
+Idle meeting tracking for the garbage collector
+Meetings with no live sockets are kept in a min-heap keyed by the time they went
+quiet, so a collection pass only pops the rooms whose idle TTL has run out and
+never scans the rooms that are still in use. Rooms that become busy again are
+dropped from the index right away and their heap entries are skipped lazily
+"""
+
+import heapq
+import threading
+import time
+
+
+class IdleRooms:
+    """Rooms without live sockets, ordered by when they went quiet"""
+
+    def __init__(self, ttl, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        # room -> time it went idle; heap entries not matching it are stale
+        self._since = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._since)
+
+    def __contains__(self, room):
+        return room in self._since
+
+    def idle(self, room, since=None):
+        """The last socket left the room (or nobody has joined it yet).
+
+        `since` backdates when it went quiet, in clock() time; it defaults to now.
+        """
+        if since is None:
+            since = self.clock()
+        with self._lock:
+            if room in self._since:
+                return
+            self._since[room] = since
+            heapq.heappush(self._heap, (since, room))
+            # Rooms that keep emptying and refilling leave stale entries behind
+            if len(self._heap) > 2 * len(self._since) + 64:
+                self._heap = [(since, room) for room, since in self._since.items()]
+                heapq.heapify(self._heap)
+
+    def active(self, room):
+        """A socket joined the room"""
+        with self._lock:
+            self._since.pop(room, None)
+
+    discard = active
+
+    def expired(self):
+        """Pop and return the rooms that have been idle for longer than the TTL"""
+        deadline = self.clock() - self.ttl
+        rooms = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= deadline:
+                since, room = heapq.heappop(self._heap)
+                if self._since.get(room) == since:
+                    del self._since[room]
+                    rooms.append(room)
+        return rooms
@@ -0,0 +1,293 @@
+"""
+Reactions, raised hands and polls
+Clicks only update in-process tallies: reactions are counted per room for the
+current tick, raised hands sit in a heap ordered by when they went up, and a
+vote moves one count from the old option to the new one. A room's changes go
+out as one interactions packet per tick, so fan-out grows with rooms and ticks,
+not with clicks times participants
+"""
+
+import heapq
+import itertools
+import secrets
+import threading
+from collections import Counter
+
+REACTIONS = ("👍", "👏", "❤️", "😂", "😮", "🎉")
+
+
+class InteractionError(ValueError):
+    """Raised for a poll or reaction the room cannot accept"""
+
+
+class HandQueue:
+    """Raised hands of one room in the order they went up.
+
+    Raising and taking the next hand are heap operations; lowering a hand
+    drops it from the index and leaves its heap entry to be skipped later.
+    """
+
+    def __init__(self):
+        # user id -> order it was raised in; heap entries not matching it are stale
+        self._raised = {}
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._raised)
+
+    def __contains__(self, user_id):
+        return user_id in self._raised
+
+    def raise_hand(self, user_id):
+        if user_id in self._raised:
+            return False
+        order = next(self._order)
+        self._raised[user_id] = order
+        heapq.heappush(self._heap, (order, user_id))
+        return True
+
+    def lower(self, user_id):
+        if self._raised.pop(user_id, None) is None:
+            return False
+        # Hands that keep going up and down leave stale entries behind
+        if len(self._heap) > 2 * len(self._raised) + 64:
+            self._heap = [(order, user) for user, order in self._raised.items()]
+            heapq.heapify(self._heap)
+        return True
+
+    def next(self):
+        """Lower and return the hand that has been up longest"""
+        while self._heap:
+            order, user_id = heapq.heappop(self._heap)
+            if self._raised.get(user_id) == order:
+                del self._raised[user_id]
+                return user_id
+        return None
+
+    def first(self, limit):
+        """User ids of the `limit` hands that have been up longest, in order"""
+        entries = heapq.nsmallest(limit, ((order, user) for user, order in self._raised.items()))
+        return [user_id for _, user_id in entries]
+
+
+class Poll:
+    """A poll with its running tally"""
+
+    __slots__ = ("poll_id", "question", "options", "counts", "votes", "open")
+
+    def __init__(self, poll_id, question, options):
+        self.poll_id = poll_id
+        self.question = question
+        self.options = options
+        self.counts = [0] * len(options)
+        # voter -> option index
+        self.votes = {}
+        self.open = True
+
+    def vote(self, voter, option):
+        """Record or change a vote; False if it changes nothing"""
+        previous = self.votes.get(voter)
+        if previous == option:
+            return False
+        if previous is not None:
+            self.counts[previous] -= 1
+        self.counts[option] += 1
+        self.votes[voter] = option
+        return True
+
+    def describe(self):
+        return {"pollId": self.poll_id, "question": self.question, "options": self.options}
+
+    def results(self):
+        return {
+            "pollId": self.poll_id,
+            "counts": list(self.counts),
+            "total": len(self.votes),
+            "open": self.open,
+        }
+
+
+class RoomInteractions:
+    __slots__ = ("reactions", "hands", "polls", "hands_changed", "polls_changed", "scheduled")
+
+    def __init__(self):
+        self.reactions = Counter()
+        self.hands = HandQueue()
+        # poll id -> Poll, open and closed
+        self.polls = {}
+        self.hands_changed = False
+        self.polls_changed = set()
+        self.scheduled = False
+
+
+class Interactions:
+    """Per-room reactions, hand queue and polls, broadcast once per tick"""
+
+    def __init__(
+        self,
+        emit,
+        schedule,
+        interval=1.0,
+        hands_shown=50,
+        max_polls=50,
+        max_options=10,
+    ):
+        # emit(room, payload) sends one interactions packet to a room
+        self.emit = emit
+        # schedule(delay, callback, *args) runs callback later
+        self.schedule = schedule
+        self.interval = interval
+        # Longest stretch of the hand queue sent in a packet
+        self.hands_shown = hands_shown
+        self.max_polls = max_polls
+        self.max_options = max_options
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, room):
+        return room in self._rooms
+
+    def _room(self, room):
+        state = self._rooms.get(room)
+        if state is None:
+            state = self._rooms[room] = RoomInteractions()
+        return state
+
+    def _mark(self, state):
+        """Called with the lock held; True if the caller must schedule the tick"""
+        if state.scheduled:
+            return False
+        state.scheduled = True
+        return True
+
+    def _after(self, room, due):
+        if due:
+            self.schedule(self.interval, self.flush, room)
+
+    def react(self, room, reaction):
+        if reaction not in REACTIONS:
+            raise InteractionError(f"Unknown reaction: {reaction}")
+        with self._lock:
+            state = self._room(room)
+            state.reactions[reaction] += 1
+            due = self._mark(state)
+        self._after(room, due)
+
+    def raise_hand(self, room, user_id):
+        with self._lock:
+            state = self._room(room)
+            if not state.hands.raise_hand(user_id):
+                return False
+            state.hands_changed = True
+            due = self._mark(state)
+        self._after(room, due)
+        return True
+
+    def lower_hand(self, room, user_id):
+        with self._lock:
+            state = self._rooms.get(room)
+            if state is None or not state.hands.lower(user_id):
+                return False
+            state.hands_changed = True
+            due = self._mark(state)
+        self._after(room, due)
+        return True
+
+    def next_hand(self, room):
+        """Lower the longest raised hand and return its user id"""
+        with self._lock:
+            state = self._rooms.get(room)
+            user_id = state.hands.next() if state is not None else None
+            if user_id is None:
+                return None
+            state.hands_changed = True
+            due = self._mark(state)
+        self._after(room, due)
+        return user_id
+
+    def start_poll(self, room, question, options):
+        """Open a poll and return its description"""
+        if not isinstance(question, str) or not 0 < len(question.strip()) <= 300:
+            raise InteractionError("Poll question is required")
+        if (
+            not isinstance(options, list)
+            or not 2 <= len(options) <= self.max_options
+            or not all(isinstance(o, str) and 0 < len(o.strip()) <= 100 for o in options)
+        ):
+            raise InteractionError(f"Polls need 2 to {self.max_options} options")
+
+        with self._lock:
+            state = self._room(room)
+            if len(state.polls) >= self.max_polls:
+                raise InteractionError(f"At most {self.max_polls} polls per meeting")
+            poll = Poll(secrets.token_urlsafe(8), question.strip(), [o.strip() for o in options])
+            state.polls[poll.poll_id] = poll
+        return poll.describe()
+
+    def vote(self, room, poll_id, voter, option):
+        with self._lock:
+            state = self._rooms.get(room)
+            poll = state.polls.get(poll_id) if state is not None else None
+            if poll is None or not poll.open:
+                raise InteractionError("Poll is not open")
+            if isinstance(option, bool) or not isinstance(option, int):
+                raise InteractionError("Option must be an index")
+            if not 0 <= option < len(poll.options):
+                raise InteractionError("No such option")
+            if not poll.vote(voter, option):
+                return
+            state.polls_changed.add(poll_id)
+            due = self._mark(state)
+        self._after(room, due)
+
+    def end_poll(self, room, poll_id):
+        """Close a poll and return its final results, or None if it is not open"""
+        with self._lock:
+            state = self._rooms.get(room)
+            poll = state.polls.get(poll_id) if state is not None else None
+            if poll is None or not poll.open:
+                return None
+            poll.open = False
+            state.polls_changed.discard(poll_id)
+            return poll.results()
+
+    def flush(self, room):
+        """Send what changed in a room since the last tick as one packet"""
+        with self._lock:
+            state = self._rooms.get(room)
+            if state is None:
+                return
+            state.scheduled = False
+            payload = {}
+            if state.reactions:
+                payload["reactions"] = dict(state.reactions)
+                state.reactions.clear()
+            if state.hands_changed:
+                payload["hands"] = self._hands(state)
+                state.hands_changed = False
+            if state.polls_changed:
+                payload["polls"] = [
+                    state.polls[poll_id].results() for poll_id in state.polls_changed
+                ]
+                state.polls_changed = set()
+        if payload:
+            self.emit(room, payload)
+
+    def _hands(self, state):
+        return {"queue": state.hands.first(self.hands_shown), "count": len(state.hands)}
+
+    def state(self, room):
+        """Hand queue and polls for someone joining the room"""
+        with self._lock:
+            state = self._rooms.get(room)
+            if state is None:
+                return {"hands": {"queue": [], "count": 0}, "polls": []}
+            return {
+                "hands": self._hands(state),
+                "polls": [dict(poll.describe(), **poll.results()) for poll in state.polls.values()],
+            }
+
+    def discard(self, room):
+        with self._lock:
+            self._rooms.pop(room, None)
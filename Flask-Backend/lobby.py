@@ -0,0 +1,151 @@
+"""
+Waiting room
+In meetings created with a waiting room, arrivals other than the host and
+presenters are held in a per-meeting waiting list instead of joining the room:
+peers hear nothing until the host admits them, one at a time or all at once.
+The host is told about the list at most once per interval, so a join storm
+becomes a handful of lobby-changed packets to the host rather than a burst of
+joins in the meeting
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def hosts_room(room):
+    """Socket.IO room holding the host and presenters of a meeting"""
+    return f"{room}:hosts"
+
+
+class Lobby:
+    """Per-meeting waiting lists, notified to the hosts over an interval"""
+
+    def __init__(self, emit, schedule, interval=0.5, shown=100):
+        # emit(room, payload) sends the waiting list to a meeting's hosts
+        self.emit = emit
+        # schedule(delay, callback, *args) runs callback later
+        self.schedule = schedule
+        self.interval = interval
+        # Longest stretch of the waiting list sent to the hosts
+        self.shown = shown
+        # room -> OrderedDict(sid -> entry), in arrival order
+        self._waiting = {}
+        # sid -> room, for sockets that disconnect while waiting
+        self._rooms = {}
+        # room -> user ids let in, who skip the waiting room when they rejoin
+        self._admitted = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def is_admitted(self, room, user_id):
+        return user_id in self._admitted.get(room, ())
+
+    def wait(self, room, sid, user_id, signal_acks=False):
+        """Put a socket on the waiting list; returns its position"""
+        with self._lock:
+            self._leave(sid)
+            waiting = self._waiting.setdefault(room, OrderedDict())
+            waiting[sid] = {
+                "userId": user_id,
+                "socketId": sid,
+                "since": time.time(),
+                "signalAcks": bool(signal_acks),
+            }
+            self._rooms[sid] = room
+            position = len(waiting)
+            due = self._mark(room)
+        if due:
+            self.schedule(self.interval, self.flush, room)
+        return position
+
+    def _mark(self, room):
+        if room in self._dirty:
+            return False
+        self._dirty.add(room)
+        return True
+
+    def _leave(self, sid):
+        room = self._rooms.pop(sid, None)
+        if room is None:
+            return None
+        waiting = self._waiting.get(room)
+        if waiting is not None:
+            waiting.pop(sid, None)
+            if not waiting:
+                del self._waiting[room]
+        return room
+
+    def leave(self, sid):
+        """Take a socket off its waiting list; returns the meeting or None"""
+        with self._lock:
+            room = self._leave(sid)
+            due = room is not None and self._mark(room)
+        if due:
+            self.schedule(self.interval, self.flush, room)
+        return room
+
+    def admit(self, room, sids=None):
+        """Take the given sockets (all if None) off the waiting list, in arrival order"""
+        with self._lock:
+            waiting = self._waiting.get(room)
+            if not waiting:
+                return []
+            if sids is None:
+                chosen = list(waiting)
+            else:
+                wanted = set(sids)
+                chosen = [sid for sid in waiting if sid in wanted]
+            entries = [waiting[sid] for sid in chosen]
+            for sid in chosen:
+                self._leave(sid)
+            admitted = self._admitted.setdefault(room, set())
+            admitted.update(entry["userId"] for entry in entries)
+            due = bool(entries) and self._mark(room)
+        if due:
+            self.schedule(self.interval, self.flush, room)
+        return entries
+
+    def deny(self, room, sid):
+        """Turn a waiting socket away; returns its entry or None"""
+        with self._lock:
+            waiting = self._waiting.get(room)
+            entry = waiting.get(sid) if waiting else None
+            if entry is None:
+                return None
+            self._leave(sid)
+            due = self._mark(room)
+        if due:
+            self.schedule(self.interval, self.flush, room)
+        return entry
+
+    def state(self, room):
+        with self._lock:
+            waiting = self._waiting.get(room, {})
+            entries = []
+            for entry in waiting.values():
+                if len(entries) == self.shown:
+                    break
+                entries.append(
+                    {
+                        "userId": entry["userId"],
+                        "socketId": entry["socketId"],
+                        "since": entry["since"],
+                    }
+                )
+            return {"count": len(waiting), "waiting": entries}
+
+    def flush(self, room):
+        with self._lock:
+            self._dirty.discard(room)
+        self.emit(room, self.state(room))
+
+    def discard(self, room):
+        """Forget a meeting's waiting list and admissions; returns the waiting sids"""
+        with self._lock:
+            waiting = self._waiting.pop(room, {})
+            for sid in waiting:
+                self._rooms.pop(sid, None)
+            self._admitted.pop(room, None)
+            self._dirty.discard(room)
+        return list(waiting)
@@ -0,0 +1,104 @@
+"""
+Membership notification aggregator
+Small rooms keep the per-event user-joined / user-left packets. In larger rooms,
+joins and leaves inside a short window are merged into one participants-changed
+packet, with a window that grows with the room size
+"""
+import math
+import threading
+
+
+class MembershipNotifier:
+    """Merges join/leave notifications per room over an adaptive window"""
+
+    def __init__(self, emit, schedule, small_room=8, base_window=0.02, max_window=1.0):
+        # emit(event, payload, room, skip_sid) sends one packet to a room or socket;
+        # skip_sid is a socket id or a list of them
+        self.emit = emit
+        # schedule(delay, callback, *args) runs callback later
+        self.schedule = schedule
+        self.small_room = small_room
+        self.base_window = base_window
+        self.max_window = max_window
+        # room -> {"added": {sid: entry}, "removed": {sid: entry}}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def window_for(self, room_size):
+        """Seconds to hold notifications for a room of this size (0 = send now)"""
+        if room_size <= self.small_room:
+            return 0
+        return min(self.max_window, self.base_window * math.sqrt(room_size))
+
+    def joined(self, room, room_size, user_id, socket_id):
+        entry = {"userId": user_id, "socketId": socket_id}
+        if not self._queue(room, room_size, "added", socket_id, entry):
+            self.emit("user-joined", entry, room, socket_id)
+
+    def joined_many(self, room, room_size, entries, skip=()):
+        """Announce sockets that joined together ({userId, socketId} entries).
+
+        The rest of the room, other than `skip`, hears about them at once, in one
+        packet unless the room is small. The new sockets are left out of that and
+        out of each other's existing-participants; instead each one hears about
+        the sockets after it, so exactly one side of every new pair makes the
+        offer. A batch already collecting for the room should be flushed first.
+        """
+        if not entries:
+            return
+        skip_sid = [entry["socketId"] for entry in entries] + list(skip)
+        self._announce(room, room_size, entries, skip_sid)
+        for i, entry in enumerate(entries[:-1]):
+            self._announce(entry["socketId"], room_size, entries[i + 1 :], None)
+
+    def _announce(self, to, room_size, entries, skip_sid):
+        if self.window_for(room_size):
+            self.emit("participants-changed", {"added": entries, "removed": []}, to, skip_sid)
+        else:
+            for entry in entries:
+                self.emit("user-joined", entry, to, skip_sid)
+
+    def left(self, room, room_size, user_id, socket_id):
+        entry = {"userId": user_id, "socketId": socket_id}
+        if not self._queue(room, room_size, "removed", socket_id, entry):
+            self.emit("user-left", entry, room, socket_id)
+
+    def _queue(self, room, room_size, kind, socket_id, entry):
+        """Add a change to the room's pending batch; False means send it right away"""
+        with self._lock:
+            pending = self._pending.get(room)
+            if pending is None:
+                # Batches already in flight keep collecting so ordering is preserved
+                window = self.window_for(room_size)
+                if not window:
+                    return False
+                pending = self._pending[room] = {"added": {}, "removed": {}}
+                self.schedule(window, self.flush, room)
+
+            if kind == "removed" and socket_id in pending["added"]:
+                # Joined and left inside the same window: nobody needs to hear about it
+                del pending["added"][socket_id]
+            else:
+                pending[kind][socket_id] = entry
+            return True
+
+    def flush(self, room):
+        """Send the merged batch for a room, if it still has changes"""
+        with self._lock:
+            pending = self._pending.pop(room, None)
+
+        if pending and (pending["added"] or pending["removed"]):
+            self.emit(
+                "participants-changed",
+                {
+                    "added": list(pending["added"].values()),
+                    "removed": list(pending["removed"].values()),
+                },
+                room,
+                None,
+            )
+
+    def discard(self, room):
+        """Forget anything pending for a room"""
+        with self._lock:
+            self._pending.pop(room, None)
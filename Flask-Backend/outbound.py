@@ -0,0 +1,208 @@
+"""
+Bounded per-socket outbound queues
+Wraps the Engine.IO send queue of each socket with message and byte caps and a
+per-event drop policy, so a client that stops reading cannot make the server
+buffer without limit:
+    - media-status-changed is coalesced: a newer status for a peer overwrites
+      the one still queued instead of being queued itself
+    - while the socket is over its limits, only offers, answers, packets that
+      are not plain events (binary events, acks) and trickle-ICE candidates
+      from peers whose connection is not yet established are queued. The
+      client reports an established connection (peer_connected); a newer
+      offer or answer from that peer (renegotiation, ICE restart) needs its
+      candidates again
+A socket that stays over its limits longer than evict_after is evicted, and one
+that reaches twice its limits is evicted as soon as that packet is queued
+"""
+import threading
+import time
+
+# Engine.IO MESSAGE packets carrying a Socket.IO EVENT start with this prefix
+_EVENT_PREFIX = '2["'
+_MESSAGE = 4
+
+COALESCE_EVENTS = {"media-status-changed"}
+# Queued even over the limits; losing one would break a negotiation
+PROTECTED_EVENTS = {"offer", "answer"}
+# Dropped over the limits only once the sending peer's connection is up
+ICE_EVENTS = {"ice-candidate"}
+
+
+def event_name(pkt):
+    """Socket.IO event name of an Engine.IO packet, or None for anything else"""
+    data = getattr(pkt, "data", None)
+    if getattr(pkt, "packet_type", None) != _MESSAGE or not isinstance(data, str):
+        return None
+    if not data.startswith(_EVENT_PREFIX):
+        return None
+    end = data.find('"', 3)
+    return data[3:end] if end > 0 else None
+
+
+def _string_field(data, name):
+    marker = f'"{name}":"'
+    start = data.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+    return data[start : data.find('"', start)]
+
+
+def _coalesce_key(event, data):
+    peer = _string_field(data, "socketId")
+    return (event, peer) if peer is not None else None
+
+
+def _packet_size(pkt):
+    data = getattr(pkt, "data", None)
+    return len(data) if isinstance(data, (str, bytes, bytearray)) else 0
+
+
+class OutboundStats:
+    """Counters shared by every outbound queue of the server"""
+
+    def __init__(self):
+        self.dropped = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def add(self, field, amount=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+
+class OutboundQueue:
+    """Engine.IO send queue with caps; delegates storage to the async mode's queue"""
+
+    def __init__(
+        self,
+        inner,
+        max_messages=1000,
+        max_bytes=4 * 1024 * 1024,
+        evict_after=5.0,
+        on_evict=None,
+        stats=None,
+        clock=time.monotonic,
+    ):
+        self._inner = inner
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.evict_after = evict_after
+        self.on_evict = on_evict
+        self.stats = stats or OutboundStats()
+        self.clock = clock
+        self.sid = None
+        self.messages = 0
+        self.bytes = 0
+        self.over_since = None
+        self.evicted = False
+        # coalesce key -> the queued packet newer updates are written into
+        self._latest = {}
+        self._key_of = {}
+        # Peers whose connection with this socket is established
+        self._connected_peers = set()
+        self._lock = threading.Lock()
+
+    def over_limit(self):
+        return self.messages >= self.max_messages or self.bytes >= self.max_bytes
+
+    def over_hard_limit(self):
+        return self.messages >= 2 * self.max_messages or self.bytes >= 2 * self.max_bytes
+
+    def peer_connected(self, peer_sid):
+        """Trickle-ICE from peer_sid may be dropped from now on"""
+        with self._lock:
+            self._connected_peers.add(peer_sid)
+
+    def _droppable(self, event, data):
+        if event in PROTECTED_EVENTS:
+            return False
+        if event in ICE_EVENTS:
+            return _string_field(data, "fromSocket") in self._connected_peers
+        return True
+
+    def put(self, pkt, *args, **kwargs):
+        if pkt is None:
+            # Writer shutdown sentinel
+            self._inner.put(pkt, *args, **kwargs)
+            return
+
+        evict = False
+        with self._lock:
+            event = event_name(pkt)
+
+            if event in PROTECTED_EVENTS and self._connected_peers:
+                # A new negotiation needs its candidates again
+                self._connected_peers.discard(_string_field(pkt.data, "fromSocket"))
+
+            key = _coalesce_key(event, pkt.data) if event in COALESCE_EVENTS else None
+            previous = self._latest.get(key) if key is not None else None
+            if previous is not None:
+                # Still waiting to be sent: deliver the newer status in its place
+                self.bytes += _packet_size(pkt) - _packet_size(previous)
+                previous.data = pkt.data
+                self.stats.add("coalesced")
+                return
+
+            if (
+                event is not None
+                and key is None
+                and self.over_limit()
+                and self._droppable(event, pkt.data)
+            ):
+                self.stats.add("dropped")
+                return
+
+            if key is not None:
+                self._latest[key] = pkt
+                self._key_of[id(pkt)] = key
+            self.messages += 1
+            self.bytes += _packet_size(pkt)
+
+            if self.over_limit():
+                now = self.clock()
+                if self.over_since is None:
+                    self.over_since = now
+                if not self.evicted and (
+                    now - self.over_since >= self.evict_after or self.over_hard_limit()
+                ):
+                    self.evicted = evict = True
+            else:
+                self.over_since = None
+
+        self._inner.put(pkt, *args, **kwargs)
+
+        if evict:
+            self.stats.add("evictions")
+            if self.on_evict:
+                self.on_evict(self)
+
+    def get(self, *args, **kwargs):
+        pkt = self._inner.get(*args, **kwargs)
+        if pkt is None:
+            return pkt
+
+        with self._lock:
+            self.messages -= 1
+            self.bytes -= _packet_size(pkt)
+            if not self.over_limit():
+                self.over_since = None
+
+            # From here on a newer status is queued on its own
+            key = self._key_of.pop(id(pkt), None)
+            if key is not None and self._latest.get(key) is pkt:
+                del self._latest[key]
+        return pkt
+
+    def task_done(self):
+        self._inner.task_done()
+
+    def join(self):
+        self._inner.join()
+
+    def qsize(self):
+        return self._inner.qsize()
+
+    def empty(self):
+        return self._inner.empty()
@@ -0,0 +1,59 @@
+"""
+Binary envelope for the signaling relay fast path
+The server only needs the target socket to route offers, answers and ICE
+candidates, so the fast path carries it in a small header and forwards the
+body as opaque bytes
+
+Envelope layout:
+    byte 0        kind (1 = offer, 2 = answer, 3 = ice-candidate)
+    byte 1        length N of the socket id
+    bytes 2..2+N  socket id (ASCII): the target inbound, the sender outbound
+    rest          opaque body, never decoded by the server
+"""
+
+RELAY_OFFER = 1
+RELAY_ANSWER = 2
+RELAY_ICE_CANDIDATE = 3
+
+RELAY_KINDS = {RELAY_OFFER, RELAY_ANSWER, RELAY_ICE_CANDIDATE}
+
+
+class EnvelopeError(ValueError):
+    """Raised when a relay envelope is truncated or malformed"""
+
+
+def pack_envelope(kind, socket_id, body):
+    """Build an envelope; body is any bytes-like object"""
+    sid = socket_id.encode("ascii")
+    if len(sid) > 255:
+        raise EnvelopeError("Socket id too long")
+    return bytes((kind, len(sid))) + sid + body
+
+
+def unpack_envelope(packet):
+    """Split an envelope into (kind, socket id, body view) without copying the body"""
+    if not isinstance(packet, (bytes, bytearray)) or len(packet) < 2:
+        raise EnvelopeError("Envelope too short")
+
+    kind = packet[0]
+    sid_end = 2 + packet[1]
+    if kind not in RELAY_KINDS:
+        raise EnvelopeError(f"Unknown relay kind {kind}")
+    if packet[1] == 0 or len(packet) < sid_end:
+        raise EnvelopeError("Truncated socket id")
+
+    try:
+        socket_id = packet[2:sid_end].decode("ascii")
+    except UnicodeDecodeError:
+        raise EnvelopeError("Socket id must be ASCII")
+
+    return kind, socket_id, memoryview(packet)[sid_end:]
+
+
+def readdress_envelope(packet, from_socket):
+    """Swap the target socket id for the sender's, copying the body exactly once.
+
+    Returns (target socket id, outbound envelope).
+    """
+    kind, target_socket, body = unpack_envelope(packet)
+    return target_socket, pack_envelope(kind, from_socket, body)
@@ -0,0 +1,101 @@
+"""
+Reliable delivery for relayed offers and answers
+Messages carrying a msgId are kept in a small window per target socket until
+the target acknowledges them with signal-ack; when the target comes back after
+a reconnect (resume) the unacknowledged ones are sent again instead of the
+peers waiting out their timers. A sender retrying a msgId it already sent is
+not forwarded twice. Windows and the duplicate filter are bounded per socket,
+so a client that never acks only costs the last few messages
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class ReliableRelay:
+    """Per-target windows of unacknowledged signaling messages"""
+
+    def __init__(self, emit, window=16, seen=128):
+        # emit(event, payload, target sid)
+        self.emit = emit
+        self.window = window
+        self.seen = seen
+        # Sockets whose client acknowledges signaling messages
+        self._acking = set()
+        # target sid -> {(sender sid, msgId): (event, payload)}, oldest first
+        self._pending = {}
+        # sender sid -> recently forwarded (event, target sid, msgId), oldest first
+        self._seen = {}
+        self.retransmitted = 0
+        self.duplicates = 0
+        self.overflowed = 0
+        self._lock = threading.Lock()
+
+    def enable(self, sid):
+        """The client of this socket sends signal-ack for offers and answers"""
+        with self._lock:
+            self._acking.add(sid)
+
+    def send(self, event, payload, target):
+        """Forward a message to its target; returns False for a duplicate msgId"""
+        msg_id = payload.get("msgId")
+        if msg_id is not None:
+            sender = payload["fromSocket"]
+            with self._lock:
+                seen = self._seen.setdefault(sender, OrderedDict())
+                key = (event, target, msg_id)
+                if key in seen:
+                    self.duplicates += 1
+                    return False
+                seen[key] = None
+                if len(seen) > self.seen:
+                    seen.popitem(last=False)
+
+                if target in self._acking:
+                    pending = self._pending.setdefault(target, OrderedDict())
+                    pending[(sender, msg_id)] = (event, payload)
+                    if len(pending) > self.window:
+                        # The peers fall back to their own timers for this one
+                        pending.popitem(last=False)
+                        self.overflowed += 1
+
+        self.emit(event, payload, target)
+        return True
+
+    def ack(self, target, sender, msg_id):
+        """The target received the message sender sent with msg_id"""
+        with self._lock:
+            pending = self._pending.get(target)
+            if pending is None:
+                return False
+            return pending.pop((sender, msg_id), None) is not None
+
+    def unacked(self, target):
+        with self._lock:
+            return len(self._pending.get(target, ()))
+
+    def resend(self, target):
+        """Send every unacknowledged message of a target again, oldest first"""
+        with self._lock:
+            messages = list(self._pending.get(target, {}).values())
+            self.retransmitted += len(messages)
+        for event, payload in messages:
+            self.emit(event, payload, target)
+        return len(messages)
+
+    def remap(self, old_sid, new_sid):
+        """A session resumed on a new socket: move its window and duplicate filter"""
+        with self._lock:
+            for state in (self._pending, self._seen):
+                if old_sid in state:
+                    state[new_sid] = state.pop(old_sid)
+            if old_sid in self._acking:
+                self._acking.discard(old_sid)
+                self._acking.add(new_sid)
+
+    def forget(self, sid):
+        """Drop everything kept for a socket that is gone for good"""
+        with self._lock:
+            self._pending.pop(sid, None)
+            self._seen.pop(sid, None)
+            self._acking.discard(sid)
@@ -0,0 +1,355 @@
+"""
+Snapshots and a membership journal for in-memory room state
+Live room membership only exists in process memory, so it is periodically
+written to a compact binary snapshot, with an append-only journal of the
+changes made since. After a restart the snapshot is opened (optionally
+memory-mapped) without decoding its records: sessions are looked up by resume
+token with a binary search when their clients reconnect
+
+Snapshot layout (little-endian):
+    header   magic "RTCS", version u16, reserved u16, generation u64,
+             string count u32, record count u32, string blob length u32
+    offsets  string count + 1 u32 offsets into the blob; string 0 is empty (None)
+    strings  UTF-8 blob
+    records  record count x 5 u32 string indices (sid, room, userId, role, token),
+             sorted by token
+    trailer  CRC-32 of everything before it
+
+Journal files rooms.journal.<generation> hold the changes made after the
+snapshot of that generation was taken. Entry layout:
+    u32 payload length, then payload: op byte + NUL-separated ids
+    op 1 = put (sid, room, userId, role, token), op 2 = remove (sid)
+"""
+
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+MAGIC = b"RTCS"
+VERSION = 1
+SNAPSHOT_NAME = "rooms.snapshot"
+JOURNAL_PREFIX = "rooms.journal."
+
+OP_PUT = 1
+OP_REMOVE = 2
+
+SID, ROOM, USER_ID, ROLE, TOKEN = range(5)
+_FIELDS = 5
+
+_HEADER = struct.Struct("<4sHHQIII")
+_LENGTH = struct.Struct("<I")
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is truncated or corrupt"""
+
+
+def _u32_array(data):
+    values = array("I")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def encode_snapshot(records, generation):
+    """Serialize (sid, room, userId, role, token) tuples into snapshot bytes"""
+    records = sorted(records, key=lambda fields: fields[TOKEN] or "")
+    index = {"": 0}
+    encoded = [b""]
+    indices = array("I")
+    for fields in records:
+        for value in fields:
+            value = value or ""
+            position = index.get(value)
+            if position is None:
+                position = index[value] = len(encoded)
+                encoded.append(value.encode())
+            indices.append(position)
+
+    # offsets[i] and offsets[i + 1] bound string i in the blob
+    offsets = array("I", [0])
+    total = 0
+    for value in encoded:
+        total += len(value)
+        offsets.append(total)
+
+    if sys.byteorder == "big":
+        offsets.byteswap()
+        indices.byteswap()
+    body = b"".join(
+        [
+            _HEADER.pack(MAGIC, VERSION, 0, generation, len(encoded), len(records), total),
+            offsets.tobytes(),
+            b"".join(encoded),
+            indices.tobytes(),
+        ]
+    )
+    return body + _LENGTH.pack(zlib.crc32(body))
+
+
+class SnapshotReader:
+    """Random access to the records of a snapshot buffer without decoding them all"""
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size + _LENGTH.size:
+            raise SnapshotError("Snapshot too short")
+
+        magic, version, _, generation, n_strings, n_records, blob_length = _HEADER.unpack_from(
+            view
+        )
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError("Not a room state snapshot")
+
+        blob_at = _HEADER.size + (n_strings + 1) * 4
+        records_at = blob_at + blob_length
+        end = records_at + n_records * _FIELDS * 4
+        if len(view) != end + _LENGTH.size:
+            raise SnapshotError("Snapshot length does not match its header")
+        if zlib.crc32(view[:end]) != _LENGTH.unpack_from(view, end)[0]:
+            raise SnapshotError("Snapshot checksum mismatch")
+
+        self.generation = generation
+        self._count = n_records
+        self._n_strings = n_strings
+        self._blob = view[blob_at:records_at]
+        if sys.byteorder == "little":
+            self._offsets = view[_HEADER.size : blob_at].cast("I")
+            self._indices = view[records_at:end].cast("I")
+        else:
+            self._offsets = _u32_array(view[_HEADER.size : blob_at])
+            self._indices = _u32_array(view[records_at:end])
+
+    def __len__(self):
+        return self._count
+
+    def _string(self, i):
+        if i == 0:
+            return None
+        if i >= self._n_strings:
+            raise SnapshotError("Snapshot record points outside the string table")
+        return str(self._blob[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+    def record(self, position):
+        base = position * _FIELDS
+        return tuple(self._string(self._indices[base + field]) for field in range(_FIELDS))
+
+    def find(self, token):
+        """Record with this resume token, or None (binary search over the sorted records)"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (self._string(self._indices[mid * _FIELDS + TOKEN]) or "") < token:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._string(self._indices[lo * _FIELDS + TOKEN]) == token:
+            return self.record(lo)
+        return None
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self.record(position)
+
+    def release(self):
+        for view in (self._blob, self._offsets, self._indices):
+            if isinstance(view, memoryview):
+                view.release()
+
+
+def decode_snapshot(buffer):
+    """Return (generation, list of (sid, room, userId, role, token)) from snapshot bytes"""
+    reader = SnapshotReader(buffer)
+    try:
+        return reader.generation, list(reader)
+    finally:
+        reader.release()
+
+
+def encode_entry(op, fields):
+    payload = bytes((op,)) + "\0".join(value or "" for value in fields).encode()
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def decode_journal(buffer):
+    """Yield (op, fields) for every complete entry; a torn tail is ignored"""
+    view = memoryview(buffer)
+    offset = 0
+    while offset + _LENGTH.size <= len(view):
+        (length,) = _LENGTH.unpack_from(view, offset)
+        start = offset + _LENGTH.size
+        if length == 0 or start + length > len(view):
+            return
+        payload = bytes(view[start : start + length])
+        yield payload[0], tuple(value or None for value in payload[1:].decode().split("\0"))
+        offset = start + length
+
+
+def _persistable(fields):
+    # NUL separates journal fields, so ids containing it cannot be journaled
+    return all(value is None or "\0" not in value for value in fields)
+
+
+class RestoredSessions:
+    """Memberships recovered at startup, claimed one by one as clients resume"""
+
+    def __init__(self, reader, changes, on_close=None):
+        self._reader = reader
+        # sid -> fields (put) or None (removed) from the journals after the snapshot
+        self._changes = changes
+        self._by_token = {
+            fields[TOKEN]: fields for fields in changes.values() if fields and fields[TOKEN]
+        }
+        self._claimed = set()
+        self._on_close = on_close
+        self._lock = threading.Lock()
+
+    def _live(self, fields):
+        sid = fields[SID]
+        if sid in self._claimed:
+            return False
+        return self._changes.get(sid, fields) is fields
+
+    def take(self, token):
+        """Claim the session this token resumes; each session can be claimed once"""
+        if not token:
+            return None
+        with self._lock:
+            fields = self._by_token.get(token)
+            if fields is None and self._reader is not None:
+                fields = self._reader.find(token)
+            if fields is None or not self._live(fields):
+                return None
+            self._claimed.add(fields[SID])
+            return fields
+
+    def remaining(self):
+        """Sessions nobody has claimed yet"""
+        with self._lock:
+            records = list(self._reader) if self._reader is not None else []
+            records.extend(fields for fields in self._changes.values() if fields)
+            return [fields for fields in records if self._live(fields)]
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.release()
+                self._reader = None
+            self._changes = {}
+            self._by_token = {}
+        if self._on_close:
+            self._on_close()
+            self._on_close = None
+
+
+class RoomStateStore:
+    """Snapshot file plus journal segments in one directory"""
+
+    def __init__(self, directory, use_mmap=False):
+        self.directory = directory
+        self.use_mmap = use_mmap
+        self.generation = 0
+        self._journal = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _journal_generations(self):
+        generations = []
+        for name in os.listdir(self.directory):
+            suffix = name[len(JOURNAL_PREFIX) :]
+            if name.startswith(JOURNAL_PREFIX) and suffix.isdigit():
+                generations.append(int(suffix))
+        return sorted(generations)
+
+    def _read(self, path):
+        with open(path, "rb") as f:
+            if not self.use_mmap or os.fstat(f.fileno()).st_size == 0:
+                return f.read()
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def load(self):
+        """Open the snapshot and replay the journals written after it"""
+        reader = None
+        buffer = None
+        snapshot_generation = 0
+        path = self._path(SNAPSHOT_NAME)
+        if os.path.exists(path):
+            buffer = self._read(path)
+            try:
+                reader = SnapshotReader(buffer)
+                snapshot_generation = reader.generation
+            except SnapshotError as exc:
+                print(f"Ignoring room state snapshot: {exc}")
+
+        changes = {}
+        generations = [g for g in self._journal_generations() if g >= snapshot_generation]
+        for generation in generations:
+            with open(self._path(f"{JOURNAL_PREFIX}{generation}"), "rb") as f:
+                for op, fields in decode_journal(f.read()):
+                    if op == OP_PUT and len(fields) == _FIELDS:
+                        changes[fields[SID]] = fields
+                    elif op == OP_REMOVE:
+                        changes[fields[SID]] = None
+
+        self.generation = max([snapshot_generation] + generations)
+        close = buffer.close if isinstance(buffer, mmap.mmap) else None
+        return RestoredSessions(reader, changes, on_close=close)
+
+    def _append(self, entry):
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self._path(f"{JOURNAL_PREFIX}{self.generation}"), "ab")
+            self._journal.write(entry)
+            self._journal.flush()
+
+    def put(self, fields):
+        """Journal a new or updated membership: (sid, room, userId, role, token)"""
+        if _persistable(fields):
+            self._append(encode_entry(OP_PUT, fields))
+
+    def remove(self, sid):
+        """Journal the end of a membership"""
+        self._append(encode_entry(OP_REMOVE, (sid,)))
+
+    def snapshot(self, capture):
+        """Write a snapshot of capture() atomically and start a new journal segment.
+
+        capture runs under the journal lock, so every change is either in the
+        captured records or in the new segment.
+        """
+        with self._lock:
+            records = capture()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            self.generation += 1
+            generation = self.generation
+
+        data = encode_snapshot(records, generation)
+        path = self._path(SNAPSHOT_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        # Segments before this generation are now covered by the snapshot
+        for old in self._journal_generations():
+            if old < generation:
+                os.remove(self._path(f"{JOURNAL_PREFIX}{old}"))
+        return len(data)
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
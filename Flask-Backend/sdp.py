@@ -0,0 +1,228 @@
+"""
+SDP processing for the signaling relay
+Parses session descriptions once, applies per-meeting codec and bitrate
+policies and caches both the parsed and the rewritten results by content hash
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class SdpError(ValueError):
+    """Raised when a session description is malformed"""
+
+
+class MediaSection:
+    """One m= section of a session description"""
+
+    __slots__ = ("kind", "port", "proto", "payloads", "lines", "codecs")
+
+    def __init__(self, kind, port, proto, payloads, lines, codecs):
+        self.kind = kind
+        self.port = port
+        self.proto = proto
+        self.payloads = payloads
+        self.lines = lines
+        self.codecs = codecs
+
+    @property
+    def rejected(self):
+        # A bundle-only section also has port 0 but is live on the bundle transport
+        return self.port == "0" and "a=bundle-only" not in self.lines
+
+
+class ParsedSdp:
+    """Session-level lines plus the media sections, in their original order"""
+
+    __slots__ = ("session_lines", "media")
+
+    def __init__(self, session_lines, media):
+        self.session_lines = session_lines
+        self.media = media
+
+
+class SdpPolicy:
+    """Per-meeting rewrite rules for offers and answers"""
+
+    __slots__ = ("codecs", "bitrates", "key")
+
+    def __init__(self, codecs=None, bitrates=None):
+        # kind -> tuple of upper-cased codec names in preference order
+        self.codecs = {
+            kind: tuple(name.upper() for name in names) for kind, names in (codecs or {}).items()
+        }
+        # kind -> b=AS cap in kbps
+        self.bitrates = dict(bitrates or {})
+        self.key = repr((sorted(self.codecs.items()), sorted(self.bitrates.items()))).encode()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a policy from the JSON stored on a meeting, validating its shape"""
+        if not isinstance(data, dict):
+            raise ValueError("SDP policy must be an object")
+
+        codecs = data.get("codecs", {})
+        bitrates = data.get("maxBitrateKbps", {})
+        if not isinstance(codecs, dict) or not all(
+            isinstance(names, list) and all(isinstance(n, str) for n in names)
+            for names in codecs.values()
+        ):
+            raise ValueError("codecs must map media kinds to lists of codec names")
+        if not isinstance(bitrates, dict) or not all(
+            isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in bitrates.values()
+        ):
+            raise ValueError("maxBitrateKbps must map media kinds to positive integers")
+
+        return cls(codecs, bitrates)
+
+
+def parse_sdp(sdp):
+    """Split a session description into session lines and media sections"""
+    if not isinstance(sdp, str) or not sdp.startswith("v=0"):
+        raise SdpError("SDP must start with v=0")
+
+    lines = sdp.split("\r\n") if "\r\n" in sdp else sdp.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+
+    session_lines = []
+    media = []
+    current = None
+    for line in lines:
+        if len(line) < 2 or line[1] != "=":
+            raise SdpError(f"Malformed SDP line: {line[:40]!r}")
+
+        if line[0] == "m":
+            parts = line[2:].split(" ")
+            if len(parts) < 4:
+                raise SdpError(f"Malformed m-line: {line[:40]!r}")
+            current = MediaSection(parts[0], parts[1], parts[2], parts[3:], [line], {})
+            media.append(current)
+        elif current is None:
+            session_lines.append(line)
+        else:
+            current.lines.append(line)
+            if line.startswith("a=rtpmap:"):
+                pt, _, encoding = line[9:].partition(" ")
+                current.codecs[pt] = encoding.split("/", 1)[0].upper()
+
+    if not any(line.startswith("o=") for line in session_lines):
+        raise SdpError("SDP is missing the o= line")
+
+    return ParsedSdp(session_lines, media)
+
+
+def _ordered_payloads(section, preferred):
+    """Move the preferred codecs (and their RTX/FEC companions) to the front"""
+    rank = {name: i for i, name in enumerate(preferred)}
+    apt = {}
+    for line in section.lines:
+        if line.startswith("a=fmtp:") and "apt=" in line:
+            pt, _, params = line[7:].partition(" ")
+            for param in params.split(";"):
+                key, _, value = param.strip().partition("=")
+                if key == "apt":
+                    apt[pt] = value
+
+    def sort_key(item):
+        index, pt = item
+        codec = section.codecs.get(apt.get(pt, pt))
+        return (rank.get(codec, len(rank)), index)
+
+    return [pt for _, pt in sorted(enumerate(section.payloads), key=sort_key)]
+
+
+def _rewrite_section(section, policy):
+    """Return the lines of one media section with the policy applied"""
+    if section.rejected:
+        # Rejected sections must keep their slot (JSEP), but not their codec lines
+        kept = [section.lines[0]]
+        kept.extend(
+            line
+            for line in section.lines[1:]
+            if line.startswith(("c=", "a=mid:")) or line == "a=inactive"
+        )
+        return kept
+
+    lines = section.lines
+    preferred = policy.codecs.get(section.kind)
+    if preferred:
+        payloads = _ordered_payloads(section, preferred)
+        lines = [" ".join(["m=" + section.kind, section.port, section.proto] + payloads)] + lines[
+            1:
+        ]
+
+    cap = policy.bitrates.get(section.kind)
+    if cap:
+        rewritten = []
+        inserted = False
+        for line in lines:
+            if line.startswith("b=AS:"):
+                continue
+            rewritten.append(line)
+            if not inserted and line.startswith("c="):
+                rewritten.append(f"b=AS:{cap}")
+                inserted = True
+        if not inserted:
+            rewritten.insert(1, f"b=AS:{cap}")
+        lines = rewritten
+
+    return lines
+
+
+def rewrite_sdp(parsed, policy):
+    """Serialize a parsed description with the policy applied"""
+    lines = list(parsed.session_lines)
+    for section in parsed.media:
+        lines.extend(_rewrite_section(section, policy))
+    return "\r\n".join(lines) + "\r\n"
+
+
+class SdpProcessor:
+    """Parse-once, rewrite-once SDP pipeline with a bounded LRU cache"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._parsed = OrderedDict()
+        self._rewritten = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, cache, key):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _put(self, cache, key, value):
+        with self._lock:
+            cache[key] = value
+            if len(cache) > self.max_entries:
+                cache.popitem(last=False)
+
+    def _parse_cached(self, digest, sdp):
+        parsed = self._get(self._parsed, digest)
+        if parsed is None:
+            parsed = parse_sdp(sdp)
+            self._put(self._parsed, digest, parsed)
+        return parsed
+
+    def process(self, sdp, policy):
+        """Return the SDP rewritten for the policy; raises SdpError if malformed"""
+        if not isinstance(sdp, str):
+            raise SdpError("SDP must be a string")
+
+        digest = hashlib.blake2b(sdp.encode(), digest_size=16).digest()
+        key = digest + policy.key
+        result = self._get(self._rewritten, key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = rewrite_sdp(self._parse_cached(digest, sdp), policy)
+        self._put(self._rewritten, key, result)
+        return result
@@ -1,37 +1,815 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify, send_file
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 from bson.objectid import ObjectId
+import functools
+import hmac
 import os
-from datetime import datetime
+import re
+import secrets
+import time
+import weakref
+from collections import Counter
+from datetime import datetime, timedelta
+
+from capture import CaptureLog
+from chat import MessageDeduper
+from chathistory import ChatHistory
+from connections import ConnectionRecord, ConnectionTable
+from files import FileStore, UploadError
+from idle import IdleRooms
+from interactions import InteractionError, Interactions
+from lobby import Lobby, hosts_room
+from notifications import MembershipNotifier
+from outbound import OutboundQueue, OutboundStats
+from relay import EnvelopeError, readdress_envelope
+from reliable import ReliableRelay
+from roomstate import RoomStateStore
+from sdp import SdpError, SdpPolicy, SdpProcessor
+from singleflight import SingleFlight
+from telemetry import NetworkQuality
+from turn import TurnPool, turn_urls
+from usercache import UserLookup
+from usersearch import UserIndex, fold, search_names
+from webinar import (
+    ATTENDEE,
+    MEETING,
+    MEETING_TYPES,
+    PRESENTER,
+    WEBINAR,
+    AttendeeCounter,
+    ModeratedChatLane,
+    presenters_room,
+)
+from whiteboard import WhiteboardError, Whiteboards
+
+# REST routes live on a blueprint; create_app() builds the application around it
+api = Blueprint("api", __name__)
+
+# Handlers are registered at import time; the server is created by create_app()
+socketio = SocketIO()
+
+DEFAULT_CONFIG = {
+    "MONGO_URI": os.getenv("MONGO_URI", "mongodb://localhost:27017/"),
+    "MONGO_DB": os.getenv("MONGO_DB", "meeting_app"),
+    "SOCKETIO_ASYNC_MODE": os.getenv("SOCKETIO_ASYNC_MODE", "threading"),
+    "SOCKETIO_LOGGER": os.getenv("SOCKETIO_LOGGER", "true").lower() == "true",
+}
+
+# Bounded per-socket send queues: coalesce media status, drop all but offers,
+# answers and ICE candidates for peers not yet connected when backed up, evict
+# sockets that stay over the caps for OUTBOUND_EVICT_AFTER seconds or reach
+# twice the caps
+OUTBOUND_MAX_MESSAGES = int(os.getenv("OUTBOUND_MAX_MESSAGES", "1000"))
+OUTBOUND_MAX_BYTES = int(os.getenv("OUTBOUND_MAX_BYTES", str(4 * 1024 * 1024)))
+OUTBOUND_EVICT_AFTER = float(os.getenv("OUTBOUND_EVICT_AFTER", "5"))
+
+# How long a dropped socket stays suspended before its user is treated as gone
+RESUME_GRACE_SECONDS = float(os.getenv("RESUME_GRACE_SECONDS", "15"))
+
+# Optional SDP rewriting of relayed offers/answers (codec order, bitrate caps)
+SDP_PROCESSING_ENABLED = os.getenv("SDP_PROCESSING", "false").lower() == "true"
+
+# Rooms larger than JOIN_BATCH_MIN_ROOM get merged participants-changed packets
+JOIN_BATCH_MIN_ROOM = int(os.getenv("JOIN_BATCH_MIN_ROOM", "8"))
+JOIN_BATCH_MAX_WINDOW = float(os.getenv("JOIN_BATCH_MAX_WINDOW", "1.0"))
+
+# Webinar attendees are only counted, and the count is broadcast periodically;
+# their chat is rate limited and held until a presenter approves it
+ATTENDEE_COUNT_INTERVAL = float(os.getenv("ATTENDEE_COUNT_INTERVAL", "2.0"))
+ATTENDEE_CHAT_INTERVAL = float(os.getenv("ATTENDEE_CHAT_INTERVAL", "5.0"))
+
+# Chat retries are recognised by id among the last CHAT_DEDUPE_SIZE messages of a room
+CHAT_DEDUPE_SIZE = int(os.getenv("CHAT_DEDUPE_SIZE", "1024"))
+
+# Chat history is written in batches every CHAT_FLUSH_INTERVAL seconds and
+# searched in process ("memory") or through a MongoDB text index ("mongo")
+CHAT_SEARCH_BACKEND = os.getenv("CHAT_SEARCH_BACKEND", "memory")
+CHAT_FLUSH_INTERVAL = float(os.getenv("CHAT_FLUSH_INTERVAL", "0.5"))
+
+# Files shared in chat are uploaded in chunks of at most FILE_CHUNK_SIZE bytes
+# and kept on disk under FILE_STORAGE_DIR until the meeting ends. A meeting, and
+# each user in it, may upload FILE_MEETING_QUOTA / FILE_USER_QUOTA bytes; uploads
+# that receive nothing for FILE_STALE_UPLOAD_TTL seconds are deleted
+FILE_STORAGE_DIR = os.getenv("FILE_STORAGE_DIR", "uploads")
+FILE_MAX_SIZE = int(os.getenv("FILE_MAX_SIZE", str(1 << 30)))
+FILE_CHUNK_SIZE = int(os.getenv("FILE_CHUNK_SIZE", str(8 << 20)))
+FILE_MEETING_QUOTA = int(os.getenv("FILE_MEETING_QUOTA", str(10 << 30)))
+FILE_USER_QUOTA = int(os.getenv("FILE_USER_QUOTA", str(2 << 30)))
+FILE_STALE_UPLOAD_TTL = float(os.getenv("FILE_STALE_UPLOAD_TTL", "86400"))
+
+# Whiteboard operations are fanned out once per WHITEBOARD_TICK_INTERVAL; the
+# board is snapshotted once WHITEBOARD_SNAPSHOT_OPS operations have piled up
+WHITEBOARD_TICK_INTERVAL = float(os.getenv("WHITEBOARD_TICK_INTERVAL", "0.05"))
+WHITEBOARD_SNAPSHOT_OPS = int(os.getenv("WHITEBOARD_SNAPSHOT_OPS", "500"))
+
+# Reactions, the hand queue and poll results go out once per INTERACTION_TICK_INTERVAL
+INTERACTION_TICK_INTERVAL = float(os.getenv("INTERACTION_TICK_INTERVAL", "1.0"))
+
+# Hosts hear about their waiting room at most once per LOBBY_NOTIFY_INTERVAL
+LOBBY_NOTIFY_INTERVAL = float(os.getenv("LOBBY_NOTIFY_INTERVAL", "0.5"))
+
+# User search runs on an in-process prefix index of up to USER_SEARCH_MAX_USERS
+# users; without it (or past that size) it is an anchored regex query instead
+USER_SEARCH_INDEX = os.getenv("USER_SEARCH_INDEX", "true").lower() == "true"
+USER_SEARCH_MAX_USERS = int(os.getenv("USER_SEARCH_MAX_USERS", "1000000"))
+
+# A Bloom filter of usernames (USER_FILTER_ERROR_RATE false positives, sized for
+# at least USER_FILTER_CAPACITY users) rules out missing names without a query;
+# the last USER_CACHE_SIZE users read are cached. Before ruling a name out, users
+# created since are read back, at most every USER_FILTER_REFRESH_INTERVAL seconds.
+# The filter is rebuilt through /api/users/filter/rebuild with USER_FILTER_REBUILD_TOKEN
+USER_FILTER_ENABLED = os.getenv("USER_FILTER", "true").lower() == "true"
+USER_FILTER_CAPACITY = int(os.getenv("USER_FILTER_CAPACITY", "1000000"))
+USER_FILTER_ERROR_RATE = float(os.getenv("USER_FILTER_ERROR_RATE", "0.01"))
+USER_FILTER_REFRESH_INTERVAL = float(os.getenv("USER_FILTER_REFRESH_INTERVAL", "1"))
+USER_FILTER_REBUILD_TOKEN = os.getenv("USER_FILTER_REBUILD_TOKEN", "")
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+# Optional persistence of room membership across restarts: a snapshot every
+# ROOM_SNAPSHOT_INTERVAL seconds plus a journal of the changes in between
+ROOM_STATE_DIR = os.getenv("ROOM_STATE_DIR", "")
+ROOM_STATE_MMAP = os.getenv("ROOM_STATE_MMAP", "false").lower() == "true"
+ROOM_SNAPSHOT_INTERVAL = float(os.getenv("ROOM_SNAPSHOT_INTERVAL", "30"))
+
+# webrtc-stats samples are aggregated every TELEMETRY_TICK_INTERVAL seconds over
+# a TELEMETRY_WINDOW second window to advise senders on their send resolution
+TELEMETRY_TICK_INTERVAL = float(os.getenv("TELEMETRY_TICK_INTERVAL", "2.0"))
+TELEMETRY_WINDOW = float(os.getenv("TELEMETRY_WINDOW", "10.0"))
+TELEMETRY_CAPACITY = int(os.getenv("TELEMETRY_CAPACITY", "4096"))
+TELEMETRY_MAX_LINKS = int(os.getenv("TELEMETRY_MAX_LINKS", "1024"))
+
+# Offers/answers with a msgId are kept per target until acked (signal-ack) and
+# sent again when the target resumes; clients opt in with signalAcks on join
+SIGNAL_ACK_WINDOW = int(os.getenv("SIGNAL_ACK_WINDOW", "16"))
+SIGNAL_DEDUPE_SIZE = int(os.getenv("SIGNAL_DEDUPE_SIZE", "128"))
+
+# Capture inbound Socket.IO events to CAPTURE_DIR for replay (tools/replay_capture.py).
+# CAPTURE_SAMPLE is the share of sockets captured; CAPTURE_PAYLOADS=false keeps sizes only
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "")
+CAPTURE_SAMPLE = float(os.getenv("CAPTURE_SAMPLE", "1.0"))
+CAPTURE_PAYLOADS = os.getenv("CAPTURE_PAYLOADS", "true").lower() == "true"
+
+# TURN pool: comma-separated hosts sharing TURN_SECRET (coturn use-auth-secret).
+# Servers POST their load to /api/turn/load with TURN_REPORT_TOKEN
+TURN_SERVERS = [host.strip() for host in os.getenv("TURN_SERVERS", "").split(",") if host.strip()]
+TURN_SECRET = os.getenv("TURN_SECRET", "")
+TURN_CREDENTIAL_TTL = int(os.getenv("TURN_CREDENTIAL_TTL", "3600"))
+TURN_LOAD_HALF_LIFE = float(os.getenv("TURN_LOAD_HALF_LIFE", "30"))
+TURN_REPORT_TOKEN = os.getenv("TURN_REPORT_TOKEN", "")
+# Meetings with no live sockets for IDLE_MEETING_TTL seconds are ended by a
+# collector that runs every IDLE_GC_INTERVAL seconds (a TTL of 0 disables it)
+IDLE_MEETING_TTL = float(os.getenv("IDLE_MEETING_TTL", "900"))
+IDLE_GC_INTERVAL = float(os.getenv("IDLE_GC_INTERVAL", "30"))
+
+STUN_URLS = [
+    url.strip()
+    for url in os.getenv(
+        "STUN_URLS", "stun:stun.l.google.com:19302,stun:stun1.l.google.com:19302"
+    ).split(",")
+    if url.strip()
+]
+
+_app = None
+_db_config = None
+_create_eio_queue = None
+
+
+def create_app(config=None):
+    """Build the Flask app and bind Socket.IO to it.
+
+    Nothing here touches the network: the MongoDB client connects on its first
+    query, so the app can be created in a gunicorn master (preload_app) and each
+    worker calls reinit_after_fork() to get its own connections and locks.
+    """
+    global _app, _create_eio_queue
+
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    CORS(app, resources={r"/*": {"origins": "*"}})
+    app.register_blueprint(api)
+
+    init_db(app.config)
+    _init_state()
+
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        logger=app.config["SOCKETIO_LOGGER"],
+        engineio_logger=app.config["SOCKETIO_LOGGER"],
+        async_mode=app.config["SOCKETIO_ASYNC_MODE"],
+    )
+    _create_eio_queue = socketio.server.eio.create_queue
+    socketio.server.eio.create_queue = _create_outbound_queue
+    if CAPTURE_DIR:
+        _install_capture()
+
+    _app = app
+    return app
+
+
+def init_db(config):
+    """Bind the collections to a MongoDB client that connects lazily"""
+    global _db_config, client, db, users_collection, meetings_collection
+    global participants_collection, chat_collection
+
+    _db_config = config
+    client = MongoClient(config["MONGO_URI"], connect=False)
+    db = client[config["MONGO_DB"]]
+    users_collection = db["users"]
+    meetings_collection = db["meetings"]
+    participants_collection = db["participants"]
+    chat_collection = db["chat_messages"]
+
+
+def _init_state():
+    """Create the in-process caches and helpers; their locks belong to this process"""
+    global outbound_stats, outbound_queues, read_flight, active_connections, resume_tokens
+    global sdp_processor, signal_relay, meeting_settings, membership_notifier, attendee_counter
+    global attendee_chat, chat_deduper, chat_history, file_store, network_quality, turn_pool
+    global whiteboards, interactions, lobby, idle_rooms, capture_log, room_state
+    global restored_sessions, user_index, user_lookup
+
+    outbound_stats = OutboundStats()
+    outbound_queues = weakref.WeakSet()
+
+    # Concurrent identical reads (join storms) share one in-flight database call
+    read_flight = SingleFlight()
+
+    # Usernames and display names for search, loaded by start_user_indexes()
+    user_index = UserIndex(max_users=USER_SEARCH_MAX_USERS)
+
+    # Username filter (built by start_user_indexes()) and cache of recently read users
+    user_lookup = UserLookup(
+        capacity=USER_FILTER_CAPACITY,
+        error_rate=USER_FILTER_ERROR_RATE,
+        cache_size=USER_CACHE_SIZE,
+        refresh_interval=USER_FILTER_REFRESH_INTERVAL,
+    )
 
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+    # Store active connections (sid -> ConnectionRecord), indexed by room
+    active_connections = ConnectionTable()
 
-# MongoDB setup
-client = MongoClient("mongodb://localhost:27017/")
-db = client["meeting_app"]
-users_collection = db["users"]
-meetings_collection = db["meetings"]
-participants_collection = db["participants"]
+    # Resume token -> socket id of the session it can resume
+    resume_tokens = {}
+
+    sdp_processor = SdpProcessor()
+    signal_relay = ReliableRelay(_emit_signal, window=SIGNAL_ACK_WINDOW, seen=SIGNAL_DEDUPE_SIZE)
+
+    # Meeting id -> settings the socket handlers need (type, host, presenters, SDP policy)
+    meeting_settings = {}
+
+    membership_notifier = MembershipNotifier(
+        _emit_to_room,
+        _schedule,
+        small_room=JOIN_BATCH_MIN_ROOM,
+        max_window=JOIN_BATCH_MAX_WINDOW,
+    )
+    attendee_counter = AttendeeCounter(
+        _emit_attendee_count, _schedule, interval=ATTENDEE_COUNT_INTERVAL
+    )
+    attendee_chat = ModeratedChatLane(min_interval=ATTENDEE_CHAT_INTERVAL)
+    chat_deduper = MessageDeduper(per_room=CHAT_DEDUPE_SIZE)
+    chat_history = ChatHistory(
+        chat_collection,
+        _schedule,
+        backend=CHAT_SEARCH_BACKEND,
+        flush_interval=CHAT_FLUSH_INTERVAL,
+    )
+    file_store = FileStore(
+        FILE_STORAGE_DIR,
+        max_size=FILE_MAX_SIZE,
+        chunk_size=FILE_CHUNK_SIZE,
+        meeting_quota=FILE_MEETING_QUOTA,
+        user_quota=FILE_USER_QUOTA,
+    )
+    whiteboards = Whiteboards(
+        _emit_whiteboard_ops,
+        _schedule,
+        interval=WHITEBOARD_TICK_INTERVAL,
+        snapshot_ops=WHITEBOARD_SNAPSHOT_OPS,
+    )
+    interactions = Interactions(_emit_interactions, _schedule, interval=INTERACTION_TICK_INTERVAL)
+    lobby = Lobby(_emit_lobby, _schedule, interval=LOBBY_NOTIFY_INTERVAL)
+    network_quality = NetworkQuality(
+        _emit_quality_advice,
+        _schedule,
+        interval=TELEMETRY_TICK_INTERVAL,
+        capacity=TELEMETRY_CAPACITY,
+        window=TELEMETRY_WINDOW,
+        max_links=TELEMETRY_MAX_LINKS,
+    )
+
+    # Without a shared secret no credentials can be minted, so only STUN is offered
+    turn_pool = TurnPool(
+        {host: turn_urls(host) for host in TURN_SERVERS} if TURN_SECRET else {},
+        TURN_SECRET,
+        ttl=TURN_CREDENTIAL_TTL,
+        half_life=TURN_LOAD_HALF_LIFE,
+        stun_urls=STUN_URLS,
+    )
+
+    # Meetings without live sockets, for the idle meeting collector. Wall-clock
+    # time, so it compares with the lastActivity stamps of other processes
+    idle_rooms = IdleRooms(IDLE_MEETING_TTL, clock=time.time)
+
+    capture_log = (
+        CaptureLog(CAPTURE_DIR, sample=CAPTURE_SAMPLE, payloads=CAPTURE_PAYLOADS)
+        if CAPTURE_DIR
+        else None
+    )
+
+    # Set up by restore_room_state() in the process that serves clients
+    room_state = None
+    restored_sessions = None
+
+
+def reinit_after_fork():
+    """Give a forked worker its own MongoDB client and fresh in-process state.
+
+    MongoClient is not fork-safe (the inherited one is dropped, not closed, since
+    closing it can deadlock in the child), and locks created in the master are not
+    green once eventlet has patched the worker.
+    """
+    init_db(_db_config)
+    _init_state()
+    restore_room_state()
+    start_idle_gc()
+    start_upload_cleanup()
+    start_user_indexes()
+
+
+def __getattr__(name):
+    # `from server import app` (tests, scripts) builds the default app on first use
+    if name == "app":
+        return _app or create_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def restore_room_state():
+    """Load the room state saved by the previous process and start snapshotting.
+
+    Restored sessions come back suspended: clients reconnecting with their resume
+    token pick them up, the rest are removed after the resume grace period.
+    """
+    global room_state, restored_sessions
+    if not ROOM_STATE_DIR:
+        return
+
+    start = time.perf_counter()
+    room_state = RoomStateStore(ROOM_STATE_DIR, use_mmap=ROOM_STATE_MMAP)
+    restored_sessions = room_state.load()
+    print(f"Room state restored in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    _schedule(RESUME_GRACE_SECONDS, _expire_restored_sessions)
+    _schedule(ROOM_SNAPSHOT_INTERVAL, _snapshot_room_state, True)
+
+
+def _capture_room_state():
+    records = [
+        (sid, info["room"], info["userId"], info.get("role"), info.get("resumeToken"))
+        for sid, info in list(active_connections.items())
+    ]
+    if restored_sessions is not None:
+        records.extend(restored_sessions.remaining())
+    return records
+
+
+def _snapshot_room_state(repeat=False):
+    if room_state is None:
+        return
+    try:
+        room_state.snapshot(_capture_room_state)
+    except OSError as e:
+        print(f"Room state snapshot failed: {e}")
+    if repeat:
+        _schedule(ROOM_SNAPSHOT_INTERVAL, _snapshot_room_state, True)
+
+
+def _journal_put(sid):
+    if room_state is not None:
+        info = active_connections[sid]
+        room_state.put(
+            (sid, info["room"], info["userId"], info.get("role"), info.get("resumeToken"))
+        )
+
+
+def _journal_remove(sid):
+    if room_state is not None:
+        room_state.remove(sid)
+
+
+def _claim_restored_session(token):
+    """Bring back a session saved before a restart; returns its old sid or None"""
+    if restored_sessions is None:
+        return None
+    fields = restored_sessions.take(token)
+    if fields is None:
+        return None
+
+    sid, room, user_id, role, token = fields
+    record = ConnectionRecord(room, user_id, sid, role)
+    record.resume_token = token
+    record.suspended_at = time.time()
+    active_connections[sid] = record
+    resume_tokens[token] = sid
+    if role == ATTENDEE:
+        attendee_counter.add(room, 1)
+    return sid
+
+
+def _expire_restored_sessions():
+    """Remove restored sessions nobody resumed, unless the user has since rejoined"""
+    global restored_sessions
+    if restored_sessions is None:
+        return
+
+    stale = restored_sessions.remaining()
+    restored_sessions.close()
+    restored_sessions = None
+
+    connections = list(active_connections.values())
+    present = {(info["room"], info["userId"]) for info in connections}
+    room_sizes = Counter(info["room"] for info in connections)
+    gone = [fields for fields in stale if (fields[1], fields[2]) not in present]
+
+    for start in range(0, len(gone), 1000):
+        batch = gone[start : start + 1000]
+        participants_collection.delete_many(
+            {"$or": [{"meetingId": room, "userId": user} for _, room, user, _, _ in batch]}
+        )
+    for sid, room, user_id, role, _ in gone:
+        if role != ATTENDEE:
+            membership_notifier.left(room, room_sizes[room], user_id, sid)
+        if not room_sizes[room]:
+            idle_rooms.idle(room)
+
+    print(f"Expired {len(gone)} restored sessions that were not resumed")
+    _snapshot_room_state()
+
+
+def start_idle_gc():
+    """Start the idle collector; its first pass runs right away, in the background.
+
+    That pass first tracks the active meetings no socket is in yet, so nothing
+    here waits on the database and a worker boots while MongoDB is down.
+    """
+    if IDLE_MEETING_TTL <= 0:
+        return
+    _schedule(0, _collect_idle_meetings, True, True)
+
+
+def _seed_idle_meetings():
+    """Track every active meeting this process has no live socket for.
+
+    Meetings orphaned before a restart are ended too. A meeting counts as idle
+    since its lastActivity, when another process has stamped one.
+    """
+    live = set(active_connections.rooms())
+    for meeting in meetings_collection.find({"active": True}, {"_id": 1, "lastActivity": 1}):
+        room = str(meeting["_id"])
+        if room not in live:
+            idle_rooms.idle(room, _activity_since(meeting))
+
+
+def _activity_since(meeting):
+    """A meeting's lastActivity in idle_rooms clock time, or None if it has none"""
+    last_activity = meeting.get("lastActivity")
+    return last_activity.timestamp() if last_activity else None
+
+
+def _record_activity():
+    """Stamp lastActivity on the meetings this process has sockets in.
+
+    Other processes see the meeting in use through it and keep it alive.
+    """
+    meeting_ids = [ObjectId(room) for room in active_connections.rooms() if ObjectId.is_valid(room)]
+    if meeting_ids:
+        meetings_collection.update_many(
+            {"_id": {"$in": meeting_ids}, "active": True},
+            {"$set": {"lastActivity": datetime.fromtimestamp(idle_rooms.clock())}},
+        )
+
+
+def _collect_idle_meetings(repeat=False, seed=False):
+    """End every meeting that has had no live socket for longer than the idle TTL.
+
+    With `seed`, active meetings are tracked first (see _seed_idle_meetings).
+    A pass that hits a database error logs it and puts the rooms it took back,
+    already expired, so the next pass (which retries a failed seed) ends them.
+    """
+    rooms = []
+    try:
+        if seed:
+            _seed_idle_meetings()
+            seed = False
+        _record_activity()
+        rooms = idle_rooms.expired()
+        _end_idle_meetings(rooms)
+
+        if rooms:
+            for room in rooms:
+                _turn_away_waiting(room, {"meetingId": room, "reason": "idle"})
+                _release_room(room)
+                # Sockets still in the Socket.IO room without a tracked connection
+                socketio.emit("meeting-ended", {"meetingId": room, "reason": "idle"}, to=room)
+            print(f"Ended {len(rooms)} idle meetings")
+    except PyMongoError as exc:
+        print(f"Could not collect idle meetings: {exc}")
+        expired = idle_rooms.clock() - idle_rooms.ttl
+        for room in rooms:
+            if not _room_size(room):
+                idle_rooms.idle(room, expired)
+    finally:
+        if repeat:
+            _schedule(IDLE_GC_INTERVAL, _collect_idle_meetings, True, seed)
+
+
+def _end_idle_meetings(rooms):
+    """End the meetings of expired rooms with a single update.
+
+    Rooms another process stamped recently are dropped from `rooms` and count
+    as idle from that stamp.
+    """
+    meeting_ids = [ObjectId(room) for room in rooms if ObjectId.is_valid(room)]
+    if not meeting_ids:
+        return
+    cutoff = datetime.fromtimestamp(idle_rooms.clock() - idle_rooms.ttl)
+    in_use = meetings_collection.find(
+        {"_id": {"$in": meeting_ids}, "lastActivity": {"$gt": cutoff}},
+        {"_id": 1, "lastActivity": 1},
+    )
+    for meeting in in_use:
+        room = str(meeting["_id"])
+        rooms.remove(room)
+        idle_rooms.idle(room, _activity_since(meeting))
+
+    meetings_collection.update_many(
+        {
+            "_id": {"$in": meeting_ids},
+            "active": True,
+            # Unless another process stamped it since the find
+            "$or": [{"lastActivity": {"$exists": False}}, {"lastActivity": {"$lte": cutoff}}],
+        },
+        {"$set": {"active": False, "endedAt": datetime.now(), "endedReason": "idle"}},
+    )
+
+
+def start_upload_cleanup():
+    """Sweep abandoned uploads a few times per FILE_STALE_UPLOAD_TTL (0 disables it)"""
+    if FILE_STALE_UPLOAD_TTL > 0:
+        _schedule(FILE_STALE_UPLOAD_TTL / 4, _expire_stale_uploads, True)
+
+
+def _expire_stale_uploads(repeat=False):
+    expired = file_store.expire_stale(FILE_STALE_UPLOAD_TTL)
+    if expired:
+        print(f"Deleted {expired} abandoned uploads")
+    if repeat:
+        _schedule(FILE_STALE_UPLOAD_TTL / 4, _expire_stale_uploads, True)
+
+
+def start_user_indexes():
+    """Build the username filter and the user search index in the background.
+
+    Until they are built, lookups and searches go to the database, so no
+    request waits for a scan of the users collection.
+    """
+    if USER_FILTER_ENABLED or USER_SEARCH_INDEX:
+        _schedule(0, _build_user_indexes)
+
+
+def _build_user_indexes():
+    try:
+        if USER_FILTER_ENABLED and not user_lookup.built:
+            _rebuild_user_filter()
+        if USER_SEARCH_INDEX and not user_index.built:
+            user_index.build(_load_user_names)
+    except PyMongoError as exc:
+        print(f"Could not build the user indexes, retrying in 30s: {exc}")
+        _schedule(30, _build_user_indexes)
+
+
+def _release_room(room):
+    """Free the state kept for a meeting room, including its shared files"""
+    meeting_settings.pop(room, None)
+    membership_notifier.discard(room)
+    attendee_counter.discard(room)
+    attendee_chat.discard(room)
+    chat_deduper.discard(room)
+    chat_history.discard(room)
+    whiteboards.discard(room)
+    interactions.discard(room)
+    lobby.discard(room)
+    network_quality.discard(room)
+    idle_rooms.discard(room)
+    file_store.discard(room)
+
+
+def ensure_indexes():
+    """Create the indexes that back the participant upserts, user search and chat history.
+
+    A database that still holds duplicate participant rows is cleaned up first.
+    An index that cannot be built is logged and skipped, and the server runs
+    without it.
+    """
+    participant_keys = [("meetingId", 1), ("userId", 1)]
+    try:
+        participants_collection.create_index(participant_keys, unique=True)
+    except OperationFailure as exc:
+        if exc.code != 11000:
+            print(f"Could not create the participants index: {exc}")
+        else:
+            print(f"Removed {_dedupe_participants()} duplicate participant rows")
+            _create_index(participants_collection, participant_keys, unique=True)
+    except PyMongoError as exc:
+        print(f"Could not create the participants index: {exc}")
+
+    # Usernames are unique; the username filter reads new users by createdAt, and
+    # anchored regexes on searchNames are index range scans for the user search fallback
+    _create_index(users_collection, "username", unique=True)
+    _create_index(users_collection, "createdAt")
+    try:
+        backfilled = _backfill_search_names()
+        if backfilled:
+            print(f"Added searchNames to {backfilled} users")
+    except PyMongoError as exc:
+        print(f"Could not add searchNames to existing users: {exc}")
+    _create_index(users_collection, "searchNames")
+    try:
+        chat_history.ensure_indexes()
+    except PyMongoError as exc:
+        print(f"Could not create the chat history indexes: {exc}")
+
+
+def _backfill_search_names():
+    """Store searchNames on users created before it existed; returns how many.
+
+    A one-off migration: later starts find nothing to update.
+    """
+    updated = 0
+    users = users_collection.find(
+        {"searchNames": {"$exists": False}}, {"username": 1, "displayName": 1}
+    )
+    for user in users:
+        if isinstance(user.get("username"), str):
+            names = search_names(user["username"], user.get("displayName"))
+            users_collection.update_one({"_id": user["_id"]}, {"$set": {"searchNames": names}})
+            updated += 1
+    return updated
+
+
+def _create_index(collection, keys, **options):
+    """Create one index; returns False (and logs why) if it could not be built"""
+    try:
+        collection.create_index(keys, **options)
+        return True
+    except PyMongoError as exc:
+        print(f"Could not create index {keys!r} on {collection.name}: {exc}")
+        return False
+
+
+def _dedupe_participants():
+    """Merge participant rows that share a (meetingId, userId) into the earliest one.
+
+    Rows written before the unique index existed can repeat a pair. The kept row
+    is marked host if any of its duplicates was. Returns the number of rows removed.
+    """
+    duplicates = participants_collection.aggregate(
+        [
+            {"$sort": {"joinedAt": 1, "_id": 1}},
+            {
+                "$group": {
+                    "_id": {"meetingId": "$meetingId", "userId": "$userId"},
+                    "ids": {"$push": "$_id"},
+                    "isHost": {"$max": "$isHost"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+        ],
+        allowDiskUse=True,
+    )
+    removed = 0
+    for group in duplicates:
+        keep, extra = group["ids"][0], group["ids"][1:]
+        if group["isHost"]:
+            participants_collection.update_one({"_id": keep}, {"$set": {"isHost": True}})
+        removed += participants_collection.delete_many({"_id": {"$in": extra}}).deleted_count
+    return removed
+
+
+def _create_outbound_queue(*args, **kwargs):
+    queue = OutboundQueue(
+        _create_eio_queue(*args, **kwargs),
+        max_messages=OUTBOUND_MAX_MESSAGES,
+        max_bytes=OUTBOUND_MAX_BYTES,
+        evict_after=OUTBOUND_EVICT_AFTER,
+        on_evict=_evict_slow_consumer,
+        stats=outbound_stats,
+    )
+    outbound_queues.add(queue)
+    return queue
+
+
+def _outbound_queue(sid):
+    """The outbound queue of a connected socket, or None"""
+    eio_sid = socketio.server.manager.eio_sid_from_sid(sid, "/")
+    eio_socket = socketio.server.eio.sockets.get(eio_sid)
+    if eio_socket is not None and isinstance(eio_socket.queue, OutboundQueue):
+        return eio_socket.queue
+    return None
+
+
+def _evict_slow_consumer(queue):
+    print(
+        f"Evicting slow consumer {queue.sid}: {queue.messages} messages / "
+        f"{queue.bytes} bytes queued for over {OUTBOUND_EVICT_AFTER}s"
+    )
+    if queue.sid:
+        socketio.start_background_task(socketio.server.disconnect, queue.sid)
+
+
+def _install_capture():
+    """Record every inbound event in the capture log before its handler runs"""
+    handlers = socketio.server.handlers.get("/", {})
+    for event, handler in list(handlers.items()):
+        handlers[event] = _captured(event, handler)
+
+
+def _captured(event, handler):
+    @functools.wraps(handler)
+    def capture_and_handle(sid, *args):
+        lifecycle = event in ("connect", "disconnect")
+        if capture_log is not None:
+            # connect gets the WSGI environ and disconnect a reason; neither is replayed
+            capture_log.record(sid, event, () if lifecycle else args)
+        if not lifecycle:
+            return handler(sid, *args)
+        # python-socketio retries these without their last argument on TypeError;
+        # retry here so the event is only captured once
+        try:
+            return handler(sid, *args)
+        except TypeError:
+            return handler(sid, *args[:-1])
+
+    return capture_and_handle
+
+
+def _schedule(delay, callback, *args):
+    """Run a callback after a delay on a Socket.IO background task"""
+
+    def run():
+        socketio.sleep(delay)
+        callback(*args)
+
+    socketio.start_background_task(run)
+
+
+def _emit_to_room(event, payload, room, skip_sid):
+    socketio.emit(event, payload, to=room, skip_sid=skip_sid)
+
+
+def _emit_attendee_count(room, count):
+    socketio.emit("attendee-count", {"room": room, "count": count}, to=room)
+
+
+def _emit_signal(event, payload, target):
+    socketio.emit(event, payload, to=target)
+
+
+def _emit_quality_advice(sid, payload):
+    socketio.emit("quality-advice", payload, to=sid)
 
-# Simplified Socket.IO configuration
-socketio = SocketIO(
-    app, cors_allowed_origins="*", logger=True, engineio_logger=True, async_mode="threading"
-)
 
-# Store active connections
-active_connections = {}
+def _emit_whiteboard_ops(room, payload):
+    socketio.emit("whiteboard-ops", payload, to=room)
 
 
-@app.route("/")
+def _emit_interactions(room, payload):
+    socketio.emit("interactions", payload, to=room)
+
+
+def _emit_lobby(room, payload):
+    socketio.emit("lobby-changed", payload, to=hosts_room(room))
+
+
+def _turn_away_waiting(room, payload):
+    """Tell the sockets still in a meeting's waiting room that it has ended"""
+    for sid in lobby.discard(room):
+        socketio.emit("meeting-ended", payload, to=sid)
+
+
+@api.route("/")
 def index():
     return "WebRTC Flask Server"
 
 
 # User management endpoints
-@app.route("/api/users", methods=["POST"])
+@api.route("/api/users", methods=["POST"])
 def create_user():
     user_data = request.json
 
@@ -42,35 +820,146 @@ def create_user():
     if not user_data["username"] or user_data["username"] == "":
         return jsonify({"error": "Username cannot be empty"}), 400
 
-    # Check if user already exists
-    existing_user = users_collection.find_one({"username": user_data["username"]})
-    if existing_user:
-        return jsonify({"error": "Username already exists"}), 400
+    username = user_data["username"]
+
+    # Check if user already exists; names the filter rules out skip the query only
+    # while the unique index is there to settle sign-ups the filter has not seen
+    may_exist = _username_may_exist(username)
+    if may_exist or not user_lookup.has_unique_index(_username_index_exists):
+        if users_collection.find_one({"username": username}, {"_id": 1}):
+            return jsonify({"error": "Username already exists"}), 400
+        if may_exist:
+            user_lookup.missed()
 
     # Add new user
-    user_id = users_collection.insert_one(
-        {
-            "username": user_data["username"],
-            "displayName": user_data.get("displayName", user_data["username"]),
-            "createdAt": datetime.now(),
-        }
-    ).inserted_id
+    display_name = user_data.get("displayName", username)
+    user = {
+        "username": username,
+        "displayName": display_name,
+        "createdAt": datetime.now(),
+    }
+    if isinstance(username, str):
+        user["searchNames"] = search_names(username, display_name)
+    try:
+        user_id = users_collection.insert_one(user).inserted_id
+    except DuplicateKeyError:
+        return jsonify({"error": "Username already exists"}), 400
+    if isinstance(username, str):
+        user_lookup.added(username)
+        user_index.add(username, display_name)
+
+    return jsonify({"userId": str(user_id), "username": username}), 201
+
+
+def _username_may_exist(username):
+    # Only string names are in the filter
+    if not USER_FILTER_ENABLED or not isinstance(username, str):
+        return True
+    return user_lookup.may_exist(username, refresh=_load_new_usernames)
+
+
+def _rebuild_user_filter():
+    """Build the username filter from the users collection; returns the names added"""
+    return user_lookup.build(
+        _load_usernames, users_collection.estimated_document_count(), synced_to=datetime.now()
+    )
+
+
+def _load_usernames():
+    for user in users_collection.find({}, {"_id": 0, "username": 1}):
+        if isinstance(user["username"], str):
+            yield user["username"]
+
+
+def _load_new_usernames(since):
+    """Usernames created since `since`, by any worker, and where the next read starts"""
+    now = datetime.now()
+    # Workers stamp createdAt with their own clocks, so read a little further back
+    query = {} if since is None else {"createdAt": {"$gte": since - timedelta(seconds=5)}}
+    users = users_collection.find(query, {"_id": 0, "username": 1})
+    return [user["username"] for user in users if isinstance(user.get("username"), str)], now
+
+
+def _username_index_exists():
+    try:
+        indexes = users_collection.index_information()
+    except PyMongoError:
+        return False
+    return any(
+        index["key"] == [("username", 1)] and index.get("unique") for index in indexes.values()
+    )
+
 
-    return jsonify({"userId": str(user_id), "username": user_data["username"]}), 201
+@api.route("/api/users/search", methods=["GET"])
+def search_users():
+    prefix = request.args.get("prefix", "").strip()
+    if not prefix:
+        return jsonify({"error": "Search prefix is required"}), 400
 
+    limit = request.args.get("limit", "10")
+    if not limit.isdigit() or not 1 <= int(limit) <= 50:
+        return jsonify({"error": "Limit must be between 1 and 50"}), 400
 
-@app.route("/api/users/<username>", methods=["GET"])
+    return jsonify({"users": _search_users(prefix, int(limit))}), 200
+
+
+def _search_users(prefix, limit):
+    """Users whose username or display name starts with a prefix"""
+    # The index is built in the background (start_user_indexes)
+    if USER_SEARCH_INDEX and user_index.available:
+        return user_index.search(prefix, limit)
+
+    # searchNames holds the names folded like the index folds them, so an anchored,
+    # case-sensitive regex on it (an index range scan) matches the same users
+    pattern = {"$regex": "^" + re.escape(fold(prefix))}
+    users = users_collection.find(
+        {"searchNames": pattern}, {"_id": 0, "username": 1, "displayName": 1}
+    ).limit(limit)
+    return [
+        {"username": user["username"], "displayName": user.get("displayName", user["username"])}
+        for user in users
+    ]
+
+
+def _load_user_names():
+    for user in users_collection.find({}, {"_id": 0, "username": 1, "displayName": 1}):
+        if isinstance(user["username"], str):
+            yield user["username"], user.get("displayName", user["username"])
+
+
+@api.route("/api/users/<username>", methods=["GET"])
 def get_user(username):
-    user = users_collection.find_one({"username": username})
+    user = user_lookup.get(username)
+    if user is not None:
+        return jsonify(user), 200
+
+    if not _username_may_exist(username):
+        return jsonify({"error": "User not found"}), 404
+
+    user = users_collection.find_one({"username": username}, {"searchNames": 0})
     if not user:
+        user_lookup.missed()
         return jsonify({"error": "User not found"}), 404
 
     user["_id"] = str(user["_id"])
+    user_lookup.put(username, user)
     return jsonify(user), 200
 
 
+@api.route("/api/users/filter/rebuild", methods=["POST"])
+def rebuild_user_filter():
+    token = request.headers.get("X-Rebuild-Token", "")
+    if not USER_FILTER_REBUILD_TOKEN or not hmac.compare_digest(
+        token.encode(), USER_FILTER_REBUILD_TOKEN.encode()
+    ):
+        return jsonify({"error": "Invalid rebuild token"}), 403
+
+    _rebuild_user_filter()
+    return jsonify(user_lookup.stats()), 200
+
+
 # Meeting management endpoints
-@app.route("/api/meetings", methods=["POST"])
+@api.route("/api/meetings", methods=["POST"])
 def create_meeting():
     meeting_data = request.json
 
@@ -80,25 +969,45 @@ def create_meeting():
 
     host_id = meeting_data["hostId"]
 
+    meeting_type = meeting_data.get("type", MEETING)
+    if meeting_type not in MEETING_TYPES:
+        return jsonify({"error": f"Meeting type must be one of {sorted(MEETING_TYPES)}"}), 400
+
+    presenters = meeting_data.get("presenters", [])
+    if not isinstance(presenters, list):
+        return jsonify({"error": "Presenters must be a list of user IDs"}), 400
+
+    waiting_room = meeting_data.get("waitingRoom", False)
+    if not isinstance(waiting_room, bool):
+        return jsonify({"error": "waitingRoom must be a boolean"}), 400
+
+    meeting = {
+        "name": meeting_data.get("name", "New Meeting"),
+        "hostId": host_id,
+        "createdAt": datetime.now(),
+        "active": True,
+        "type": meeting_type,
+    }
+    if meeting_type == WEBINAR:
+        meeting["presenters"] = presenters
+    if waiting_room:
+        meeting["waitingRoom"] = True
+
+    # Optional codec preferences / bitrate caps applied to relayed SDP
+    if meeting_data.get("sdpPolicy") is not None:
+        try:
+            SdpPolicy.from_dict(meeting_data["sdpPolicy"])
+        except ValueError as e:
+            return jsonify({"error": f"Invalid SDP policy: {e}"}), 400
+        meeting["sdpPolicy"] = meeting_data["sdpPolicy"]
+
     # Create new meeting
-    meeting_id = meetings_collection.insert_one(
-        {
-            "name": meeting_data.get("name", "New Meeting"),
-            "hostId": host_id,
-            "createdAt": datetime.now(),
-            "active": True,
-        }
-    ).inserted_id
+    meeting_id = meetings_collection.insert_one(meeting).inserted_id
+    meeting_settings[str(meeting_id)] = _settings_from_meeting(meeting)
+    idle_rooms.idle(str(meeting_id))
 
     # Add host as participant
-    participants_collection.insert_one(
-        {
-            "meetingId": str(meeting_id),
-            "userId": host_id,
-            "joinedAt": datetime.now(),
-            "isHost": True,
-        }
-    )
+    _upsert_participant(str(meeting_id), host_id, True)
 
     return (
         jsonify({"meetingId": str(meeting_id), "name": meeting_data.get("name", "New Meeting")}),
@@ -106,7 +1015,7 @@ def create_meeting():
     )
 
 
-@app.route("/api/meetings/<meeting_id>/join", methods=["POST"])
+@api.route("/api/meetings/<meeting_id>/join", methods=["POST"])
 def join_meeting(meeting_id):
     user_data = request.json
 
@@ -127,32 +1036,24 @@ def join_meeting(meeting_id):
         return jsonify({"error": "Invalid meeting ID format"}), 400
 
     # Check if meeting exists
-    meeting = meetings_collection.find_one({"_id": meeting_obj_id})
+    meeting = _find_meeting(meeting_obj_id)
     if not meeting:
         return jsonify({"error": "Meeting not found"}), 404
 
     if not meeting["active"]:
         return jsonify({"error": "Meeting has ended"}), 400
 
-    # Check if user is already in the meeting
-    existing = participants_collection.find_one({"meetingId": meeting_id, "userId": user_id})
+    # Users held in the waiting room are added when the host admits them
+    if _must_wait(meeting_id, user_id, _settings_from_meeting(meeting)):
+        return jsonify({"success": True, "waiting": True}), 200
 
-    if not existing:
-        # Add user as participant
-        participants_collection.insert_one(
-            {
-                "meetingId": meeting_id,
-                "userId": user_id,
-                "joinedAt": datetime.now(),
-                "isHost": meeting["hostId"] == user_id,
-                
-            }
-        )
+    # Add user as participant unless already in the meeting
+    _upsert_participant(meeting_id, user_id, meeting["hostId"] == user_id)
 
     return jsonify({"success": True}), 200
 
 
-@app.route("/api/meetings/<meeting_id>/end", methods=["POST"])
+@api.route("/api/meetings/<meeting_id>/end", methods=["POST"])
 def end_meeting(meeting_id):
     user_data = request.json
     user_id = user_data["userId"]
@@ -173,6 +1074,8 @@ def end_meeting(meeting_id):
 
     # Notify all participants through socket
     socketio.emit("meeting-ended", {"meetingId": meeting_id}, to=meeting_id)
+    _turn_away_waiting(meeting_id, {"meetingId": meeting_id})
+    _release_room(meeting_id)
 
     return (
         jsonify(
@@ -182,14 +1085,88 @@ def end_meeting(meeting_id):
     )
 
 
-@app.route("/api/meetings/<meeting_id>/participants", methods=["GET"])
-def get_participants(meeting_id):
-    participants = list(participants_collection.find({"meetingId": meeting_id}))
+def _upsert_participant(meeting_id, user_id, is_host):
+    """Add a user to a meeting's participants unless they are already there.
+
+    A single upsert backed by the unique (meetingId, userId) index, so concurrent
+    joins cannot create duplicate rows.
+    """
+    try:
+        participants_collection.update_one(
+            {"meetingId": meeting_id, "userId": user_id},
+            {"$setOnInsert": {"joinedAt": datetime.now(), "isHost": is_host}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # A concurrent upsert inserted the row first
+        pass
+
+
+def _find_meeting(meeting_obj_id):
+    """Read a meeting document, sharing the query with concurrent lookups of it"""
+    return read_flight.do(
+        ("meeting", meeting_obj_id), meetings_collection.find_one, {"_id": meeting_obj_id}
+    )
+
+
+def _participant_error(meeting_id, user_id):
+    """Error response unless the meeting is active and the user is a participant"""
+    try:
+        meeting_obj_id = ObjectId(meeting_id)
+    except Exception:
+        return jsonify({"error": "Invalid meeting ID format"}), 400
+
+    meeting = _find_meeting(meeting_obj_id)
+    if not meeting:
+        return jsonify({"error": "Meeting not found"}), 404
+    if not meeting["active"]:
+        return jsonify({"error": "Meeting has ended"}), 400
+
+    if not participants_collection.find_one(
+        {"meetingId": meeting_id, "userId": user_id}, {"_id": 1}
+    ):
+        return jsonify({"error": "Not a participant of this meeting"}), 403
+    return None
+
+
+def _participant_roster(meeting_id, member=None):
+    """Participants of a meeting with their user details, shared by concurrent readers.
+
+    `member` is a user the caller has just added. A shared read may have started
+    before that write, so their row is fetched on its own if the result lacks it.
+    """
+    roster = read_flight.do(("participants", meeting_id), _load_participant_roster, meeting_id)
+    if member is None or any(entry["userId"] == member for entry in roster):
+        return roster
+    return roster + _load_participant_roster(meeting_id, member)
+
+
+def _load_participant_roster(meeting_id, user_id=None):
+    """Participants of a meeting (or one of them) joined with their user details.
+
+    The user details come from one batched fetch.
+    """
+    query = {"meetingId": meeting_id}
+    if user_id is not None:
+        query["userId"] = user_id
+    participants = list(participants_collection.find(query))
+
+    user_ids = []
+    for participant in participants:
+        try:
+            user_ids.append(ObjectId(participant["userId"]))
+        except Exception:
+            continue
+
+    projection = {"username": 1, "displayName": 1}
+    users = {
+        str(user["_id"]): user
+        for user in users_collection.find({"_id": {"$in": user_ids}}, projection)
+    }
 
-    # Get user details for each participant
     result = []
     for participant in participants:
-        user = users_collection.find_one({"_id": ObjectId(participant["userId"])})
+        user = users.get(participant["userId"])
         if user:
             result.append(
                 {
@@ -201,13 +1178,66 @@ def get_participants(meeting_id):
                 }
             )
 
-    return jsonify(result), 200
+    return result
+
+
+@api.route("/api/meetings/<meeting_id>/participants", methods=["GET"])
+def get_participants(meeting_id):
+    return jsonify(_participant_roster(meeting_id)), 200
+
+
+# Join + host check + participant list in a single round trip
+@api.route("/api/meetings/<meeting_id>/bootstrap", methods=["POST"])
+def bootstrap_meeting(meeting_id):
+    user_data = request.json
+
+    # Validate input data
+    if not user_data or not user_data.get("userId"):
+        return jsonify({"error": "User ID is required"}), 400
+
+    user_id = user_data["userId"]
+
+    try:
+        meeting_obj_id = ObjectId(meeting_id)
+    except Exception:
+        return jsonify({"error": "Invalid meeting ID format"}), 400
+
+    meeting = _find_meeting(meeting_obj_id)
+    if not meeting:
+        return jsonify({"error": "Meeting not found"}), 404
+
+    if not meeting["active"]:
+        return jsonify({"error": "Meeting has ended"}), 400
+
+    is_host_user = meeting["hostId"] == user_id
+    waiting = _must_wait(meeting_id, user_id, _settings_from_meeting(meeting))
+    if not waiting:
+        _upsert_participant(meeting_id, user_id, is_host_user)
+
+    data = {
+        "meeting": {
+            "meetingId": meeting_id,
+            "name": meeting.get("name", "New Meeting"),
+            "hostId": meeting["hostId"],
+            "createdAt": meeting["createdAt"].isoformat(),
+            "active": meeting["active"],
+        },
+        "isHost": is_host_user,
+        "waiting": waiting,
+        # Nobody in the meeting is shown to someone still in the waiting room
+        "participants": [] if waiting else _participant_roster(meeting_id, user_id),
+    }
+    # TURN credentials are for participants only; once admitted, a guest gets
+    # them from /api/ice-servers
+    if not waiting:
+        data["iceServers"], data["ttl"] = turn_pool.ice_servers(user_id)
+    return jsonify(data), 200
 
 
 # check if user is host
-@app.route("/api/meetings/<meeting_id>/is-host/<user_id>", methods=["GET"])
+@api.route("/api/meetings/<meeting_id>/is-host/<user_id>", methods=["GET"])
 def is_host(meeting_id, user_id):
-    meeting = meetings_collection.find_one({"_id": ObjectId(meeting_id)})
+    meeting = _find_meeting(ObjectId(meeting_id))
     if not meeting:
         return jsonify({"error": "Meeting not found"}), 404
 
@@ -215,7 +1245,7 @@ def is_host(meeting_id, user_id):
 
 
 # remove participant when they leave
-@app.route("/api/meetings/<meeting_id>/leave", methods=["POST"])
+@api.route("/api/meetings/<meeting_id>/leave", methods=["POST"])
 def leave_meeting_api(meeting_id):
     user_data = request.json
     user_id = user_data["userId"]
@@ -226,10 +1256,255 @@ def leave_meeting_api(meeting_id):
     return jsonify({"success": True}), 200
 
 
+@api.route("/api/meetings/<meeting_id>/chat/search", methods=["GET"])
+def search_chat(meeting_id):
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Search query is required"}), 400
+
+    limit = request.args.get("limit", "20")
+    if not limit.isdigit() or not 1 <= int(limit) <= 100:
+        return jsonify({"error": "Limit must be between 1 and 100"}), 400
+
+    user_id = request.args.get("userId")
+    if not user_id:
+        return jsonify({"error": "User ID is required"}), 400
+
+    # Only people in the meeting may read its chat
+    error = _participant_error(meeting_id, user_id)
+    if error:
+        return error
+
+    try:
+        messages, cursor = chat_history.search(
+            meeting_id, query, limit=int(limit), before=request.args.get("before")
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    return jsonify({"messages": messages, "next": cursor}), 200
+
+
+def _upload_error(error):
+    body = {"error": str(error)}
+    if error.offset is not None:
+        body["offset"] = error.offset
+    return jsonify(body), error.status
+
+
+def _share_file(meta):
+    # Only metadata goes over the socket; the file itself is downloaded over HTTP
+    room = meta["meetingId"]
+    socketio.emit(
+        "file-shared",
+        {
+            "fileId": meta["fileId"],
+            "name": meta["name"],
+            "size": meta["size"],
+            "contentType": meta["contentType"],
+            "userId": meta["userId"],
+            "username": meta["username"],
+            "url": f"/api/meetings/{room}/files/{meta['fileId']}",
+        },
+        to=room,
+    )
+
+
+@api.route("/api/meetings/<meeting_id>/files", methods=["POST"])
+def start_upload(meeting_id):
+    data = request.get_json(silent=True) or {}
+    if not data.get("userId"):
+        return jsonify({"error": "User ID is required"}), 400
+
+    error = _participant_error(meeting_id, data["userId"])
+    if error:
+        return error
+
+    try:
+        meta = file_store.start(
+            meeting_id,
+            data["userId"],
+            data.get("name"),
+            data.get("size"),
+            content_type=data.get("contentType"),
+            username=data.get("username"),
+        )
+    except UploadError as error:
+        return _upload_error(error)
+
+    if meta["complete"]:
+        _share_file(meta)
+    return (
+        jsonify(
+            {
+                "fileId": meta["fileId"],
+                "offset": 0,
+                "chunkSize": file_store.chunk_size,
+                "complete": meta["complete"],
+            }
+        ),
+        201,
+    )
+
+
+def _file_user_error(meeting_id, file_id=None):
+    """Error response unless the userId query parameter names a participant.
+
+    With a file_id, the user must also be the one who started that upload.
+    """
+    user_id = request.args.get("userId")
+    if not user_id:
+        return jsonify({"error": "User ID is required"}), 400
+
+    error = _participant_error(meeting_id, user_id)
+    if error or file_id is None:
+        return error
+
+    try:
+        meta = file_store.metadata(meeting_id, file_id)
+    except UploadError as error:
+        return _upload_error(error)
+    if meta["userId"] != user_id:
+        return jsonify({"error": "Only the uploader can write this file"}), 403
+    return None
+
+
+# Where an upload stands, so an interrupted client knows where to resume
+@api.route("/api/meetings/<meeting_id>/files/<file_id>/upload", methods=["GET"])
+def upload_status(meeting_id, file_id):
+    error = _file_user_error(meeting_id, file_id)
+    if error:
+        return error
+
+    try:
+        meta = file_store.metadata(meeting_id, file_id)
+        offset = file_store.offset(meeting_id, file_id)
+    except UploadError as error:
+        return _upload_error(error)
+
+    return jsonify({"offset": offset, "size": meta["size"], "complete": meta["complete"]}), 200
+
+
+@api.route("/api/meetings/<meeting_id>/files/<file_id>/upload", methods=["PUT"])
+def upload_chunk(meeting_id, file_id):
+    offset = request.args.get("offset", "")
+    if not offset.isdigit():
+        return jsonify({"error": "Offset is required"}), 400
+
+    error = _file_user_error(meeting_id, file_id)
+    if error:
+        return error
+
+    try:
+        received, meta = file_store.write_chunk(
+            meeting_id, file_id, int(offset), request.stream, request.content_length
+        )
+    except UploadError as error:
+        return _upload_error(error)
+
+    if meta["complete"]:
+        _share_file(meta)
+    return jsonify({"offset": received, "complete": meta["complete"]}), 200
+
+
+@api.route("/api/meetings/<meeting_id>/files/<file_id>", methods=["GET"])
+def download_file(meeting_id, file_id):
+    error = _file_user_error(meeting_id)
+    if error:
+        return error
+
+    try:
+        path, meta = file_store.file_path(meeting_id, file_id)
+    except UploadError as error:
+        return _upload_error(error)
+
+    # conditional=True answers Range requests; the WSGI server's file wrapper
+    # (sendfile under gunicorn) sends the bytes without copying them through Python
+    return send_file(
+        os.path.abspath(path),
+        mimetype=meta["contentType"],
+        as_attachment=True,
+        download_name=meta["name"],
+        conditional=True,
+    )
+
+
+@api.route("/api/ice-servers", methods=["GET"])
+def get_ice_servers():
+    meeting_id = request.args.get("meetingId")
+    user_id = request.args.get("userId")
+    if not meeting_id or not user_id:
+        return jsonify({"error": "Meeting ID and user ID are required"}), 400
+
+    # Credentials are only minted for someone who has joined the meeting
+    error = _participant_error(meeting_id, user_id)
+    if error:
+        return error
+
+    ice_servers, ttl = turn_pool.ice_servers(user_id)
+    return jsonify({"iceServers": ice_servers, "ttl": ttl}), 200
+
+
+@api.route("/api/turn/load", methods=["POST"])
+def report_turn_load():
+    token = request.headers.get("X-Turn-Report-Token", "")
+    if not TURN_REPORT_TOKEN or not hmac.compare_digest(token.encode(), TURN_REPORT_TOKEN.encode()):
+        return jsonify({"error": "Invalid report token"}), 403
+
+    report = request.get_json(silent=True) or {}
+    load = report.get("load")
+    if isinstance(load, bool) or not isinstance(load, (int, float)) or load < 0:
+        return jsonify({"error": "Load must be a non-negative number"}), 400
+
+    if not turn_pool.report(report.get("server"), float(load)):
+        return jsonify({"error": "Unknown TURN server"}), 404
+
+    return jsonify({"success": True}), 200
+
+
+@api.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    queues = list(outbound_queues)
+    deepest = sorted(queues, key=lambda q: q.bytes, reverse=True)[:10]
+
+    return (
+        jsonify(
+            {
+                "outbound": {
+                    "sockets": len(queues),
+                    "queuedMessages": sum(q.messages for q in queues),
+                    "queuedBytes": sum(q.bytes for q in queues),
+                    "overLimit": sum(1 for q in queues if q.over_limit()),
+                    "dropped": outbound_stats.dropped,
+                    "coalesced": outbound_stats.coalesced,
+                    "evictions": outbound_stats.evictions,
+                    "deepest": [
+                        {"socketId": q.sid, "messages": q.messages, "bytes": q.bytes}
+                        for q in deepest
+                    ],
+                },
+                "signaling": {
+                    "retransmitted": signal_relay.retransmitted,
+                    "duplicates": signal_relay.duplicates,
+                    "overflowed": signal_relay.overflowed,
+                },
+                "turn": turn_pool.stats(),
+                "userFilter": user_lookup.stats(),
+            }
+        ),
+        200,
+    )
+
+
 # Socket.IO events for WebRTC signaling
 @socketio.on("connect")
 def handle_connect():
     print(f"Client connected: {request.sid}")
+
+    # Label the socket's outbound queue for metrics and eviction
+    queue = _outbound_queue(request.sid)
+    if queue is not None:
+        queue.sid = request.sid
     emit("connected", {"data": "Connected"})
 
 
@@ -238,25 +1513,121 @@ def handle_connect():
 def handle_disconnect():
     print(f"Client disconnected: {request.sid}")
 
+    # Arrivals who give up while waiting drop off the host's list
+    lobby.leave(request.sid)
+
     # Clean up active connections
     if request.sid in active_connections:
         room_info = active_connections[request.sid]
         room = room_info["room"]
-        user_id = room_info["userId"]
 
         # Leave the room
         leave_room(room)
 
-        # Notify other participants that this user left
-        socketio.emit(
-            "user-left", {"userId": user_id, "socketId": request.sid}, to=room, include_self=False
-        )
+        # Keep the session suspended so a quick reconnect can resume it
+        token = room_info.get("resumeToken")
+        if RESUME_GRACE_SECONDS > 0 and token in resume_tokens:
+            room_info["suspendedAt"] = time.time()
+            socketio.start_background_task(_expire_suspended_session, request.sid, token)
+            print(f"Session {request.sid} suspended for {RESUME_GRACE_SECONDS}s")
+            return
+
+        _remove_connection(request.sid)
+
+    # Also covers sockets that never joined a room or only waited in the lobby
+    signal_relay.forget(request.sid)
+
+
+def _remove_connection(sid):
+    """Drop a connection for good: notify the room and delete the participant row."""
+    room_info = active_connections.pop(sid, None)
+    if room_info is None:
+        return
 
-        # Remove from database
-        participants_collection.delete_one({"meetingId": room, "userId": user_id})
+    room = room_info["room"]
+    user_id = room_info["userId"]
+    resume_tokens.pop(room_info.get("resumeToken"), None)
+    _journal_remove(sid)
+
+    # The user came back on another socket with a plain join: their row and
+    # their tile belong to that connection now
+    if _has_live_connection(room, user_id):
+        _announce_leave(room_info, sid, notify=False)
+        print(f"Dropped stale session {sid} of user {user_id} in room {room}")
+        return
+
+    # Notify other participants that this user left
+    _announce_leave(room_info, sid)
+
+    # Remove from database
+    participants_collection.delete_one({"meetingId": room, "userId": user_id})
+
+    print(f"User {user_id} left room {room}")
+
+
+def _has_live_connection(room, user_id):
+    """Whether a user has a connection in a room that is not suspended"""
+    return any(
+        conn_info["userId"] == user_id and conn_info.get("suspendedAt") is None
+        for conn_info in active_connections.in_room(room).values()
+    )
+
+
+def _announce_leave(room_info, sid, notify=True):
+    """Tell the room a connection is gone; an attendee's leave only reaches the presenters.
+
+    With notify=False only the per-connection state is released.
+    """
+    room = room_info["room"]
+    network_quality.forget(room, sid)
+    signal_relay.forget(sid)
+    interactions.lower_hand(room, room_info["userId"])
+    room_size = _room_size(room)
+    if not room_size:
+        idle_rooms.idle(room)
+    if room_info.get("role") == ATTENDEE:
+        attendee_counter.add(room, -1)
+        attendee_chat.forget_sender(sid)
+        # Presenters hold a connection to every attendee and close it on user-left
+        if notify:
+            socketio.emit(
+                "user-left",
+                {"userId": room_info["userId"], "socketId": sid},
+                to=presenters_room(room),
+            )
+    elif notify:
+        membership_notifier.left(room, room_size, room_info["userId"], sid)
+
+
+def _room_size(room):
+    """Number of tracked connections in a room"""
+    return active_connections.room_size(room)
+
+
+def _expire_suspended_session(sid, token):
+    """Finish the disconnect of a suspended session that was not resumed in time."""
+    socketio.sleep(RESUME_GRACE_SECONDS)
+
+    room_info = active_connections.get(sid)
+    if (
+        room_info
+        and room_info.get("suspendedAt") is not None
+        and room_info.get("resumeToken") == token
+    ):
+        _remove_connection(sid)
+
+
+def _issue_resume_token(sid):
+    """Create a fresh resume token for a connection, revoking its previous one."""
+    room_info = active_connections[sid]
+    resume_tokens.pop(room_info.get("resumeToken"), None)
+
+    token = secrets.token_urlsafe(16)
+    room_info["resumeToken"] = token
+    resume_tokens[token] = sid
+    _journal_put(sid)
+    return token
 
-        print(f"User {user_id} left room {room}")
-        del active_connections[request.sid]
 
 @socketio.on("leave")
 def on_leave(data):
@@ -266,19 +1637,22 @@ def on_leave(data):
     print(f"User {user_id} explicitly leaving room {room}")
 
     leave_room(room)
+    leave_room(presenters_room(room))
+
+    # Clean up connection
+    room_info = active_connections.pop(request.sid, None)
+    if room_info:
+        resume_tokens.pop(room_info.get("resumeToken"), None)
+        _journal_remove(request.sid)
+    else:
+        room_info = {"room": room, "userId": user_id}
 
     # Notify other participants
-    socketio.emit(
-        "user-left", {"userId": user_id, "socketId": request.sid}, to=room, include_self=False
-    )
+    _announce_leave(room_info, request.sid)
 
     # Remove from database
     participants_collection.delete_one({"meetingId": room, "userId": user_id})
 
-    # Clean up connection
-    if request.sid in active_connections:
-        del active_connections[request.sid]
-
 
 @socketio.on("join")
 def on_join(data):
@@ -290,25 +1664,23 @@ def on_join(data):
 
         room = data["room"]
         user_id = data.get("userId")
+        role = _role_for(room, user_id)
 
-        # Store connection info
-        active_connections[request.sid] = {"room": room, "userId": user_id, "socketId": request.sid}
-
-        join_room(room)
+        # Held back without joining the room or telling anyone but the host
+        if _must_wait(room, user_id):
+            position = lobby.wait(room, request.sid, user_id, data.get("signalAcks"))
+            emit("waiting-room", {"room": room, "position": position})
+            print(f"User {user_id} is waiting to be admitted to room {room}")
+            return
 
-        # Get all existing participants in the room
-        existing_participants = []
-        for sid, conn_info in active_connections.items():
-            if conn_info["room"] == room and sid != request.sid:
-                existing_participants.append({"userId": conn_info["userId"], "socketId": sid})
+        room_size = _enter_room(request.sid, room, user_id, role, data.get("signalAcks"))
 
-        # Send existing participants to the new user
-        emit("existing-participants", {"participants": existing_participants})
-
-        # Notify other participants that a new user joined
-        socketio.emit(
-            "user-joined", {"userId": user_id, "socketId": request.sid}, to=room, include_self=False
-        )
+        if role == ATTENDEE:
+            # Receive-only: no per-attendee fan-out, just the aggregated count
+            attendee_counter.add(room, 1)
+        else:
+            # Notify other participants that a new user joined
+            membership_notifier.joined(room, room_size, user_id, request.sid)
 
         print(f"User {user_id} joined room {room}")
 
@@ -317,6 +1689,196 @@ def on_join(data):
         socketio.emit("error", {"message": "Failed to join room"}, to=request.sid)
 
 
+def _enter_room(sid, room, user_id, role, signal_acks=False, unlisted=()):
+    """Make a socket a member of a meeting room and send it what it needs to start.
+
+    Sockets in `unlisted` are left out of its existing-participants. Returns the
+    room size; telling the other members is up to the caller.
+    """
+    previous = active_connections.get(sid)
+    if previous:
+        resume_tokens.pop(previous.get("resumeToken"), None)
+    active_connections[sid] = ConnectionRecord(room, user_id, sid, role)
+    _retire_suspended_sessions(room, user_id, sid)
+    idle_rooms.active(room)
+    if signal_acks:
+        signal_relay.enable(sid)
+
+    join_room(room, sid=sid)
+    if role == PRESENTER:
+        join_room(presenters_room(room), sid=sid)
+    if _can_moderate({"room": room, "userId": user_id}):
+        join_room(hosts_room(room), sid=sid)
+        # The host sees who is already waiting without waiting for a change
+        waiting = lobby.state(room)
+        if waiting["count"]:
+            socketio.emit("lobby-changed", waiting, to=sid)
+
+    # Let the client resume this session after a transient disconnect
+    token = _issue_resume_token(sid)
+    socketio.emit("session-token", {"token": token, "graceSeconds": RESUME_GRACE_SECONDS}, to=sid)
+
+    # Get all existing participants in the room (attendees are never listed)
+    existing_participants = []
+    room_size = 1
+    for other, conn_info in active_connections.in_room(room).items():
+        if other != sid:
+            room_size += 1
+            if conn_info.get("role") != ATTENDEE and other not in unlisted:
+                existing_participants.append({"userId": conn_info["userId"], "socketId": other})
+
+    # Send existing participants to the new user
+    socketio.emit(
+        "existing-participants",
+        {"participants": existing_participants, "role": role},
+        to=sid,
+    )
+
+    # Late joiners catch up on the whiteboard from its snapshot and the ops after it
+    if room in whiteboards:
+        socketio.emit("whiteboard-state", whiteboards.state(room), to=sid)
+    if room in interactions:
+        socketio.emit("interactions-state", interactions.state(room), to=sid)
+
+    return room_size
+
+
+def _retire_suspended_sessions(room, user_id, sid):
+    """Drop a user's suspended sessions in a room once they rejoin on a new socket.
+
+    The user did not resume, so the old session can no longer be; peers learn
+    about the new socket from its join and drop the old tile themselves.
+    """
+    stale = [
+        other
+        for other, conn_info in active_connections.in_room(room).items()
+        if other != sid
+        and conn_info["userId"] == user_id
+        and conn_info.get("suspendedAt") is not None
+    ]
+    for other in stale:
+        _remove_connection(other)
+
+
+def _admit(room, entries):
+    """Let waiting sockets in with one participant write and one notification to the room"""
+    # Sockets that went away since the host pressed admit are skipped
+    entries = [e for e in entries if socketio.server.manager.is_connected(e["socketId"], "/")]
+    if not entries:
+        return
+
+    now = datetime.now()
+    try:
+        participants_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"meetingId": room, "userId": entry["userId"]},
+                    {"$setOnInsert": {"joinedAt": now, "isHost": False}},
+                    upsert=True,
+                )
+                for entry in entries
+            ],
+            ordered=False,
+        )
+    except BulkWriteError as e:
+        # Rows inserted first by a concurrent upsert are fine
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+    # Joins and leaves still collecting reach the room before the new members are in it
+    membership_notifier.flush(room)
+
+    # Presenters go first, so attendees admitted with them find them listed and offer
+    roles = {entry["socketId"]: _role_for(room, entry["userId"]) for entry in entries}
+    entries = sorted(entries, key=lambda entry: roles[entry["socketId"]] == ATTENDEE)
+    # Full peers of the batch are introduced to each other by joined_many instead
+    peers = {sid for sid, role in roles.items() if role != ATTENDEE}
+
+    joined = []
+    attendees = []
+    for entry in entries:
+        sid, user_id = entry["socketId"], entry["userId"]
+        role = roles[sid]
+        socketio.emit("admitted", {"room": room}, to=sid)
+        if role == ATTENDEE:
+            _enter_room(sid, room, user_id, role, entry["signalAcks"])
+            attendees.append(sid)
+        else:
+            _enter_room(sid, room, user_id, role, entry["signalAcks"], unlisted=peers)
+            joined.append({"userId": user_id, "socketId": sid})
+
+    if attendees:
+        attendee_counter.add(room, len(attendees))
+    membership_notifier.joined_many(room, _room_size(room), joined, skip=attendees)
+    print(f"Admitted {len(entries)} users to room {room}")
+
+
+@socketio.on("resume")
+def on_resume(data):
+    token = (data or {}).get("token")
+    old_sid = resume_tokens.get(token) or _claim_restored_session(token)
+    room_info = active_connections.get(old_sid) if old_sid else None
+
+    if not room_info:
+        emit("resume-failed", {"message": "Session cannot be resumed"})
+        return
+
+    room = room_info["room"]
+    user_id = room_info["userId"]
+
+    # Swap the socket id in place; the old socket may not have timed out yet
+    del active_connections[old_sid]
+    _journal_remove(old_sid)
+    network_quality.forget(room, old_sid)
+    signal_relay.remap(old_sid, request.sid)
+    if data.get("signalAcks"):
+        signal_relay.enable(request.sid)
+    leave_room(room, sid=old_sid)
+    room_info["socketId"] = request.sid
+    room_info["suspendedAt"] = None
+    active_connections[request.sid] = room_info
+    idle_rooms.active(room)
+
+    join_room(room)
+    if room_info.get("role") == PRESENTER:
+        leave_room(presenters_room(room), sid=old_sid)
+        join_room(presenters_room(room))
+    if _can_moderate(room_info):
+        leave_room(hosts_room(room), sid=old_sid)
+        join_room(hosts_room(room))
+    new_token = _issue_resume_token(request.sid)
+
+    participants = [
+        {"userId": conn_info["userId"], "socketId": sid}
+        for sid, conn_info in active_connections.in_room(room).items()
+        if sid != request.sid and conn_info.get("role") != ATTENDEE
+    ]
+    emit(
+        "session-resumed",
+        {
+            "room": room,
+            "userId": user_id,
+            "previousSocketId": old_sid,
+            "token": new_token,
+            "participants": participants,
+        },
+    )
+
+    # Peers keep their RTCPeerConnections and only re-key the signaling socket.
+    # Only presenters hold connections to an attendee.
+    socketio.emit(
+        "socket-remapped",
+        {"userId": user_id, "oldSocketId": old_sid, "newSocketId": request.sid},
+        to=presenters_room(room) if room_info.get("role") == ATTENDEE else room,
+        include_self=False,
+    )
+
+    # Offers/answers that were in flight when the old socket dropped
+    signal_relay.resend(request.sid)
+
+    print(f"User {user_id} resumed session in room {room} ({old_sid} -> {request.sid})")
+
+
 # Add this with the other socket.io events
 @socketio.on("end-meeting")
 def on_end_meeting(data):
@@ -333,6 +1895,98 @@ def on_end_meeting(data):
 
         # Notify all participants
         socketio.emit("meeting-ended", {"meetingId": room}, to=room)
+        _turn_away_waiting(room, {"meetingId": room})
+        _release_room(room)
+
+
+def _settings_from_meeting(meeting):
+    policy = None
+    if meeting.get("sdpPolicy") is not None:
+        try:
+            policy = SdpPolicy.from_dict(meeting["sdpPolicy"])
+        except ValueError:
+            policy = None
+
+    return {
+        "type": meeting.get("type", MEETING),
+        "hostId": meeting.get("hostId"),
+        "presenters": frozenset(meeting.get("presenters", [])),
+        "sdpPolicy": policy,
+        "waitingRoom": bool(meeting.get("waitingRoom")),
+    }
+
+
+def _meeting_settings(room):
+    """Look up the settings of a meeting room, reading the meeting at most once.
+
+    Only meetings that exist are cached (and released with their room), so
+    arbitrary room names cannot grow the cache.
+    """
+    settings = meeting_settings.get(room)
+    if settings is not None:
+        return settings
+
+    meeting = None
+    if ObjectId.is_valid(room):
+        meeting = _find_meeting(ObjectId(room))
+    if meeting is None:
+        return _settings_from_meeting({})
+
+    settings = _settings_from_meeting(meeting)
+    meeting_settings[room] = settings
+    return settings
+
+
+def _role_for(room, user_id):
+    """Presenter or attendee for webinars; everyone is a full peer otherwise"""
+    settings = _meeting_settings(room)
+    if settings["type"] != WEBINAR:
+        return PRESENTER
+    if user_id == settings["hostId"] or user_id in settings["presenters"]:
+        return PRESENTER
+    return ATTENDEE
+
+
+def _can_moderate(room_info):
+    """The host, and a webinar's presenters, run the hand queue and polls"""
+    settings = _meeting_settings(room_info["room"])
+    user_id = room_info["userId"]
+    return user_id == settings["hostId"] or user_id in settings["presenters"]
+
+
+def _must_wait(room, user_id, settings=None):
+    """Whether a meeting's waiting room holds this user back"""
+    settings = settings or _meeting_settings(room)
+    return (
+        settings.get("waitingRoom", False)
+        and user_id != settings["hostId"]
+        and user_id not in settings["presenters"]
+        and not lobby.is_admitted(room, user_id)
+    )
+
+
+def _process_description(description):
+    """Apply the sender's meeting SDP policy to an offer/answer.
+
+    Returns the description unchanged when processing is off or the meeting has no
+    policy, and None when the SDP is malformed and must not be relayed.
+    """
+    if not SDP_PROCESSING_ENABLED or not isinstance(description, dict):
+        return description
+
+    room_info = active_connections.get(request.sid)
+    policy = _meeting_settings(room_info["room"])["sdpPolicy"] if room_info else None
+    if policy is None:
+        return description
+
+    try:
+        sdp = sdp_processor.process(description.get("sdp"), policy)
+    except SdpError as e:
+        print(f"Rejected SDP from {request.sid}: {e}")
+        emit("error", {"message": f"Invalid session description: {e}"})
+        return None
+
+    return {**description, "sdp": sdp}
 
 
 # WebRTC signaling events - now include target socket ID
@@ -340,34 +1994,48 @@ def on_end_meeting(data):
 def on_offer(data):
     target_socket = data.get("targetSocket")
     if target_socket:
-        emit(
-            "offer",
-            {
-                "offer": data["offer"],
-                "fromSocket": request.sid,
-                "fromUserId": data.get("fromUserId"),
-                "msgId": data.get("msgId"),
-            },
-            to=target_socket,
-        )
+        offer = _process_description(data["offer"])
+        if offer is None:
+            return
+        payload = {
+            "offer": offer,
+            "fromSocket": request.sid,
+            "fromUserId": data.get("fromUserId"),
+            "msgId": data.get("msgId"),
+        }
+        # Attendees offer to receive the presenters' media; they get no tile
+        room_info = active_connections.get(request.sid)
+        if room_info and room_info.get("role") == ATTENDEE:
+            payload["receiveOnly"] = True
+        signal_relay.send("offer", payload, target_socket)
 
 
 @socketio.on("answer")
 def on_answer(data):
     target_socket = data.get("targetSocket")
     if target_socket:
-        emit(
+        answer = _process_description(data["answer"])
+        if answer is None:
+            return
+        signal_relay.send(
             "answer",
             {
-                "answer": data["answer"],
+                "answer": answer,
                 "fromSocket": request.sid,
                 "fromUserId": data.get("fromUserId"),
                 "msgId": data.get("msgId"),
             },
-            to=target_socket,
+            target_socket,
         )
 
 
+@socketio.on("signal-ack")
+def on_signal_ack(data):
+    """The client received the offer/answer fromSocket sent with msgId"""
+    if isinstance(data, dict):
+        signal_relay.ack(request.sid, data.get("fromSocket"), data.get("msgId"))
+
+
 @socketio.on("ice-candidate")
 def on_ice_candidate(data):
     target_socket = data.get("targetSocket")
@@ -383,6 +2051,29 @@ def on_ice_candidate(data):
         )
 
 
+@socketio.on("peer-connected")
+def on_peer_connected(data):
+    """The client's connection with targetSocket is established"""
+    target_socket = data.get("targetSocket") if isinstance(data, dict) else None
+    queue = _outbound_queue(request.sid)
+    if target_socket and queue is not None:
+        # Trickle-ICE from that peer is now safe to shed while over the limits
+        queue.peer_connected(target_socket)
+
+
+# Binary fast path for offer/answer/ice-candidate: only the envelope header is read
+# and the body is forwarded as opaque bytes. SDP policies are not applied here.
+@socketio.on("signal-relay")
+def on_signal_relay(packet):
+    try:
+        target_socket, outbound = readdress_envelope(packet, request.sid)
+    except EnvelopeError as e:
+        emit("error", {"message": f"Invalid relay envelope: {e}"})
+        return
+
+    emit("signal-relay", outbound, to=target_socket)
+
+
 @socketio.on("media-status-update")
 def on_media_status_update(data):
     room = data.get("room")
@@ -412,6 +2103,18 @@ def on_media_status_update(data):
         )
 
 
+@socketio.on("webrtc-stats")
+def on_webrtc_stats(data):
+    """Per-peer getStats() summaries: samples [[senderSocketId, rttMs, loss, jitterMs, kbps]]"""
+    room_info = active_connections.get(request.sid)
+    if not room_info or not isinstance(data, dict):
+        return
+
+    # Only stored here; the aggregation runs on the telemetry tick
+    room = room_info["room"]
+    network_quality.ingest(room, request.sid, data.get("samples"), active_connections.in_room(room))
+
+
 @socketio.on("send-chat-message")
 def on_send_chat_message(data):
     room = data.get("room")
@@ -423,23 +2126,207 @@ def on_send_chat_message(data):
 
     print(f"Chat message from {username} ({user_id}): {message}")
 
-    if room and message:
+    if room and isinstance(message, str) and message:
+        chat_message = {
+            "id": message_id,
+            "userId": user_id,
+            "username": username,
+            "message": message,
+            "timestamp": timestamp,
+        }
+
+        room_info = active_connections.get(request.sid)
+        attendee = room_info is not None and room_info.get("role") == ATTENDEE
+        if attendee:
+            room = room_info["room"]
+
+        # A retry of a message the room already got is only acknowledged to its sender
+        if not chat_deduper.first_delivery(room, message_id):
+            emit("chat-ack", {"id": message_id, "duplicate": True})
+            return
+
+        if attendee:
+            # Attendee chat is rate limited and waits for a presenter to approve it
+            if not attendee_chat.submit(room, request.sid, chat_message):
+                chat_deduper.forget(room, message_id)
+                emit(
+                    "chat-rate-limited",
+                    {"id": message_id, "retryAfter": attendee_chat.min_interval},
+                )
+                return
+            socketio.emit("chat-pending", chat_message, to=presenters_room(room))
+            return
+
         # Broadcast the chat message to all participants in the room (including sender)
-        socketio.emit(
-            "chat-message",
-            {
-                "id": message_id,
-                "userId": user_id,
-                "username": username,
-                "message": message,
-                "timestamp": timestamp,
-            },
-            to=room,
+        socketio.emit("chat-message", chat_message, to=room)
+        chat_history.append(room, chat_message)
+
+
+@socketio.on("moderate-chat-message")
+def on_moderate_chat_message(data):
+    room_info = active_connections.get(request.sid)
+    if not room_info or room_info.get("role") != PRESENTER:
+        emit("error", {"message": "Only presenters can moderate chat"})
+        return
+
+    room = room_info["room"]
+    chat_message = attendee_chat.take(room, data.get("id"))
+    if chat_message and data.get("approve"):
+        socketio.emit("chat-message", chat_message, to=room)
+        chat_history.append(room, chat_message)
+
+
+@socketio.on("whiteboard-op")
+def on_whiteboard_op(data):
+    room_info = active_connections.get(request.sid)
+    if not room_info:
+        emit("error", {"message": "Join a room before drawing"})
+        return
+    if room_info.get("role") == ATTENDEE:
+        emit("error", {"message": "Attendees cannot draw on the whiteboard"})
+        return
+
+    try:
+        # Applied now; fanned out to the room with the other ops of this tick
+        whiteboards.submit(room_info["room"], request.sid, (data or {}).get("ops"))
+    except WhiteboardError as e:
+        emit("error", {"message": str(e)})
+
+
+@socketio.on("whiteboard-sync")
+def on_whiteboard_sync(data):
+    # A client that missed ops (e.g. after a resume) asks from the last seq it has
+    room_info = active_connections.get(request.sid)
+    if room_info:
+        emit("whiteboard-state", whiteboards.state(room_info["room"], (data or {}).get("since")))
+
+
+@socketio.on("send-reaction")
+def on_send_reaction(data):
+    room_info = active_connections.get(request.sid)
+    if not room_info:
+        return
+
+    try:
+        # Counted only; the room gets the tally on the next interactions tick
+        interactions.react(room_info["room"], (data or {}).get("reaction"))
+    except InteractionError as e:
+        emit("error", {"message": str(e)})
+
+
+@socketio.on("raise-hand")
+def on_raise_hand(data=None):
+    room_info = active_connections.get(request.sid)
+    if room_info:
+        interactions.raise_hand(room_info["room"], room_info["userId"])
+
+
+@socketio.on("lower-hand")
+def on_lower_hand(data=None):
+    room_info = active_connections.get(request.sid)
+    if not room_info:
+        return
+
+    user_id = (data or {}).get("userId") or room_info["userId"]
+    if user_id != room_info["userId"] and not _can_moderate(room_info):
+        emit("error", {"message": "Only the host can lower other hands"})
+        return
+    interactions.lower_hand(room_info["room"], user_id)
+
+
+@socketio.on("next-hand")
+def on_next_hand(data=None):
+    room_info = active_connections.get(request.sid)
+    if not room_info or not _can_moderate(room_info):
+        emit("error", {"message": "Only the host can call on raised hands"})
+        return
+
+    user_id = interactions.next_hand(room_info["room"])
+    if user_id is not None:
+        socketio.emit("hand-called", {"userId": user_id}, to=room_info["room"])
+
+
+@socketio.on("start-poll")
+def on_start_poll(data):
+    room_info = active_connections.get(request.sid)
+    if not room_info or not _can_moderate(room_info):
+        emit("error", {"message": "Only the host can start polls"})
+        return
+
+    data = data or {}
+    try:
+        poll = interactions.start_poll(room_info["room"], data.get("question"), data.get("options"))
+    except InteractionError as e:
+        emit("error", {"message": str(e)})
+        return
+    socketio.emit("poll-started", poll, to=room_info["room"])
+
+
+@socketio.on("poll-vote")
+def on_poll_vote(data):
+    room_info = active_connections.get(request.sid)
+    if not room_info:
+        return
+
+    data = data or {}
+    try:
+        interactions.vote(
+            room_info["room"], data.get("pollId"), room_info["userId"], data.get("option")
         )
+    except InteractionError as e:
+        emit("error", {"message": str(e)})
+
+
+@socketio.on("end-poll")
+def on_end_poll(data):
+    room_info = active_connections.get(request.sid)
+    if not room_info or not _can_moderate(room_info):
+        emit("error", {"message": "Only the host can end polls"})
+        return
+
+    results = interactions.end_poll(room_info["room"], (data or {}).get("pollId"))
+    if results is not None:
+        socketio.emit("poll-ended", results, to=room_info["room"])
+
+
+@socketio.on("admit")
+def on_admit(data):
+    room_info = active_connections.get(request.sid)
+    if not room_info or not _can_moderate(room_info):
+        emit("error", {"message": "Only the host can admit participants"})
+        return
+
+    data = data or {}
+    if data.get("all"):
+        sids = None
+    else:
+        sids = data.get("socketIds") or [data.get("socketId")]
+        if not isinstance(sids, list):
+            emit("error", {"message": "socketIds must be a list"})
+            return
+    _admit(room_info["room"], lobby.admit(room_info["room"], sids))
+
+
+@socketio.on("deny-entry")
+def on_deny_entry(data):
+    room_info = active_connections.get(request.sid)
+    if not room_info or not _can_moderate(room_info):
+        emit("error", {"message": "Only the host can deny entry"})
+        return
+
+    entry = lobby.deny(room_info["room"], (data or {}).get("socketId"))
+    if entry is not None:
+        socketio.emit("entry-denied", {"room": room_info["room"]}, to=entry["socketId"])
 
 
 if __name__ == "__main__":
     print("Starting Flask-SocketIO server...")
+    app = create_app()
+    ensure_indexes()
+    restore_room_state()
+    start_idle_gc()
+    start_upload_cleanup()
+    start_user_indexes()
 
     # Check if running in production
     is_production = os.environ.get("FLASK_ENV") == "production"
@@ -448,7 +2335,7 @@ if __name__ == "__main__":
         # In production, don't run the development server directly
         # This will be handled by Gunicorn
         print("Production mode detected. Use Gunicorn to run this application.")
-        print("Example: gunicorn --worker-class eventlet -w 1 --bind 0.0.0.0:5002 server:app")
+        print("Example: gunicorn -c gunicorn.conf.py wsgi:app")
     else:
         # Development mode with security considerations
         # Only bind to localhost in development unless explicitly overridden
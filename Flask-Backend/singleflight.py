@@ -0,0 +1,65 @@
+"""
+Request coalescing for concurrent identical reads
+While a call for a key is in flight, other callers asking for the same key wait
+for it and share its result instead of starting their own backend call.
+Only in-flight calls are shared; nothing is cached once the call returns.
+
+Built on threading primitives, which eventlet's monkey patching turns into
+green locks and events, so it is safe in both the threading and eventlet
+async modes
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and hands its outcome to every caller"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args):
+        """Return fn(*args), sharing the result with concurrent callers of the same key.
+
+        Errors are shared too. Results are handed out as-is to every caller, so they
+        must be treated as read-only.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
@@ -0,0 +1,255 @@
+"""
+Network-quality telemetry from client getStats() summaries
+Clients report, per remote peer, the RTT, packet loss, jitter and received
+bitrate they observe. Samples are written into a per-room NumPy ring buffer in
+O(1); a periodic tick computes rolling percentiles per link for all links of a
+room at once and tells a sender to lower its send resolution towards a peer
+when that link crosses the thresholds (and to restore it once it recovers)
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+
+RTT, LOSS, JITTER, BITRATE = range(4)
+_METRICS = 4
+
+REDUCE = "reduce-resolution"
+RESTORE = "restore-resolution"
+
+
+class RoomStats:
+    """Ring buffer of samples for one room, plus the link bookkeeping"""
+
+    __slots__ = (
+        "values",
+        "links",
+        "times",
+        "pos",
+        "next_link",
+        "link_ids",
+        "link_keys",
+        "degraded",
+    )
+
+    def __init__(self, capacity):
+        self.values = np.zeros((capacity, _METRICS), dtype=np.float32)
+        self.links = np.full(capacity, -1, dtype=np.int32)
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.pos = 0
+        self.next_link = 0
+        # (reporter sid, sender sid) <-> link id
+        self.link_ids = {}
+        self.link_keys = {}
+        self.degraded = set()
+
+    def link_for(self, reporter, sender, max_links):
+        """Link id of a pair, or None once the room tracks max_links links"""
+        key = (reporter, sender)
+        link = self.link_ids.get(key)
+        if link is None:
+            if len(self.link_ids) >= max_links:
+                return None
+            link = self.link_ids[key] = self.next_link
+            self.link_keys[link] = key
+            self.next_link += 1
+        return link
+
+
+def _sample_row(sample):
+    """Validate [senderSocketId, rttMs, loss, jitterMs, kbps]; None if malformed"""
+    if not isinstance(sample, (list, tuple)) or len(sample) != 5:
+        return None
+    sender = sample[0]
+    if not isinstance(sender, str) or not sender:
+        return None
+    row = []
+    for value in sample[1:]:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        if not math.isfinite(value) or value < 0:
+            return None
+        row.append(value)
+    if row[LOSS] > 1:
+        return None
+    return sender, row
+
+
+def grouped_percentile(links, values, q):
+    """Per-link q-quantile of every metric column, computed for all links at once.
+
+    Returns (link ids, sample counts, percentiles with one row per link).
+    """
+    if len(links) == 0:
+        return links, links, values[:0]
+
+    unique, counts = np.unique(links, return_counts=True)
+    # Groups appear in link order once sorted; offsets pick the quantile in each
+    starts = np.cumsum(counts) - counts
+    offsets = starts + np.floor(q * (counts - 1)).astype(np.int64)
+    result = np.empty((len(unique), values.shape[1]), dtype=values.dtype)
+    for column in range(values.shape[1]):
+        # Sort by link, then by value inside each link's group
+        order = np.lexsort((values[:, column], links))
+        result[:, column] = values[order, column][offsets]
+    return unique, counts, result
+
+
+class NetworkQuality:
+    """Collects quality samples and emits advice on threshold crossings"""
+
+    def __init__(
+        self,
+        emit,
+        schedule,
+        interval=2.0,
+        capacity=4096,
+        window=10.0,
+        percentile=0.9,
+        min_samples=3,
+        max_samples=64,
+        max_links=1024,
+        loss=(0.05, 0.02),
+        rtt=(400.0, 250.0),
+        jitter=(50.0, 30.0),
+        clock=time.monotonic,
+    ):
+        # emit(sid, payload) sends quality-advice to one socket
+        self.emit = emit
+        self.schedule = schedule
+        self.interval = interval
+        self.capacity = capacity
+        self.window = window
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        # Links a room may track; a room of n sockets uses at most n * (n - 1)
+        self.max_links = max_links
+        # (degrade above, recover below) for each metric
+        self.high = np.array([rtt[0], loss[0], jitter[0]], dtype=np.float32)
+        self.low = np.array([rtt[1], loss[1], jitter[1]], dtype=np.float32)
+        self.clock = clock
+        self.rooms = {}
+        self._dirty = set()
+        self._tick_pending = False
+        self._lock = threading.Lock()
+
+    def ingest(self, room, reporter, samples, members=()):
+        """Store one report; returns the number of samples accepted.
+
+        Samples about a sender that is not one of `members`, the sockets in the
+        reporter's room, are dropped: advice only ever goes to a room mate.
+        """
+        if not isinstance(samples, list):
+            return 0
+
+        rows = []
+        for sample in samples[: self.max_samples]:
+            parsed = _sample_row(sample)
+            if parsed is not None and parsed[0] != reporter and parsed[0] in members:
+                rows.append(parsed)
+        # A room's buffers are only allocated once it has a sample to keep
+        if not rows:
+            return 0
+
+        now = self.clock()
+        accepted = 0
+        with self._lock:
+            stats = self.rooms.get(room)
+            if stats is None:
+                stats = RoomStats(self.capacity)
+
+            for sender, row in rows:
+                link = stats.link_for(reporter, sender, self.max_links)
+                if link is None:
+                    continue
+                pos = stats.pos
+                stats.values[pos] = row
+                stats.links[pos] = link
+                stats.times[pos] = now
+                stats.pos = (pos + 1) % self.capacity
+                accepted += 1
+
+            if accepted:
+                self.rooms[room] = stats
+                self._dirty.add(room)
+                if not self._tick_pending:
+                    self._tick_pending = True
+                    self.schedule(self.interval, self.tick)
+        return accepted
+
+    def tick(self):
+        """Aggregate every room that received samples since the last tick"""
+        with self._lock:
+            rooms, self._dirty = self._dirty, set()
+            self._tick_pending = False
+
+        for room in rooms:
+            self._evaluate(room)
+
+    def _evaluate(self, room):
+        now = self.clock()
+        with self._lock:
+            stats = self.rooms.get(room)
+            if stats is None:
+                return
+            fresh = (stats.links >= 0) & (stats.times >= now - self.window)
+            links = stats.links[fresh]
+            values = stats.values[fresh]
+
+        link_ids, counts, tail = grouped_percentile(links, values[:, :BITRATE], self.percentile)
+        _, _, median = grouped_percentile(links, values[:, BITRATE:], 0.5)
+        if not len(link_ids):
+            return
+
+        enough = counts >= self.min_samples
+        bad = enough & (tail > self.high).any(axis=1)
+        good = enough & (tail < self.low).all(axis=1)
+
+        advice = []
+        with self._lock:
+            for i in np.flatnonzero(bad | good):
+                link = int(link_ids[i])
+                key = stats.link_keys.get(link)
+                if key is None:
+                    continue
+                if bad[i] and link not in stats.degraded:
+                    stats.degraded.add(link)
+                    advice.append((REDUCE, key, tail[i], median[i, 0]))
+                elif good[i] and link in stats.degraded:
+                    stats.degraded.discard(link)
+                    advice.append((RESTORE, key, tail[i], median[i, 0]))
+
+        for action, (reporter, sender), tail_row, bitrate in advice:
+            self.emit(
+                sender,
+                {
+                    "action": action,
+                    "peerSocketId": reporter,
+                    "rttMs": round(float(tail_row[RTT]), 1),
+                    "loss": round(float(tail_row[LOSS]), 4),
+                    "jitterMs": round(float(tail_row[JITTER]), 1),
+                    "bitrateKbps": round(float(bitrate), 1),
+                },
+            )
+
+    def forget(self, room, sid):
+        """Drop the links of a socket that left; its old samples are ignored"""
+        with self._lock:
+            stats = self.rooms.get(room)
+            if stats is None:
+                return
+            for key in [key for key in stats.link_ids if sid in key]:
+                link = stats.link_ids.pop(key)
+                del stats.link_keys[link]
+                stats.degraded.discard(link)
+                stats.links[stats.links == link] = -1
+            if not stats.link_ids:
+                del self.rooms[room]
+
+    def discard(self, room):
+        with self._lock:
+            self.rooms.pop(room, None)
+            self._dirty.discard(room)
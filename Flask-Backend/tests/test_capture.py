@@ -0,0 +1,148 @@
+"""
+Unit tests for signaling capture and replay
+Tests the capture log format, sampling, the handler hook and the replay driver
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import server
+from capture import (
+    FLAG_PAYLOADS,
+    KIND_BINARY,
+    KIND_NONE,
+    CaptureLog,
+    encode_record,
+    read_capture,
+    sampled,
+)
+from connections import ConnectionTable
+from relay import RELAY_OFFER, pack_envelope, unpack_envelope
+from server import app, socketio
+from tools.replay_capture import load_records, replay
+
+
+def _read(log):
+    log.close()
+    with open(log.path, "rb") as f:
+        return read_capture(f.read())
+
+
+@pytest.mark.unit
+class TestCaptureLog:
+    """Test writing and reading capture logs"""
+
+    def test_round_trip(self, tmp_path):
+        """Test that events come back with their sid, name, offset and arguments"""
+        log = CaptureLog(str(tmp_path))
+        log.record("sid-a", "join", ({"room": "r1", "userId": "alice"},))
+        log.record("sid-a", "signal-relay", (b"\x01\x03abcbody",))
+
+        started, flags, records = _read(log)
+
+        assert flags == FLAG_PAYLOADS and started > 0
+        assert [(r.sid, r.event) for r in records] == [
+            ("sid-a", "join"),
+            ("sid-a", "signal-relay"),
+        ]
+        assert records[0].args() == [{"room": "r1", "userId": "alice"}]
+        assert records[1].kind == KIND_BINARY
+        assert records[1].args() == [b"\x01\x03abcbody"]
+        assert 0 <= records[0].offset <= records[1].offset
+
+    def test_sizes_only(self, tmp_path):
+        """Test that payloads can be left out, keeping their size"""
+        log = CaptureLog(str(tmp_path), payloads=False)
+        log.record("sid-a", "send-chat-message", ({"message": "secret"},))
+
+        _, flags, records = _read(log)
+        assert flags == 0
+        assert records[0].kind == KIND_NONE
+        assert records[0].size == len('[{"message":"secret"}]')
+        assert records[0].args() is None
+
+    def test_torn_tail_ignored(self):
+        """Test that a partially written last record is skipped"""
+        log = b"RTCL\x01\x00\x01\x00" + b"\x00" * 8
+        log += encode_record(0.5, "sid", "join", 1, 2, b"[]")
+        torn = encode_record(0.6, "sid", "leave", 1, 2, b"[]")[:-4]
+
+        assert [r.event for r in read_capture(log + torn)[2]] == ["join"]
+
+    def test_sampling_is_per_socket(self):
+        """Test that a socket is either always or never sampled, near the rate"""
+        sids = [f"sid-{i}" for i in range(10000)]
+        chosen = [sid for sid in sids if sampled(sid, 0.1)]
+
+        assert 800 < len(chosen) < 1200
+        assert all(sampled(sid, 0.1) for sid in chosen)
+
+
+@pytest.mark.socket
+class TestCaptureHook:
+    """Test that inbound events reach the capture log"""
+
+    @pytest.fixture
+    def capturing(self, tmp_path):
+        handlers = dict(socketio.server.handlers["/"])
+        log = CaptureLog(str(tmp_path))
+        with patch("server.capture_log", log), patch(
+            "server.active_connections", ConnectionTable()
+        ), patch("server.resume_tokens", {}):
+            server._install_capture()
+            yield log
+        socketio.server.handlers["/"] = handlers
+
+    def test_events_captured(self, capturing, mock_db):
+        """Test that connect, events and disconnect are recorded in order"""
+        with patch("server.participants_collection", mock_db["participants"]):
+            client = socketio.test_client(app)
+            client.emit("join", {"room": "room1", "userId": "alice"})
+            client.emit("signal-relay", pack_envelope(RELAY_OFFER, "peer", b"sdp"))
+            client.disconnect()
+
+        records = _read(capturing)[2]
+        assert [r.event for r in records] == ["connect", "join", "signal-relay", "disconnect"]
+        assert len({r.sid for r in records}) == 1
+        assert records[1].args() == [{"room": "room1", "userId": "alice"}]
+
+
+class FakeTarget:
+    def __init__(self):
+        self.sent = []
+        self.count = 0
+
+    def connect(self):
+        self.count += 1
+        return f"client-{self.count}", f"new-{self.count}"
+
+    def emit(self, client, event, args):
+        self.sent.append((client, event, args))
+
+    def disconnect(self, client):
+        self.sent.append((client, "disconnect", None))
+
+
+@pytest.mark.unit
+class TestReplay:
+    """Test the replay driver"""
+
+    def test_replay_maps_socket_ids(self, tmp_path):
+        """Test that captured sids in payloads and envelopes point at the replaying clients"""
+        log = CaptureLog(str(tmp_path))
+        log.record("old-a", "connect")
+        log.record("old-b", "connect")
+        log.record("old-a", "offer", ({"targetSocket": "old-b", "offer": {}},))
+        log.record("old-a", "signal-relay", (pack_envelope(RELAY_OFFER, "old-b", b"x"),))
+        log.record("old-b", "disconnect")
+        log.close()
+
+        target = FakeTarget()
+        elapsed, latencies, skipped = replay(load_records([log.path]), target, None)
+
+        assert target.sent[0] == ("client-1", "offer", [{"targetSocket": "new-2", "offer": {}}])
+        assert unpack_envelope(target.sent[1][2][0])[1] == "new-2"
+        assert target.sent[2] == ("client-2", "disconnect", None)
+        assert len(latencies["offer"]) == 1 and len(latencies["connect"]) == 2
+        assert skipped == 0
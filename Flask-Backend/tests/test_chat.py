@@ -0,0 +1,93 @@
+"""
+Unit tests for idempotent chat delivery
+Tests the per-room id LRU and that retried messages are broadcast once
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from chat import MessageDeduper
+from connections import ConnectionTable
+from server import app, socketio
+
+
+def _message(message_id, room="room1"):
+    return {
+        "room": room,
+        "id": message_id,
+        "userId": "alice",
+        "username": "alice",
+        "message": f"message {message_id}",
+        "timestamp": "2024-01-01T12:00:00Z",
+    }
+
+
+@pytest.mark.unit
+class TestMessageDeduper:
+    """Test the bounded per-room id sets"""
+
+    def test_duplicates_detected_per_room(self):
+        """Test that an id is delivered once per room"""
+        deduper = MessageDeduper()
+
+        assert deduper.first_delivery("room1", "m1")
+        assert not deduper.first_delivery("room1", "m1")
+        assert deduper.first_delivery("room2", "m1")
+        assert deduper.first_delivery("room1", None)
+        assert deduper.first_delivery("room1", None)
+        assert deduper.duplicates == 1
+
+    def test_bounded_lru(self):
+        """Test that only the most recently seen ids are kept"""
+        deduper = MessageDeduper(per_room=3)
+        for message_id in ("m1", "m2", "m3"):
+            deduper.first_delivery("room1", message_id)
+        # A retry refreshes m1, so m2 is the one evicted
+        deduper.first_delivery("room1", "m1")
+        deduper.first_delivery("room1", "m4")
+
+        assert not deduper.first_delivery("room1", "m1")
+        assert deduper.first_delivery("room1", "m2")
+
+    def test_forget_allows_resend(self):
+        """Test that an undelivered id can be sent again"""
+        deduper = MessageDeduper()
+        deduper.first_delivery("room1", "m1")
+        deduper.forget("room1", "m1")
+
+        assert deduper.first_delivery("room1", "m1")
+
+
+@pytest.mark.socket
+class TestChatRetries:
+    """Test that retried chat messages do not fan out again"""
+
+    def test_retry_flood_broadcasts_once_per_id(self):
+        """Test that a flood of retries gives one chat-message per unique id"""
+        with patch("server.chat_deduper", MessageDeduper()), patch(
+            "server.active_connections", ConnectionTable()
+        ), patch("server.resume_tokens", {}):
+            sender = socketio.test_client(app)
+            listener = socketio.test_client(app)
+            sender.emit("join", {"room": "room1", "userId": "alice"})
+            listener.emit("join", {"room": "room1", "userId": "bob"})
+            sender.get_received()
+            listener.get_received()
+
+            ids = [f"m{i}" for i in range(20)]
+            for attempt in range(10):
+                for message_id in ids:
+                    sender.emit("send-chat-message", _message(message_id))
+
+            delivered = [e["args"][0]["id"] for e in listener.get_received()]
+            assert sorted(delivered) == sorted(ids)
+
+            received = sender.get_received()
+            acks = [e["args"][0] for e in received if e["name"] == "chat-ack"]
+            assert len(acks) == 20 * 9
+            assert all(ack["duplicate"] for ack in acks)
+            assert len([e for e in received if e["name"] == "chat-message"]) == 20
+
+            sender.disconnect()
+            listener.disconnect()
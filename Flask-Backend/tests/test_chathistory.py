@@ -0,0 +1,232 @@
+"""
+Unit tests for chat history and search
+Tests the posting-list index, batched persistence, pagination and the search endpoint
+"""
+
+from unittest.mock import MagicMock, patch
+
+import mongomock
+import pytest
+from bson.objectid import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from chathistory import MONGO, ChatHistory, PostingIndex, tokenize
+from connections import ConnectionTable
+from server import app, socketio
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()["test_meeting_app"]["chat_messages"]
+
+
+def _chat(message_id, text, user="alice"):
+    return {
+        "id": message_id,
+        "userId": user,
+        "username": user,
+        "message": text,
+        "timestamp": "2024-01-01T12:00:00Z",
+    }
+
+
+@pytest.mark.unit
+class TestPostingIndex:
+    """Test the in-process inverted index"""
+
+    def test_tokenize(self):
+        """Test that words are lower-cased and de-duplicated"""
+        assert tokenize("Deploy the build, then DEPLOY again!") == [
+            "deploy",
+            "the",
+            "build",
+            "then",
+            "again",
+        ]
+
+    def test_all_terms_newest_first(self):
+        """Test that a query matches messages holding every term, newest first"""
+        index = PostingIndex()
+        for doc_id, text in enumerate(
+            ["release notes", "the release is out", "notes on the release", "lunch?"]
+        ):
+            index.add(doc_id, text)
+
+        assert index.search(["release"], 10) == [2, 1, 0]
+        assert index.search(["release", "notes"], 10) == [2, 0]
+        assert index.search(["release", "pizza"], 10) == []
+
+    def test_pages_below_cursor(self):
+        """Test that a search continues below the last message of the previous page"""
+        index = PostingIndex()
+        for doc_id in range(10):
+            index.add(doc_id, f"standup update {doc_id}")
+
+        first = index.search(["standup"], 4)
+        second = index.search(["standup"], 4, before=first[-1])
+
+        assert first == [9, 8, 7, 6]
+        assert second == [5, 4, 3, 2]
+
+
+@pytest.mark.unit
+class TestChatHistory:
+    """Test batched persistence and search"""
+
+    def test_messages_written_in_one_batch(self, collection, scheduler):
+        """Test that messages are stored by the scheduled flush with one write"""
+        history = ChatHistory(collection, scheduler)
+        for i in range(5):
+            history.append("room1", _chat(f"m{i}", f"message {i}"))
+
+        assert collection.count_documents({}) == 0
+        assert len(scheduler.calls) == 1
+
+        with patch.object(collection, "insert_many", wraps=collection.insert_many) as insert:
+            scheduler.run_all()
+        assert insert.call_count == 1
+        assert collection.count_documents({"meetingId": "room1"}) == 5
+
+    def test_search_pagination(self, collection, scheduler):
+        """Test that results come newest first with a cursor for the next page"""
+        history = ChatHistory(collection, scheduler)
+        for i in range(5):
+            history.append("room1", _chat(f"m{i}", f"agenda item {i}"))
+        history.append("room2", _chat("other", "agenda elsewhere"))
+        scheduler.run_all()
+
+        page, cursor = history.search("room1", "Agenda", limit=2)
+        assert [m["id"] for m in page] == ["m4", "m3"]
+        page, cursor = history.search("room1", "agenda", limit=2, before=cursor)
+        assert [m["id"] for m in page] == ["m2", "m1"]
+        page, cursor = history.search("room1", "agenda", limit=2, before=cursor)
+        assert [m["id"] for m in page] == ["m0"] and cursor is None
+
+    def test_index_loaded_then_extended(self, collection, scheduler):
+        """Test that stored history is indexed on first search and new messages after flushes"""
+        earlier = ChatHistory(collection, scheduler)
+        earlier.append("room1", _chat("old", "budget review"))
+        scheduler.run_all()
+
+        history = ChatHistory(collection, scheduler)
+        assert [m["id"] for m in history.search("room1", "budget")[0]] == ["old"]
+
+        history.append("room1", _chat("new", "budget approved"))
+        assert [m["id"] for m in history.search("room1", "budget")[0]] == ["old"]
+        scheduler.run_all()
+        assert [m["id"] for m in history.search("room1", "budget")[0]] == ["new", "old"]
+
+    def test_failed_batch_requeued(self, collection, scheduler):
+        """Test that a batch whose write fails is stored by the next flush"""
+        history = ChatHistory(collection, scheduler)
+        history.append("room1", _chat("m0", "retry me"))
+        with patch.object(collection, "insert_many", side_effect=AutoReconnect("down")):
+            scheduler.run_all()
+        assert collection.count_documents({}) == 0
+        assert len(scheduler.calls) == 1
+
+        history.append("room1", _chat("m1", "retry me too"))
+        scheduler.run_all()
+        assert [m["id"] for m in history.search("room1", "retry")[0]] == ["m1", "m0"]
+
+    def test_partial_batch_failure(self, collection, scheduler):
+        """Test that only the rejected messages of a batch are retried"""
+        history = ChatHistory(collection, scheduler, max_pending=1)
+        for i in range(3):
+            history.append("room1", _chat(f"m{i}", f"message {i}"))
+        collection.insert_one(dict(history._pending[0]))
+        errors = {
+            "writeErrors": [{"index": 0, "code": 11000}, {"index": 1, "code": 121}],
+        }
+        with patch.object(collection, "insert_many", side_effect=BulkWriteError(errors)):
+            scheduler.run_all()
+
+        assert history.stored == 2
+        assert [doc["messageId"] for doc in history._pending] == ["m1"]
+
+        history._requeue([history._pending[0]])
+        assert len(history._pending) == 1 and history.dropped == 1
+
+    def test_non_text_messages_skipped(self, collection, scheduler):
+        """Test that only text is stored and stored non-text does not break search"""
+        collection.insert_one({"meetingId": "room1", "message": {"text": "hi"}})
+        history = ChatHistory(collection, scheduler)
+        history.append("room1", _chat("m0", ["hello"]))
+        history.append("room1", _chat("m1", "hello"))
+        scheduler.run_all()
+
+        assert collection.count_documents({}) == 2
+        assert [m["id"] for m in history.search("room1", "hello")[0]] == ["m1"]
+
+    def test_invalid_cursor(self, collection, scheduler):
+        """Test that a cursor from elsewhere is rejected"""
+        history = ChatHistory(collection, scheduler)
+        with pytest.raises(ValueError):
+            history.search("room1", "agenda", before="not-a-cursor")
+
+    def test_text_index_query(self, scheduler):
+        """Test that the MongoDB backend requires every term within the meeting"""
+        collection = MagicMock()
+        history = ChatHistory(collection, scheduler, backend=MONGO)
+        cursor = str(ObjectId())
+
+        history.search("room1", "release notes", limit=10, before=cursor)
+
+        query = collection.find.call_args[0][0]
+        assert query["meetingId"] == "room1"
+        assert query["$text"] == {"$search": '"release" "notes"'}
+        assert query["_id"] == {"$lt": ObjectId(cursor)}
+        collection.find.return_value.sort.assert_called_once_with("_id", -1)
+
+
+@pytest.mark.api
+class TestChatSearchAPI:
+    """Test the chat search endpoint"""
+
+    @pytest.fixture
+    def room(self, mock_db):
+        """An active meeting that alice has joined"""
+        room = str(mock_db["meetings"].insert_one({"hostId": "alice", "active": True}).inserted_id)
+        mock_db["participants"].insert_one({"meetingId": room, "userId": "alice"})
+        with patch("server.meetings_collection", mock_db["meetings"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ):
+            yield room
+
+    def test_search_sent_messages(self, client, collection, scheduler, room):
+        """Test that broadcast messages become searchable after the flush"""
+        history = ChatHistory(collection, scheduler)
+        url = f"/api/meetings/{room}/chat/search?userId=alice&q=slides"
+        with patch("server.chat_history", history), patch(
+            "server.active_connections", ConnectionTable()
+        ), patch("server.resume_tokens", {}):
+            sender = socketio.test_client(app)
+            for i, text in enumerate(["Slides are up", "see the slides", "thanks"]):
+                sender.emit("send-chat-message", {"room": room, **_chat(f"m{i}", text)})
+            sender.disconnect()
+            scheduler.run_all()
+
+            response = client.get(f"{url}&limit=1")
+            assert response.status_code == 200
+            assert [m["message"] for m in response.json["messages"]] == ["see the slides"]
+
+            cursor = response.json["next"]
+            response = client.get(f"{url}&before={cursor}")
+            assert [m["id"] for m in response.json["messages"]] == ["m0"]
+            assert response.json["next"] is None
+
+    def test_search_validation(self, client, room):
+        """Test that a query is required and the limit and cursor are checked"""
+        url = f"/api/meetings/{room}/chat/search?userId=alice"
+        assert client.get(url).status_code == 400
+        assert client.get(f"{url}&q=a&limit=500").status_code == 400
+        with patch("server.chat_history", ChatHistory(MagicMock(), MagicMock())):
+            response = client.get(f"{url}&q=a&before=x")
+        assert response.status_code == 400
+
+    def test_search_needs_a_participant(self, client, room):
+        """Test that only participants of the meeting can search its chat"""
+        url = f"/api/meetings/{room}/chat/search?q=slides"
+        assert client.get(url).status_code == 400
+        assert client.get(f"{url}&userId=mallory").status_code == 403
+        assert client.get("/api/meetings/room1/chat/search?q=a&userId=alice").status_code == 400
@@ -0,0 +1,75 @@
+"""
+Unit tests for compact connection records
+Tests the slot-backed record, its dict-style view and id interning
+"""
+
+import pytest
+
+from connections import ConnectionRecord, ConnectionTable, intern_id
+from webinar import ATTENDEE
+
+
+@pytest.mark.unit
+class TestConnectionRecord:
+    """Test the connection record used by active_connections"""
+
+    def test_dict_style_view(self):
+        """Test that records read and write through the old dict keys"""
+        record = ConnectionRecord("room1", "user1", "sid1", ATTENDEE)
+
+        assert record["room"] == "room1"
+        assert record["userId"] == "user1"
+        assert record["socketId"] == "sid1"
+        assert record.get("role") == ATTENDEE
+        assert record.get("resumeToken") is None
+        assert record.get("unknown", "default") == "default"
+
+        record["suspendedAt"] = 12.5
+        assert record.suspended_at == 12.5
+        with pytest.raises(KeyError):
+            record["unknown"]
+
+    def test_records_have_no_dict(self):
+        """Test that records are slot-only and reject unknown attributes"""
+        record = ConnectionRecord("room1", "user1", "sid1")
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.extra = 1
+
+    def test_ids_are_interned(self):
+        """Test that equal room and user ids decoded separately share one object"""
+        room_a = "".join(["meeting-", "abc"])
+        room_b = "".join(["meeting-", "abc"])
+        assert room_a is not room_b
+
+        first = ConnectionRecord(room_a, "u1", "sid1")
+        second = ConnectionRecord(room_b, "u1", "sid2")
+        assert first.room is second.room
+        assert intern_id(None) is None
+
+
+@pytest.mark.unit
+class TestConnectionTable:
+    """Test the connection table and its per-room index"""
+
+    def test_room_index_follows_changes(self):
+        """Test that set, replace, del, pop and clear keep the room index in step"""
+        table = ConnectionTable({"sid1": ConnectionRecord("room1", "user1", "sid1")})
+        table["sid2"] = ConnectionRecord("room1", "user2", "sid2")
+        table["sid3"] = ConnectionRecord("room2", "user3", "sid3")
+        assert list(table.in_room("room1")) == ["sid1", "sid2"]
+        assert table.room_size("room2") == 1
+
+        # A socket that joins another room moves between the indexes
+        table["sid1"] = ConnectionRecord("room2", "user1", "sid1")
+        assert list(table.in_room("room1")) == ["sid2"]
+        assert list(table.in_room("room2")) == ["sid3", "sid1"]
+
+        del table["sid2"]
+        assert table.pop("sid3")["userId"] == "user3"
+        assert table.pop("missing", None) is None
+        assert table.room_size("room1") == 0 and dict(table.in_room("room1")) == {}
+        assert table.rooms() == ["room2"]
+
+        table.clear()
+        assert table == {} and table.room_size("room2") == 0
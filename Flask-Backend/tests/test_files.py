@@ -0,0 +1,232 @@
+"""
+Unit tests for chat file sharing
+Tests chunked resumable uploads, the file-shared event and ranged downloads
+"""
+
+import io
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from connections import ConnectionTable
+from files import FileStore, UploadError
+from server import app, socketio
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FileStore(str(tmp_path), max_size=1 << 20, chunk_size=4096, buffer_size=1000)
+    with patch("server.file_store", store):
+        yield store
+
+
+@pytest.fixture
+def room(mock_db):
+    """An active meeting that alice has joined"""
+    room = str(mock_db["meetings"].insert_one({"hostId": "alice", "active": True}).inserted_id)
+    mock_db["participants"].insert_one({"meetingId": room, "userId": "alice"})
+    with patch("server.meetings_collection", mock_db["meetings"]), patch(
+        "server.participants_collection", mock_db["participants"]
+    ):
+        yield room
+
+
+def _start(client, room, size=len(DATA), name="notes.bin", user="alice"):
+    return client.post(
+        f"/api/meetings/{room}/files",
+        json={"userId": user, "username": user, "name": name, "size": size},
+    )
+
+
+def _put(client, room, file_id, offset, chunk, user="alice"):
+    return client.put(
+        f"/api/meetings/{room}/files/{file_id}/upload?offset={offset}&userId={user}",
+        data=chunk,
+        content_type="application/octet-stream",
+    )
+
+
+@pytest.mark.unit
+class TestFileStore:
+    """Test the on-disk upload store"""
+
+    def test_short_stream_resumes_from_received_bytes(self, tmp_path):
+        """Test that bytes from an interrupted chunk are kept and the offset moves on"""
+        store = FileStore(str(tmp_path), buffer_size=7)
+        meta = store.start("room1", "alice", "a.bin", 100)
+
+        # The client promised 50 bytes but the connection dropped after 30
+        received, _ = store.write_chunk("room1", meta["fileId"], 0, io.BytesIO(b"x" * 30), 50)
+        assert received == 30
+        assert store.offset("room1", meta["fileId"]) == 30
+
+        received, meta = store.write_chunk("room1", meta["fileId"], 30, io.BytesIO(b"y" * 70), 70)
+        assert received == 100 and meta["complete"]
+        path, _ = store.file_path("room1", meta["fileId"])
+        with open(path, "rb") as f:
+            assert f.read() == b"x" * 30 + b"y" * 70
+
+    def test_rejects_bad_requests(self, tmp_path):
+        """Test size limits, offset mismatches and path-like ids"""
+        store = FileStore(str(tmp_path), max_size=100, chunk_size=10)
+        with pytest.raises(UploadError) as error:
+            store.start("room1", "alice", "big.bin", 101)
+        assert error.value.status == 413
+
+        meta = store.start("room1", "alice", "../../etc/passwd", 20)
+        assert meta["name"] == "passwd"
+        with pytest.raises(UploadError) as error:
+            store.write_chunk("room1", meta["fileId"], 5, io.BytesIO(b"x" * 5), 5)
+        assert error.value.status == 409 and error.value.offset == 0
+        with pytest.raises(UploadError) as error:
+            store.write_chunk("room1", meta["fileId"], 0, io.BytesIO(b"x" * 11), 11)
+        assert error.value.status == 413
+        with pytest.raises(UploadError) as error:
+            store.metadata("room1", "../" + meta["fileId"])
+        assert error.value.status == 404
+        assert sorted(os.listdir(tmp_path / "room1")) == [
+            meta["fileId"] + ".json",
+            meta["fileId"] + ".part",
+        ]
+
+    def test_quotas(self, tmp_path):
+        """Test that declared sizes count against the meeting's and each user's quota"""
+        store = FileStore(str(tmp_path), meeting_quota=100, user_quota=60)
+        store.start("room1", "alice", "a.bin", 40)
+        with pytest.raises(UploadError) as error:
+            store.start("room1", "alice", "b.bin", 30)
+        assert error.value.status == 413
+
+        store.start("room1", "bob", "b.bin", 60)
+        with pytest.raises(UploadError):
+            store.start("room1", "carol", "c.bin", 1)
+        store.start("room2", "carol", "c.bin", 60)
+
+    def test_stale_uploads_and_ended_meetings_removed(self, tmp_path):
+        """Test that abandoned uploads are swept and a discarded meeting loses its files"""
+        store = FileStore(str(tmp_path))
+        stale = store.start("room1", "alice", "a.bin", 10)
+        fresh = store.start("room1", "alice", "b.bin", 10)
+        done = store.start("room1", "alice", "c.bin", 0)
+        old = time.time() - 120
+        os.utime(tmp_path / "room1" / (stale["fileId"] + ".part"), (old, old))
+
+        assert store.expire_stale(60) == 1
+        with pytest.raises(UploadError):
+            store.metadata("room1", stale["fileId"])
+        assert store.offset("room1", fresh["fileId"]) == 0
+        assert store.file_path("room1", done["fileId"])
+
+        store.discard("room1")
+        store.discard("../room1")
+        assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.api
+class TestFileSharingAPI:
+    """Test the upload and download endpoints"""
+
+    def test_upload_share_and_download(self, client, store, room):
+        """Test a chunked upload that is announced to the room and downloaded by range"""
+        with patch("server.active_connections", ConnectionTable()), patch(
+            "server.resume_tokens", {}
+        ):
+            listener = socketio.test_client(app)
+            listener.emit("join", {"room": room, "userId": "bob"})
+            listener.get_received()
+
+            response = _start(client, room)
+            assert response.status_code == 201
+            file_id = response.json["fileId"]
+            assert response.json["chunkSize"] == 4096
+
+            for offset in range(0, len(DATA), 4096):
+                response = _put(client, room, file_id, offset, DATA[offset : offset + 4096])
+                assert response.status_code == 200
+            assert response.json == {"offset": len(DATA), "complete": True}
+
+            shared = [e for e in listener.get_received() if e["name"] == "file-shared"]
+            listener.disconnect()
+
+        assert len(shared) == 1
+        event = shared[0]["args"][0]
+        assert event["name"] == "notes.bin" and event["size"] == len(DATA)
+        assert event["url"] == f"/api/meetings/{room}/files/{file_id}"
+
+        response = client.get(event["url"] + "?userId=alice")
+        assert response.status_code == 200
+        assert response.data == DATA
+        assert "attachment" in response.headers["Content-Disposition"]
+
+        response = client.get(event["url"] + "?userId=alice", headers={"Range": "bytes=1000-1999"})
+        assert response.status_code == 206
+        assert response.data == DATA[1000:2000]
+        assert response.headers["Content-Range"] == f"bytes 1000-1999/{len(DATA)}"
+
+    def test_resume_after_interruption(self, client, store, room):
+        """Test that a client can ask where an upload stands and carry on"""
+        file_id = _start(client, room).json["fileId"]
+        _put(client, room, file_id, 0, DATA[:4096])
+
+        # A retry of the same chunk is told where the upload really is
+        response = _put(client, room, file_id, 0, DATA[:4096])
+        assert response.status_code == 409
+        assert response.json["offset"] == 4096
+
+        status = client.get(f"/api/meetings/{room}/files/{file_id}/upload?userId=alice").json
+        assert status == {"offset": 4096, "size": len(DATA), "complete": False}
+
+        response = client.get(f"/api/meetings/{room}/files/{file_id}?userId=alice")
+        assert response.status_code == 409
+
+    def test_upload_validation(self, client, store, room):
+        """Test that the user, file size and offset are required"""
+        response = client.post(f"/api/meetings/{room}/files", json={"name": "a.bin", "size": 1})
+        assert response.status_code == 400
+        assert _start(client, room, size=2 << 20).status_code == 413
+        file_id = _start(client, room).json["fileId"]
+        response = client.put(
+            f"/api/meetings/{room}/files/{file_id}/upload?userId=alice", data=b"x"
+        )
+        assert response.status_code == 400
+        assert client.get(f"/api/meetings/{room}/files/missing?userId=alice").status_code == 404
+
+    def test_uploads_need_a_participant_of_a_live_meeting(self, client, store, room, mock_db):
+        """Test that outsiders and ended meetings cannot upload"""
+        assert _start(client, room, user="mallory").status_code == 403
+        assert _start(client, "room1").status_code == 400
+
+        mock_db["meetings"].update_many({}, {"$set": {"active": False}})
+        assert _start(client, room).status_code == 400
+
+    def test_files_need_a_participant(self, client, store, room, mock_db):
+        """Test that only participants read files and only the uploader writes them"""
+        mock_db["participants"].insert_one({"meetingId": room, "userId": "bob"})
+        file_id = _start(client, room, size=4096).json["fileId"]
+        url = f"/api/meetings/{room}/files/{file_id}"
+
+        assert _put(client, room, file_id, 0, DATA[:4096], user="bob").status_code == 403
+        assert _put(client, room, file_id, 0, DATA[:4096], user="mallory").status_code == 403
+        assert client.get(f"{url}/upload?userId=bob").status_code == 403
+        assert client.get(f"{url}/upload").status_code == 400
+        assert _put(client, room, file_id, 0, DATA[:4096]).status_code == 200
+
+        assert client.get(url).status_code == 400
+        assert client.get(f"{url}?userId=mallory").status_code == 403
+        response = client.get(f"{url}?userId=bob")
+        assert response.status_code == 200 and response.data == DATA[:4096]
+
+    def test_ending_the_meeting_deletes_its_files(self, client, store, room, tmp_path):
+        """Test that a meeting's uploads are removed when the host ends it"""
+        file_id = _start(client, room).json["fileId"]
+        assert os.path.isdir(tmp_path / room)
+
+        response = client.post(f"/api/meetings/{room}/end", json={"userId": "alice"})
+        assert response.status_code == 200
+        assert not os.path.exists(tmp_path / room)
+        response = client.get(f"/api/meetings/{room}/files/{file_id}/upload?userId=alice")
+        assert response.status_code == 400
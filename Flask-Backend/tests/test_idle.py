@@ -0,0 +1,246 @@
+"""
+Unit tests for the idle meeting collector
+Tests the idle room heap and ending abandoned meetings in bulk
+"""
+
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+import server
+from connections import ConnectionTable
+from idle import IdleRooms
+from server import app, socketio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestIdleRooms:
+    """Test the heap of rooms without live sockets"""
+
+    def test_rooms_expire_after_ttl(self):
+        """Test that only rooms idle for longer than the TTL are returned"""
+        clock = Clock()
+        rooms = IdleRooms(60, clock=clock)
+        rooms.idle("a")
+        clock.now += 30
+        rooms.idle("b")
+
+        assert rooms.expired() == []
+        clock.now += 30
+        assert rooms.expired() == ["a"]
+        clock.now += 30
+        assert rooms.expired() == ["b"]
+        assert len(rooms) == 0
+
+    def test_active_room_not_expired(self):
+        """Test that a room someone rejoined is skipped, and restarts its TTL when empty"""
+        clock = Clock()
+        rooms = IdleRooms(60, clock=clock)
+        rooms.idle("a")
+        clock.now += 30
+        rooms.active("a")
+        clock.now += 10
+        rooms.idle("a")
+
+        clock.now += 30
+        assert rooms.expired() == []
+        clock.now += 30
+        assert rooms.expired() == ["a"]
+
+    def test_stale_heap_entries_compacted(self):
+        """Test that rooms flapping between idle and active do not grow the heap"""
+        rooms = IdleRooms(60, clock=Clock())
+        for _ in range(1000):
+            rooms.idle("a")
+            rooms.active("a")
+        rooms.idle("a")
+
+        assert len(rooms._heap) <= 2 * len(rooms) + 65
+
+
+@pytest.mark.socket
+class TestIdleMeetingCollector:
+    """Test that abandoned meetings are ended and their state freed"""
+
+    @pytest.fixture
+    def collector(self, mock_db, scheduler):
+        clock = Clock()
+        meetings = MagicMock(wraps=mock_db["meetings"])
+        with patch("server.meetings_collection", meetings), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.users_collection", mock_db["users"]), patch(
+            "server.active_connections", ConnectionTable()
+        ), patch(
+            "server.resume_tokens", {}
+        ), patch(
+            "server.meeting_settings", {}
+        ), patch(
+            "server.idle_rooms", IdleRooms(60, clock=clock)
+        ), patch(
+            "server._schedule", scheduler
+        ):
+            yield meetings, clock
+
+    def _meeting(self, meetings):
+        return str(
+            meetings.insert_one(
+                {"hostId": "host", "active": True, "createdAt": datetime.now()}
+            ).inserted_id
+        )
+
+    def test_abandoned_meetings_ended_in_bulk(self, client, collector):
+        """Test that meetings nobody joined are ended with a single update_many"""
+        meetings, clock = collector
+        ids = [
+            client.post("/api/meetings", json={"hostId": "host"}).get_json()["meetingId"]
+            for _ in range(3)
+        ]
+        assert all(room in server.idle_rooms for room in ids)
+
+        clock.now += 61
+        server._collect_idle_meetings()
+
+        assert meetings.update_many.call_count == 1
+        assert meetings.update_one.call_count == 0
+        assert meetings.count_documents({"active": True}) == 0
+        assert meetings.find_one({})["endedReason"] == "idle"
+        assert server.meeting_settings == {}
+
+    def test_live_meeting_kept_until_empty(self, collector):
+        """Test that a meeting is only collected once its last socket has left"""
+        meetings, clock = collector
+        room = self._meeting(meetings)
+        server.idle_rooms.idle(room)
+
+        client = socketio.test_client(app)
+        client.emit("join", {"room": room, "userId": "host"})
+        clock.now += 120
+        server._collect_idle_meetings()
+        assert meetings.find_one({})["active"] is True
+
+        client.emit("leave", {"room": room, "userId": "host"})
+        clock.now += 61
+        server._collect_idle_meetings()
+        assert meetings.find_one({})["active"] is False
+        client.disconnect()
+
+    def test_stragglers_notified(self, collector):
+        """Test that sockets still in the room get meeting-ended"""
+        meetings, clock = collector
+        room = self._meeting(meetings)
+        client = socketio.test_client(app)
+        client.emit("join", {"room": room, "userId": "host"})
+        client.get_received()
+
+        # The connection record is lost but the socket is still in the room
+        server.active_connections.clear()
+        server.idle_rooms.idle(room)
+        clock.now += 61
+        server._collect_idle_meetings()
+
+        ended = [e["args"][0] for e in client.get_received() if e["name"] == "meeting-ended"]
+        assert ended == [{"meetingId": room, "reason": "idle"}]
+        client.disconnect()
+
+    def test_startup_seeds_orphaned_meetings(self, collector, scheduler):
+        """Test that active meetings left over from a previous process are tracked"""
+        meetings, _ = collector
+        room = self._meeting(meetings)
+
+        server.start_idle_gc()
+        assert room not in server.idle_rooms
+        assert scheduler.calls == [(0, server._collect_idle_meetings, (True, True))]
+
+        scheduler.run_all()
+        assert room in server.idle_rooms
+        assert scheduler.calls == [
+            (server.IDLE_GC_INTERVAL, server._collect_idle_meetings, (True, False))
+        ]
+
+    def test_database_errors_retried(self, collector, scheduler):
+        """Test that a failed pass keeps the collector going and its rooms tracked"""
+        meetings, clock = collector
+        room = self._meeting(meetings)
+        meetings.find.side_effect = ServerSelectionTimeoutError("down")
+
+        server.start_idle_gc()
+        scheduler.run_all()
+        assert room not in server.idle_rooms
+        # The seed is retried on the next pass
+        assert scheduler.calls[0][2] == (True, True)
+
+        meetings.find.side_effect = None
+        scheduler.run_all()
+        assert room in server.idle_rooms
+
+        meetings.update_many.side_effect = ServerSelectionTimeoutError("down")
+        clock.now += 61
+        scheduler.run_all()
+        assert meetings.update_many.call_count == 1
+        assert room in server.idle_rooms
+        assert meetings.find_one({})["active"] is True
+
+        meetings.update_many.side_effect = None
+        scheduler.run_all()
+        assert meetings.find_one({})["active"] is False
+        assert room not in server.idle_rooms
+        assert len(scheduler.calls) == 1
+
+    def test_meeting_in_use_elsewhere_kept(self, collector):
+        """Test that a meeting stamped by another process waits for its stamp to age out"""
+        meetings, clock = collector
+        room = self._meeting(meetings)
+        meetings.update_one({}, {"$set": {"lastActivity": datetime.fromtimestamp(clock.now + 30)}})
+        server.idle_rooms.idle(room)
+
+        clock.now += 61
+        server._collect_idle_meetings()
+        assert meetings.find_one({})["active"] is True
+        assert room in server.idle_rooms
+
+        clock.now += 30
+        server._collect_idle_meetings()
+        assert meetings.find_one({})["active"] is False
+
+    def test_live_meetings_stamped(self, collector):
+        """Test that each pass stamps lastActivity on meetings with sockets here"""
+        meetings, clock = collector
+        room = self._meeting(meetings)
+        client = socketio.test_client(app)
+        client.emit("join", {"room": room, "userId": "host"})
+
+        server._collect_idle_meetings()
+        assert meetings.find_one({})["lastActivity"] == datetime.fromtimestamp(clock.now)
+        client.disconnect()
+
+    def test_startup_seeds_from_last_activity(self, collector, scheduler):
+        """Test that a restarted process counts idleness from the shared stamp"""
+        meetings, clock = collector
+        room = self._meeting(meetings)
+        meetings.update_one({}, {"$set": {"lastActivity": datetime.fromtimestamp(clock.now - 50)}})
+
+        server.start_idle_gc()
+        scheduler.run_all()
+        clock.now += 11
+        assert server.idle_rooms.expired() == [room]
+
+    def test_ended_meeting_released(self, client, collector):
+        """Test that ending a meeting frees its in-memory state"""
+        response = client.post("/api/meetings", json={"hostId": "host"})
+        room = response.get_json()["meetingId"]
+        assert room in server.meeting_settings
+
+        response = client.post(f"/api/meetings/{room}/end", json={"userId": "host"})
+        assert response.status_code == 200
+        assert room not in server.meeting_settings
+        assert room not in server.idle_rooms
@@ -0,0 +1,154 @@
+"""
+Unit tests for reactions, raised hands and polls
+Tests the hand queue, incremental poll tallies and tick-aggregated broadcasts
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from connections import ConnectionTable
+from interactions import HandQueue, InteractionError, Interactions
+from server import app, socketio
+
+
+@pytest.mark.unit
+class TestHandQueue:
+    """Test the raise-ordered hand queue"""
+
+    def test_hands_come_out_in_raise_order(self):
+        """Test that lowered hands are skipped and the rest keep their order"""
+        hands = HandQueue()
+        for user in ("alice", "bob", "carol", "dave"):
+            hands.raise_hand(user)
+        assert not hands.raise_hand("alice")
+        hands.lower("bob")
+
+        assert hands.first(2) == ["alice", "carol"]
+        assert [hands.next(), hands.next(), hands.next(), hands.next()] == [
+            "alice",
+            "carol",
+            "dave",
+            None,
+        ]
+
+    def test_stale_entries_compacted(self):
+        """Test that raising and lowering again and again does not grow the heap"""
+        hands = HandQueue()
+        hands.raise_hand("alice")
+        for _ in range(1000):
+            hands.raise_hand("bob")
+            hands.lower("bob")
+
+        assert len(hands) == 1
+        assert len(hands._heap) <= 2 * len(hands) + 65
+
+
+@pytest.mark.unit
+class TestInteractions:
+    """Test the per-room tallies and their tick"""
+
+    def test_one_packet_per_tick(self, scheduler):
+        """Test that many clicks in a tick produce one aggregated packet per room"""
+        emit = MagicMock()
+        rooms = Interactions(emit, scheduler)
+        for _ in range(100):
+            rooms.react("room1", "👍")
+        rooms.react("room1", "🎉")
+        rooms.raise_hand("room1", "alice")
+        rooms.raise_hand("room1", "bob")
+        rooms.react("room2", "👏")
+
+        assert len(scheduler.calls) == 2
+        scheduler.run_all()
+
+        assert emit.call_count == 2
+        room, payload = emit.call_args_list[0][0]
+        assert room == "room1"
+        assert payload == {
+            "reactions": {"👍": 100, "🎉": 1},
+            "hands": {"queue": ["alice", "bob"], "count": 2},
+        }
+
+        # Nothing changed: no tick and no packet
+        scheduler.run_all()
+        assert emit.call_count == 2
+
+    def test_votes_tallied_incrementally(self, scheduler):
+        """Test that changing a vote moves it and repeating it changes nothing"""
+        emit = MagicMock()
+        rooms = Interactions(emit, scheduler)
+        poll = rooms.start_poll("room1", "Lunch?", ["Pizza", "Sushi"])
+
+        rooms.vote("room1", poll["pollId"], "alice", 0)
+        rooms.vote("room1", poll["pollId"], "bob", 0)
+        rooms.vote("room1", poll["pollId"], "bob", 1)
+        rooms.vote("room1", poll["pollId"], "bob", 1)
+        scheduler.run_all()
+
+        results = emit.call_args[0][1]["polls"][0]
+        assert results["counts"] == [1, 1] and results["total"] == 2
+
+        final = rooms.end_poll("room1", poll["pollId"])
+        assert final["open"] is False
+        with pytest.raises(InteractionError):
+            rooms.vote("room1", poll["pollId"], "carol", 0)
+
+    def test_invalid_input_rejected(self, scheduler):
+        """Test unknown reactions, bad polls and bad options"""
+        rooms = Interactions(MagicMock(), scheduler)
+        with pytest.raises(InteractionError):
+            rooms.react("room1", "<script>")
+        with pytest.raises(InteractionError):
+            rooms.start_poll("room1", "Only one?", ["Yes"])
+        poll = rooms.start_poll("room1", "Lunch?", ["Pizza", "Sushi"])
+        for option in (2, -1, "0", True):
+            with pytest.raises(InteractionError):
+                rooms.vote("room1", poll["pollId"], "alice", option)
+
+
+@pytest.mark.socket
+class TestInteractionEvents:
+    """Test the interaction socket events"""
+
+    def test_reactions_hands_and_polls(self, scheduler):
+        """Test that clicks reach the room as tick packets and the host runs the queue"""
+        rooms = Interactions(
+            lambda room, payload: socketio.emit("interactions", payload, to=room), scheduler
+        )
+        settings = {"type": "meeting", "hostId": "host", "presenters": frozenset()}
+        with patch("server.interactions", rooms), patch(
+            "server.meeting_settings", {"room1": settings}
+        ), patch("server.active_connections", ConnectionTable()), patch("server.resume_tokens", {}):
+            host = socketio.test_client(app)
+            guest = socketio.test_client(app)
+            host.emit("join", {"room": "room1", "userId": "host"})
+            guest.emit("join", {"room": "room1", "userId": "guest"})
+            host.get_received()
+            guest.get_received()
+
+            for _ in range(20):
+                guest.emit("send-reaction", {"reaction": "👏"})
+            guest.emit("raise-hand")
+            assert host.get_received() == []
+            scheduler.run_all()
+
+            packets = [e["args"][0] for e in host.get_received() if e["name"] == "interactions"]
+            assert packets == [{"reactions": {"👏": 20}, "hands": {"queue": ["guest"], "count": 1}}]
+            guest.get_received()
+
+            guest.emit("next-hand")
+            assert guest.get_received()[0]["name"] == "error"
+            host.emit("next-hand")
+            called = [e for e in guest.get_received() if e["name"] == "hand-called"]
+            assert called[0]["args"][0] == {"userId": "guest"}
+
+            host.emit("start-poll", {"question": "Ship it?", "options": ["Yes", "No"]})
+            poll = [e for e in guest.get_received() if e["name"] == "poll-started"][0]["args"][0]
+            guest.emit("poll-vote", {"pollId": poll["pollId"], "option": 0})
+            host.emit("end-poll", {"pollId": poll["pollId"]})
+            ended = [e for e in guest.get_received() if e["name"] == "poll-ended"][0]["args"][0]
+            assert ended["counts"] == [1, 0] and ended["open"] is False
+
+            host.disconnect()
+            guest.disconnect()
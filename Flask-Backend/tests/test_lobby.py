@@ -0,0 +1,158 @@
+"""
+Unit tests for the waiting room
+Tests the per-meeting waiting list, its host notifications and batched admission
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from connections import ConnectionTable
+from lobby import Lobby
+from notifications import MembershipNotifier
+from server import app, socketio
+
+
+@pytest.mark.unit
+class TestLobby:
+    """Test the waiting lists and their notifications"""
+
+    def test_arrivals_notified_once_per_interval(self, scheduler):
+        """Test that a join storm is one lobby-changed per interval, in arrival order"""
+        emit = MagicMock()
+        lobby = Lobby(emit, scheduler, shown=3)
+        positions = [lobby.wait("room1", f"sid-{i}", f"user-{i}") for i in range(5)]
+
+        assert positions == [1, 2, 3, 4, 5]
+        assert len(scheduler.calls) == 1
+        scheduler.run_all()
+
+        emit.assert_called_once()
+        room, payload = emit.call_args[0]
+        assert room == "room1"
+        assert payload["count"] == 5
+        assert [entry["userId"] for entry in payload["waiting"]] == ["user-0", "user-1", "user-2"]
+
+    def test_admit_deny_and_leave(self, scheduler):
+        """Test that admitted users are remembered and the others drop off the list"""
+        lobby = Lobby(MagicMock(), scheduler)
+        for i in range(4):
+            lobby.wait("room1", f"sid-{i}", f"user-{i}", signal_acks=i == 2)
+
+        assert lobby.leave("sid-0") == "room1"
+        assert lobby.deny("room1", "sid-1")["userId"] == "user-1"
+        assert lobby.deny("room1", "sid-1") is None
+
+        entries = lobby.admit("room1", ["sid-3", "sid-2", "sid-9"])
+        assert [entry["socketId"] for entry in entries] == ["sid-2", "sid-3"]
+        assert entries[0]["signalAcks"] is True
+        assert lobby.is_admitted("room1", "user-2")
+        assert not lobby.is_admitted("room1", "user-1")
+        assert lobby.state("room1") == {"count": 0, "waiting": []}
+
+        lobby.wait("room1", "sid-4", "user-4")
+        assert lobby.discard("room1") == ["sid-4"]
+        assert not lobby.is_admitted("room1", "user-2")
+        assert lobby.leave("sid-4") is None
+
+    def test_admitted_joins_announced_together(self, scheduler):
+        """Test that a large room gets one packet and the batch meets itself pairwise"""
+        emit = MagicMock()
+        notifier = MembershipNotifier(emit, scheduler)
+        entries = [{"userId": f"user-{i}", "socketId": f"sid-{i}"} for i in range(3)]
+
+        notifier.joined_many("room1", 20, entries, skip=["sid-attendee"])
+        notifier.joined_many("room1", 20, [])
+
+        skip = ["sid-0", "sid-1", "sid-2", "sid-attendee"]
+        assert [call[0] for call in emit.call_args_list] == [
+            ("participants-changed", {"added": entries, "removed": []}, "room1", skip),
+            ("participants-changed", {"added": entries[1:], "removed": []}, "sid-0", None),
+            ("participants-changed", {"added": entries[2:], "removed": []}, "sid-1", None),
+        ]
+
+    def test_admitted_joins_in_small_room(self, scheduler):
+        """Test that a small room keeps getting user-joined for admitted users"""
+        emit = MagicMock()
+        notifier = MembershipNotifier(emit, scheduler)
+        entries = [{"userId": f"user-{i}", "socketId": f"sid-{i}"} for i in range(2)]
+
+        notifier.joined_many("room1", 3, entries)
+
+        assert [call[0] for call in emit.call_args_list] == [
+            ("user-joined", entries[0], "room1", ["sid-0", "sid-1"]),
+            ("user-joined", entries[1], "room1", ["sid-0", "sid-1"]),
+            ("user-joined", entries[1], "sid-0", None),
+        ]
+
+
+@pytest.mark.socket
+class TestWaitingRoomEvents:
+    """Test the waiting room socket events"""
+
+    def test_host_admits_everyone_at_once(self, scheduler):
+        """Test that waiting guests are invisible until one admit brings them all in"""
+        lobby = Lobby(
+            lambda room, payload: socketio.emit("lobby-changed", payload, to=f"{room}:hosts"),
+            scheduler,
+        )
+        settings = {
+            "type": "meeting",
+            "hostId": "host",
+            "presenters": frozenset(),
+            "waitingRoom": True,
+        }
+        participants = MagicMock()
+        with patch("server.lobby", lobby), patch(
+            "server.meeting_settings", {"room1": settings}
+        ), patch("server.participants_collection", participants), patch(
+            "server.active_connections", ConnectionTable()
+        ), patch(
+            "server.resume_tokens", {}
+        ):
+            host = socketio.test_client(app)
+            host.emit("join", {"room": "room1", "userId": "host"})
+            host.get_received()
+
+            guests = [socketio.test_client(app) for _ in range(3)]
+            for i, guest in enumerate(guests):
+                guest.emit("join", {"room": "room1", "userId": f"guest-{i}"})
+                waiting = [e for e in guest.get_received() if e["name"] == "waiting-room"]
+                assert waiting[0]["args"][0] == {"room": "room1", "position": i + 1}
+            assert host.get_received() == []
+
+            scheduler.run_all()
+            changed = [e["args"][0] for e in host.get_received() if e["name"] == "lobby-changed"]
+            assert len(changed) == 1 and changed[0]["count"] == 3
+
+            guests[0].emit("admit", {"all": True})
+            assert guests[0].get_received()[0]["name"] == "error"
+
+            host.emit("admit", {"all": True})
+            participants.bulk_write.assert_called_once()
+            assert len(participants.bulk_write.call_args[0][0]) == 3
+
+            joined = [
+                e["args"][0]["userId"] for e in host.get_received() if e["name"] == "user-joined"
+            ]
+            assert joined == ["guest-0", "guest-1", "guest-2"]
+            for i, guest in enumerate(guests):
+                received = guest.get_received()
+                assert [e["name"] for e in received][:2] == ["admitted", "session-token"]
+                existing = [e["args"][0] for e in received if e["name"] == "existing-participants"]
+                assert [p["userId"] for p in existing[0]["participants"]] == ["host"]
+                # Each guest offers to the guests admitted after it, and never to itself
+                joined = [e["args"][0]["userId"] for e in received if e["name"] == "user-joined"]
+                assert joined == [f"guest-{j}" for j in range(i + 1, 3)]
+
+            # Admitted users skip the waiting room when they rejoin
+            guests[0].disconnect()
+            rejoin = socketio.test_client(app)
+            rejoin.emit("join", {"room": "room1", "userId": "guest-0"})
+            names = [e["name"] for e in rejoin.get_received()]
+            assert "waiting-room" not in names and "existing-participants" in names
+
+            host.disconnect()
+            rejoin.disconnect()
+            for guest in guests[1:]:
+                guest.disconnect()
@@ -2,10 +2,15 @@
 Unit tests for Meeting Management API endpoints
 Tests meeting creation, joining, ending, and participant management
 """
+
 import pytest
 from bson import ObjectId
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
+
+import server
+from server import app, ensure_indexes
 
 
 @pytest.mark.api
@@ -53,6 +58,35 @@ class TestMeetingAPI:
             data = response.get_json()
             assert data["name"] == "New Meeting"  # Default name
 
+    def test_create_meeting_with_sdp_policy(self, client, mock_db):
+        """Test meeting creation with codec preferences and bitrate caps"""
+        with patch("server.meetings_collection", mock_db["meetings"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.meeting_settings", {}) as settings:
+            policy = {"codecs": {"video": ["VP8"]}, "maxBitrateKbps": {"video": 300}}
+            response = client.post(
+                "/api/meetings",
+                json={"hostId": "host123", "sdpPolicy": policy},
+                content_type="application/json",
+            )
+
+            assert response.status_code == 201
+            meeting_id = response.get_json()["meetingId"]
+            assert settings[meeting_id]["sdpPolicy"].bitrates == {"video": 300}
+            assert mock_db["meetings"].find_one({"hostId": "host123"})["sdpPolicy"] == policy
+
+    def test_create_meeting_invalid_sdp_policy(self, client, mock_db):
+        """Test meeting creation with a malformed SDP policy"""
+        with patch("server.meetings_collection", mock_db["meetings"]):
+            response = client.post(
+                "/api/meetings",
+                json={"hostId": "host123", "sdpPolicy": {"maxBitrateKbps": {"video": "fast"}}},
+                content_type="application/json",
+            )
+
+            assert response.status_code == 400
+            assert "Invalid SDP policy" in response.get_json()["error"]
+
     def test_create_meeting_missing_host_id(self, client):
         """Test meeting creation without hostId"""
         response = client.post(
@@ -135,6 +169,72 @@ class TestMeetingAPI:
             # Should still succeed
             assert response.status_code == 200
 
+    def test_concurrent_joins_create_one_row(self, mock_db):
+        """Test that 500 parallel joins by the same user leave exactly one row"""
+        with patch("server.meetings_collection", mock_db["meetings"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.users_collection", mock_db["users"]):
+            ensure_indexes()
+            meeting_id = (
+                mock_db["meetings"]
+                .insert_one(
+                    {
+                        "name": "Test Meeting",
+                        "hostId": "host123",
+                        "createdAt": datetime.now(),
+                        "active": True,
+                    }
+                )
+                .inserted_id
+            )
+
+            def join(_):
+                with app.test_client() as thread_client:
+                    return thread_client.post(
+                        f"/api/meetings/{meeting_id}/join", json={"userId": "user456"}
+                    ).status_code
+
+            with ThreadPoolExecutor(max_workers=50) as pool:
+                statuses = list(pool.map(join, range(500)))
+
+            assert statuses == [200] * 500
+            assert (
+                mock_db["participants"].count_documents(
+                    {"meetingId": str(meeting_id), "userId": "user456"}
+                )
+                == 1
+            )
+
+    def test_ensure_indexes_removes_duplicate_participants(self, mock_db):
+        """Test that duplicate rows are merged first and an index that fails is skipped"""
+        participants = mock_db["participants"]
+        participants.insert_many(
+            [
+                {"meetingId": "m1", "userId": "u1", "joinedAt": datetime(2024, 1, 2)},
+                {"meetingId": "m1", "userId": "u1", "joinedAt": datetime(2024, 1, 1)},
+                {
+                    "meetingId": "m1",
+                    "userId": "u1",
+                    "joinedAt": datetime(2024, 1, 3),
+                    "isHost": True,
+                },
+                {"meetingId": "m2", "userId": "u1", "joinedAt": datetime(2024, 1, 1)},
+            ]
+        )
+        mock_db["users"].insert_many([{"username": "alice"}, {"username": "alice"}])
+        with patch("server.participants_collection", participants), patch(
+            "server.users_collection", mock_db["users"]
+        ):
+            ensure_indexes()
+
+        rows = list(participants.find({"meetingId": "m1"}))
+        assert len(rows) == 1
+        assert rows[0]["joinedAt"] == datetime(2024, 1, 1) and rows[0]["isHost"] is True
+        assert participants.count_documents({}) == 2
+        assert participants.index_information()["meetingId_1_userId_1"]["unique"]
+        assert "searchNames_1" in mock_db["users"].index_information()
+        assert mock_db["users"].count_documents({"searchNames": ["alice"]}) == 2
+
     def test_join_nonexistent_meeting(self, client, mock_db):
         """Test joining non-existent meeting"""
         with patch("server.meetings_collection", mock_db["meetings"]):
@@ -378,6 +478,173 @@ class TestMeetingAPI:
             assert data["isHost"] is False
 
 
+@pytest.mark.api
+@pytest.mark.unit
+class TestMeetingBootstrap:
+    """Test the combined join + host check + participants endpoint"""
+
+    def _create_meeting(self, mock_db, host_id, active=True):
+        return (
+            mock_db["meetings"]
+            .insert_one(
+                {
+                    "name": "Test Meeting",
+                    "hostId": host_id,
+                    "createdAt": datetime.now(),
+                    "active": active,
+                }
+            )
+            .inserted_id
+        )
+
+    def test_bootstrap_success(self, client, mock_db):
+        """Test that bootstrap joins the user and returns host status and roster"""
+        host_id = str(mock_db["users"].insert_one({"username": "host"}).inserted_id)
+        user_id = str(mock_db["users"].insert_one({"username": "guest"}).inserted_id)
+        meeting_id = self._create_meeting(mock_db, host_id)
+        mock_db["participants"].insert_one(
+            {
+                "meetingId": str(meeting_id),
+                "userId": host_id,
+                "joinedAt": datetime.now(),
+                "isHost": True,
+            }
+        )
+
+        meetings = MagicMock(wraps=mock_db["meetings"])
+        users = MagicMock(wraps=mock_db["users"])
+        with patch("server.meetings_collection", meetings), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.users_collection", users):
+            response = client.post(
+                f"/api/meetings/{meeting_id}/bootstrap",
+                json={"userId": user_id},
+                content_type="application/json",
+            )
+
+            assert response.status_code == 200
+            data = response.get_json()
+            assert data["isHost"] is False
+            assert data["meeting"]["meetingId"] == str(meeting_id)
+            assert data["meeting"]["name"] == "Test Meeting"
+            assert sorted(p["username"] for p in data["participants"]) == ["guest", "host"]
+            assert data["iceServers"] and "ttl" in data
+
+            # One meeting read and one batched user fetch
+            assert meetings.find_one.call_count == 1
+            assert users.find.call_count == 1
+            assert users.find_one.call_count == 0
+
+    def test_bootstrap_roster_includes_caller(self, client, mock_db):
+        """Test that a shared roster read from before the caller's upsert still lists them"""
+        user_id = str(mock_db["users"].insert_one({"username": "guest"}).inserted_id)
+        meeting_id = self._create_meeting(mock_db, "host123")
+        share = server.read_flight.do
+
+        def stale_roster(key, fn, *args):
+            # The roster read was already in flight, and empty, when the caller joined
+            return [] if key[0] == "participants" else share(key, fn, *args)
+
+        with patch("server.meetings_collection", mock_db["meetings"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.users_collection", mock_db["users"]), patch(
+            "server.read_flight.do", side_effect=stale_roster
+        ):
+            response = client.post(
+                f"/api/meetings/{meeting_id}/bootstrap",
+                json={"userId": user_id},
+                content_type="application/json",
+            )
+
+            assert response.status_code == 200
+            participants = response.get_json()["participants"]
+            assert [p["username"] for p in participants] == ["guest"]
+
+    def test_bootstrap_into_waiting_room(self, client, mock_db):
+        """Test that a guest held in the waiting room gets no roster or TURN credentials"""
+        meeting_id = (
+            mock_db["meetings"]
+            .insert_one(
+                {
+                    "name": "Test Meeting",
+                    "hostId": "host",
+                    "createdAt": datetime.now(),
+                    "active": True,
+                    "waitingRoom": True,
+                }
+            )
+            .inserted_id
+        )
+
+        with patch("server.meetings_collection", mock_db["meetings"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.meeting_settings", {}), patch.object(
+            server.turn_pool, "ice_servers", wraps=server.turn_pool.ice_servers
+        ) as ice_servers:
+            response = client.post(
+                f"/api/meetings/{meeting_id}/bootstrap",
+                json={"userId": "guest"},
+                content_type="application/json",
+            )
+
+            data = response.get_json()
+            assert data["waiting"] is True and data["participants"] == []
+            assert "iceServers" not in data and "ttl" not in data
+            assert ice_servers.call_count == 0
+            assert mock_db["participants"].count_documents({}) == 0
+
+    def test_bootstrap_is_idempotent(self, client, mock_db):
+        """Test that bootstrapping twice leaves a single participant row"""
+        with patch("server.meetings_collection", mock_db["meetings"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.users_collection", mock_db["users"]):
+            meeting_id = self._create_meeting(mock_db, "host123")
+
+            for _ in range(2):
+                response = client.post(
+                    f"/api/meetings/{meeting_id}/bootstrap",
+                    json={"userId": "host123"},
+                    content_type="application/json",
+                )
+                assert response.status_code == 200
+                assert response.get_json()["isHost"] is True
+
+            assert mock_db["participants"].count_documents({"meetingId": str(meeting_id)}) == 1
+
+    def test_bootstrap_ended_meeting(self, client, mock_db):
+        """Test bootstrapping into an ended meeting"""
+        with patch("server.meetings_collection", mock_db["meetings"]):
+            meeting_id = self._create_meeting(mock_db, "host123", active=False)
+
+            response = client.post(
+                f"/api/meetings/{meeting_id}/bootstrap",
+                json={"userId": "user456"},
+                content_type="application/json",
+            )
+
+            assert response.status_code == 400
+            assert "Meeting has ended" in response.get_json()["error"]
+
+    def test_bootstrap_nonexistent_meeting(self, client, mock_db):
+        """Test bootstrapping into a meeting that does not exist"""
+        with patch("server.meetings_collection", mock_db["meetings"]):
+            response = client.post(
+                f"/api/meetings/{ObjectId()}/bootstrap",
+                json={"userId": "user456"},
+                content_type="application/json",
+            )
+
+            assert response.status_code == 404
+
+    def test_bootstrap_missing_user_id(self, client):
+        """Test bootstrapping without a userId"""
+        response = client.post(
+            f"/api/meetings/{ObjectId()}/bootstrap", json={}, content_type="application/json"
+        )
+
+        assert response.status_code == 400
+
+
 @pytest.mark.api
 @pytest.mark.unit
 class TestMeetingEdgeCases:
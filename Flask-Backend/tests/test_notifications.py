@@ -0,0 +1,94 @@
+"""
+Unit tests for the membership notification aggregator
+Tests immediate delivery in small rooms and merged batches in large rooms
+"""
+import pytest
+from unittest.mock import patch
+
+from connections import ConnectionTable
+from notifications import MembershipNotifier
+from server import _emit_to_room, app, socketio
+
+
+@pytest.fixture
+def notifier(scheduler):
+    emitted = []
+    notifier = MembershipNotifier(
+        lambda event, payload, room, skip_sid: emitted.append((event, payload, room, skip_sid)),
+        scheduler,
+        small_room=4,
+    )
+    notifier.emitted = emitted
+    notifier.scheduler = scheduler
+    return notifier
+
+
+@pytest.mark.unit
+class TestMembershipNotifier:
+    """Test the per-room notification aggregator"""
+
+    def test_small_room_sends_single_events(self, notifier):
+        """Test that small rooms keep per-event user-joined/user-left"""
+        notifier.joined("room", 2, "u1", "s1")
+        notifier.left("room", 1, "u1", "s1")
+
+        assert [e[0] for e in notifier.emitted] == ["user-joined", "user-left"]
+        assert notifier.emitted[0][3] == "s1"
+        assert notifier.scheduler.calls == []
+
+    def test_large_room_batches_changes(self, notifier):
+        """Test that changes in a large room are merged into one packet"""
+        for i in range(10):
+            notifier.joined("room", 10 + i, f"u{i}", f"s{i}")
+        notifier.left("room", 19, "old", "s_old")
+
+        assert notifier.emitted == []
+        assert len(notifier.scheduler.calls) == 1
+
+        notifier.scheduler.run_all()
+
+        assert len(notifier.emitted) == 1
+        event, payload, room, _ = notifier.emitted[0]
+        assert event == "participants-changed"
+        assert [p["socketId"] for p in payload["added"]] == [f"s{i}" for i in range(10)]
+        assert payload["removed"] == [{"userId": "old", "socketId": "s_old"}]
+
+    def test_join_then_leave_cancels_out(self, notifier):
+        """Test that a join and leave inside one window produce no packet"""
+        notifier.joined("room", 20, "u1", "s1")
+        notifier.left("room", 19, "u1", "s1")
+        notifier.scheduler.run_all()
+
+        assert notifier.emitted == []
+
+    def test_window_grows_with_room_size(self, notifier):
+        """Test that the window is zero for small rooms and capped for huge ones"""
+        assert notifier.window_for(4) == 0
+        assert 0 < notifier.window_for(16) < notifier.window_for(400)
+        assert notifier.window_for(10**9) == notifier.max_window
+
+
+@pytest.mark.socket
+@pytest.mark.unit
+class TestParticipantsChangedEvent:
+    """Test batched notifications through the socket handlers"""
+
+    def test_join_burst_sends_participants_changed(self, scheduler):
+        """Test that a join burst in a large room reaches peers as one packet"""
+        notifier = MembershipNotifier(_emit_to_room, scheduler, small_room=1)
+        with patch("server.active_connections", ConnectionTable()), patch(
+            "server.resume_tokens", {}
+        ), patch("server.membership_notifier", notifier):
+            observer = socketio.test_client(app)
+            observer.emit("join", {"room": "big_room", "userId": "observer"})
+            joiners = [socketio.test_client(app) for _ in range(3)]
+            for i, joiner in enumerate(joiners):
+                joiner.emit("join", {"room": "big_room", "userId": f"user{i}"})
+            observer.get_received()
+
+            scheduler.run_all()
+
+            events = observer.get_received()
+            assert [e["name"] for e in events] == ["participants-changed"]
+            added = events[0]["args"][0]["added"]
+            assert [p["userId"] for p in added] == ["user0", "user1", "user2"]
@@ -0,0 +1,202 @@
+"""
+Unit tests for bounded per-socket outbound queues
+Tests the drop and coalesce policy against a stalled reader, eviction and metrics
+"""
+
+import json
+import queue
+
+import pytest
+from engineio import packet as eio_packet
+
+from outbound import OutboundQueue, OutboundStats, event_name
+
+
+def _event(name, data):
+    payload = json.dumps([name, data], separators=(",", ":"))
+    return eio_packet.Packet(eio_packet.MESSAGE, data="2" + payload)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _drain(q):
+    """Read everything a reader would see from the queue, in order"""
+    received = []
+    while not q.empty():
+        pkt = q.get(block=False)
+        q.task_done()
+        received.append(pkt)
+    return [p for p in received if p is not None]
+
+
+@pytest.mark.unit
+class TestOutboundQueue:
+    """Test the outbound queue against a reader that never drains it"""
+
+    @pytest.fixture
+    def stalled(self):
+        evicted = []
+        clock = FakeClock()
+        q = OutboundQueue(
+            queue.Queue(),
+            max_messages=10,
+            max_bytes=1024 * 1024,
+            evict_after=5.0,
+            on_evict=evicted.append,
+            stats=OutboundStats(),
+            clock=clock,
+        )
+        return q, clock, evicted
+
+    def test_event_name(self):
+        """Test that the event name is read from the encoded packet"""
+        assert event_name(_event("offer", {"a": 1})) == "offer"
+        assert event_name(eio_packet.Packet(eio_packet.PING)) is None
+
+    def test_ice_candidates_dropped_over_limit(self, stalled):
+        """Test that ICE candidates from a connected peer are dropped once the queue is full"""
+        q, _, _ = stalled
+        q.peer_connected("peer")
+        for i in range(50):
+            q.put(_event("ice-candidate", {"candidate": i, "fromSocket": "peer"}))
+
+        assert q.messages == 10
+        assert q.stats.dropped == 40
+        assert [json.loads(p.data[1:])[1]["candidate"] for p in _drain(q)] == list(range(10))
+
+    def test_ice_candidates_kept_until_connected(self, stalled):
+        """Test that ICE candidates are queued over the limit while their peer is connecting"""
+        q, _, _ = stalled
+        q.peer_connected("up")
+        for i in range(10):
+            q.put(_event("chat-message", {"message": i}))
+        q.put(_event("ice-candidate", {"candidate": 0, "fromSocket": "up"}))
+        q.put(_event("ice-candidate", {"candidate": 1, "fromSocket": "connecting"}))
+
+        assert q.stats.dropped == 1
+        assert json.loads(_drain(q)[-1].data[1:])[1]["candidate"] == 1
+
+    def test_renegotiation_needs_candidates_again(self, stalled):
+        """Test that an offer from a connected peer makes its candidates protected again"""
+        q, _, _ = stalled
+        q.peer_connected("peer")
+        for i in range(10):
+            q.put(_event("chat-message", {"message": i}))
+        q.put(_event("offer", {"sdp": "o", "fromSocket": "peer"}))
+        q.put(_event("ice-candidate", {"candidate": 0, "fromSocket": "peer"}))
+
+        assert q.stats.dropped == 0
+        assert event_name(_drain(q)[-1]) == "ice-candidate"
+
+    def test_offers_never_dropped(self, stalled):
+        """Test that offers and answers are queued even over the limit"""
+        q, _, _ = stalled
+        for i in range(20):
+            q.put(_event("ice-candidate", {"candidate": i}))
+        q.put(_event("offer", {"sdp": "o"}))
+        q.put(_event("answer", {"sdp": "a"}))
+
+        names = [event_name(p) for p in _drain(q)]
+        assert names[-2:] == ["offer", "answer"]
+        assert q.messages == 0
+        assert q.bytes == 0
+
+    def test_media_status_coalesced(self, stalled):
+        """Test that only the newest media status per peer reaches the reader"""
+        q, _, _ = stalled
+        for i in range(5):
+            q.put(_event("media-status-changed", {"socketId": "a", "video": i}))
+        q.put(_event("media-status-changed", {"socketId": "b", "video": 0}))
+
+        # Newer statuses overwrite the queued one instead of taking a slot
+        assert q.qsize() == 2 and q.messages == 2
+        delivered = [json.loads(p.data[1:])[1] for p in _drain(q)]
+        assert delivered == [{"socketId": "a", "video": 4}, {"socketId": "b", "video": 0}]
+        assert q.stats.coalesced == 4
+        assert q.messages == 0 and q.bytes == 0
+
+        # Once sent, the next status is queued again
+        q.put(_event("media-status-changed", {"socketId": "a", "video": 5}))
+        assert q.qsize() == 1 and q.stats.coalesced == 4
+
+    def test_only_protected_events_queued_over_limit(self, stalled):
+        """Test that over the limits only offers, answers and non-event packets are queued"""
+        q, _, _ = stalled
+        for i in range(10):
+            q.put(_event("chat-message", {"message": i}))
+        q.put(_event("user-joined", {"socketId": "x"}))
+        q.put(_event("offer", {"sdp": "o"}))
+        q.put(eio_packet.Packet(eio_packet.MESSAGE, data='51-["signal-relay"]'))
+
+        assert q.stats.dropped == 1
+        names = [event_name(p) for p in _drain(q)]
+        assert names == ["chat-message"] * 10 + ["offer", None]
+
+    def test_hard_limit_evicts_on_enqueue(self, stalled):
+        """Test that reaching twice the limits evicts without waiting for the timer"""
+        q, _, evicted = stalled
+        for _ in range(19):
+            q.put(_event("offer", {}))
+        assert evicted == []
+
+        q.put(_event("answer", {}))
+        assert evicted == [q]
+
+    def test_slow_consumer_evicted_once(self, stalled):
+        """Test that a socket over its limits for too long is evicted exactly once"""
+        q, clock, evicted = stalled
+        for _ in range(10):
+            q.put(_event("offer", {}))
+        clock.now = 4.9
+        q.put(_event("offer", {}))
+        assert evicted == []
+
+        clock.now = 5.0
+        q.put(_event("offer", {}))
+        clock.now = 9.0
+        q.put(_event("offer", {}))
+        assert evicted == [q]
+        assert q.stats.evictions == 1
+
+    def test_draining_resets_eviction_timer(self, stalled):
+        """Test that a reader catching up is not evicted"""
+        q, clock, evicted = stalled
+        for _ in range(10):
+            q.put(_event("offer", {}))
+        _drain(q)
+
+        clock.now = 10.0
+        for _ in range(10):
+            q.put(_event("offer", {}))
+        assert evicted == []
+
+    def test_shutdown_sentinel_passes_through(self, stalled):
+        """Test that the writer shutdown sentinel is never dropped or counted"""
+        q, _, _ = stalled
+        for _ in range(10):
+            q.put(_event("ice-candidate", {}))
+        q.put(None)
+        assert q.messages == 10
+        assert q.qsize() == 11
+
+
+@pytest.mark.api
+class TestOutboundMetrics:
+    """Test the outbound queue metrics endpoint"""
+
+    def test_metrics_report_queue_depths(self, client):
+        """Test that the metrics endpoint reports queue depth and counters"""
+        response = client.get("/api/metrics")
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        outbound = data["outbound"]
+        for key in ("sockets", "queuedMessages", "queuedBytes", "dropped", "evictions"):
+            assert key in outbound
+        assert isinstance(outbound["deepest"], list)
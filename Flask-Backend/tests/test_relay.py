@@ -0,0 +1,83 @@
+"""
+Unit tests for the binary signaling relay fast path
+Tests envelope packing/unpacking and the signal-relay socket event
+"""
+import pytest
+
+from relay import (
+    RELAY_ICE_CANDIDATE,
+    RELAY_OFFER,
+    EnvelopeError,
+    pack_envelope,
+    readdress_envelope,
+    unpack_envelope,
+)
+from server import app, socketio
+
+
+def _sid(client):
+    """Return the Socket.IO sid of a test client"""
+    return socketio.server.manager.sid_from_eio_sid(client.eio_sid, "/")
+
+
+@pytest.mark.unit
+class TestRelayEnvelope:
+    """Test the relay envelope format"""
+
+    def test_round_trip(self):
+        """Test that an envelope unpacks to what was packed"""
+        packet = pack_envelope(RELAY_OFFER, "target123", b'{"sdp":"v=0"}')
+
+        kind, socket_id, body = unpack_envelope(packet)
+
+        assert kind == RELAY_OFFER
+        assert socket_id == "target123"
+        assert bytes(body) == b'{"sdp":"v=0"}'
+
+    def test_readdress_swaps_socket_and_keeps_body(self):
+        """Test that the outbound envelope names the sender and carries the same body"""
+        body = bytes(range(256)) * 4
+        packet = pack_envelope(RELAY_ICE_CANDIDATE, "target123", body)
+
+        target, outbound = readdress_envelope(packet, "sender456")
+
+        assert target == "target123"
+        assert unpack_envelope(outbound)[:2] == (RELAY_ICE_CANDIDATE, "sender456")
+        assert bytes(unpack_envelope(outbound)[2]) == body
+
+    @pytest.mark.parametrize(
+        "packet",
+        [b"", b"\x01", b"\x09\x03abc", b"\x01\x00body", b"\x01\x10short", "not bytes"],
+    )
+    def test_malformed_envelopes(self, packet):
+        """Test that truncated or unknown envelopes are rejected"""
+        with pytest.raises(EnvelopeError):
+            unpack_envelope(packet)
+
+
+@pytest.mark.socket
+@pytest.mark.unit
+class TestSignalRelayEvent:
+    """Test the signal-relay socket event"""
+
+    def test_relay_forwards_opaque_body(self):
+        """Test that the target receives the body with the sender's socket id"""
+        sender = socketio.test_client(app)
+        receiver = socketio.test_client(app)
+        body = b'{"type":"offer","sdp":"v=0\\r\\n"}'
+
+        sender.emit("signal-relay", pack_envelope(RELAY_OFFER, _sid(receiver), body))
+
+        relayed = [e["args"][0] for e in receiver.get_received() if e["name"] == "signal-relay"]
+        assert len(relayed) == 1
+        kind, from_socket, received_body = unpack_envelope(relayed[0])
+        assert (kind, from_socket, bytes(received_body)) == (RELAY_OFFER, _sid(sender), body)
+        sender.disconnect()
+        receiver.disconnect()
+
+    def test_relay_rejects_bad_envelope(self, socket_client):
+        """Test that a malformed envelope reports an error to the sender"""
+        socket_client.emit("signal-relay", b"\x01")
+
+        errors = [e for e in socket_client.get_received() if e["name"] == "error"]
+        assert len(errors) == 1
@@ -0,0 +1,154 @@
+"""
+Unit tests for reliable signaling delivery
+Tests the per-target ack windows, duplicate filtering and retransmission on resume
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import server
+from connections import ConnectionTable
+from reliable import ReliableRelay
+from server import app, socketio
+
+
+def _offer(sender, msg_id):
+    return {"offer": {"type": "offer", "sdp": "v=0"}, "fromSocket": sender, "msgId": msg_id}
+
+
+def _received(client, name):
+    return [e["args"][0] for e in client.get_received() if e["name"] == name]
+
+
+@pytest.fixture
+def relay():
+    sent = []
+    relay = ReliableRelay(lambda event, payload, target: sent.append((event, target)), window=3)
+    relay.sent = sent
+    relay.enable("target")
+    return relay
+
+
+@pytest.mark.unit
+class TestReliableRelay:
+    """Test windows, acks, duplicates and retransmission"""
+
+    def test_ack_clears_window(self, relay):
+        """Test that acknowledged messages are not sent again"""
+        relay.send("offer", _offer("a", "1"), "target")
+        relay.send("offer", _offer("b", "2"), "target")
+        assert relay.ack("target", "a", "1")
+        assert not relay.ack("target", "a", "1")
+
+        assert relay.resend("target") == 1
+        assert relay.sent[-1] == ("offer", "target")
+        assert relay.retransmitted == 1
+
+    def test_duplicate_msg_id_not_forwarded(self, relay):
+        """Test that a sender retrying a msgId is only forwarded once"""
+        assert relay.send("offer", _offer("a", "1"), "target")
+        assert not relay.send("offer", _offer("a", "1"), "target")
+        # Same id towards another peer, or as another kind, is a different message
+        assert relay.send("offer", _offer("a", "1"), "other")
+        assert relay.send("answer", {"fromSocket": "a", "msgId": "1"}, "target")
+
+        assert len(relay.sent) == 3
+        assert relay.duplicates == 1
+
+    def test_window_is_bounded(self, relay):
+        """Test that only the newest messages of a target are kept"""
+        for i in range(10):
+            relay.send("offer", _offer("a", str(i)), "target")
+
+        assert relay.unacked("target") == 3
+        assert relay.overflowed == 7
+
+    def test_dedupe_filter_is_bounded(self):
+        """Test that the duplicate filter keeps a fixed number of ids per sender"""
+        relay = ReliableRelay(lambda *args: None, seen=5)
+        for i in range(100):
+            relay.send("offer", _offer("a", str(i)), "target")
+
+        assert len(relay._seen["a"]) == 5
+
+    def test_targets_without_acks_not_tracked(self, relay):
+        """Test that messages to clients that never ack are not kept"""
+        relay.send("offer", _offer("a", "1"), "legacy")
+        relay.send("offer", {"offer": {}, "fromSocket": "a", "msgId": None}, "target")
+
+        assert relay.unacked("legacy") == 0
+        assert relay.unacked("target") == 0
+
+    def test_remap_moves_window(self, relay):
+        """Test that a resumed socket gets the window of its old socket"""
+        relay.send("offer", _offer("a", "1"), "target")
+        relay.remap("target", "resumed")
+
+        assert relay.unacked("target") == 0
+        assert relay.resend("resumed") == 1
+        relay.send("offer", _offer("a", "2"), "resumed")
+        assert relay.unacked("resumed") == 2
+
+    def test_forget(self, relay):
+        """Test that a socket that left drops its window"""
+        relay.send("offer", _offer("a", "1"), "target")
+        relay.forget("target")
+
+        assert relay.resend("target") == 0
+
+
+@pytest.mark.socket
+class TestReliableSignaling:
+    """Test offers lost during a reconnect being delivered after resume"""
+
+    def test_offer_resent_after_resume(self, mock_db):
+        """Test that an offer sent while the target was away arrives after it resumes"""
+        connections = ConnectionTable()
+        with patch("server.active_connections", connections), patch(
+            "server.resume_tokens", {}
+        ), patch("server.participants_collection", mock_db["participants"]), patch(
+            "server.RESUME_GRACE_SECONDS", 60
+        ), patch(
+            "server.signal_relay", ReliableRelay(server._emit_signal)
+        ):
+            target = socketio.test_client(app)
+            target.emit("join", {"room": "room1", "userId": "alice", "signalAcks": True})
+            token = _received(target, "session-token")[0]["token"]
+            target_sid = next(iter(connections))
+
+            sender = socketio.test_client(app)
+            sender.emit("join", {"room": "room1", "userId": "bob"})
+
+            # Delivered and acked: not resent
+            sender.emit("offer", {"targetSocket": target_sid, "offer": {"sdp": "a"}, "msgId": "1"})
+            offer = _received(target, "offer")[0]
+            target.emit("signal-ack", {"fromSocket": offer["fromSocket"], "msgId": "1"})
+
+            # Sent while the target's connection is down
+            target.disconnect()
+            sender.emit("offer", {"targetSocket": target_sid, "offer": {"sdp": "b"}, "msgId": "2"})
+            sender.emit("offer", {"targetSocket": target_sid, "offer": {"sdp": "b"}, "msgId": "2"})
+
+            resumed = socketio.test_client(app)
+            resumed.emit("resume", {"token": token, "signalAcks": True})
+
+            offers = _received(resumed, "offer")
+            assert [o["msgId"] for o in offers] == ["2"]
+            assert offers[0]["offer"] == {"sdp": "b"}
+            assert server.signal_relay.duplicates == 1
+
+            resumed.disconnect()
+            sender.disconnect()
+
+    def test_sockets_outside_rooms_forgotten(self, mock_db):
+        """Test that a socket that never joined leaves no relay state behind"""
+        with patch("server.active_connections", ConnectionTable()), patch(
+            "server.signal_relay", ReliableRelay(server._emit_signal)
+        ):
+            sender = socketio.test_client(app)
+            sender.emit("offer", {"targetSocket": "someone", "offer": {"sdp": "a"}, "msgId": "1"})
+            assert len(server.signal_relay._seen) == 1
+
+            sender.disconnect()
+            assert server.signal_relay._seen == {}
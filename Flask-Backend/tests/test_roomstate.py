@@ -0,0 +1,182 @@
+"""
+Unit tests for room state snapshots and the membership journal
+Tests the binary formats, journal replay and resuming sessions after a restart
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+import server
+from connections import ConnectionTable
+from roomstate import (
+    OP_PUT,
+    OP_REMOVE,
+    SNAPSHOT_NAME,
+    RoomStateStore,
+    SnapshotError,
+    decode_journal,
+    decode_snapshot,
+    encode_entry,
+    encode_snapshot,
+)
+from server import app, socketio
+
+RECORDS = [
+    ("sid-a", "room1", "alice", "presenter", "tok-a"),
+    ("sid-b", "room1", "bob", "attendee", "tok-b"),
+    ("sid-c", "room2", None, "presenter", "tok-c"),
+]
+
+
+def _received(client, name):
+    return [e["args"][0] for e in client.get_received() if e["name"] == name]
+
+
+@pytest.mark.unit
+class TestSnapshotFormat:
+    """Test the snapshot and journal encodings"""
+
+    def test_snapshot_round_trip(self):
+        """Test that records survive encoding, with None kept as None"""
+        generation, records = decode_snapshot(encode_snapshot(RECORDS, 7))
+
+        assert generation == 7
+        assert sorted(records) == sorted(RECORDS)
+
+    def test_corrupt_snapshot_rejected(self):
+        """Test that a flipped byte fails the checksum"""
+        data = bytearray(encode_snapshot(RECORDS, 1))
+        data[40] ^= 0xFF
+        with pytest.raises(SnapshotError):
+            decode_snapshot(bytes(data))
+        with pytest.raises(SnapshotError):
+            decode_snapshot(bytes(data[:-10]))
+
+    def test_journal_ignores_torn_tail(self):
+        """Test that a partially written last entry is skipped"""
+        data = encode_entry(OP_PUT, RECORDS[0]) + encode_entry(OP_REMOVE, ("sid-a",))
+        entries = list(decode_journal(data + encode_entry(OP_PUT, RECORDS[1])[:-3]))
+
+        assert entries == [(OP_PUT, RECORDS[0]), (OP_REMOVE, ("sid-a",))]
+
+
+@pytest.mark.unit
+class TestRoomStateStore:
+    """Test snapshot files, journal segments and restored sessions"""
+
+    @pytest.mark.parametrize("use_mmap", [False, True])
+    def test_snapshot_plus_journal_replay(self, tmp_path, use_mmap):
+        """Test that journal changes after a snapshot are applied on load"""
+        store = RoomStateStore(str(tmp_path), use_mmap=use_mmap)
+        store.snapshot(lambda: RECORDS)
+        store.remove("sid-b")
+        store.put(("sid-a", "room1", "alice", "presenter", "tok-a2"))
+        store.put(("sid-d", "room2", "dave", "presenter", "tok-d"))
+        store.close()
+
+        restored = RoomStateStore(str(tmp_path), use_mmap=use_mmap).load()
+
+        assert restored.take("tok-a") is None
+        assert restored.take("tok-b") is None
+        assert restored.take("tok-a2") == ("sid-a", "room1", "alice", "presenter", "tok-a2")
+        assert restored.take("tok-c") == RECORDS[2]
+        assert sorted(f[0] for f in restored.remaining()) == ["sid-d"]
+        restored.close()
+
+    def test_session_claimed_once(self, tmp_path):
+        """Test that a restored session can only be resumed once"""
+        store = RoomStateStore(str(tmp_path))
+        store.snapshot(lambda: RECORDS)
+
+        restored = store.load()
+        assert restored.take("tok-b") == RECORDS[1]
+        assert restored.take("tok-b") is None
+        assert restored.take("unknown") is None
+
+    def test_snapshot_replaces_file_and_old_journals(self, tmp_path):
+        """Test that snapshots are swapped in atomically and compact the journal"""
+        store = RoomStateStore(str(tmp_path))
+        store.put(RECORDS[0])
+        store.snapshot(lambda: RECORDS[:1])
+        store.put(RECORDS[1])
+        store.snapshot(lambda: RECORDS[:2])
+
+        names = sorted(os.listdir(tmp_path))
+        assert names == [SNAPSHOT_NAME]
+        assert len(decode_snapshot((tmp_path / SNAPSHOT_NAME).read_bytes())[1]) == 2
+
+
+@pytest.mark.socket
+class TestRestartRecovery:
+    """Test that sessions survive a server restart through the snapshot and journal"""
+
+    @pytest.fixture
+    def restartable(self, tmp_path, mock_db, scheduler):
+        with patch("server.ROOM_STATE_DIR", str(tmp_path)), patch(
+            "server.RESUME_GRACE_SECONDS", 60
+        ), patch("server.active_connections", ConnectionTable()), patch(
+            "server.resume_tokens", {}
+        ), patch(
+            "server.room_state", None
+        ), patch(
+            "server.restored_sessions", None
+        ), patch(
+            "server._schedule", scheduler
+        ), patch(
+            "server.participants_collection", mock_db["participants"]
+        ):
+            server.restore_room_state()
+            yield mock_db
+            server.room_state.close()
+
+    def _restart(self):
+        """Drop all in-memory state, as a new process would start with"""
+        server.room_state.close()
+        server.active_connections.clear()
+        server.resume_tokens.clear()
+        server.restore_room_state()
+
+    def test_resume_after_restart(self, restartable):
+        """Test that a token issued before a restart resumes the session after it"""
+        client = socketio.test_client(app)
+        client.emit("join", {"room": "room1", "userId": "alice"})
+        token = _received(client, "session-token")[0]["token"]
+        old_sid = next(iter(server.active_connections))
+        client.disconnect()
+
+        self._restart()
+        assert server.active_connections == {}
+
+        resumed = socketio.test_client(app)
+        resumed.emit("resume", {"token": token})
+
+        session = _received(resumed, "session-resumed")[0]
+        assert session["previousSocketId"] == old_sid
+        assert session["room"] == "room1"
+        assert old_sid not in server.active_connections
+        resumed.disconnect()
+
+    def test_unresumed_sessions_expire(self, restartable, scheduler):
+        """Test that restored sessions nobody resumed are removed, rejoined users kept"""
+        participants = restartable["participants"]
+        for user in ("alice", "bob"):
+            participants.insert_one({"meetingId": "room1", "userId": user})
+            client = socketio.test_client(app)
+            client.emit("join", {"room": "room1", "userId": user})
+            client.disconnect()
+
+        self._restart()
+        scheduler.calls.clear()
+
+        # bob comes back with a fresh join instead of resuming
+        rejoined = socketio.test_client(app)
+        rejoined.emit("join", {"room": "room1", "userId": "bob"})
+
+        server._expire_restored_sessions()
+
+        assert participants.find_one({"userId": "alice"}) is None
+        assert participants.find_one({"userId": "bob"}) is not None
+        assert server.restored_sessions is None
+        rejoined.disconnect()
@@ -0,0 +1,166 @@
+"""
+Unit tests for the SDP processing stage
+Tests parsing, codec preference, bitrate caps, rejected m-lines and caching
+"""
+import pytest
+from unittest.mock import patch
+
+from connections import ConnectionTable
+from sdp import SdpError, SdpPolicy, SdpProcessor, parse_sdp
+from server import _settings_from_meeting, app, socketio
+
+OFFER = "\r\n".join(
+    [
+        "v=0",
+        "o=- 4611731400430051336 2 IN IP4 127.0.0.1",
+        "s=-",
+        "t=0 0",
+        "a=group:BUNDLE 0 1",
+        "m=audio 9 UDP/TLS/RTP/SAVPF 111 0",
+        "c=IN IP4 0.0.0.0",
+        "a=mid:0",
+        "a=rtpmap:111 opus/48000/2",
+        "a=rtpmap:0 PCMU/8000",
+        "m=video 9 UDP/TLS/RTP/SAVPF 96 97 102 103",
+        "c=IN IP4 0.0.0.0",
+        "b=AS:2000",
+        "a=mid:1",
+        "a=rtpmap:96 VP8/90000",
+        "a=rtpmap:97 rtx/90000",
+        "a=fmtp:97 apt=96",
+        "a=rtpmap:102 H264/90000",
+        "a=rtpmap:103 rtx/90000",
+        "a=fmtp:103 apt=102",
+        "m=video 0 UDP/TLS/RTP/SAVPF 96 97",
+        "c=IN IP4 0.0.0.0",
+        "a=inactive",
+        "a=mid:2",
+        "a=rtpmap:96 VP8/90000",
+        "a=rtpmap:97 rtx/90000",
+        "a=fmtp:97 apt=96",
+    ]
+) + "\r\n"
+
+
+def _lines(sdp, prefix):
+    return [line for line in sdp.split("\r\n") if line.startswith(prefix)]
+
+
+@pytest.mark.unit
+class TestSdpParsing:
+    """Test parsing session descriptions into media sections"""
+
+    def test_parse_sections(self):
+        """Test that media sections and codecs are recognised"""
+        parsed = parse_sdp(OFFER)
+
+        assert [m.kind for m in parsed.media] == ["audio", "video", "video"]
+        assert parsed.media[1].codecs["102"] == "H264"
+        assert parsed.media[2].rejected
+
+    def test_parse_rejects_garbage(self):
+        """Test that malformed SDP raises SdpError"""
+        with pytest.raises(SdpError):
+            parse_sdp("not an sdp")
+        with pytest.raises(SdpError):
+            parse_sdp("v=0\r\ns=-\r\n")
+
+    def test_policy_from_dict_validation(self):
+        """Test that policies with the wrong shape are rejected"""
+        with pytest.raises(ValueError):
+            SdpPolicy.from_dict({"codecs": {"video": "VP8"}})
+        with pytest.raises(ValueError):
+            SdpPolicy.from_dict({"maxBitrateKbps": {"video": -1}})
+
+
+@pytest.mark.unit
+class TestSdpProcessor:
+    """Test rewriting SDP with a meeting policy"""
+
+    def test_codec_preference_keeps_rtx_with_primary(self):
+        """Test that preferred codecs move first along with their RTX payloads"""
+        out = SdpProcessor().process(OFFER, SdpPolicy(codecs={"video": ["H264"]}))
+
+        assert _lines(out, "m=video 9")[0].endswith("102 103 96 97")
+        assert _lines(out, "m=audio")[0].endswith("111 0")
+
+    def test_bitrate_cap_replaces_existing(self):
+        """Test that b=AS is set once per capped section"""
+        out = SdpProcessor().process(OFFER, SdpPolicy(bitrates={"video": 300, "audio": 64}))
+
+        assert _lines(out, "b=AS:") == ["b=AS:64", "b=AS:300"]
+
+    def test_rejected_sections_are_collapsed(self):
+        """Test that port-0 m-lines keep their slot but drop codec attributes"""
+        out = SdpProcessor().process(OFFER, SdpPolicy())
+
+        rejected = out.split("m=video 0")[1]
+        assert "a=mid:2" in rejected
+        assert "a=rtpmap" not in rejected
+        assert len(_lines(out, "m=")) == 3
+
+    def test_bundle_only_sections_are_rewritten(self):
+        """Test that a port-0 m-line marked bundle-only is treated as live"""
+        offer = OFFER.replace("m=video 9 ", "m=video 0 ", 1).replace(
+            "a=mid:1\r\n", "a=mid:1\r\na=bundle-only\r\n"
+        )
+        assert not parse_sdp(offer).media[1].rejected
+
+        out = SdpProcessor().process(offer, SdpPolicy(codecs={"video": ["H264"]}))
+
+        assert _lines(out, "m=video 0")[0].endswith("102 103 96 97")
+        assert "a=rtpmap:102 H264/90000" in out
+
+    def test_repeated_sdp_hits_cache(self):
+        """Test that a renegotiation with the same SDP is served from cache"""
+        processor = SdpProcessor()
+        policy = SdpPolicy(bitrates={"video": 300})
+
+        first = processor.process(OFFER, policy)
+        second = processor.process(OFFER, policy)
+
+        assert first == second
+        assert (processor.hits, processor.misses) == (1, 1)
+
+    def test_cache_is_bounded(self):
+        """Test that the LRU cache evicts old entries"""
+        processor = SdpProcessor(max_entries=2)
+        policy = SdpPolicy()
+        for version in range(5):
+            processor.process(OFFER.replace(" 2 IN IP4", f" {version} IN IP4"), policy)
+
+        assert len(processor._rewritten) == 2
+        assert len(processor._parsed) == 2
+
+
+@pytest.mark.socket
+@pytest.mark.unit
+class TestSdpRelay:
+    """Test the SDP stage in the offer/answer relay"""
+
+    def test_offer_rewritten_for_meeting_policy(self, mock_db):
+        """Test that offers are rewritten with the sender's meeting policy"""
+        settings = _settings_from_meeting({"sdpPolicy": {"maxBitrateKbps": {"video": 300}}})
+        with patch("server.active_connections", ConnectionTable()) as connections, patch(
+            "server.resume_tokens", {}
+        ), patch("server.meeting_settings", {"room1": settings}), patch(
+            "server.SDP_PROCESSING_ENABLED", True
+        ), patch("server.RESUME_GRACE_SECONDS", 0), patch(
+            "server.participants_collection", mock_db["participants"]
+        ):
+            sender = socketio.test_client(app)
+            receiver = socketio.test_client(app)
+            sender.emit("join", {"room": "room1", "userId": "a"})
+            receiver.emit("join", {"room": "room1", "userId": "b"})
+            receiver_sid = next(sid for sid, c in connections.items() if c["userId"] == "b")
+            receiver.get_received()
+
+            sender.emit(
+                "offer", {"offer": {"type": "offer", "sdp": OFFER}, "targetSocket": receiver_sid}
+            )
+
+            offers = [e["args"][0] for e in receiver.get_received() if e["name"] == "offer"]
+            assert len(offers) == 1
+            assert _lines(offers[0]["offer"]["sdp"], "b=AS:") == ["b=AS:300"]
+            sender.disconnect()
+            receiver.disconnect()
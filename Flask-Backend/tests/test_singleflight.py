@@ -0,0 +1,161 @@
+"""
+Unit tests for request coalescing
+Tests that concurrent identical reads share one backend call and its outcome
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from bson import ObjectId
+
+from server import app
+from singleflight import SingleFlight
+
+
+class SlowCollection:
+    """Collection proxy that counts find calls and holds each one open briefly"""
+
+    def __init__(self, inner, delay=0.05):
+        self.inner = inner
+        self.delay = delay
+        self.finds = 0
+        self._lock = threading.Lock()
+
+    def _slow(self, method, *args, **kwargs):
+        with self._lock:
+            self.finds += 1
+        time.sleep(self.delay)
+        return getattr(self.inner, method)(*args, **kwargs)
+
+    def find_one(self, *args, **kwargs):
+        return self._slow("find_one", *args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return self._slow("find", *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def _burst(n, fn):
+    barrier = threading.Barrier(n)
+
+    def call():
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(lambda _: call(), range(n)))
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """Test the single-flight primitive"""
+
+    def test_concurrent_calls_share_result(self):
+        """Test that a burst of identical calls runs the function once"""
+        flight = SingleFlight()
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"value": 42}
+
+        results = _burst(20, lambda: flight.do("key", load))
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert flight.shared == 19
+
+    def test_different_keys_run_separately(self):
+        """Test that distinct keys are not coalesced"""
+        flight = SingleFlight()
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+        assert flight.calls == 2
+
+    def test_sequential_calls_are_not_cached(self):
+        """Test that a finished call is not reused by later callers"""
+        flight = SingleFlight()
+        values = iter([1, 2])
+        assert flight.do("key", lambda: next(values)) == 1
+        assert flight.do("key", lambda: next(values)) == 2
+
+    def test_errors_are_shared(self):
+        """Test that waiters see the leader's exception and the key is released"""
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.05)
+            raise RuntimeError("database down")
+
+        def call():
+            try:
+                flight.do("key", fail)
+            except RuntimeError as exc:
+                return str(exc)
+
+        assert _burst(5, call) == ["database down"] * 5
+        assert flight.do("key", lambda: "ok") == "ok"
+
+
+@pytest.mark.api
+class TestCoalescedReads:
+    """Test that read endpoints coalesce concurrent identical requests"""
+
+    @pytest.fixture
+    def meeting(self, mock_db):
+        user_id = mock_db["users"].insert_one({"username": "host"}).inserted_id
+        meeting_id = (
+            mock_db["meetings"]
+            .insert_one({"hostId": str(user_id), "active": True, "name": "Storm"})
+            .inserted_id
+        )
+        mock_db["participants"].insert_one(
+            {
+                "meetingId": str(meeting_id),
+                "userId": str(user_id),
+                "isHost": True,
+                "joinedAt": datetime.now(),
+            }
+        )
+        return str(meeting_id), str(user_id)
+
+    def test_participants_burst_queries_once(self, mock_db, meeting):
+        """Test that a burst of participant list requests runs one roster query"""
+        meeting_id, _ = meeting
+        participants = SlowCollection(mock_db["participants"])
+
+        with patch("server.users_collection", mock_db["users"]), patch(
+            "server.participants_collection", participants
+        ):
+            responses = _burst(
+                20, lambda: app.test_client().get(f"/api/meetings/{meeting_id}/participants")
+            )
+
+        assert all(r.status_code == 200 for r in responses)
+        assert all(len(r.get_json()) == 1 for r in responses)
+        assert participants.finds == 1
+
+    def test_is_host_burst_queries_once(self, mock_db, meeting):
+        """Test that a burst of host checks runs one meeting lookup"""
+        meeting_id, host_id = meeting
+        meetings = SlowCollection(mock_db["meetings"])
+
+        with patch("server.meetings_collection", meetings):
+            responses = _burst(
+                20, lambda: app.test_client().get(f"/api/meetings/{meeting_id}/is-host/{host_id}")
+            )
+
+        assert all(r.get_json() == {"isHost": True} for r in responses)
+        assert meetings.finds == 1
+
+    def test_missing_meeting_still_404(self, client, mock_db):
+        """Test that coalesced lookups keep the not-found response"""
+        with patch("server.meetings_collection", mock_db["meetings"]):
+            response = client.get(f"/api/meetings/{ObjectId()}/is-host/someone")
+        assert response.status_code == 404
@@ -6,6 +6,9 @@ import pytest
 from unittest.mock import patch
 from datetime import datetime
 
+from connections import ConnectionTable
+from server import app, socketio, _expire_suspended_session
+
 
 @pytest.mark.socket
 @pytest.mark.unit
@@ -24,7 +27,7 @@ class TestSocketConnection:
 
     def test_client_disconnect(self, socket_client, mock_db):
         """Test client disconnection with cleanup"""
-        with patch("server.active_connections", {}), patch(
+        with patch("server.active_connections", ConnectionTable()), patch(
             "server.participants_collection", mock_db["participants"]
         ):
             # Simulate user in room
@@ -42,7 +45,7 @@ class TestMeetingRoomEvents:
 
     def test_join_room_success(self, socket_client):
         """Test successful room join"""
-        with patch("server.active_connections", {}):
+        with patch("server.active_connections", ConnectionTable()):
             socket_client.emit("join", {"room": "test_room", "userId": "user123"})
 
             # Test passes if no exception is raised during join
@@ -51,10 +54,12 @@ class TestMeetingRoomEvents:
 
     def test_join_room_with_existing_participants(self, socket_client):
         """Test joining room with existing participants"""
-        mock_connections = {
-            "socket1": {"room": "test_room", "userId": "user1", "socketId": "socket1"},
-            "socket2": {"room": "test_room", "userId": "user2", "socketId": "socket2"},
-        }
+        mock_connections = ConnectionTable(
+            {
+                "socket1": {"room": "test_room", "userId": "user1", "socketId": "socket1"},
+                "socket2": {"room": "test_room", "userId": "user2", "socketId": "socket2"},
+            }
+        )
 
         with patch("server.active_connections", mock_connections):
             socket_client.emit("join", {"room": "test_room", "userId": "user3"})
@@ -64,7 +69,7 @@ class TestMeetingRoomEvents:
 
     def test_leave_room_success(self, socket_client, mock_db):
         """Test successful room leave"""
-        with patch("server.active_connections", {}), patch(
+        with patch("server.active_connections", ConnectionTable()), patch(
             "server.participants_collection", mock_db["participants"]
         ):
             # Join first
@@ -125,6 +130,175 @@ class TestMeetingRoomEvents:
             assert meeting["active"] is True
 
 
+def _received(client, name):
+    """Return the payloads of every event with the given name received by a test client"""
+    return [event["args"][0] for event in client.get_received() if event["name"] == name]
+
+
+@pytest.mark.socket
+@pytest.mark.unit
+class TestSessionResumption:
+    """Test resumable sessions after transient disconnects"""
+
+    def test_join_issues_resume_token(self, socket_client):
+        """Test that joining a room hands out a resume token"""
+        with patch("server.active_connections", ConnectionTable()), patch(
+            "server.resume_tokens", {}
+        ) as tokens:
+            socket_client.emit("join", {"room": "test_room", "userId": "user123"})
+
+            payloads = _received(socket_client, "session-token")
+            assert len(payloads) == 1
+            assert payloads[0]["token"] in tokens
+
+    def test_disconnect_suspends_session(self, mock_db):
+        """Test that a disconnect within the grace period keeps the participant"""
+        connections = ConnectionTable()
+        with patch("server.active_connections", connections), patch(
+            "server.resume_tokens", {}
+        ), patch("server.participants_collection", mock_db["participants"]), patch(
+            "server.RESUME_GRACE_SECONDS", 60
+        ):
+            mock_db["participants"].insert_one({"meetingId": "test_room", "userId": "user123"})
+            peer = socketio.test_client(app)
+            peer.emit("join", {"room": "test_room", "userId": "peer"})
+            peer.get_received()
+
+            client = socketio.test_client(app)
+            client.emit("join", {"room": "test_room", "userId": "user123"})
+            client.disconnect()
+
+            assert _received(peer, "user-left") == []
+            assert mock_db["participants"].find_one({"userId": "user123"}) is not None
+            suspended = [c for c in connections.values() if c["userId"] == "user123"]
+            assert suspended[0]["suspendedAt"] is not None
+            peer.disconnect()
+
+    def test_resume_remaps_socket(self, mock_db):
+        """Test that resuming swaps the socket id and only sends socket-remapped to peers"""
+        connections = ConnectionTable()
+        with patch("server.active_connections", connections), patch(
+            "server.resume_tokens", {}
+        ), patch("server.participants_collection", mock_db["participants"]), patch(
+            "server.RESUME_GRACE_SECONDS", 60
+        ):
+            peer = socketio.test_client(app)
+            peer.emit("join", {"room": "test_room", "userId": "peer"})
+
+            client = socketio.test_client(app)
+            client.emit("join", {"room": "test_room", "userId": "user123"})
+            token = _received(client, "session-token")[0]["token"]
+            old_sid = next(sid for sid, c in connections.items() if c["userId"] == "user123")
+            client.disconnect()
+            peer.get_received()
+
+            resumed = socketio.test_client(app)
+            resumed.emit("resume", {"token": token})
+
+            session = _received(resumed, "session-resumed")[0]
+            assert session["previousSocketId"] == old_sid
+            assert session["token"] != token
+            assert [p["userId"] for p in session["participants"]] == ["peer"]
+
+            peer_events = peer.get_received()
+            assert [e["name"] for e in peer_events] == ["socket-remapped"]
+            remap = peer_events[0]["args"][0]
+            assert remap["oldSocketId"] == old_sid
+            assert remap["newSocketId"] in connections
+            assert old_sid not in connections
+            peer.disconnect()
+            resumed.disconnect()
+
+    def test_resume_with_unknown_token(self, socket_client):
+        """Test that an unknown token is rejected"""
+        with patch("server.active_connections", ConnectionTable()), patch(
+            "server.resume_tokens", {}
+        ):
+            socket_client.emit("resume", {"token": "bogus"})
+
+            assert len(_received(socket_client, "resume-failed")) == 1
+
+    def test_suspended_session_expires(self, mock_db):
+        """Test that an unresumed session is removed after the grace period"""
+        connections = ConnectionTable(
+            {
+                "old_sid": {
+                    "room": "test_room",
+                    "userId": "user123",
+                    "socketId": "old_sid",
+                    "resumeToken": "tok",
+                    "suspendedAt": 0,
+                }
+            }
+        )
+        with patch("server.active_connections", connections), patch(
+            "server.resume_tokens", {"tok": "old_sid"}
+        ) as tokens, patch("server.participants_collection", mock_db["participants"]), patch(
+            "server.RESUME_GRACE_SECONDS", 0
+        ):
+            mock_db["participants"].insert_one({"meetingId": "test_room", "userId": "user123"})
+
+            _expire_suspended_session("old_sid", "tok")
+
+            assert connections == {}
+            assert tokens == {}
+            assert mock_db["participants"].find_one({"userId": "user123"}) is None
+
+    def test_expired_session_spares_rejoined_user(self, mock_db):
+        """Test that expiry keeps the row and stays quiet once the user is back on a new socket"""
+        connections = ConnectionTable(
+            {
+                "old_sid": {
+                    "room": "test_room",
+                    "userId": "user123",
+                    "socketId": "old_sid",
+                    "resumeToken": "tok",
+                    "suspendedAt": 0,
+                },
+                "new_sid": {"room": "test_room", "userId": "user123", "socketId": "new_sid"},
+            }
+        )
+        with patch("server.active_connections", connections), patch(
+            "server.resume_tokens", {"tok": "old_sid"}
+        ), patch("server.participants_collection", mock_db["participants"]), patch(
+            "server.RESUME_GRACE_SECONDS", 0
+        ), patch("server.membership_notifier") as notifier:
+            mock_db["participants"].insert_one({"meetingId": "test_room", "userId": "user123"})
+
+            _expire_suspended_session("old_sid", "tok")
+
+            assert list(connections) == ["new_sid"]
+            assert mock_db["participants"].find_one({"userId": "user123"}) is not None
+            notifier.left.assert_not_called()
+
+    def test_plain_rejoin_retires_suspended_session(self, mock_db):
+        """Test that joining again without resuming drops the old session without a user-left"""
+        connections = ConnectionTable()
+        with patch("server.active_connections", connections), patch(
+            "server.resume_tokens", {}
+        ) as tokens, patch("server.participants_collection", mock_db["participants"]), patch(
+            "server.RESUME_GRACE_SECONDS", 60
+        ):
+            mock_db["participants"].insert_one({"meetingId": "test_room", "userId": "user123"})
+            peer = socketio.test_client(app)
+            peer.emit("join", {"room": "test_room", "userId": "peer"})
+
+            client = socketio.test_client(app)
+            client.emit("join", {"room": "test_room", "userId": "user123"})
+            client.disconnect()
+            peer.get_received()
+
+            rejoined = socketio.test_client(app)
+            rejoined.emit("join", {"room": "test_room", "userId": "user123"})
+
+            assert [c["userId"] for c in connections.values()] == ["peer", "user123"]
+            assert len(tokens) == 2
+            assert [e["name"] for e in peer.get_received()] == ["user-joined"]
+            assert mock_db["participants"].find_one({"userId": "user123"}) is not None
+            peer.disconnect()
+            rejoined.disconnect()
+
+
 @pytest.mark.socket
 @pytest.mark.unit
 class TestWebRTCSignaling:
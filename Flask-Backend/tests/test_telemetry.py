@@ -0,0 +1,200 @@
+"""
+Unit tests for network-quality telemetry
+Tests ring buffer ingest, tick-based percentiles and the quality-advice event
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import server
+from connections import ConnectionTable
+from server import app, socketio
+from telemetry import REDUCE, RESTORE, NetworkQuality, grouped_percentile
+
+GOOD = ["sender", 80, 0.0, 5, 1200]
+BAD = ["sender", 600, 0.1, 80, 300]
+MEMBERS = {"reporter", "sender"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def quality(scheduler):
+    advice = []
+    clock = Clock()
+    engine = NetworkQuality(
+        lambda sid, payload: advice.append((sid, payload)),
+        scheduler,
+        capacity=8,
+        window=10.0,
+        clock=clock,
+    )
+    engine.advice = advice
+    engine.test_clock = clock
+    return engine
+
+
+@pytest.mark.unit
+class TestNetworkQuality:
+    """Test sample ingest and threshold crossings"""
+
+    def test_ring_buffer_wraps(self, quality):
+        """Test that old samples are overwritten once the buffer is full"""
+        for _ in range(3):
+            quality.ingest("room1", "reporter", [GOOD] * 5, MEMBERS)
+
+        stats = quality.rooms["room1"]
+        assert stats.pos == 15 % 8
+        assert (stats.links == 0).all()
+
+    def test_invalid_samples_ignored(self, quality, scheduler):
+        """Test that malformed samples and self reports are not stored"""
+        samples = [
+            ["sender", 80, 1.5, 5, 100],
+            ["sender", "80", 0, 5, 100],
+            ["sender", float("nan"), 0, 5, 100],
+            ["reporter", 80, 0, 5, 100],
+            [None, 80, 0, 5, 100],
+            ["sender", 80, 0, 5],
+        ]
+        assert quality.ingest("room1", "reporter", samples, MEMBERS) == 0
+        assert quality.ingest("room1", "reporter", "not a list", MEMBERS) == 0
+        assert scheduler.calls == []
+
+    def test_senders_outside_the_room_ignored(self, quality, scheduler):
+        """Test that samples about sockets not in the room are dropped"""
+        with patch("telemetry.RoomStats") as room_stats:
+            assert quality.ingest("room1", "reporter", [BAD] * 4) == 0
+            assert quality.ingest("room1", "reporter", [BAD] * 4, {"reporter", "other"}) == 0
+        # Rejected reports never allocate a room's buffers
+        assert room_stats.call_count == 0
+        scheduler.run_all()
+
+        assert quality.advice == []
+        assert "room1" not in quality.rooms
+
+    def test_links_per_room_capped(self, scheduler):
+        """Test that a room stops adding links once it tracks max_links"""
+        quality = NetworkQuality(lambda sid, payload: None, scheduler, max_links=2)
+        members = {f"sender{i}" for i in range(5)}
+        samples = [[f"sender{i}", 80, 0.0, 5, 1200] for i in range(5)]
+
+        assert quality.ingest("room1", "reporter", samples, members) == 2
+        assert len(quality.rooms["room1"].link_ids) == 2
+
+    def test_ingest_only_schedules_the_tick(self, quality, scheduler):
+        """Test that ingest never aggregates and schedules a single tick"""
+        with patch("telemetry.grouped_percentile") as aggregate:
+            for _ in range(10):
+                quality.ingest("room1", "reporter", [BAD], MEMBERS)
+            aggregate.assert_not_called()
+
+        assert len(scheduler.calls) == 1
+        assert quality.advice == []
+
+    def test_degraded_link_advised_once(self, quality, scheduler):
+        """Test that a crossing emits one reduce and nothing while still degraded"""
+        quality.ingest("room1", "reporter", [BAD] * 4, MEMBERS)
+        scheduler.run_all()
+        quality.ingest("room1", "reporter", [BAD] * 4, MEMBERS)
+        scheduler.run_all()
+
+        assert len(quality.advice) == 1
+        sid, payload = quality.advice[0]
+        assert sid == "sender"
+        assert payload["action"] == REDUCE
+        assert payload["peerSocketId"] == "reporter"
+        assert payload["rttMs"] == 600
+        assert payload["bitrateKbps"] == 300
+
+    def test_recovery_restores(self, quality, scheduler):
+        """Test that a degraded link gets restore once its window is healthy again"""
+        quality.ingest("room1", "reporter", [BAD] * 4, MEMBERS)
+        scheduler.run_all()
+
+        # Bad samples age out of the window
+        quality.test_clock.now += 20
+        quality.ingest("room1", "reporter", [GOOD] * 4, MEMBERS)
+        scheduler.run_all()
+
+        assert [payload["action"] for _, payload in quality.advice] == [REDUCE, RESTORE]
+
+    def test_too_few_samples_no_advice(self, quality, scheduler):
+        """Test that a single bad sample is not enough to advise"""
+        quality.ingest("room1", "reporter", [BAD], MEMBERS)
+        scheduler.run_all()
+        assert quality.advice == []
+
+    def test_forget_drops_links(self, quality, scheduler):
+        """Test that samples of a socket that left are no longer evaluated"""
+        quality.ingest("room1", "reporter", [BAD] * 4, MEMBERS)
+        quality.forget("room1", "sender")
+        scheduler.run_all()
+
+        assert quality.advice == []
+        assert "room1" not in quality.rooms
+
+    def test_grouped_percentile(self):
+        """Test per-link percentiles against a per-link sort"""
+        rng = np.random.default_rng(1)
+        links = rng.integers(0, 5, 200).astype(np.int32)
+        values = rng.random((200, 2)).astype(np.float32)
+
+        link_ids, counts, result = grouped_percentile(links, values, 0.9)
+
+        for i, link in enumerate(link_ids):
+            group = np.sort(values[links == link], axis=0)
+            assert counts[i] == len(group)
+            assert np.array_equal(result[i], group[int(0.9 * (len(group) - 1))])
+
+
+@pytest.mark.socket
+class TestQualityAdviceEvent:
+    """Test the webrtc-stats and quality-advice socket events"""
+
+    def test_advice_sent_to_sender(self, mock_db, scheduler):
+        """Test that a bad link report advises the sending socket only"""
+        with patch("server.participants_collection", mock_db["participants"]), patch(
+            "server.active_connections", ConnectionTable()
+        ), patch("server.resume_tokens", {}), patch(
+            "server.network_quality",
+            NetworkQuality(server._emit_quality_advice, scheduler),
+        ):
+            sender = socketio.test_client(app)
+            reporter = socketio.test_client(app)
+            sender.emit("join", {"room": "room1", "userId": "alice"})
+            reporter.emit("join", {"room": "room1", "userId": "bob"})
+            sender_sid, reporter_sid = list(server.active_connections)
+            sender.get_received()
+            reporter.get_received()
+
+            sample = [sender_sid, 700, 0.2, 90, 250]
+            reporter.emit("webrtc-stats", {"samples": [sample] * 5})
+            scheduler.run_all()
+
+            advice = [e["args"][0] for e in sender.get_received() if e["name"] == "quality-advice"]
+            assert len(advice) == 1
+            assert advice[0]["action"] == REDUCE
+            assert advice[0]["peerSocketId"] == reporter_sid
+            assert not [e for e in reporter.get_received() if e["name"] == "quality-advice"]
+
+            # A socket in another room cannot be targeted
+            outsider = socketio.test_client(app)
+            outsider.emit("join", {"room": "room2", "userId": "carol"})
+            outsider_sid = next(iter(server.active_connections.in_room("room2")))
+            outsider.get_received()
+            reporter.emit("webrtc-stats", {"samples": [[outsider_sid, 700, 0.2, 90, 250]] * 5})
+            scheduler.run_all()
+            assert not [e for e in outsider.get_received() if e["name"] == "quality-advice"]
+
+            sender.disconnect()
+            reporter.disconnect()
+            outsider.disconnect()
@@ -0,0 +1,204 @@
+"""
+Unit tests for the TURN server pool
+Tests load-aware allocation, credential minting and caching, and the API endpoints
+"""
+
+import base64
+import hashlib
+import hmac
+from unittest.mock import patch
+
+import pytest
+
+from turn import TurnPool, turn_urls
+
+SECRET = "turn-secret"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_pool(clock, hosts=("a", "b", "c"), **kwargs):
+    return TurnPool(
+        {host: turn_urls(host) for host in hosts},
+        SECRET,
+        ttl=600,
+        stun_urls=["stun:stun.example.com:3478"],
+        clock=clock,
+        **kwargs,
+    )
+
+
+def turn_entry(ice_servers):
+    return next(server for server in ice_servers if "username" in server)
+
+
+@pytest.mark.unit
+class TestTurnPool:
+    """Test server selection and credentials"""
+
+    def test_credentials_follow_rest_api_scheme(self, clock):
+        """Test that the password is the HMAC-SHA1 of an expiring username"""
+        ice_servers, ttl = make_pool(clock).ice_servers("alice")
+        entry = turn_entry(ice_servers)
+
+        assert ttl == 600
+        assert entry["username"] == f"{int(clock.now) + 600}:alice"
+        digest = hmac.new(SECRET.encode(), entry["username"].encode(), hashlib.sha1).digest()
+        assert entry["credential"] == base64.b64encode(digest).decode()
+        assert ice_servers[0] == {"urls": "stun:stun.example.com:3478"}
+
+    def test_credentials_cached_per_user(self, clock):
+        """Test that a user gets the same credentials until they near expiry"""
+        pool = make_pool(clock)
+        first = turn_entry(pool.ice_servers("alice")[0])
+        clock.now += 300
+        cached, ttl = pool.ice_servers("alice")
+
+        assert turn_entry(cached) is first
+        assert ttl == 300
+        assert pool.issued == 1 and pool.cached == 1
+
+        # Reissued close to expiry, on the same server
+        clock.now += 280
+        renewed = turn_entry(pool.ice_servers("alice")[0])
+        assert renewed["username"] != first["username"]
+        assert renewed["urls"] == first["urls"]
+
+    def test_least_loaded_server_chosen(self, clock):
+        """Test that users go to the server with the lowest reported load"""
+        pool = make_pool(clock)
+        pool.report("a", 100)
+        pool.report("b", 10)
+        pool.report("c", 50)
+
+        entry = turn_entry(pool.ice_servers("alice")[0])
+        assert entry["urls"] == turn_urls("b")
+
+    def test_allocations_spread_before_reports_catch_up(self, clock):
+        """Test that assigned users count as load so a burst is spread out"""
+        pool = make_pool(clock)
+        for host in ("a", "b", "c"):
+            pool.report(host, 0)
+
+        servers = [turn_entry(pool.ice_servers(f"user{i}")[0])["urls"][0] for i in range(6)]
+        assert sorted(servers) == sorted([turn_urls(h)[0] for h in ("a", "b", "c")] * 2)
+
+    def test_assignments_decay(self, clock):
+        """Test that assignments fade once reports would include them"""
+        pool = make_pool(clock, hosts=("a", "b"), half_life=10.0)
+        pool.report("a", 0)
+        pool.report("b", 2)
+        for i in range(4):
+            pool.ice_servers(f"user{i}")
+        assert pool.score(pool.servers["a"], clock.now) == pytest.approx(3)
+
+        clock.now += 10
+        assert pool.score(pool.servers["a"], clock.now) == pytest.approx(1.5)
+
+    def test_stale_servers_skipped(self, clock):
+        """Test that a server that stopped reporting gets no new users"""
+        pool = make_pool(clock, hosts=("a", "b"), stale_after=60)
+        pool.report("a", 0)
+        pool.report("b", 100)
+        clock.now += 50
+        pool.report("b", 100)
+        clock.now += 20
+
+        entry = turn_entry(pool.ice_servers("alice")[0])
+        assert entry["urls"] == turn_urls("b")
+
+    def test_unknown_server_report(self, clock):
+        """Test that reports for servers outside the pool are rejected"""
+        assert make_pool(clock).report("z", 1) is False
+
+    def test_no_servers_offers_stun_only(self, clock):
+        """Test that an empty pool returns the STUN servers without credentials"""
+        ice_servers, ttl = TurnPool({}, "", stun_urls=["stun:s:3478"]).ice_servers("alice")
+        assert ice_servers == [{"urls": "stun:s:3478"}]
+        assert ttl is None
+
+
+@pytest.mark.api
+class TestTurnEndpoints:
+    """Test the ICE server and load report endpoints"""
+
+    @pytest.fixture
+    def pool(self, clock):
+        pool = make_pool(clock)
+        with patch("server.turn_pool", pool), patch("server.TURN_REPORT_TOKEN", "report"):
+            yield pool
+
+    @pytest.fixture
+    def meeting_id(self, mock_db):
+        meeting_id = str(
+            mock_db["meetings"].insert_one({"hostId": "host", "active": True}).inserted_id
+        )
+        mock_db["participants"].insert_one({"meetingId": meeting_id, "userId": "alice"})
+        with patch("server.meetings_collection", mock_db["meetings"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ):
+            yield meeting_id
+
+    def test_ice_servers(self, client, pool, meeting_id):
+        """Test that the endpoint returns STUN plus one TURN entry with credentials"""
+        response = client.get(f"/api/ice-servers?meetingId={meeting_id}&userId=alice")
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["ttl"] == 600
+        assert turn_entry(data["iceServers"])["username"].endswith(":alice")
+
+    def test_ice_servers_requires_participant(self, client, pool, meeting_id, mock_db):
+        """Test that only participants of an active meeting get credentials"""
+        assert client.get("/api/ice-servers?userId=alice").status_code == 400
+        assert client.get(f"/api/ice-servers?meetingId={meeting_id}").status_code == 400
+        response = client.get(f"/api/ice-servers?meetingId={meeting_id}&userId=mallory")
+        assert response.status_code == 403
+        response = client.get("/api/ice-servers?meetingId=nope&userId=alice")
+        assert response.status_code == 400
+
+        mock_db["meetings"].update_many({}, {"$set": {"active": False}})
+        response = client.get(f"/api/ice-servers?meetingId={meeting_id}&userId=alice")
+        assert response.status_code == 400
+        assert pool.stats()["issued"] == 0
+
+    def test_load_report(self, client, pool):
+        """Test that authorized load reports reach the pool"""
+        headers = {"X-Turn-Report-Token": "report"}
+        response = client.post("/api/turn/load", json={"server": "b", "load": 42}, headers=headers)
+
+        assert response.status_code == 200
+        assert pool.servers["b"].load == 42
+        assert (
+            client.post(
+                "/api/turn/load", json={"server": "z", "load": 1}, headers=headers
+            ).status_code
+            == 404
+        )
+        assert (
+            client.post(
+                "/api/turn/load", json={"server": "b", "load": "x"}, headers=headers
+            ).status_code
+            == 400
+        )
+
+    def test_load_report_requires_token(self, client, pool):
+        """Test that reports without the shared token are refused"""
+        response = client.post(
+            "/api/turn/load",
+            json={"server": "b", "load": 42},
+            headers={"X-Turn-Report-Token": "wrong"},
+        )
+        assert response.status_code == 403
+        assert pool.servers["b"].reported_at is None
@@ -0,0 +1,195 @@
+"""
+Unit tests for the username filter and user cache
+Tests the Bloom filter, the LRU cache and how create_user/get_user use them
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+import server
+from usercache import BloomFilter, UserLookup
+
+
+@pytest.mark.unit
+class TestBloomFilter:
+    """Test the Bloom filter"""
+
+    def test_no_false_negatives_and_rate_near_target(self):
+        """Test that every added name is found and few absent ones are"""
+        bloom = BloomFilter(10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(f"user-{i}")
+
+        assert all(f"user-{i}" in bloom for i in range(10000))
+        false_positives = sum(f"absent-{i}" in bloom for i in range(10000))
+        assert false_positives < 200
+        assert 0.005 < bloom.false_positive_rate() < 0.02
+
+
+@pytest.mark.unit
+class TestUserLookup:
+    """Test the filter lifecycle and the cache"""
+
+    def test_filter_rules_out_missing_names_once_built(self):
+        """Test that nothing is ruled out before the build and counters after it"""
+        lookup = UserLookup(capacity=100)
+        assert lookup.may_exist("anyone")
+
+        assert lookup.build(lambda: iter(["alice", "bob"])) == 2
+        lookup.added("carol")
+        assert lookup.may_exist("alice") and lookup.may_exist("carol")
+        assert not lookup.may_exist("mallory")
+        lookup.missed()
+
+        stats = lookup.stats()
+        assert stats["negatives"] == 1 and stats["falsePositives"] == 1
+        assert stats["observedFalsePositiveRate"] == 0.5
+        assert stats["users"] == 3 and stats["expectedFalsePositiveRate"] < 0.01
+
+    def test_refresh_before_ruling_out_at_most_once_per_interval(self):
+        """Test that names created elsewhere are pulled in before a negative"""
+        now = [0.0]
+        lookup = UserLookup(capacity=100, refresh_interval=1.0, clock=lambda: now[0])
+        lookup.build(lambda: iter(["alice"]), synced_to=0)
+        created = ["bob"]
+        calls = []
+
+        def refresh(since):
+            calls.append(since)
+            return list(created), since + 1
+
+        assert lookup.may_exist("bob", refresh=refresh)
+        created.append("carol")
+        assert not lookup.may_exist("carol", refresh=refresh)
+        now[0] = 1.0
+        assert lookup.may_exist("carol", refresh=refresh)
+
+        assert calls == [0, 1]
+        assert lookup.stats()["users"] == 3 and lookup.negatives == 1
+
+    def test_unique_index_rechecked_until_found(self):
+        """Test that a missing index is looked up again only after the interval"""
+        now = [0.0]
+        lookup = UserLookup(index_check_interval=60.0, clock=lambda: now[0])
+        answers = [False, True]
+        assert not lookup.has_unique_index(lambda: answers.pop(0))
+        now[0] = 30.0
+        assert not lookup.has_unique_index(lambda: answers.pop(0))
+        now[0] = 60.0
+        assert lookup.has_unique_index(lambda: answers.pop(0))
+        assert lookup.has_unique_index(lambda: answers.pop(0)) and not answers
+
+    def test_cache_keeps_most_recent_users(self):
+        """Test that the least recently read user is evicted first"""
+        lookup = UserLookup(cache_size=2)
+        lookup.put("alice", {"username": "alice"})
+        lookup.put("bob", {"username": "bob"})
+        assert lookup.get("alice") == {"username": "alice"}
+        lookup.put("carol", {"username": "carol"})
+
+        assert lookup.get("bob") is None
+        assert lookup.get("alice") and lookup.get("carol")
+        assert lookup.stats()["cacheHits"] == 3
+
+        uncached = UserLookup(cache_size=0)
+        uncached.put("alice", {"username": "alice"})
+        assert uncached.get("alice") is None
+
+
+@pytest.mark.api
+class TestUserLookupAPI:
+    """Test the filter and cache in front of the user endpoints"""
+
+    def test_get_user_skips_database_for_missing_and_cached(
+        self, client, mock_db, user_lookup, scheduler
+    ):
+        """Test that a probe for a missing name and a repeat read make no query"""
+        mock_db["users"].insert_one(
+            {"username": "alice", "displayName": "Alice", "searchNames": ["alice"]}
+        )
+        with patch("server.users_collection", mock_db["users"]), patch(
+            "server._schedule", scheduler
+        ), patch.object(mock_db["users"], "find_one", wraps=mock_db["users"].find_one) as find_one:
+            # Built in the background; until then every name is looked up
+            assert client.get("/api/users/probe").status_code == 404
+            server.start_user_indexes()
+            scheduler.run_all()
+            assert user_lookup.built and find_one.call_count == 1
+
+            assert client.get("/api/users/alice").status_code == 200
+            user = client.get("/api/users/alice").get_json()
+            assert user["displayName"] == "Alice" and "searchNames" not in user
+            assert find_one.call_count == 2
+
+            for i in range(20):
+                assert client.get(f"/api/users/probe-{i}").status_code == 404
+            assert find_one.call_count == 2
+            assert user_lookup.stats()["negatives"] == 20
+
+    def test_create_user_relies_on_unique_index(self, client, mock_db):
+        """Test that a new name skips the lookup and a stale filter is caught by the index"""
+        mock_db["users"].create_index("username", unique=True)
+        with patch("server.users_collection", mock_db["users"]):
+            server._build_user_indexes()
+        with patch("server.users_collection", mock_db["users"]), patch.object(
+            mock_db["users"], "find_one", wraps=mock_db["users"].find_one
+        ) as find_one:
+            response = client.post("/api/users", json={"username": "alice"})
+            assert response.status_code == 201
+            assert find_one.call_count == 0
+
+            # Written behind this process's back, so the filter has not seen it
+            mock_db["users"].insert_one({"username": "bob", "displayName": "Bob"})
+            response = client.post("/api/users", json={"username": "bob"})
+            assert response.status_code == 400
+            assert response.get_json()["error"] == "Username already exists"
+
+            assert client.post("/api/users", json={"username": "alice"}).status_code == 400
+            assert find_one.call_count == 1
+
+    def test_create_user_checks_without_unique_index(self, client, mock_db, user_lookup):
+        """Test that filter negatives are not trusted while the index is missing"""
+        user_lookup.build(lambda: iter([]), synced_to=datetime.now())
+        with patch("server.users_collection", mock_db["users"]):
+            # Written behind this process's back, and no index to catch the duplicate
+            mock_db["users"].insert_one({"username": "bob", "displayName": "Bob"})
+            response = client.post("/api/users", json={"username": "bob"})
+            assert response.status_code == 400
+            assert mock_db["users"].count_documents({"username": "bob"}) == 1
+
+    def test_get_user_finds_users_created_by_other_workers(self, client, mock_db):
+        """Test that a user another worker created is read back instead of a 404"""
+        mock_db["users"].insert_one({"username": "alice", "createdAt": datetime.now()})
+        with patch("server.users_collection", mock_db["users"]):
+            assert client.get("/api/users/alice").status_code == 200
+            mock_db["users"].insert_one(
+                {"username": "bob", "displayName": "Bob", "createdAt": datetime.now()}
+            )
+            response = client.get("/api/users/bob")
+            assert response.status_code == 200
+            assert response.get_json()["displayName"] == "Bob"
+
+    def test_rebuild_endpoint(self, client, mock_db, user_lookup):
+        """Test that a rebuild needs the token and picks up users imported elsewhere"""
+        mock_db["users"].insert_one({"username": "alice", "displayName": "Alice"})
+        with patch("server.users_collection", mock_db["users"]), patch(
+            "server.USER_FILTER_REBUILD_TOKEN", "secret"
+        ):
+            server._build_user_indexes()
+            assert client.get("/api/users/alice").status_code == 200
+            # Imported without createdAt, so refreshes do not see it
+            mock_db["users"].insert_one({"username": "bob", "displayName": "Bob"})
+            assert client.get("/api/users/bob").status_code == 404
+
+            response = client.post("/api/users/filter/rebuild", headers={"X-Rebuild-Token": "x"})
+            assert response.status_code == 403
+            response = client.post(
+                "/api/users/filter/rebuild", headers={"X-Rebuild-Token": "secret"}
+            )
+            assert response.status_code == 200 and response.get_json()["users"] == 2
+
+            assert client.get("/api/users/bob").status_code == 200
+            metrics = client.get("/api/metrics").get_json()["userFilter"]
+            assert metrics["users"] == 2 and "expectedFalsePositiveRate" in metrics
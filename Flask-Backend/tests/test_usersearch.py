@@ -0,0 +1,150 @@
+"""
+Unit tests for user search
+Tests the in-process prefix index and the /api/users/search endpoint
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import server
+from server import ensure_indexes
+from usersearch import UserIndex, search_names
+
+
+def _index(users, **kwargs):
+    index = UserIndex(**kwargs)
+    index.build(lambda: iter(users))
+    return index
+
+
+@pytest.mark.unit
+class TestUserIndex:
+    """Test the sorted prefix index"""
+
+    def test_matches_usernames_and_display_names(self):
+        """Test case-insensitive prefix matches on both names, each user once"""
+        index = _index(
+            [
+                ("alice", "Alice Liddell"),
+                ("alfred", "Alfred"),
+                ("bob", "Albert Bob"),
+                ("carol", "carol"),
+            ]
+        )
+
+        assert [u["username"] for u in index.search("al")] == ["bob", "alfred", "alice"]
+        assert index.search("ALICE L") == [{"username": "alice", "displayName": "Alice Liddell"}]
+        assert [u["username"] for u in index.search("c")] == ["carol"]
+        assert index.search("zed") == []
+        assert len(index.search("al", limit=2)) == 2
+
+    def test_new_users_indexed_after_build(self):
+        """Test that adds before the build are skipped and later ones are searchable"""
+        index = UserIndex()
+        index.add("early", "Early")
+        assert not index.built
+
+        index.build(lambda: iter([("early", "Early")]))
+        index.add("eve", "Eve")
+        index.add("eve", "Eve")
+        assert [u["username"] for u in index.search("e")] == ["early", "eve"]
+        assert len(index) == 2
+
+    def test_users_created_during_build_kept(self):
+        """Test that a user added while the collection is being read is not lost"""
+        index = UserIndex()
+        reading = threading.Event()
+        resume = threading.Event()
+
+        def users():
+            yield "old", "Old"
+            reading.set()
+            resume.wait(5)
+
+        builder = threading.Thread(target=index.build, args=(users,))
+        builder.start()
+        reading.wait(5)
+        index.add("new", "New")
+        resume.set()
+        builder.join(5)
+
+        assert [u["username"] for u in index.search("")] == ["new", "old"]
+
+    def test_overflow_makes_index_unavailable(self):
+        """Test that the index empties itself once it holds more than max_users"""
+        index = _index([("a", "a"), ("b", "b")], max_users=3)
+        assert index.available
+
+        index.add("c", "c")
+        index.add("d", "d")
+        assert not index.available
+        assert index.search("") == []
+        assert not _index([(str(i), "x") for i in range(5)], max_users=3).available
+
+
+@pytest.mark.api
+class TestUserSearchAPI:
+    """Test the user search endpoint"""
+
+    def test_search_with_index(self, client, mock_db, scheduler):
+        """Test that the index is built in the background and kept up to date"""
+        mock_db["users"].insert_one(
+            {
+                "username": "dana",
+                "displayName": "Dana Scully",
+                "searchNames": search_names("dana", "Dana Scully"),
+            }
+        )
+        with patch("server.users_collection", mock_db["users"]), patch(
+            "server.user_index", UserIndex()
+        ) as index, patch("server._schedule", scheduler):
+            # Searches before the build query the database instead
+            response = client.get("/api/users/search?prefix=Da")
+            assert [u["username"] for u in response.get_json()["users"]] == ["dana"]
+            assert not index.built
+
+            server.start_user_indexes()
+            scheduler.run_all()
+            response = client.get("/api/users/search?prefix=Da")
+            assert response.status_code == 200
+            assert response.get_json() == {
+                "users": [{"username": "dana", "displayName": "Dana Scully"}]
+            }
+            assert index.built
+
+            client.post("/api/users", json={"username": "dale", "displayName": "Dale"})
+            response = client.get("/api/users/search?prefix=da&limit=1")
+            assert response.get_json()["users"] == [{"username": "dale", "displayName": "Dale"}]
+
+    def test_search_regex_fallback(self, client, mock_db):
+        """Test that the regex query ignores case like the index does"""
+        with patch("server.users_collection", mock_db["users"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.USER_SEARCH_INDEX", False):
+            client.post("/api/users", json={"username": "dana", "displayName": "Dana Scully"})
+            client.post("/api/users", json={"username": "Fox", "displayName": "Fox Mulder"})
+            client.post("/api/users", json={"username": "d.a", "displayName": "D.A."})
+            # Created before searchNames was stored
+            mock_db["users"].insert_one({"username": "walter", "displayName": "Skinner"})
+            ensure_indexes()
+
+            response = client.get("/api/users/search?prefix=fOX")
+            assert response.get_json()["users"] == [
+                {"username": "Fox", "displayName": "Fox Mulder"}
+            ]
+            response = client.get("/api/users/search?prefix=dana s")
+            assert [u["username"] for u in response.get_json()["users"]] == ["dana"]
+            response = client.get("/api/users/search?prefix=SKIN")
+            assert [u["username"] for u in response.get_json()["users"]] == ["walter"]
+            # Regex metacharacters in the prefix are matched literally
+            response = client.get("/api/users/search?prefix=d.")
+            assert [u["username"] for u in response.get_json()["users"]] == ["d.a"]
+
+    def test_search_rejects_bad_input(self, client):
+        """Test that a missing prefix or an out-of-range limit is a 400"""
+        assert client.get("/api/users/search").status_code == 400
+        assert client.get("/api/users/search?prefix=%20").status_code == 400
+        assert client.get("/api/users/search?prefix=a&limit=0").status_code == 400
+        assert client.get("/api/users/search?prefix=a&limit=51").status_code == 400
@@ -0,0 +1,187 @@
+"""
+Unit tests for webinar (large-audience) mode
+Tests receive-only attendees, aggregated attendee counts and moderated chat
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+import server
+from connections import ConnectionTable
+from server import (
+    _emit_attendee_count,
+    _meeting_settings,
+    _settings_from_meeting,
+    app,
+    socketio,
+)
+from webinar import AttendeeCounter, ModeratedChatLane
+
+
+def _names(client):
+    return [event["name"] for event in client.get_received()]
+
+
+@pytest.mark.unit
+class TestWebinarHelpers:
+    """Test the attendee counter and the moderated chat lane"""
+
+    def test_counter_coalesces_updates(self, scheduler):
+        """Test that many count changes produce one scheduled broadcast"""
+        emitted = []
+        counter = AttendeeCounter(lambda room, count: emitted.append((room, count)), scheduler)
+
+        for _ in range(100):
+            counter.add("web", 1)
+        counter.add("web", -1)
+        scheduler.run_all()
+
+        assert emitted == [("web", 99)]
+
+    def test_chat_lane_rate_limits_sender(self):
+        """Test that an attendee cannot submit faster than the minimum interval"""
+        lane = ModeratedChatLane(min_interval=5.0)
+
+        assert lane.submit("web", "s1", {"id": "m1"}, now=100.0)
+        assert not lane.submit("web", "s1", {"id": "m2"}, now=102.0)
+        assert lane.submit("web", "s1", {"id": "m3"}, now=106.0)
+        assert lane.take("web", "m1") == {"id": "m1"}
+        assert lane.take("web", "m2") is None
+
+    def test_chat_lane_is_bounded(self):
+        """Test that the pending queue drops the oldest messages"""
+        lane = ModeratedChatLane(min_interval=0, max_pending=2)
+        for i in range(5):
+            lane.submit("web", f"s{i}", {"id": f"m{i}"})
+
+        assert lane.take("web", "m0") is None
+        assert lane.take("web", "m4") == {"id": "m4"}
+
+
+@pytest.mark.socket
+@pytest.mark.unit
+class TestWebinarRoom:
+    """Test presenter/attendee behaviour through the socket handlers"""
+
+    @pytest.fixture
+    def webinar(self, scheduler, mock_db):
+        settings = _settings_from_meeting({"type": "webinar", "hostId": "host"})
+        counter = AttendeeCounter(_emit_attendee_count, scheduler)
+        with patch("server.active_connections", ConnectionTable()), patch(
+            "server.resume_tokens", {}
+        ), patch("server.meeting_settings", {"web1": settings}), patch(
+            "server.attendee_counter", counter
+        ), patch("server.attendee_chat", ModeratedChatLane()), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.RESUME_GRACE_SECONDS", 0):
+            presenter = socketio.test_client(app)
+            presenter.emit("join", {"room": "web1", "userId": "host"})
+            presenter.get_received()
+            yield presenter
+            presenter.disconnect()
+
+    def test_attendee_join_is_not_announced(self, webinar, scheduler):
+        """Test that attendees only see presenters and are only counted"""
+        attendees = [socketio.test_client(app) for _ in range(3)]
+        for i, attendee in enumerate(attendees):
+            attendee.emit("join", {"room": "web1", "userId": f"attendee{i}"})
+
+        received = attendees[2].get_received()
+        existing = [e["args"][0] for e in received if e["name"] == "existing-participants"][0]
+        assert existing["role"] == "attendee"
+        assert [p["userId"] for p in existing["participants"]] == ["host"]
+        assert _names(webinar) == []
+
+        scheduler.run_all()
+
+        counts = [e["args"][0] for e in webinar.get_received() if e["name"] == "attendee-count"]
+        assert counts == [{"room": "web1", "count": 3}]
+
+        # Only the presenters, who hold a connection to each attendee, hear of a leave
+        attendees[0].disconnect()
+        assert _names(webinar) == ["user-left"]
+        assert "user-left" not in _names(attendees[1])
+
+    def test_attendee_offer_is_receive_only(self, webinar):
+        """Test that attendees make the offer and presenters see it as receive-only"""
+        attendee = socketio.test_client(app)
+        attendee.emit("join", {"room": "web1", "userId": "attendee"})
+        received = attendee.get_received()
+        existing = [e["args"][0] for e in received if e["name"] == "existing-participants"][0]
+        presenter_sid = existing["participants"][0]["socketId"]
+
+        attendee.emit(
+            "offer",
+            {"offer": {"type": "offer", "sdp": "v=0"}, "targetSocket": presenter_sid},
+        )
+
+        offers = [e["args"][0] for e in webinar.get_received() if e["name"] == "offer"]
+        assert offers[0]["receiveOnly"] is True
+        assert offers[0]["fromUserId"] is None
+
+    def test_unknown_rooms_are_not_cached(self, webinar):
+        """Test that settings are only cached for meetings that exist"""
+        assert _meeting_settings("no-such-room")["type"] == "meeting"
+        assert "no-such-room" not in server.meeting_settings
+        assert "web1" in server.meeting_settings
+
+    def test_attendee_chat_is_moderated(self, webinar):
+        """Test that attendee chat reaches the room only after presenter approval"""
+        attendee = socketio.test_client(app)
+        attendee.emit("join", {"room": "web1", "userId": "attendee"})
+        attendee.get_received()
+
+        message = {
+            "room": "web1",
+            "id": "m1",
+            "userId": "attendee",
+            "username": "attendee",
+            "message": "Question!",
+            "timestamp": datetime.now().isoformat(),
+        }
+        attendee.emit("send-chat-message", message)
+        attendee.emit("send-chat-message", {**message, "id": "m2"})
+
+        assert _names(webinar) == ["chat-pending"]
+        assert _names(attendee) == ["chat-rate-limited"]
+
+        webinar.emit("moderate-chat-message", {"id": "m1", "approve": True})
+
+        assert _names(attendee) == ["chat-message"]
+
+    def test_attendee_cannot_moderate(self, webinar):
+        """Test that attendees are refused moderation"""
+        attendee = socketio.test_client(app)
+        attendee.emit("join", {"room": "web1", "userId": "attendee"})
+        attendee.get_received()
+
+        attendee.emit("moderate-chat-message", {"id": "m1", "approve": True})
+
+        assert _names(attendee) == ["error"]
+
+
+@pytest.mark.api
+@pytest.mark.unit
+class TestWebinarCreation:
+    """Test creating webinar meetings"""
+
+    def test_create_webinar(self, client, mock_db):
+        """Test that the meeting type and presenters are stored"""
+        with patch("server.meetings_collection", mock_db["meetings"]), patch(
+            "server.participants_collection", mock_db["participants"]
+        ), patch("server.meeting_settings", {}):
+            response = client.post(
+                "/api/meetings",
+                json={"hostId": "host", "type": "webinar", "presenters": ["guest"]},
+            )
+
+            assert response.status_code == 201
+            meeting = mock_db["meetings"].find_one({"hostId": "host"})
+            assert meeting["type"] == "webinar"
+            assert meeting["presenters"] == ["guest"]
+
+    def test_create_meeting_invalid_type(self, client):
+        """Test that unknown meeting types are rejected"""
+        response = client.post("/api/meetings", json={"hostId": "host", "type": "party"})
+
+        assert response.status_code == 400
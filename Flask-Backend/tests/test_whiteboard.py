@@ -0,0 +1,161 @@
+"""
+Unit tests for the collaborative whiteboard
+Tests operation sequencing, compaction, catch-up state and tick-batched fan-out
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from connections import ConnectionTable
+from server import app, socketio
+from whiteboard import WhiteboardError, Whiteboards
+
+
+def _add(stroke_id, points=(0, 0), **fields):
+    return {"type": "add", "id": stroke_id, "points": list(points), **fields}
+
+
+def _extend(stroke_id, points=(1, 1)):
+    return {"type": "extend", "id": stroke_id, "points": list(points)}
+
+
+@pytest.mark.unit
+class TestWhiteboards:
+    """Test the per-room documents"""
+
+    def test_ops_sequenced_and_batched_per_tick(self, scheduler):
+        """Test that ops get room sequence numbers and go out as one packet per tick"""
+        emit = MagicMock()
+        boards = Whiteboards(emit, scheduler)
+
+        assert boards.submit("room1", "sid-a", [_add("s1"), _extend("s1")]) == 2
+        assert (
+            boards.submit("room1", "sid-b", [_add("s2", color="#f00", width=2.5, tool="pen")]) == 1
+        )
+        assert boards.submit("room2", "sid-c", [_add("s1")]) == 1
+        assert len(scheduler.calls) == 2
+
+        scheduler.run_all()
+        room, payload = emit.call_args_list[0][0]
+        assert room == "room1"
+        assert payload["seq"] == 3
+        assert [(seq, sid, op["type"]) for seq, sid, op in payload["ops"]] == [
+            (1, "sid-a", "add"),
+            (2, "sid-a", "extend"),
+            (3, "sid-b", "add"),
+        ]
+        assert emit.call_args_list[1][0][1]["seq"] == 1
+
+    def test_stale_ops_dropped(self, scheduler):
+        """Test that ops on strokes that no longer exist get no sequence number"""
+        boards = Whiteboards(MagicMock(), scheduler)
+        boards.submit("room1", "sid-a", [_add("s1"), {"type": "remove", "id": "s1"}])
+
+        assert boards.submit("room1", "sid-b", [_extend("s1"), _add("s2")]) == 1
+        assert boards.state("room1")["seq"] == 3
+
+    def test_invalid_ops_rejected(self, scheduler):
+        """Test that malformed operations are refused as a whole"""
+        boards = Whiteboards(MagicMock(), scheduler, max_points=4)
+        for ops in (
+            [],
+            [{"type": "rotate", "id": "s1"}],
+            [_add("")],
+            [_add("s1", points=range(5))],
+            [_add("s1", points=["x", 1])],
+            [_add("s1", points=[float("inf"), 1])],
+            [_add("s1", color="red; background: url(x)")],
+            [_add("s1", tool="<script>")],
+            [_add("s1", width=1e9)],
+            [_add("s1", width=True)],
+        ):
+            with pytest.raises(WhiteboardError):
+                boards.submit("room1", "sid-a", ops)
+        assert "room1" not in boards
+
+    def test_point_limits(self, scheduler):
+        """Test that strokes and boards stop growing at their point limits"""
+        boards = Whiteboards(MagicMock(), scheduler, max_stroke_points=6, max_board_points=10)
+        assert boards.submit("room1", "sid-a", [_add("s1", points=range(4))]) == 1
+        assert boards.submit("room1", "sid-a", [_extend("s1", points=range(4))]) == 0
+        assert boards.submit("room1", "sid-a", [_extend("s1")]) == 1
+        assert boards.submit("room1", "sid-a", [_add("s2", points=range(6))]) == 0
+        assert boards.submit("room1", "sid-a", [_add("s2", points=range(4))]) == 1
+
+        # Removing a stroke frees its points for the rest of the board
+        boards.submit("room1", "sid-a", [{"type": "remove", "id": "s1"}])
+        assert boards.submit("room1", "sid-a", [_add("s3", points=range(6))]) == 1
+        boards.submit("room1", "sid-a", [{"type": "clear"}])
+        assert boards.submit("room1", "sid-a", [_add("s4", points=range(6))]) == 1
+
+    def test_late_joiner_gets_snapshot_and_tail(self, scheduler):
+        """Test that compaction keeps live strokes only and a short op tail"""
+        boards = Whiteboards(MagicMock(), scheduler, snapshot_ops=10)
+        boards.submit("room1", "sid-a", [_add("s1")] + [_extend("s1")] * 5)
+        boards.submit("room1", "sid-a", [_add("s2"), {"type": "remove", "id": "s2"}])
+        boards.submit("room1", "sid-a", [_add("s3"), _extend("s3")])
+        scheduler.run_all()
+        boards.submit("room1", "sid-a", [_extend("s1", points=(9, 9))])
+
+        state = boards.state("room1")
+        assert state["seq"] == 11
+        assert state["snapshot"]["seq"] == 10
+        assert [s["id"] for s in state["snapshot"]["strokes"]] == ["s1", "s3"]
+        # The snapshot is not changed by ops applied after it
+        assert state["snapshot"]["strokes"][0]["points"] == [0, 0] + [1, 1] * 5
+        assert [seq for seq, _, _ in state["ops"]] == [11]
+
+    def test_catch_up_from_known_seq(self, scheduler):
+        """Test that a client that has a seq gets only the ops after it"""
+        boards = Whiteboards(MagicMock(), scheduler, snapshot_ops=3)
+        boards.submit("room1", "sid-a", [_add("s1"), _extend("s1"), _extend("s1")])
+        scheduler.run_all()
+        boards.submit("room1", "sid-a", [_extend("s1"), _extend("s1")])
+
+        state = boards.state("room1", since=4)
+        assert "snapshot" not in state
+        assert [seq for seq, _, _ in state["ops"]] == [5]
+        # Older than the snapshot: start from the snapshot again
+        assert boards.state("room1", since=1)["snapshot"]["seq"] == 3
+
+
+@pytest.mark.socket
+class TestWhiteboardEvents:
+    """Test the whiteboard socket events"""
+
+    def test_draw_and_late_join(self, scheduler):
+        """Test that drawers' ops are fanned out per tick and a late joiner catches up"""
+        boards = Whiteboards(lambda room, payload: None, scheduler)
+        with patch("server.whiteboards", boards), patch(
+            "server.active_connections", ConnectionTable()
+        ), patch("server.resume_tokens", {}):
+            boards.emit = lambda room, payload: socketio.emit("whiteboard-ops", payload, to=room)
+            first = socketio.test_client(app)
+            second = socketio.test_client(app)
+            first.emit("join", {"room": "room1", "userId": "alice"})
+            second.emit("join", {"room": "room1", "userId": "bob"})
+            first.get_received()
+            second.get_received()
+
+            first.emit("whiteboard-op", {"ops": [_add("a1"), _extend("a1")]})
+            second.emit("whiteboard-op", {"ops": [_add("b1")]})
+            assert second.get_received() == []
+            scheduler.run_all()
+
+            packets = [e for e in second.get_received() if e["name"] == "whiteboard-ops"]
+            assert len(packets) == 1
+            assert [seq for seq, _, _ in packets[0]["args"][0]["ops"]] == [1, 2, 3]
+
+            late = socketio.test_client(app)
+            late.emit("join", {"room": "room1", "userId": "carol"})
+            states = [e for e in late.get_received() if e["name"] == "whiteboard-state"]
+            assert states[0]["args"][0]["seq"] == 3
+            assert len(states[0]["args"][0]["ops"]) == 3
+
+            late.emit("whiteboard-op", {"ops": [{"type": "spray"}]})
+            errors = [e for e in late.get_received() if e["name"] == "error"]
+            assert errors and "Unknown operation" in errors[0]["args"][0]["message"]
+
+            for client in (first, second, late):
+                client.disconnect()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Create the backend's MongoDB indexes
+Runs ensure_indexes against MONGO_URI / MONGO_DB, e.g. as a deploy step before
+the workers start. Duplicate participant rows are merged first; an index that
+still cannot be built is reported and skipped
+
+Usage: python -m tools.ensure_indexes
+"""
+
+import argparse
+
+from server import create_app, ensure_indexes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+
+    create_app()
+    ensure_indexes()
+
+
+if __name__ == "__main__":
+    main()
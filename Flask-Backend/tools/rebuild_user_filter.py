@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Rebuild the username filter of a running backend
+Asks the backend to rebuild its username Bloom filter from the users
+collection, e.g. after users were imported straight into MongoDB or once the
+filter holds more users than it was sized for, and prints its new statistics
+
+Usage: python -m tools.rebuild_user_filter [--url URL] [--token TOKEN]
+    the token defaults to USER_FILTER_REBUILD_TOKEN
+"""
+
+import argparse
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+
+def rebuild(url, token):
+    request = urllib.request.Request(
+        f"{url}/api/users/filter/rebuild",
+        data=b"",
+        headers={"X-Rebuild-Token": token},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=600) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.load(exc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:5002", help="backend base URL")
+    parser.add_argument("--token", default=os.getenv("USER_FILTER_REBUILD_TOKEN", ""))
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error("no token: pass --token or set USER_FILTER_REBUILD_TOKEN")
+
+    status, body = rebuild(args.url, args.token)
+    if status != 200:
+        print(f"HTTP {status}: {body.get('error', body)}", file=sys.stderr)
+        sys.exit(1)
+    print(
+        f"{body['users']} usernames, {body['bits'] / 8 / 2**20:.1f} MiB, "
+        f"{body['hashes']} hashes, expected false positive rate "
+        f"{body['expectedFalsePositiveRate']:.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Replay captured signaling traffic against a build of the backend
+Reads capture logs written with CAPTURE_DIR and sends every event again, one
+client per captured socket, at the captured pace (--speed 1), faster (10) or
+as fast as possible (max). Socket ids in payloads and relay envelopes are
+mapped to the replaying clients. Reports throughput and per-event latency
+
+By default the app is built in this process and events go through the real
+Socket.IO handlers, so latency is server processing time; --mongomock gives it
+an empty in-memory database. --url drives a running server instead (needs the
+python-socketio client extras), where latency is the round trip to the ack.
+Resume tokens are not captured, so resume events fail on replay
+
+Usage: python -m tools.replay_capture LOG [LOG ...] [--speed 1|10|max] [--url URL]
+"""
+
+import argparse
+import contextlib
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+from capture import read_capture
+from relay import EnvelopeError, pack_envelope, unpack_envelope
+
+
+class InProcessTarget:
+    """An app built in this process, driven through Flask-SocketIO test clients"""
+
+    def __init__(self, use_mongomock):
+        import server
+
+        self.server = server
+        self.app = server.create_app({"SOCKETIO_LOGGER": False})
+        if use_mongomock:
+            import mongomock
+
+            db = mongomock.MongoClient()["replay"]
+            server.users_collection = db["users"]
+            server.meetings_collection = db["meetings"]
+            server.participants_collection = db["participants"]
+
+    def connect(self):
+        client = self.server.socketio.test_client(self.app)
+        sid = self.server.socketio.server.manager.sid_from_eio_sid(client.eio_sid, "/")
+        return client, sid
+
+    def emit(self, client, event, args):
+        client.emit(event, *args)
+        client.get_received()
+
+    def disconnect(self, client):
+        if client.is_connected():
+            client.disconnect()
+
+
+class RemoteTarget:
+    """A running server, reached with the python-socketio client"""
+
+    def __init__(self, url):
+        try:
+            import socketio
+        except ImportError:
+            sys.exit(
+                "--url needs the python-socketio client: pip install 'python-socketio[client]'"
+            )
+        self.socketio = socketio
+        self.url = url
+
+    def connect(self):
+        client = self.socketio.Client(reconnection=False)
+        client.connect(self.url, transports=["websocket"])
+        return client, client.sid
+
+    def emit(self, client, event, args):
+        # Waiting for the ack gives the round trip of each event
+        client.call(event, args[0] if len(args) == 1 else tuple(args), timeout=10)
+
+    def disconnect(self, client):
+        client.disconnect()
+
+
+def load_records(paths):
+    """Records of all logs (one per worker) merged in capture order"""
+    timeline = []
+    for path in paths:
+        with open(path, "rb") as f:
+            started, _, records = read_capture(f.read())
+        timeline.extend((started + record.offset, record) for record in records)
+    timeline.sort(key=lambda item: item[0])
+    if not timeline:
+        return []
+    origin = timeline[0][0]
+    for at, record in timeline:
+        record.offset = at - origin
+    return [record for _, record in timeline]
+
+
+def remap(value, sids):
+    """Replace captured socket ids with the replaying ones"""
+    if isinstance(value, str):
+        return sids.get(value, value)
+    if isinstance(value, list):
+        return [remap(item, sids) for item in value]
+    if isinstance(value, dict):
+        return {key: remap(item, sids) for key, item in value.items()}
+    if isinstance(value, bytes):
+        try:
+            kind, target, body = unpack_envelope(value)
+        except EnvelopeError:
+            return value
+        return pack_envelope(kind, sids.get(target, target), body)
+    return value
+
+
+def replay(records, target, speed):
+    clients = {}
+    sids = {}
+    latencies = defaultdict(list)
+    skipped = 0
+
+    def connect(captured_sid):
+        start = time.perf_counter()
+        client, sid = target.connect()
+        latencies["connect"].append(time.perf_counter() - start)
+        clients[captured_sid] = client
+        sids[captured_sid] = sid
+        return client
+
+    start = time.perf_counter()
+    for record in records:
+        if speed:
+            wait = start + record.offset / speed - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+        client = clients.get(record.sid)
+        if record.event == "connect":
+            if client is None:
+                connect(record.sid)
+            continue
+        if record.event == "disconnect":
+            if client is not None:
+                target.disconnect(clients.pop(record.sid))
+            continue
+
+        args = record.args()
+        if args is None:
+            skipped += 1
+            continue
+        if client is None:
+            # Sampling or log rotation started mid-session
+            client = connect(record.sid)
+
+        args = remap(args, sids)
+        sent = time.perf_counter()
+        target.emit(client, record.event, args)
+        latencies[record.event].append(time.perf_counter() - sent)
+
+    elapsed = time.perf_counter() - start
+    for client in clients.values():
+        target.disconnect(client)
+    return elapsed, latencies, skipped
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(elapsed, latencies, skipped, captured_span):
+    events = sum(len(values) for name, values in latencies.items() if name != "connect")
+    print(f"replayed {events} events in {elapsed:.2f} s (captured over {captured_span:.2f} s)")
+    print(f"throughput {events / elapsed if elapsed else 0:.0f} events/s")
+    if skipped:
+        print(f"skipped {skipped} events captured without payloads")
+
+    print(f"{'event':<24} {'count':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    rows = sorted(latencies.items(), key=lambda item: len(item[1]), reverse=True)
+    everything = sorted(
+        v for name, values in latencies.items() if name != "connect" for v in values
+    )
+    if everything:
+        rows.insert(0, ("(all events)", everything))
+    for name, values in rows:
+        values = sorted(values)
+        cells = [percentile(values, q) * 1000 for q in (0.5, 0.95, 0.99)] + [values[-1] * 1000]
+        print(f"{name:<24} {len(values):>8} " + " ".join(f"{c:>8.2f}" for c in cells))
+    if everything:
+        print(f"mean latency {statistics.mean(everything) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("logs", nargs="+", help="capture logs (.rtcl)")
+    parser.add_argument("--speed", default="1", help="1, 10 (times the captured pace) or max")
+    parser.add_argument("--url", help="replay against a running server instead")
+    parser.add_argument("--mongomock", action="store_true", help="in-process in-memory database")
+    parser.add_argument("--verbose", action="store_true", help="keep the server's own output")
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    records = load_records(args.logs)
+    if not records:
+        sys.exit("no events in the capture logs")
+
+    target = RemoteTarget(args.url) if args.url else InProcessTarget(args.mongomock)
+    with open(os.devnull, "w") as devnull:
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+        with quiet:
+            elapsed, latencies, skipped = replay(records, target, speed)
+    report(elapsed, latencies, skipped, records[-1].offset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Stand-in TURN load reporter for local testing
+Pretends to be the servers of a TURN pool: each one's allocation count drifts
+randomly (or stays at a fixed --load) and is posted to /api/turn/load every
+--interval seconds, the way a sidecar next to each coturn instance would
+
+Usage: python -m tools.turn_load_reporter [--url URL] [--servers a b] [--load N]
+    server ids default to TURN_SERVERS and the token to TURN_REPORT_TOKEN
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+
+
+def post_load(url, token, server, load):
+    request = urllib.request.Request(
+        f"{url}/api/turn/load",
+        data=json.dumps({"server": server, "load": load}).encode(),
+        headers={"Content-Type": "application/json", "X-Turn-Report-Token": token},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:5002", help="backend base URL")
+    parser.add_argument(
+        "--servers",
+        nargs="+",
+        default=[h.strip() for h in os.getenv("TURN_SERVERS", "").split(",") if h.strip()],
+        help="TURN server ids to report for",
+    )
+    parser.add_argument("--token", default=os.getenv("TURN_REPORT_TOKEN", ""))
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between reports")
+    parser.add_argument("--load", type=float, help="report this load instead of a random walk")
+    parser.add_argument("--max-load", type=float, default=500.0, help="random walk ceiling")
+    parser.add_argument("--once", action="store_true", help="send one round and exit")
+    args = parser.parse_args()
+
+    if not args.servers:
+        parser.error("no TURN servers: pass --servers or set TURN_SERVERS")
+
+    loads = {server: random.uniform(0, args.max_load / 2) for server in args.servers}
+    while True:
+        for server in args.servers:
+            if args.load is not None:
+                load = args.load
+            else:
+                step = random.gauss(0, args.max_load / 20)
+                load = loads[server] = min(args.max_load, max(0.0, loads[server] + step))
+            status = post_load(args.url, args.token, server, round(load, 1))
+            print(f"{server:<30} load {load:>8.1f} -> HTTP {status}")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
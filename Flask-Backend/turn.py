@@ -0,0 +1,173 @@
+"""
+TURN server pool with load-aware allocation and short-lived credentials
+Each TURN server reports its load (active relay allocations); the pool keeps a
+decayed estimate per server (the smoothed reports plus the users assigned
+since, which fade as the reports catch up) and assigns new users to the least
+loaded one. Credentials
+follow the TURN REST API scheme supported by coturn's use-auth-secret:
+username "<expiry>:<userId>", password base64(HMAC-SHA1(secret, username)).
+They are cached per user until close to expiry, so repeated joins are a dict
+lookup
+"""
+
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+
+def turn_urls(host):
+    """ICE urls for a TURN host: UDP and TCP on 3478, TLS on 5349"""
+    return [f"turn:{host}:3478", f"turn:{host}:3478?transport=tcp", f"turns:{host}:5349"]
+
+
+def turn_credential(secret, username):
+    digest = hmac.new(secret.encode(), username.encode(), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+
+class TurnServer:
+    """Load bookkeeping for one TURN server"""
+
+    __slots__ = ("id", "urls", "load", "allocations", "updated", "reported_at")
+
+    def __init__(self, server_id, urls):
+        self.id = server_id
+        self.urls = urls
+        # Smoothed reported load and allocations made since, both decayed to `updated`
+        self.load = 0.0
+        self.allocations = 0.0
+        self.updated = None
+        self.reported_at = None
+
+
+class TurnPool:
+    """Picks a TURN server per user and mints credentials for it"""
+
+    def __init__(
+        self,
+        servers,
+        secret,
+        ttl=3600,
+        half_life=30.0,
+        allocation_weight=1.0,
+        stale_after=60.0,
+        stun_urls=(),
+        clock=time.time,
+    ):
+        # servers: {server id: [ice urls]}
+        self.servers = {
+            server_id: TurnServer(server_id, urls) for server_id, urls in servers.items()
+        }
+        self.secret = secret
+        self.ttl = ttl
+        # Cached credentials are reissued once less than this much lifetime is left
+        self.refresh_margin = ttl / 10
+        self.half_life = half_life
+        self.allocation_weight = allocation_weight
+        self.stale_after = stale_after
+        self.stun = [{"urls": url} for url in stun_urls]
+        self.clock = clock
+        # user id -> (expiry, server id, ice server entry), oldest issue first
+        self._credentials = OrderedDict()
+        self.issued = 0
+        self.cached = 0
+        self._lock = threading.Lock()
+
+    def _decay(self, server, now):
+        if server.updated is not None and now > server.updated:
+            factor = 0.5 ** ((now - server.updated) / self.half_life)
+            server.allocations *= factor
+        server.updated = now
+
+    def report(self, server_id, load):
+        """Record a load report from a server; returns False for unknown servers"""
+        server = self.servers.get(server_id)
+        if server is None:
+            return False
+        now = self.clock()
+        with self._lock:
+            self._decay(server, now)
+            if server.reported_at is None:
+                server.load = load
+            else:
+                # Smooth spikes; a report half_life old counts half as much
+                keep = 0.5 ** ((now - server.reported_at) / self.half_life)
+                server.load = keep * server.load + (1 - keep) * load
+            server.reported_at = now
+        return True
+
+    def score(self, server, now):
+        self._decay(server, now)
+        return server.load + self.allocation_weight * server.allocations
+
+    def _pick(self, now):
+        fresh = [
+            server
+            for server in self.servers.values()
+            if server.reported_at is not None and now - server.reported_at <= self.stale_after
+        ]
+        # Before any report arrives (or if every reporter went quiet) use all of them
+        candidates = fresh or list(self.servers.values())
+        server = min(candidates, key=lambda s: (self.score(s, now), s.id))
+        server.allocations += 1
+        return server
+
+    def _expire(self, now):
+        # Same ttl for every entry, so the oldest issues expire first
+        while self._credentials:
+            user_id, (expiry, _, _) = next(iter(self._credentials.items()))
+            if expiry > now:
+                break
+            del self._credentials[user_id]
+
+    def ice_servers(self, user_id):
+        """ICE server list for a user and the seconds its TURN credentials stay valid"""
+        if not self.servers:
+            return list(self.stun), None
+
+        now = self.clock()
+        with self._lock:
+            cached = self._credentials.get(user_id)
+            if cached is not None and cached[0] - now > self.refresh_margin:
+                self.cached += 1
+                expiry, _, entry = cached
+            else:
+                self._expire(now)
+                if cached is not None:
+                    # Keep a user on the same server when renewing its credentials
+                    server = self.servers.get(cached[1]) or self._pick(now)
+                else:
+                    server = self._pick(now)
+                expiry = int(now + self.ttl)
+                username = f"{expiry}:{user_id}"
+                entry = {
+                    "urls": server.urls,
+                    "username": username,
+                    "credential": turn_credential(self.secret, username),
+                }
+                self._credentials[user_id] = (expiry, server.id, entry)
+                self._credentials.move_to_end(user_id)
+                self.issued += 1
+
+        return self.stun + [entry], int(expiry - now)
+
+    def stats(self):
+        now = self.clock()
+        with self._lock:
+            return {
+                "servers": [
+                    {
+                        "id": server.id,
+                        "load": round(server.load, 3),
+                        "score": round(self.score(server, now), 3),
+                        "reportedAt": server.reported_at,
+                    }
+                    for server in self.servers.values()
+                ],
+                "cachedUsers": len(self._credentials),
+                "issued": self.issued,
+                "cacheHits": self.cached,
+            }
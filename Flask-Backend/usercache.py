@@ -0,0 +1,230 @@
+"""
+Username existence filter and user cache
+A Bloom filter over every existing username answers "this user does not exist"
+without a query: bots probing random names and sign-ups of new names skip the
+lookup entirely. Names the filter cannot rule out, and the small share of
+absent names it lets through, are looked up as before, and the unique index on
+username still decides whether a sign-up wins. Users created by other processes
+are pulled in from the database before a name is ruled out, at most once per
+refresh interval. A small LRU cache of recently read users serves repeat reads
+of the same people
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings sized for a capacity and error rate"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def false_positive_rate(self):
+        """Expected false positive rate for the names added so far"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class UserLookup:
+    """Username Bloom filter plus an LRU cache of user documents.
+
+    Until the filter is built every name may exist, so nothing is ruled out.
+    """
+
+    def __init__(
+        self,
+        capacity=1_000_000,
+        error_rate=0.01,
+        cache_size=1024,
+        refresh_interval=1.0,
+        index_check_interval=60.0,
+        clock=time.monotonic,
+    ):
+        # The filter is sized for at least this many users, or twice the users at build
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.cache_size = cache_size
+        self.refresh_interval = refresh_interval
+        self.index_check_interval = index_check_interval
+        self.clock = clock
+        self._filter = None
+        # Where the last build or refresh stopped reading, handed to the next refresh
+        self.synced_to = None
+        self._refreshed_at = None
+        # Whether the unique username index exists, and when that was last checked
+        self._unique_index = False
+        self._index_checked_at = None
+        # Usernames created while a build was reading the collection
+        self._pending = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        # Lookups the filter answered, and absent names it let through
+        self.negatives = 0
+        self.false_positives = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def built(self):
+        return self._filter is not None
+
+    def build(self, usernames, expected=0, synced_to=None):
+        """(Re)build the filter from a callable returning every username.
+
+        Lookups keep using the previous filter until the new one is swapped in;
+        users added meanwhile go into both. `synced_to` marks where the read
+        started, for the first refresh.
+        """
+        with self._build_lock:
+            with self._lock:
+                self._pending = []
+
+            bloom = BloomFilter(max(self.capacity, 2 * expected), self.error_rate)
+            for username in usernames():
+                bloom.add(username)
+
+            with self._lock:
+                for username in self._pending:
+                    bloom.add(username)
+                self._pending = None
+                self._filter = bloom
+                self.synced_to = synced_to
+                self._refreshed_at = None
+                self.negatives = self.false_positives = 0
+            return bloom.count
+
+    def may_exist(self, username, refresh=None):
+        """False only if the username is certainly not taken.
+
+        Before ruling a name out, `refresh(synced_to)` is called, at most once per
+        refresh interval, for the (usernames, synced_to) created since the last
+        build or refresh, e.g. by other processes.
+        """
+        bloom = self._filter
+        if bloom is None or username in bloom:
+            return True
+        if refresh is not None and self._refresh_due():
+            usernames, synced_to = refresh(self.synced_to)
+            with self._lock:
+                for name in usernames:
+                    # Names already in (or colliding in) the filter change nothing
+                    if name not in bloom:
+                        bloom.add(name)
+                        if self._pending is not None:
+                            self._pending.append(name)
+                if self._filter is bloom:
+                    self.synced_to = synced_to
+            if username in bloom:
+                return True
+        with self._lock:
+            self.negatives += 1
+        return False
+
+    def _refresh_due(self):
+        now = self.clock()
+        with self._lock:
+            if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return False
+            self._refreshed_at = now
+            return True
+
+    def has_unique_index(self, check):
+        """Whether usernames are unique in the database, so filter negatives are safe.
+
+        `check()` looks the index up; once found it is trusted, a missing one is
+        looked up again after the index check interval.
+        """
+        if self._unique_index:
+            return True
+        now = self.clock()
+        with self._lock:
+            due = (
+                self._index_checked_at is None
+                or now - self._index_checked_at >= self.index_check_interval
+            )
+            if due:
+                self._index_checked_at = now
+        if due:
+            self._unique_index = bool(check())
+        return self._unique_index
+
+    def missed(self):
+        """Record that a name the filter let through was not found"""
+        if self._filter is not None:
+            with self._lock:
+                self.false_positives += 1
+
+    def added(self, username):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(username)
+            if self._filter is not None:
+                self._filter.add(username)
+
+    def get(self, username):
+        """Cached user document, or None"""
+        with self._lock:
+            user = self._cache.get(username)
+            if user is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(username)
+            self.cache_hits += 1
+            return user
+
+    def put(self, username, user):
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._cache[username] = user
+            self._cache.move_to_end(username)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self):
+        bloom = self._filter
+        stats = {
+            "built": bloom is not None,
+            "negatives": self.negatives,
+            "falsePositives": self.false_positives,
+            # Share of absent names the filter failed to rule out
+            "observedFalsePositiveRate": self.false_positives
+            / max(1, self.false_positives + self.negatives),
+            "cacheSize": len(self._cache),
+            "cacheHits": self.cache_hits,
+            "cacheMisses": self.cache_misses,
+        }
+        if bloom is not None:
+            stats.update(
+                {
+                    "users": bloom.count,
+                    "bits": bloom.size,
+                    "hashes": bloom.hashes,
+                    "expectedFalsePositiveRate": bloom.false_positive_rate(),
+                }
+            )
+        return stats
@@ -0,0 +1,135 @@
+"""
+User search by prefix
+An in-process sorted index of usernames and display names for invite
+autocomplete. It is built from the users collection in the background when a
+worker starts and extended by every new user, so a lookup is a binary search plus a
+short scan instead of a query. Past a configured number of users it drops its
+entries and reports itself unavailable, and callers fall back to the database
+"""
+
+import threading
+from bisect import bisect_left, insort
+
+# Separates the folded search key from the username it belongs to, and sorts
+# before any character a name can contain
+_SEPARATOR = "\x00"
+
+
+def fold(text):
+    """Case-insensitive form of a name used for matching"""
+    return text.casefold().replace(_SEPARATOR, "")
+
+
+def search_names(username, display_name=None):
+    """Folded names a user is found by; stored as searchNames for the regex fallback"""
+    names = [fold(username)]
+    if isinstance(display_name, str) and display_name and fold(display_name) != names[0]:
+        names.append(fold(display_name))
+    return names
+
+
+class UserIndex:
+    """Sorted (folded name, username) keys over usernames and display names.
+
+    Each user has a key for their username and, when it differs, one for their
+    display name. Keys are plain strings ("name\\0username"), so the list sorts and
+    bisects without a key function.
+    """
+
+    def __init__(self, max_users=1_000_000):
+        self.max_users = max_users
+        self._keys = []
+        # username -> display name
+        self._users = {}
+        self.built = False
+        # Set when the users no longer fit; the index stays empty from then on
+        self.overflowed = False
+        # Users created while a build was reading the collection
+        self._pending = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._users)
+
+    @property
+    def available(self):
+        return self.built and not self.overflowed
+
+    def build(self, users):
+        """Fill the index from (username, display name) pairs, once.
+
+        `users` is a callable returning the pairs; concurrent builds wait for a
+        single one. Users added while it runs are applied afterwards.
+        """
+        with self._build_lock:
+            if self.built:
+                return
+            with self._lock:
+                self._pending = []
+
+            keys = []
+            names = {}
+            for username, display_name in users():
+                if len(names) >= self.max_users:
+                    keys, names = [], {}
+                    self.overflowed = True
+                    break
+                names[username] = display_name
+                keys.extend(self._keys_for(username, display_name))
+            keys.sort()
+
+            with self._lock:
+                self._keys = keys
+                self._users = names
+                pending, self._pending = self._pending, None
+                for username, display_name in pending:
+                    self._add(username, display_name)
+                self.built = True
+
+    @staticmethod
+    def _keys_for(username, display_name):
+        for name in search_names(username, display_name):
+            yield name + _SEPARATOR + username
+
+    def add(self, username, display_name):
+        """Index a new user; a no-op until the index has been built"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((username, display_name))
+            elif self.built:
+                self._add(username, display_name)
+
+    def _add(self, username, display_name):
+        if self.overflowed or username in self._users:
+            return
+        if len(self._users) >= self.max_users:
+            self._keys, self._users = [], {}
+            self.overflowed = True
+            return
+        self._users[username] = display_name
+        for key in self._keys_for(username, display_name):
+            insort(self._keys, key)
+
+    def search(self, prefix, limit=10):
+        """Up to `limit` users whose username or display name starts with `prefix`.
+
+        Results are ordered by the name that matched; a user matching on both
+        names is listed once.
+        """
+        prefix = fold(prefix)
+        results = []
+        seen = set()
+        with self._lock:
+            keys = self._keys
+            position = bisect_left(keys, prefix)
+            while position < len(keys) and len(results) < limit:
+                key = keys[position]
+                if not key.startswith(prefix):
+                    break
+                username = key[key.index(_SEPARATOR) + 1 :]
+                if username not in seen:
+                    seen.add(username)
+                    results.append({"username": username, "displayName": self._users[username]})
+                position += 1
+        return results
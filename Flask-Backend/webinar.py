@@ -0,0 +1,101 @@
+"""
+Webinar (large-audience) mode
+Presenters are full peers. Attendees are receive-only: they are never announced
+to the room, only counted, and their chat goes through a rate-limited lane that
+presenters moderate
+"""
+import threading
+import time
+from collections import OrderedDict
+
+MEETING = "meeting"
+WEBINAR = "webinar"
+MEETING_TYPES = {MEETING, WEBINAR}
+
+PRESENTER = "presenter"
+ATTENDEE = "attendee"
+
+
+def presenters_room(room):
+    """Socket.IO room holding only the presenters of a webinar"""
+    return f"{room}:presenters"
+
+
+class AttendeeCounter:
+    """Per-room attendee counts, broadcast at most once per interval"""
+
+    def __init__(self, emit, schedule, interval=2.0):
+        # emit(room, count) sends the aggregated count to a room
+        self.emit = emit
+        self.schedule = schedule
+        self.interval = interval
+        self.counts = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def add(self, room, delta):
+        with self._lock:
+            count = self.counts.get(room, 0) + delta
+            if count > 0:
+                self.counts[room] = count
+            else:
+                self.counts.pop(room, None)
+
+            if room not in self._dirty:
+                self._dirty.add(room)
+                self.schedule(self.interval, self.flush, room)
+
+    def flush(self, room):
+        with self._lock:
+            self._dirty.discard(room)
+            count = self.counts.get(room, 0)
+        self.emit(room, count)
+
+    def discard(self, room):
+        with self._lock:
+            self.counts.pop(room, None)
+            self._dirty.discard(room)
+
+
+class ModeratedChatLane:
+    """Rate-limited attendee chat held for presenter approval"""
+
+    def __init__(self, min_interval=5.0, max_pending=200):
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        # room -> OrderedDict(message id -> message)
+        self._pending = {}
+        # sid -> time of the last accepted message
+        self._last_sent = {}
+        self._lock = threading.Lock()
+
+    def submit(self, room, sid, message, now=None):
+        """Queue an attendee message; returns False when the sender is rate limited"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last = self._last_sent.get(sid)
+            if last is not None and now - last < self.min_interval:
+                return False
+            self._last_sent[sid] = now
+
+            pending = self._pending.setdefault(room, OrderedDict())
+            pending[message["id"]] = message
+            if len(pending) > self.max_pending:
+                pending.popitem(last=False)
+            return True
+
+    def take(self, room, message_id):
+        """Remove and return a pending message, or None if it is unknown"""
+        with self._lock:
+            pending = self._pending.get(room)
+            if not pending:
+                return None
+            return pending.pop(message_id, None)
+
+    def forget_sender(self, sid):
+        with self._lock:
+            self._last_sent.pop(sid, None)
+
+    def discard(self, room):
+        with self._lock:
+            self._pending.pop(room, None)
@@ -0,0 +1,232 @@
+"""
+Collaborative whiteboard
+Clients send small drawing operations (add a stroke, extend it with new points,
+remove it, clear the board) instead of canvas state. The server numbers every
+operation with a per-room sequence number, applies it to a compacted document
+of the live strokes and fans the operations out once per tick. Every so many
+operations the document is snapshotted and older operations are dropped, so a
+late joiner gets the snapshot plus the short tail of operations after it
+"""
+
+import math
+import re
+import threading
+
+ADD = "add"
+EXTEND = "extend"
+REMOVE = "remove"
+CLEAR = "clear"
+
+# Stroke fields kept besides its id and points
+STROKE_FIELDS = ("tool", "color", "width")
+
+# #rgb, #rgba, #rrggbb or #rrggbbaa
+_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$")
+_TOOL = re.compile(r"^[a-z][a-z-]{0,15}$")
+MAX_WIDTH = 100
+
+
+class WhiteboardError(ValueError):
+    """Raised for operations the whiteboard does not accept"""
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+class Board:
+    """The document, latest snapshot and operation tail of one room"""
+
+    __slots__ = ("seq", "strokes", "points", "snapshot_seq", "snapshot", "tail", "pending")
+
+    def __init__(self):
+        self.seq = 0
+        # stroke id -> stroke, in drawing order
+        self.strokes = {}
+        # Points held by all the strokes
+        self.points = 0
+        self.snapshot_seq = 0
+        self.snapshot = []
+        # [seq, socket id, op] for every operation after the snapshot, numbered
+        # snapshot_seq + 1, snapshot_seq + 2, ...
+        self.tail = []
+        # Operations not yet fanned out
+        self.pending = []
+
+
+class Whiteboards:
+    """Per-room whiteboards with tick-batched fan-out"""
+
+    def __init__(
+        self,
+        emit,
+        schedule,
+        interval=0.05,
+        snapshot_ops=500,
+        max_ops=100,
+        max_points=1000,
+        max_strokes=5000,
+        max_stroke_points=20000,
+        max_board_points=1_000_000,
+    ):
+        # emit(room, payload) sends one batch of operations to a room
+        self.emit = emit
+        # schedule(delay, callback, *args) runs callback later
+        self.schedule = schedule
+        self.interval = interval
+        self.snapshot_ops = snapshot_ops
+        self.max_ops = max_ops
+        self.max_points = max_points
+        self.max_strokes = max_strokes
+        # Points one stroke and one room's board may hold; more are not applied
+        self.max_stroke_points = max_stroke_points
+        self.max_board_points = max_board_points
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, room):
+        return room in self._boards
+
+    def submit(self, room, sid, ops):
+        """Sequence and apply a client's operations; returns how many were applied.
+
+        Operations on strokes that no longer exist, and new strokes or points
+        past the stroke and board limits, are dropped without a number.
+        """
+        if not isinstance(ops, list) or not ops:
+            raise WhiteboardError("Operations are required")
+        if len(ops) > self.max_ops:
+            raise WhiteboardError(f"At most {self.max_ops} operations per message")
+        ops = [self._validate(op) for op in ops]
+
+        with self._lock:
+            board = self._boards.get(room)
+            if board is None:
+                board = self._boards[room] = Board()
+            schedule = not board.pending
+            applied = 0
+            for op in ops:
+                if not self._apply(board, op):
+                    continue
+                board.seq += 1
+                entry = [board.seq, sid, op]
+                board.tail.append(entry)
+                board.pending.append(entry)
+                applied += 1
+            schedule = schedule and bool(board.pending)
+
+        if schedule:
+            self.schedule(self.interval, self.flush, room)
+        return applied
+
+    def _validate(self, op):
+        if not isinstance(op, dict):
+            raise WhiteboardError("Operation must be an object")
+        kind = op.get("type")
+        if kind not in (ADD, EXTEND, REMOVE, CLEAR):
+            raise WhiteboardError(f"Unknown operation: {kind}")
+        if kind == CLEAR:
+            return {"type": CLEAR}
+        stroke_id = op.get("id")
+        if not isinstance(stroke_id, str) or not 0 < len(stroke_id) <= 64:
+            raise WhiteboardError("Stroke id is required")
+        if kind == REMOVE:
+            return {"type": REMOVE, "id": stroke_id}
+
+        points = op.get("points")
+        if (
+            not isinstance(points, list)
+            or len(points) > self.max_points
+            or not all(_is_number(p) for p in points)
+        ):
+            raise WhiteboardError(f"Points must be a list of at most {self.max_points} numbers")
+        clean = {"type": kind, "id": stroke_id, "points": points}
+        if kind == ADD:
+            if "tool" in op and not (isinstance(op["tool"], str) and _TOOL.match(op["tool"])):
+                raise WhiteboardError("Tool must be a short lower-case name")
+            if "color" in op and not (isinstance(op["color"], str) and _COLOR.match(op["color"])):
+                raise WhiteboardError("Color must be a hex color such as #1e88e5")
+            if "width" in op and not (_is_number(op["width"]) and 0 < op["width"] <= MAX_WIDTH):
+                raise WhiteboardError(f"Width must be a number up to {MAX_WIDTH}")
+            for field in STROKE_FIELDS:
+                if field in op:
+                    clean[field] = op[field]
+        return clean
+
+    def _apply(self, board, op):
+        kind = op["type"]
+        if kind == CLEAR:
+            board.strokes.clear()
+            board.points = 0
+        elif kind == REMOVE:
+            stroke = board.strokes.pop(op["id"], None)
+            if stroke is None:
+                return False
+            board.points -= len(stroke["points"])
+        elif kind == EXTEND:
+            stroke = board.strokes.get(op["id"])
+            added = len(op["points"])
+            if (
+                stroke is None
+                or len(stroke["points"]) + added > self.max_stroke_points
+                or board.points + added > self.max_board_points
+            ):
+                return False
+            stroke["points"].extend(op["points"])
+            board.points += added
+        else:
+            added = len(op["points"])
+            if (
+                op["id"] in board.strokes
+                or len(board.strokes) >= self.max_strokes
+                or added > self.max_stroke_points
+                or board.points + added > self.max_board_points
+            ):
+                return False
+            stroke = {key: value for key, value in op.items() if key != "type"}
+            stroke["points"] = list(op["points"])
+            board.strokes[op["id"]] = stroke
+            board.points += added
+        return True
+
+    def flush(self, room):
+        """Fan out a room's pending operations as one packet, then compact if due"""
+        with self._lock:
+            board = self._boards.get(room)
+            if board is None or not board.pending:
+                return
+            pending, board.pending = board.pending, []
+            if len(board.tail) >= self.snapshot_ops:
+                self._compact(board)
+        self.emit(room, {"seq": pending[-1][0], "ops": pending})
+
+    def _compact(self, board):
+        # Points lists are copied: later extends must not change the snapshot
+        board.snapshot = [
+            dict(stroke, points=list(stroke["points"])) for stroke in board.strokes.values()
+        ]
+        board.snapshot_seq = board.seq
+        board.tail = []
+
+    def state(self, room, since=None):
+        """What a client at `since` (or with nothing) needs to catch up.
+
+        Operations still waiting for the tick are included too, so clients
+        skip any operation at or below the sequence number they have.
+        """
+        with self._lock:
+            board = self._boards.get(room)
+            if board is None:
+                return {"seq": 0, "snapshot": {"seq": 0, "strokes": []}, "ops": []}
+            if isinstance(since, int) and board.snapshot_seq <= since <= board.seq:
+                # The tail holds every number after the snapshot, in order
+                return {"seq": board.seq, "ops": board.tail[since - board.snapshot_seq :]}
+            return {
+                "seq": board.seq,
+                "snapshot": {"seq": board.snapshot_seq, "strokes": board.snapshot},
+                "ops": list(board.tail),
+            }
+
+    def discard(self, room):
+        with self._lock:
+            self._boards.pop(room, None)
@@ -1,4 +1,8 @@
-from server import app, socketio
+from server import create_app, socketio
+
+# No database I/O here: with preload_app this runs in the gunicorn master. The
+# indexes are built by the first worker (gunicorn.conf.py) or python -m tools.ensure_indexes
+app = create_app()
 
 if __name__ == "__main__":
-    socketio.run(app)
\ No newline at end of file
+    socketio.run(app)
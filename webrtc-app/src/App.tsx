@@ -128,6 +128,8 @@ function App() {
     localStreamRef,
     socketRef,
     userId,
+    meetingId,
+    inRoom,
     setRemoteParticipants,
   });
 
@@ -170,6 +172,7 @@ function App() {
     handleLeaveMeeting,
   } = useMeetingOperations({
     userId,
+    username,
     meetingId,
     isHost,
     socketRef,
@@ -182,6 +185,7 @@ function App() {
     setRemoteParticipants,
     setInRoom,
     setMeetingId,
+    setParticipants,
     setIsHost,
     setMainParticipant,
     setIsMuted,
@@ -212,10 +216,12 @@ function App() {
     onUserJoined: webRTCHandlers.handleUserJoined,
     onUserLeft: webRTCHandlers.handleUserLeft,
     onExistingParticipants: webRTCHandlers.handleExistingParticipants,
+    onParticipantsChanged: webRTCHandlers.handleParticipantsChanged,
     onOffer: webRTCHandlers.handleOffer,
     onAnswer: webRTCHandlers.handleAnswer,
     onIceCandidate: webRTCHandlers.handleIceCandidate,
     onLeaveMeeting: handleLeaveMeeting,
+    onSocketRemapped: webRTCHandlers.handleSocketRemapped,
     onMediaStatusChanged: handleMediaStatusChanged,
     onChatMessage: handleChatMessage,
   });
@@ -1,11 +1,12 @@
 import React, { useState } from "react";
 import { meetingAPI } from "../../Service/api";
+import type { MeetingBootstrap } from "../../types";
 import "./MeetingLobby.css";
 
 interface MeetingLobbyProps {
   userId: string;
   username: string;
-  onJoinMeeting: (meetingId: string) => void;
+  onJoinMeeting: (meetingId: string, bootstrap: MeetingBootstrap) => void;
   onCreateMeeting: (meetingId: string) => void;
   onLogout?: () => void;
   initialMeetingId?: string;
@@ -54,8 +55,9 @@ const MeetingLobby: React.FC<MeetingLobbyProps> = ({
     setError("");
 
     try {
-      await meetingAPI.joinMeeting(meetingId, userId);
-      onJoinMeeting(meetingId);
+      // One round trip for membership, host status and the current roster
+      const data = await meetingAPI.bootstrapMeeting(meetingId, userId);
+      onJoinMeeting(meetingId, data);
     } catch (err) {
       const errorMessage =
         err instanceof Error ? err.message : "Failed to join meeting";
@@ -109,6 +109,23 @@ export const meetingAPI = {
   isHost: async (meetingId: string, userId: string) => {
     return apiRequest(`/api/meetings/${meetingId}/is-host/${userId}`);
   },
+
+  // Join + host check + participants in one call
+  bootstrapMeeting: async (meetingId: string, userId: string) => {
+    return apiRequest(`/api/meetings/${meetingId}/bootstrap`, {
+      method: "POST",
+      body: JSON.stringify({ userId }),
+    });
+  },
+
+  // STUN/TURN servers with short-lived TURN credentials for a participant
+  getIceServers: async (meetingId: string, userId: string) => {
+    return apiRequest(
+      `/api/ice-servers?meetingId=${encodeURIComponent(
+        meetingId
+      )}&userId=${encodeURIComponent(userId)}`
+    );
+  },
 };
 
 // Export the base URL for socket connections
@@ -1,15 +1,11 @@
-export const ICE_SERVERS = [
+// Used until /api/ice-servers returns the meeting's servers with TURN credentials
+export const ICE_SERVERS: RTCIceServer[] = [
   // Google STUN servers
   { urls: "stun:stun.l.google.com:19302" },
   { urls: "stun:stun1.l.google.com:19302" },
   { urls: "stun:stun2.l.google.com:19302" },
   { urls: "stun:stun3.l.google.com:19302" },
   { urls: "stun:stun4.l.google.com:19302" },
-  {
-    urls: ["turn:real-time-chat.com:3478", "turns:real-time-chat.com:5349"],
-    username: "webrtcuser",
-    credential: "securepassword",
-  },
 ];
 
 export const RTC_CONFIGURATION = {
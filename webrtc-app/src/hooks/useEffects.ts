@@ -78,9 +78,10 @@ export const useEffects = ({
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []); // Empty dependency array ensures this only runs on unmount
 
-  // Fetch participants periodically using API service
+  // Refresh participants periodically using API service; the initial roster
+  // is set when the meeting is created or bootstrapped
   useEffect(() => {
-    if (meetingId) {
+    if (meetingId && inRoom) {
       const fetchParticipants = async () => {
         try {
           const data = await meetingAPI.getParticipants(meetingId);
@@ -90,7 +91,6 @@ export const useEffects = ({
         }
       };
 
-      fetchParticipants();
       const intervalId = setInterval(fetchParticipants, 10000);
       return () => clearInterval(intervalId);
     }
@@ -1,11 +1,12 @@
 import { useCallback } from "react";
 import { Socket } from "socket.io-client";
 import { meetingAPI } from "../Service/api";
-import type { Participant } from "../types";
+import type { MeetingBootstrap, Participant } from "../types";
 import { cleanupMediaTracks, clearVideoElement } from "../utils/webrtcUtils";
 
 interface UseMeetingOperationsProps {
   userId: string | null;
+  username: string | null;
   meetingId: string | null;
   isHost: boolean;
   socketRef: React.MutableRefObject<Socket | null>;
@@ -22,6 +23,9 @@ interface UseMeetingOperationsProps {
   >;
   setInRoom: React.Dispatch<React.SetStateAction<boolean>>;
   setMeetingId: React.Dispatch<React.SetStateAction<string | null>>;
+  setParticipants: React.Dispatch<
+    React.SetStateAction<MeetingBootstrap["participants"]>
+  >;
   setIsHost: React.Dispatch<React.SetStateAction<boolean>>;
   setMainParticipant: React.Dispatch<React.SetStateAction<string | null>>;
   setIsMuted: React.Dispatch<React.SetStateAction<boolean>>;
@@ -33,6 +37,7 @@ interface UseMeetingOperationsProps {
 
 export const useMeetingOperations = ({
   userId,
+  username,
   meetingId,
   isHost,
   socketRef,
@@ -45,6 +50,7 @@ export const useMeetingOperations = ({
   setRemoteParticipants,
   setInRoom,
   setMeetingId,
+  setParticipants,
   setIsHost,
   setMainParticipant,
   setIsMuted,
@@ -73,6 +79,10 @@ export const useMeetingOperations = ({
       setMeetingId(newMeetingId);
       setInRoom(true);
       setIsHost(true);
+      // A new meeting's only participant is its host
+      setParticipants([
+        { userId: userId!, username: username ?? undefined, isHost: true },
+      ]);
       localStorage.setItem("lastMeetingId", newMeetingId);
 
       // Update URL with new meeting ID
@@ -80,22 +90,17 @@ export const useMeetingOperations = ({
       currentUrl.searchParams.set("meetingId", newMeetingId);
       window.history.replaceState({}, document.title, currentUrl.toString());
     },
-    [setMeetingId, setInRoom, setIsHost]
+    [setMeetingId, setInRoom, setIsHost, setParticipants, userId, username]
   );
 
   // Handle joining a meeting
   const handleJoinMeeting = useCallback(
-    async (meetingIdToJoin: string) => {
+    (meetingIdToJoin: string, bootstrap: MeetingBootstrap) => {
       setMeetingId(meetingIdToJoin);
       setInRoom(true);
-
-      // Check if user is host using API service
-      try {
-        const data = await meetingAPI.isHost(meetingIdToJoin, userId!);
-        setIsHost(data.isHost);
-      } catch (err) {
-        console.error("Error checking host status:", err);
-      }
+      // Host status and roster come with the bootstrap response
+      setIsHost(bootstrap.isHost);
+      setParticipants(bootstrap.participants);
 
       localStorage.setItem("lastMeetingId", meetingIdToJoin);
 
@@ -104,7 +109,7 @@ export const useMeetingOperations = ({
       currentUrl.searchParams.set("meetingId", meetingIdToJoin);
       window.history.replaceState({}, document.title, currentUrl.toString());
     },
-    [setMeetingId, setInRoom, setIsHost, userId]
+    [setMeetingId, setInRoom, setIsHost, setParticipants]
   );
   const handleEndMeeting = useCallback(async () => {
     if (!meetingId || !userId || !isHost) return;
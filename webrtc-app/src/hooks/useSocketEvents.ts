@@ -1,4 +1,4 @@
-import { useEffect, useCallback } from "react";
+import { useEffect, useCallback, useRef } from "react";
 import { Socket } from "socket.io-client";
 import type { Participant } from "../types";
 
@@ -9,12 +9,20 @@ interface UseSocketEventsProps {
   isEndingMeeting: boolean;
   onUserJoined: (data: { userId: string; socketId: string }) => void;
   onUserLeft: (data: { userId: string; socketId: string }) => void;
-  onExistingParticipants: (data: { participants: Participant[] }) => void;
+  onExistingParticipants: (data: {
+    participants: Participant[];
+    role?: string;
+  }) => void;
+  onParticipantsChanged: (data: {
+    added: { userId: string; socketId: string }[];
+    removed: { userId: string; socketId: string }[];
+  }) => void;
   onOffer: (data: {
     offer: RTCSessionDescriptionInit;
     fromSocket: string;
     fromUserId: string;
     msgId: string;
+    receiveOnly?: boolean;
   }) => void;
   onAnswer: (data: {
     answer: RTCSessionDescriptionInit;
@@ -28,6 +36,11 @@ interface UseSocketEventsProps {
     fromUserId: string;
   }) => void;
   onLeaveMeeting: () => void;
+  onSocketRemapped: (data: {
+    userId: string;
+    oldSocketId: string;
+    newSocketId: string;
+  }) => void;
   onMediaStatusChanged?: (data: {
     userId: string;
     socketId: string;
@@ -52,10 +65,12 @@ export const useSocketEvents = ({
   onUserJoined,
   onUserLeft,
   onExistingParticipants,
+  onParticipantsChanged,
   onOffer,
   onAnswer,
   onIceCandidate,
   onLeaveMeeting,
+  onSocketRemapped,
   onMediaStatusChanged,
   onChatMessage,
 }: UseSocketEventsProps) => {
@@ -69,20 +84,94 @@ export const useSocketEvents = ({
     [meetingId, isEndingMeeting, onLeaveMeeting]
   );
 
+  // Offers/answers already handled; the server resends unacked ones on resume
+  const seenSignals = useRef<Set<string>>(new Set());
+
+  // Token to resume this meeting's session after the socket reconnects
+  const sessionToken = useRef<string | null>(null);
+
+  useEffect(() => {
+    sessionToken.current = null;
+  }, [meetingId]);
+
+  // Join room when called
+  const joinRoom = useCallback(() => {
+    if (socketRef.current && userId && meetingId) {
+      socketRef.current.emit("join", {
+        room: meetingId,
+        userId,
+        signalAcks: true,
+      });
+    }
+  }, [socketRef, meetingId, userId]);
+
   // Setup socket event listeners
   useEffect(() => {
     if (!socketRef.current) return;
 
     const socket = socketRef.current;
 
+    // Ack a relayed offer/answer; returns false if it was already handled
+    const acknowledge = (
+      kind: string,
+      data: { fromSocket: string; msgId: string }
+    ) => {
+      if (!data.msgId) return true;
+      socket.emit("signal-ack", {
+        fromSocket: data.fromSocket,
+        msgId: data.msgId,
+      });
+
+      const key = `${kind}:${data.fromSocket}:${data.msgId}`;
+      const seen = seenSignals.current;
+      if (seen.has(key)) return false;
+      seen.add(key);
+      if (seen.size > 256) {
+        const oldest = seen.values().next().value;
+        if (oldest !== undefined) seen.delete(oldest);
+      }
+      return true;
+    };
+
+    const handleOffer: typeof onOffer = (data) => {
+      if (acknowledge("offer", data)) onOffer(data);
+    };
+    const handleAnswer: typeof onAnswer = (data) => {
+      if (acknowledge("answer", data)) onAnswer(data);
+    };
+
+    // Session resumption: a reconnected socket takes over the old session so
+    // peers keep their connections; if it expired, join again from scratch
+    const handleSessionToken = (data: { token: string }) => {
+      sessionToken.current = data.token;
+    };
+    const handleReconnect = () => {
+      if (sessionToken.current) {
+        socket.emit("resume", {
+          token: sessionToken.current,
+          signalAcks: true,
+        });
+      }
+    };
+    const handleResumeFailed = () => {
+      sessionToken.current = null;
+      joinRoom();
+    };
+
     // Multi-participant event listeners
     socket.on("user-joined", onUserJoined);
     socket.on("user-left", onUserLeft);
     socket.on("existing-participants", onExistingParticipants);
-    socket.on("offer", onOffer);
-    socket.on("answer", onAnswer);
+    socket.on("participants-changed", onParticipantsChanged);
+    socket.on("offer", handleOffer);
+    socket.on("answer", handleAnswer);
     socket.on("ice-candidate", onIceCandidate);
     socket.on("meeting-ended", handleMeetingEnded);
+    socket.on("session-token", handleSessionToken);
+    socket.on("session-resumed", handleSessionToken);
+    socket.on("resume-failed", handleResumeFailed);
+    socket.on("socket-remapped", onSocketRemapped);
+    socket.on("connect", handleReconnect);
 
     // Media status event listener
     if (onMediaStatusChanged) {
@@ -99,10 +188,16 @@ export const useSocketEvents = ({
       socket.off("user-joined", onUserJoined);
       socket.off("user-left", onUserLeft);
       socket.off("existing-participants", onExistingParticipants);
-      socket.off("offer", onOffer);
-      socket.off("answer", onAnswer);
+      socket.off("participants-changed", onParticipantsChanged);
+      socket.off("offer", handleOffer);
+      socket.off("answer", handleAnswer);
       socket.off("ice-candidate", onIceCandidate);
       socket.off("meeting-ended", handleMeetingEnded);
+      socket.off("session-token", handleSessionToken);
+      socket.off("session-resumed", handleSessionToken);
+      socket.off("resume-failed", handleResumeFailed);
+      socket.off("socket-remapped", onSocketRemapped);
+      socket.off("connect", handleReconnect);
 
       if (onMediaStatusChanged) {
         socket.off("media-status-changed", onMediaStatusChanged);
@@ -119,21 +214,17 @@ export const useSocketEvents = ({
     onUserJoined,
     onUserLeft,
     onExistingParticipants,
+    onParticipantsChanged,
     onOffer,
     onAnswer,
     onIceCandidate,
     handleMeetingEnded,
+    joinRoom,
+    onSocketRemapped,
     onMediaStatusChanged,
     onChatMessage,
   ]);
 
-  // Join room when called
-  const joinRoom = useCallback(() => {
-    if (socketRef.current && userId && meetingId) {
-      socketRef.current.emit("join", { room: meetingId, userId });
-    }
-  }, [socketRef, meetingId, userId]);
-
   return {
     joinRoom,
   };
@@ -1,11 +1,15 @@
-import { useRef, useCallback, useState } from "react";
+import { useRef, useCallback, useState, useEffect } from "react";
 import { Socket } from "socket.io-client";
 import type { Participant } from "../types";
+import { meetingAPI } from "../Service/api";
+import { ICE_SERVERS, RTC_CONFIGURATION } from "../constants/webrtc";
 
 interface UseWebRTCConnectionProps {
   localStreamRef: React.MutableRefObject<MediaStream | null>;
   socketRef: React.MutableRefObject<Socket | null>;
   userId: string | null;
+  meetingId: string | null;
+  inRoom: boolean;
   setRemoteParticipants: React.Dispatch<
     React.SetStateAction<Map<string, Participant>>
   >;
@@ -15,6 +19,8 @@ export const useWebRTCConnection = ({
   localStreamRef,
   socketRef,
   userId,
+  meetingId,
+  inRoom,
   setRemoteParticipants,
 }: UseWebRTCConnectionProps) => {
   const peerConnections = useRef<Map<string, RTCPeerConnection>>(new Map());
@@ -22,6 +28,44 @@ export const useWebRTCConnection = ({
     Map<string, NodeJS.Timeout>
   >(new Map());
   const connectionStartTimes = useRef<Map<string, number>>(new Map());
+  // Current socket of each peer connection's remote end; it changes when the
+  // peer resumes its session on a new socket
+  const signalTargets = useRef<WeakMap<RTCPeerConnection, string>>(
+    new WeakMap()
+  );
+  // Set for webinar attendees: they only receive, and offer to each presenter
+  const receiveOnly = useRef(false);
+  // STUN only until the server hands out TURN credentials for this meeting
+  const iceServers = useRef<RTCIceServer[]>(ICE_SERVERS);
+
+  // Fetch ICE servers once in the meeting, and again before the credentials expire
+  useEffect(() => {
+    if (!inRoom || !meetingId || !userId) {
+      iceServers.current = ICE_SERVERS;
+      return;
+    }
+
+    let cancelled = false;
+    let refreshTimer: ReturnType<typeof setTimeout> | undefined;
+    const loadIceServers = async () => {
+      try {
+        const data = await meetingAPI.getIceServers(meetingId, userId);
+        if (cancelled) return;
+        iceServers.current = data.iceServers;
+        if (data.ttl) {
+          refreshTimer = setTimeout(loadIceServers, data.ttl * 900);
+        }
+      } catch (error) {
+        console.error("Failed to load ICE servers, using STUN only:", error);
+      }
+    };
+
+    loadIceServers();
+    return () => {
+      cancelled = true;
+      clearTimeout(refreshTimer);
+    };
+  }, [inRoom, meetingId, userId]);
 
   // Function to clear connection timeout
   const clearConnectionTimeout = useCallback(
@@ -160,59 +204,25 @@ export const useWebRTCConnection = ({
       });
 
       const pc = new RTCPeerConnection({
-        iceServers: [
-          // Google STUN servers
-          { urls: "stun:stun.l.google.com:19302" },
-          { urls: "stun:stun1.l.google.com:19302" },
-          { urls: "stun:stun2.l.google.com:19302" },
-          { urls: "stun:stun3.l.google.com:19302" },
-          { urls: "stun:stun4.l.google.com:19302" },
-
-          // Additional public STUN servers
-          { urls: "stun:stun.relay.metered.ca:80" },
-          { urls: "stun:global.stun.twilio.com:3478" },
-
-          // Metered TURN servers (multiple protocols and ports)
-          {
-            urls: "turn:global.relay.metered.ca:80",
-            username: "92c0c0f3362e3c6f2f20a86d",
-            credential: "aK0V47jdAT0iaI4a",
-          },
-          {
-            urls: "turn:global.relay.metered.ca:80?transport=tcp",
-            username: "92c0c0f3362e3c6f2f20a86d",
-            credential: "aK0V47jdAT0iaI4a",
-          },
-          {
-            urls: "turn:global.relay.metered.ca:443",
-            username: "92c0c0f3362e3c6f2f20a86d",
-            credential: "aK0V47jdAT0iaI4a",
-          },
-          {
-            urls: "turns:global.relay.metered.ca:443?transport=tcp",
-            username: "92c0c0f3362e3c6f2f20a86d",
-            credential: "aK0V47jdAT0iaI4a",
-          },
-
-          // Additional TURN servers for better connectivity
-          {
-            urls: "turn:relay1.expressturn.com:3478",
-            username: "ef4BIXR2JUZ0JJ2HFPZ",
-            credential: "K5BdZjHHmKITB7xP",
-          },
-        ],
-        iceCandidatePoolSize: 10,
-        bundlePolicy: "max-bundle",
-        rtcpMuxPolicy: "require",
-        iceTransportPolicy: "all",
+        ...RTC_CONFIGURATION,
+        iceServers: iceServers.current,
       });
 
+      // Where ICE candidates and restart offers for this connection go
+      const signalTarget = () =>
+        signalTargets.current.get(pc) ?? participantSocketId;
+
       // Track connection attempt and retry count
       let connectionAttempts = 0;
       const maxAttempts = 3;
 
       // Add local stream tracks - ensure they exist first
-      if (localStreamRef.current) {
+      if (receiveOnly.current) {
+        if (isInitiator) {
+          pc.addTransceiver("audio", { direction: "recvonly" });
+          pc.addTransceiver("video", { direction: "recvonly" });
+        }
+      } else if (localStreamRef.current) {
         const tracks = localStreamRef.current.getTracks();
         console.log(
           `Adding ${tracks.length} tracks to peer connection for ${participantSocketId}`
@@ -239,7 +249,7 @@ export const useWebRTCConnection = ({
           if (socketRef.current) {
             socketRef.current.emit("ice-candidate", {
               candidate: event.candidate,
-              targetSocket: participantSocketId,
+              targetSocket: signalTarget(),
               fromUserId: userId,
             });
           }
@@ -345,6 +355,10 @@ export const useWebRTCConnection = ({
             console.log(`Successfully connected to ${participantSocketId}`);
             connectionAttempts = 0;
             clearConnectionTimeout(participantSocketId);
+            // Late ICE candidates from this peer are no longer needed
+            socketRef.current?.emit("peer-connected", {
+              targetSocket: participantSocketId,
+            });
             break;
 
           case "failed":
@@ -370,7 +384,7 @@ export const useWebRTCConnection = ({
 
                     socketRef.current?.emit("offer", {
                       offer,
-                      targetSocket: participantSocketId,
+                      targetSocket: signalTarget(),
                       fromUserId: userId,
                       msgId: Date.now().toString(),
                       isRestart: true,
@@ -473,6 +487,7 @@ export const useWebRTCConnection = ({
       fromSocket: string;
       fromUserId: string;
       msgId: string;
+      receiveOnly?: boolean;
     }) => {
       console.log("Received offer from:", data.fromSocket);
 
@@ -482,6 +497,9 @@ export const useWebRTCConnection = ({
       }
 
       setRemoteParticipants((prev) => {
+        // A webinar attendee only receives our media and gets no tile
+        if (data.receiveOnly) return prev;
+
         const updated = new Map(prev);
         const existingParticipant = updated.get(data.fromSocket);
 
@@ -551,7 +569,11 @@ export const useWebRTCConnection = ({
         const hasTracksAttached = senders.some(
           (sender) => sender.track !== null
         );
-        if (!hasTracksAttached && localStreamRef.current) {
+        if (
+          !hasTracksAttached &&
+          localStreamRef.current &&
+          !receiveOnly.current
+        ) {
           console.log(
             `No tracks attached to senders, manually adding tracks for ${data.fromSocket}`
           );
@@ -649,6 +671,16 @@ export const useWebRTCConnection = ({
 
       setRemoteParticipants((prev) => {
         const updated = new Map(prev);
+
+        // The user rejoined on a new socket instead of resuming: drop the old tile
+        prev.forEach((participant, socketId) => {
+          if (participant.userId === data.userId && socketId !== data.socketId) {
+            peerConnections.current.get(socketId)?.close();
+            peerConnections.current.delete(socketId);
+            updated.delete(socketId);
+          }
+        });
+
         const existingParticipant = updated.get(data.socketId);
 
         if (existingParticipant) {
@@ -712,10 +744,22 @@ export const useWebRTCConnection = ({
   );
 
   const handleExistingParticipants = useCallback(
-    async (data: { participants: Participant[] }) => {
+    async (data: { participants: Participant[]; role?: string }) => {
       console.log("Existing participants:", data.participants);
 
+      // Presenters are never told about attendees, so attendees make the offers
+      receiveOnly.current = data.role === "attendee";
+      if (receiveOnly.current) {
+        data.participants.forEach((participant) => {
+          peerConnections.current.get(participant.socketId)?.close();
+          handleUserJoined(participant);
+        });
+        return;
+      }
+
       data.participants.forEach((participant) => {
+        // A rejoin after a failed resume replaces the connections we still hold
+        peerConnections.current.get(participant.socketId)?.close();
         const pc = createPeerConnection(participant.socketId, false);
 
         setRemoteParticipants((prev) => {
@@ -728,7 +772,55 @@ export const useWebRTCConnection = ({
         });
       });
     },
-    [createPeerConnection, setRemoteParticipants]
+    [createPeerConnection, handleUserJoined, setRemoteParticipants]
+  );
+
+  // Joins and leaves the server merged into one packet (large rooms). A joiner
+  // sees its own entry and the members it got in existing-participants; it
+  // skips both and waits for their offers, so existing members still initiate.
+  const handleParticipantsChanged = useCallback(
+    (data: {
+      added: { userId: string; socketId: string }[];
+      removed: { userId: string; socketId: string }[];
+    }) => {
+      console.log("Participants changed:", data);
+
+      data.removed.forEach((entry) => handleUserLeft(entry));
+      data.added.forEach((entry) => {
+        if (entry.socketId === socketRef.current?.id) return;
+        if (peerConnections.current.has(entry.socketId)) return;
+        handleUserJoined(entry);
+      });
+    },
+    [handleUserJoined, handleUserLeft, socketRef]
+  );
+
+  // A peer resumed its session on a new socket: keep its connection and re-key it
+  const handleSocketRemapped = useCallback(
+    (data: { userId: string; oldSocketId: string; newSocketId: string }) => {
+      console.log("Socket remapped:", data);
+
+      const pc = peerConnections.current.get(data.oldSocketId);
+      if (pc) {
+        peerConnections.current.delete(data.oldSocketId);
+        peerConnections.current.set(data.newSocketId, pc);
+        signalTargets.current.set(pc, data.newSocketId);
+      }
+      clearConnectionTimeout(data.oldSocketId);
+
+      setRemoteParticipants((prev) => {
+        const participant = prev.get(data.oldSocketId);
+        if (!participant) return prev;
+        const updated = new Map(prev);
+        updated.delete(data.oldSocketId);
+        updated.set(data.newSocketId, {
+          ...participant,
+          socketId: data.newSocketId,
+        });
+        return updated;
+      });
+    },
+    [clearConnectionTimeout, setRemoteParticipants]
   );
 
   const cleanupConnections = useCallback(() => {
@@ -748,6 +840,8 @@ export const useWebRTCConnection = ({
     handleUserJoined,
     handleUserLeft,
     handleExistingParticipants,
+    handleParticipantsChanged,
+    handleSocketRemapped,
     cleanupConnections,
     peerConnections,
     connectionTimeouts,
@@ -19,12 +19,20 @@ export interface ChatMessage {
 export interface SocketEvents {
   "user-joined": (data: { userId: string; socketId: string }) => void;
   "user-left": (data: { userId: string; socketId: string }) => void;
-  "existing-participants": (data: { participants: Participant[] }) => void;
+  "existing-participants": (data: {
+    participants: Participant[];
+    role?: string;
+  }) => void;
+  "participants-changed": (data: {
+    added: { userId: string; socketId: string }[];
+    removed: { userId: string; socketId: string }[];
+  }) => void;
   offer: (data: {
     offer: RTCSessionDescriptionInit;
     fromSocket: string;
     fromUserId: string;
     msgId: string;
+    receiveOnly?: boolean;
   }) => void;
   answer: (data: {
     answer: RTCSessionDescriptionInit;
@@ -59,3 +67,23 @@ export interface MainParticipantView {
   userId: string | null;
   isLocal: boolean;
 }
+
+export interface MeetingBootstrap {
+  meeting: {
+    meetingId: string;
+    name: string;
+    hostId: string;
+    createdAt: string;
+    active: boolean;
+  };
+  isHost: boolean;
+  waiting: boolean;
+  participants: Array<{
+    userId: string;
+    username?: string;
+    displayName?: string;
+    isHost?: boolean;
+  }>;
+  iceServers?: RTCIceServer[];
+  ttl?: number | null;
+}